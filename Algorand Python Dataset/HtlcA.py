@@ -0,0 +1,166 @@
+import typing
+
+from algopy import ARC4Contract, BoxMap, Bytes, Global, Txn, UInt64, arc4, gtxn, itxn, op, subroutine, urange
+
+Bytes32: typing.TypeAlias = arc4.StaticArray[arc4.Byte, typing.Literal[32]]
+Bytes32Array: typing.TypeAlias = arc4.DynamicArray[Bytes32]
+
+#: The min balance increase per box created
+BOX_FLAT_MIN_BALANCE = 2500
+
+#: The min balance increase per byte of boxes (key included)
+BOX_BYTE_MIN_BALANCE = 400
+
+#: Lock box min balance: flat + ("h_" prefix + 32 byte hashlock + 80 byte Lock) per byte
+LOCK_MIN_BALANCE = BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (2 + 32 + 80)
+
+class Lock(arc4.Struct):
+    sender: arc4.Address
+    receiver: arc4.Address
+    amount: arc4.UInt64
+    timeout: arc4.UInt64
+
+# Event structs
+class Locked(arc4.Struct):
+    hashlock: Bytes32
+    sender: arc4.Address
+    receiver: arc4.Address
+    amount: arc4.UInt64
+    timeout: arc4.UInt64
+
+class PaymentReleased(arc4.Struct):
+    hashlock: Bytes32
+    to: arc4.Address
+    amount: arc4.UInt64
+
+class Refund(arc4.Struct):
+    hashlock: Bytes32
+    to: arc4.Address
+    amount: arc4.UInt64
+
+class HashedTimeLock(ARC4Contract):
+    """
+    @title HashedTimeLock
+    @notice Algorand Python port of HtlcE.sol holding many locks in one app
+    Each lock lives in a box keyed by its keccak256 hashlock, so the same secret
+    unlocks the matching lock on an Ethereum HashedTimeLockedContract.
+    Claims and refunds take arrays, settling several locks with a single inner
+    payment; each settled lock needs its box in the transaction's box references.
+    """
+
+    def __init__(self) -> None:
+        # Locks keyed by hashlock
+        self.locks = BoxMap(Bytes, Lock, key_prefix=b"h_")
+        self.fee_limit = UInt64(0)
+
+    @arc4.abimethod(create="require")
+    def create(self, fee_limit: UInt64) -> None:
+        """
+        Constructor equivalent
+        @param fee_limit: Maximum amount a single lock may hold, 0 for no limit
+        """
+        self.fee_limit = fee_limit
+
+    @arc4.abimethod
+    def lock(
+        self,
+        pay: gtxn.PaymentTransaction,
+        hashlock: Bytes32,
+        receiver: arc4.Address,
+        timeout: UInt64,
+    ) -> None:
+        """
+        Lock the grouped payment until the secret is revealed or the timeout passes
+        The payment also covers the lock box min balance; the full amount is paid
+        out on claim or refund once the box is deleted
+        @param pay: Payment to the app account holding the locked amount
+        @param hashlock: keccak256 of the 32 byte secret
+        @param receiver: Account allowed to claim with the secret
+        @param timeout: Timestamp after which the sender can refund
+        """
+        assert pay.sender == Txn.sender, "Payment sender must match transaction sender"
+        assert pay.receiver == Global.current_application_address, "Payment must be to app address"
+        assert pay.amount >= LOCK_MIN_BALANCE, "Payment must cover the lock min balance"
+        assert self.fee_limit == 0 or pay.amount <= self.fee_limit, "Fee exceeds limit"
+        assert timeout > Global.latest_timestamp, "Timeout must be in the future"
+        assert hashlock.bytes not in self.locks, "Hashlock already used"
+
+        self.locks[hashlock.bytes] = Lock(
+            sender=arc4.Address(Txn.sender),
+            receiver=receiver,
+            amount=arc4.UInt64(pay.amount),
+            timeout=arc4.UInt64(timeout),
+        )
+        arc4.emit(Locked(
+            hashlock=hashlock.copy(),
+            sender=arc4.Address(Txn.sender),
+            receiver=receiver,
+            amount=arc4.UInt64(pay.amount),
+            timeout=arc4.UInt64(timeout),
+        ))
+
+    @arc4.abimethod
+    def claim(self, secrets: Bytes32Array) -> UInt64:
+        """
+        Receiver claims every lock matching one of the secrets
+        @param secrets: 32 byte secrets whose keccak256 are the hashlocks
+        @return Total amount paid to the receiver
+        """
+        total = UInt64(0)
+        for index in urange(secrets.length):
+            hashlock = op.keccak256(secrets[index].bytes)
+            lock = self.locks[hashlock].copy()
+            assert lock.receiver == arc4.Address(Txn.sender), "Only receiver can claim payment"
+
+            del self.locks[hashlock]
+            total += lock.amount.native
+            arc4.emit(PaymentReleased(
+                hashlock=Bytes32.from_bytes(hashlock),
+                to=lock.receiver,
+                amount=lock.amount,
+            ))
+
+        self.pay_sender(total)
+        return total
+
+    @arc4.abimethod
+    def refund(self, hashlocks: Bytes32Array) -> UInt64:
+        """
+        Sender refunds every listed lock whose timeout has passed
+        @param hashlocks: Hashlocks of the locks to refund
+        @return Total amount refunded to the sender
+        """
+        total = UInt64(0)
+        for index in urange(hashlocks.length):
+            hashlock = hashlocks[index].copy()
+            lock = self.locks[hashlock.bytes].copy()
+            assert lock.sender == arc4.Address(Txn.sender), "Only sender can refund"
+            assert Global.latest_timestamp > lock.timeout.native, "Timeout not reached"
+
+            del self.locks[hashlock.bytes]
+            total += lock.amount.native
+            arc4.emit(Refund(
+                hashlock=hashlock.copy(),
+                to=lock.sender,
+                amount=lock.amount,
+            ))
+
+        self.pay_sender(total)
+        return total
+
+    @arc4.abimethod(readonly=True)
+    def get_lock(self, hashlock: Bytes32) -> Lock:
+        """
+        Get a lock by its hashlock
+        """
+        return self.locks[hashlock.bytes]
+
+    @subroutine
+    def pay_sender(self, total: UInt64) -> None:
+        """Single inner payment settling a whole batch"""
+        assert total > UInt64(0), "Insufficient contract balance"
+        itxn.Payment(
+            receiver=Txn.sender,
+            amount=total,
+            fee=0
+        ).submit()
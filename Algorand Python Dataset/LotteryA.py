@@ -0,0 +1,206 @@
+from algopy import Account, ARC4Contract, BoxRef, Bytes, Global, Txn, UInt64, arc4, gtxn, itxn, op, subroutine
+
+#: Every page box holds PAGE_BYTES, i.e. two box references of I/O budget
+PAGE_BYTES = 2048
+
+#: Cumulative ticket count stored per entry
+CUM_BYTES = 8
+ENTRIES_PER_CUM_PAGE = 256
+
+#: Owner address stored per entry
+ADDRESS_BYTES = 32
+ENTRIES_PER_OWNER_PAGE = 64
+
+#: Box references one app call carries, each granting BOX_REF_BYTES of box I/O budget
+MAX_BOX_REFS = 8
+BOX_REF_BYTES = 1024
+
+#: Entries per round: buy and draw read the whole page index plus a sum page and an
+#: owner page, which must fit the I/O budget of a single app call
+MAX_ENTRIES = (MAX_BOX_REFS * BOX_REF_BYTES - 2 * PAGE_BYTES) // CUM_BYTES * ENTRIES_PER_CUM_PAGE
+
+# Event structs
+class EntryAdded(arc4.Struct):
+    round: arc4.UInt64
+    entry: arc4.UInt64
+    owner: arc4.Address
+    tickets: arc4.UInt64
+
+class WinnerDrawn(arc4.Struct):
+    round: arc4.UInt64
+    ticket: arc4.UInt64
+    winner: arc4.Address
+    prize: arc4.UInt64
+
+class WeightedLottery(ARC4Contract):
+    """
+    @title WeightedLottery
+    @notice Algorand counterpart of Lottery.sol where each entry weighs as many
+    tickets as it paid for.
+    Entries are stored as prefix sums: entry i covers tickets
+    [cum[i - 1], cum[i]). The sums are packed 8 bytes each into fixed size page
+    boxes ("c" + page), owners 32 bytes each into "o" + page, and the page index
+    box "i" keeps the last sum of every page. Buying appends in O(1) and the
+    draw binary searches the page index, then one page, so the probes grow with
+    log(entries). Both read the whole index though, which grows by 8 bytes per
+    256 entries, plus one sum page and one owner page; a round is capped at
+    MAX_ENTRIES so that fits the box references of one app call.
+    The app account must be funded for the page boxes min balance.
+    """
+
+    def __init__(self) -> None:
+        self.owner = Global.creator_address
+        self.ticket_price = UInt64(0)
+        self.round = UInt64(1)
+        self.entry_count = UInt64(0)
+        self.total_tickets = UInt64(0)
+        self.pot = UInt64(0)
+        self.page_index = BoxRef(key=b"i")
+
+    @arc4.abimethod(create="require")
+    def create(self, ticket_price: UInt64) -> None:
+        """
+        Constructor equivalent
+        @param ticket_price: Price of one ticket in microAlgo
+        """
+        assert ticket_price > 0, "Ticket price must be positive"
+        self.ticket_price = ticket_price
+
+    @arc4.abimethod
+    def buy(self, pay: gtxn.PaymentTransaction) -> UInt64:
+        """
+        Buy as many tickets as the grouped payment covers
+        @param pay: Payment to the app account
+        @return Index of the new entry in the current round
+        """
+        assert pay.sender == Txn.sender, "Payment sender must match transaction sender"
+        assert pay.receiver == Global.current_application_address, "Payment must be to app address"
+        tickets = pay.amount // self.ticket_price
+        assert tickets > 0, "Payment below ticket price"
+
+        entry = self.entry_count
+        assert entry < MAX_ENTRIES, "Round is full"
+        cumulative = self.total_tickets + tickets
+
+        # Append the prefix sum and mirror it as the last sum of its page
+        page = entry // ENTRIES_PER_CUM_PAGE
+        cum_page = BoxRef(key=self.page_key(Bytes(b"c"), page))
+        self.ensure_page(cum_page.key)
+        cum_page.replace((entry % ENTRIES_PER_CUM_PAGE) * CUM_BYTES, op.itob(cumulative))
+        if not self.page_index:
+            assert self.page_index.create(size=CUM_BYTES)
+        elif self.page_index.length <= page * CUM_BYTES:
+            self.page_index.resize((page + 1) * CUM_BYTES)
+        self.page_index.replace(page * CUM_BYTES, op.itob(cumulative))
+
+        # Append the owner
+        owner_page = BoxRef(key=self.page_key(Bytes(b"o"), entry // ENTRIES_PER_OWNER_PAGE))
+        self.ensure_page(owner_page.key)
+        owner_page.replace((entry % ENTRIES_PER_OWNER_PAGE) * ADDRESS_BYTES, Txn.sender.bytes)
+
+        self.entry_count = entry + 1
+        self.total_tickets = cumulative
+        self.pot += pay.amount
+
+        arc4.emit(EntryAdded(
+            round=arc4.UInt64(self.round),
+            entry=arc4.UInt64(entry),
+            owner=arc4.Address(Txn.sender),
+            tickets=arc4.UInt64(tickets),
+        ))
+        return entry
+
+    @arc4.abimethod
+    def draw(self) -> arc4.Address:
+        """
+        Pick a winning ticket, pay the pot to its owner and start a new round
+        Randomness comes from the previous block seed, which is not a secure
+        randomness beacon
+        @return Address of the winner
+        """
+        assert Txn.sender == self.owner, "Only owner can draw"
+        assert self.total_tickets > 0, "No tickets sold"
+
+        seed = op.sha512_256(
+            op.Block.blk_seed(Global.round - 1)
+            + op.itob(self.round)
+            + Global.current_application_address.bytes
+        )
+        ticket = op.btoi(op.extract(seed, 0, 8)) % self.total_tickets
+        entry = self.find_entry(ticket)
+        owner_page = BoxRef(key=self.page_key(Bytes(b"o"), entry // ENTRIES_PER_OWNER_PAGE))
+        winner = Account(
+            owner_page.extract((entry % ENTRIES_PER_OWNER_PAGE) * ADDRESS_BYTES, ADDRESS_BYTES)
+        )
+
+        prize = self.pot
+        itxn.Payment(receiver=winner, amount=prize, fee=0).submit()
+        arc4.emit(WinnerDrawn(
+            round=arc4.UInt64(self.round),
+            ticket=arc4.UInt64(ticket),
+            winner=arc4.Address(winner),
+            prize=arc4.UInt64(prize),
+        ))
+
+        # Page boxes are kept and overwritten by the next round
+        self.round += 1
+        self.entry_count = UInt64(0)
+        self.total_tickets = UInt64(0)
+        self.pot = UInt64(0)
+        return arc4.Address(winner)
+
+    @arc4.abimethod(readonly=True)
+    def get_entry(self, entry: UInt64) -> arc4.Tuple[arc4.Address, arc4.UInt64]:
+        """
+        Get an entry of the current round
+        @return Owner and cumulative ticket count up to and including the entry
+        """
+        assert entry < self.entry_count, "Unknown entry"
+        owner_page = BoxRef(key=self.page_key(Bytes(b"o"), entry // ENTRIES_PER_OWNER_PAGE))
+        owner = owner_page.extract((entry % ENTRIES_PER_OWNER_PAGE) * ADDRESS_BYTES, ADDRESS_BYTES)
+        return arc4.Tuple((arc4.Address(owner), arc4.UInt64(self.cumulative_at(entry))))
+
+    @subroutine
+    def find_entry(self, ticket: UInt64) -> UInt64:
+        """Index of the first entry whose prefix sum exceeds ticket"""
+        # First page whose last prefix sum exceeds the ticket
+        low = UInt64(0)
+        high = (self.entry_count - 1) // ENTRIES_PER_CUM_PAGE
+        while low < high:
+            middle = (low + high) // 2
+            if op.btoi(self.page_index.extract(middle * CUM_BYTES, CUM_BYTES)) > ticket:
+                high = middle
+            else:
+                low = middle + 1
+        page = low
+
+        # First entry of that page whose prefix sum exceeds the ticket
+        cum_page = BoxRef(key=self.page_key(Bytes(b"c"), page))
+        first = page * ENTRIES_PER_CUM_PAGE
+        low = UInt64(0)
+        high = self.entry_count - first - 1
+        if high >= ENTRIES_PER_CUM_PAGE:
+            high = UInt64(ENTRIES_PER_CUM_PAGE - 1)
+        while low < high:
+            middle = (low + high) // 2
+            if op.btoi(cum_page.extract(middle * CUM_BYTES, CUM_BYTES)) > ticket:
+                high = middle
+            else:
+                low = middle + 1
+        return first + low
+
+    @subroutine
+    def cumulative_at(self, entry: UInt64) -> UInt64:
+        cum_page = BoxRef(key=self.page_key(Bytes(b"c"), entry // ENTRIES_PER_CUM_PAGE))
+        return op.btoi(cum_page.extract((entry % ENTRIES_PER_CUM_PAGE) * CUM_BYTES, CUM_BYTES))
+
+    @subroutine
+    def page_key(self, prefix: Bytes, page: UInt64) -> Bytes:
+        return prefix + op.itob(page)
+
+    @subroutine
+    def ensure_page(self, key: Bytes) -> None:
+        """Create a page box on first use, later rounds overwrite it"""
+        _length, exists = op.Box.length(key)
+        if not exists:
+            assert op.Box.create(key, PAGE_BYTES)
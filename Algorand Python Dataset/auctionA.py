@@ -2,16 +2,29 @@ from algopy import (
     Account,
     ARC4Contract,
     Asset,
+    BoxMap,
     Global,
-    LocalState,
     Txn,
     UInt64,
     arc4,
     gtxn,
     itxn,
     subroutine,
+    urange,
 )
 
+#: The min balance increase per box created
+BOX_FLAT_MIN_BALANCE = 2500
+
+#: The min balance increase per byte of boxes (key included)
+BOX_BYTE_MIN_BALANCE = 400
+
+#: Escrow box min balance: flat + ("e_" prefix + 32 byte address + 8 byte amount) per byte
+ESCROW_MIN_BALANCE = BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (2 + 32 + 8)
+
+#: Bidder list box min balance: flat + ("b_" prefix + 8 byte index + 32 byte address) per byte
+BIDDER_MIN_BALANCE = BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (2 + 8 + 32)
+
 
 class Auction(ARC4Contract):
     def __init__(self) -> None:
@@ -20,7 +33,15 @@ class Auction(ARC4Contract):
         self.asa_amount = UInt64(0)
         self.asa = Asset()
         self.previous_bidder = Account()
-        self.claimable_amount = LocalState(UInt64, key="claim", description="The claimable amount")
+        self.settled = False
+        # Cumulative escrow per bidder, box-backed so bidders never need to opt in.
+        # A first bid also deposits the min balance of the bidder's two boxes,
+        # returned with the payout that deletes each box
+        self.escrow = BoxMap(Account, UInt64, key_prefix=b"e_")
+        # Bidder list in first-bid order, walked by refund_losers
+        self.bidders = BoxMap(UInt64, Account, key_prefix=b"b_")
+        self.bidder_count = UInt64(0)
+        self.refund_cursor = UInt64(0)
 
     @arc4.abimethod
     def opt_into_asset(self, asset: Asset) -> None:
@@ -59,10 +80,6 @@ class Auction(ARC4Contract):
         self.auction_end = Global.latest_timestamp + length
         self.previous_bid = starting_price
 
-    @arc4.abimethod
-    def opt_in(self) -> None:
-        pass
-
     @arc4.abimethod
     def bid(self, pay: gtxn.PaymentTransaction) -> None:
         # Ensure auction hasn't ended
@@ -70,33 +87,96 @@ class Auction(ARC4Contract):
 
         # Verify payment transaction
         assert pay.sender == Txn.sender, "payment sender must match transaction sender"
-        assert pay.amount > self.previous_bid, "Bid must be higher than previous bid"
+        assert (
+            pay.receiver == Global.current_application_address
+        ), "payment must be to this app"
+
+        # First-time bidders pay the min balance of their boxes on top of the bid
+        escrowed, exists = self.escrow.maybe(Txn.sender)
+        deposit = UInt64(0) if exists else UInt64(ESCROW_MIN_BALANCE + BIDDER_MIN_BALANCE)
+        assert pay.amount > self.previous_bid + deposit, "Bid must be higher than previous bid"
+        amount = pay.amount - deposit
 
         # set global state
-        self.previous_bid = pay.amount
+        self.previous_bid = amount
         self.previous_bidder = pay.sender
 
-        # Update claimable amount
-        self.claimable_amount[Txn.sender] = pay.amount
+        # Accumulate escrow, registering first-time bidders for batch refunds
+        if not exists:
+            self.bidders[self.bidder_count] = Txn.sender
+            self.bidder_count += 1
+        self.escrow[Txn.sender] = escrowed + amount
 
     @arc4.abimethod
     def claim_bids(self) -> None:
-        amount = original_amount = self.claimable_amount[Txn.sender]
+        amount = self.refundable_amount(Txn.sender)
+        assert amount > 0, "No claimable amount"
 
-        # subtract previous bid if sender is previous bidder
-        if Txn.sender == self.previous_bidder:
-            amount -= self.previous_bid
+        # Update escrow before paying out
+        amount += self.release_escrow(Txn.sender, amount)
 
         itxn.Payment(
             amount=amount,
             receiver=Txn.sender,
+            fee=0,
         ).submit()
 
-        self.claimable_amount[Txn.sender] = original_amount - amount
+    @arc4.abimethod
+    def refund_losers(self, page_size: UInt64) -> UInt64:
+        assert Txn.sender == Global.creator_address, "Only creator can refund bidders"
+        assert self.settled, "asset has not been claimed"
+
+        # Refund the next page of bidders, resuming from the stored cursor
+        end = self.refund_cursor + page_size
+        if end > self.bidder_count:
+            end = self.bidder_count
+        for index in urange(self.refund_cursor, end):
+            # The walked list entry goes, its deposit with the refund
+            bidder = self.bidders[index]
+            del self.bidders[index]
+            amount = self.refundable_amount(bidder)
+            amount += self.release_escrow(bidder, amount) + BIDDER_MIN_BALANCE
+            itxn.Payment(
+                amount=amount,
+                receiver=bidder,
+                fee=0,
+            ).submit()
+        self.refund_cursor = end
+
+        # Number of bidders still waiting to be walked
+        return self.bidder_count - end
+
+    @subroutine
+    def refundable_amount(self, bidder: Account) -> UInt64:
+        amount = self.escrow.get(bidder, default=UInt64(0))
+
+        # The winning bid stays in escrow until settled, everything else is refundable
+        if bidder == self.previous_bidder and not self.settled:
+            amount -= self.previous_bid
+        return amount
+
+    @subroutine
+    def release_escrow(self, bidder: Account, amount: UInt64) -> UInt64:
+        # Take amount out of the bidder's escrow, deleting the box once empty;
+        # returns the box deposit freed by the deletion, to pay out with it
+        escrowed, exists = self.escrow.maybe(bidder)
+        if not exists:
+            return UInt64(0)
+        if escrowed == amount:
+            del self.escrow[bidder]
+            return UInt64(ESCROW_MIN_BALANCE)
+        self.escrow[bidder] = escrowed - amount
+        return UInt64(0)
 
     @arc4.abimethod
     def claim_asset(self, asset: Asset) -> None:
         assert Global.latest_timestamp > self.auction_end, "auction has not ended"
+        assert not self.settled, "asset already claimed"
+        self.settled = True
+
+        # The winning bid leaves the escrow; the rest is refunded by refund_losers
+        deposit = self.release_escrow(self.previous_bidder, self.previous_bid)
+
         # Send ASA to previous bidder
         itxn.AssetTransfer(
             xfer_asset=asset,
@@ -104,6 +184,12 @@ class Auction(ARC4Contract):
             asset_receiver=self.previous_bidder,
             asset_amount=self.asa_amount,
         ).submit()
+        if deposit > 0:
+            itxn.Payment(
+                amount=deposit,
+                receiver=self.previous_bidder,
+                fee=0,
+            ).submit()
 
     @subroutine
     def delete_application(self) -> None:
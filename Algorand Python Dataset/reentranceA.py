@@ -1,13 +1,28 @@
-from algopy import Account, ARC4Contract, Box, BoxMap, Global, Txn, UInt64, arc4, itxn, subroutine
+import typing
+
+from algopy import Account, ARC4Contract, BoxMap, Global, Txn, UInt64, arc4, gtxn, itxn, subroutine
+
+AddressArray: typing.TypeAlias = arc4.DynamicArray[arc4.Address]
+
+#: The min balance increase per box created
+BOX_FLAT_MIN_BALANCE = 2500
+
+#: The min balance increase per byte of boxes (key included)
+BOX_BYTE_MIN_BALANCE = 400
+
+#: Balance box min balance: flat + ("balance_" prefix + 32 byte address + 8 byte amount) per byte
+BALANCE_MIN_BALANCE = BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (8 + 32 + 8)
 
 class Reentrance(ARC4Contract):
     """
     @title Reentrance
     @notice A contract demonstrating reentrancy vulnerabilities and fixes
     """
-    
+
     def __init__(self) -> None:
-        # Initialize user balances using box storage
+        # Initialize user balances using box storage.
+        # A first deposit also covers the min balance of the user's box,
+        # refunded with the payout that deletes it
         self.balances = BoxMap(Account, UInt64, key_prefix=b"balance_")
 
     @arc4.abimethod
@@ -17,76 +32,91 @@ class Reentrance(ARC4Contract):
         @param user: Address to check balance for
         @return The user's balance
         """
-        balance = self.balances[Account(user.bytes)]
+        balance = self.balances.get(Account(user.bytes), default=UInt64(0))
         return arc4.UInt64(balance)
 
     @arc4.abimethod
-    def add_to_balance(self) -> None:
-        """Add to sender's balance"""
-        # Get the payment from the transaction
-        assert Txn.amount > UInt64(0), "PAYMENT_REQUIRED"
-        
-        # Add to user's balance
-        current_balance = self.balances[Txn.sender]
-        self.balances[Txn.sender] = current_balance + Txn.amount
+    def add_to_balance(self, pay: gtxn.PaymentTransaction) -> None:
+        """
+        Add to sender's balance
+        @param pay: Payment to the app account preceding this call,
+                    plus BALANCE_MIN_BALANCE when the sender has no balance yet
+        """
+        # Verify the deposit (app calls carry no amount of their own)
+        assert pay.sender == Txn.sender, "PAYMENT_SENDER_MISMATCH"
+        assert pay.receiver == Global.current_application_address, "PAYMENT_RECEIVER_MISMATCH"
+        current_balance, exists = self.balances.maybe(Txn.sender)
+        deposit = UInt64(0) if exists else UInt64(BALANCE_MIN_BALANCE)
+        assert pay.amount > deposit, "PAYMENT_REQUIRED"
+        amount = pay.amount - deposit
+
+        # Add to user's balance, keeping the box deposit out of it
+        self.balances[Txn.sender] = current_balance + amount
+
+    @arc4.abimethod
+    def withdraw_balance(self) -> None:
+        """
+        Withdraw the sender's whole balance
+        """
+        assert self.pay_out(Txn.sender) > UInt64(0), "NO_BALANCE"
+
+    @arc4.abimethod
+    def payout_balances(self, users: AddressArray) -> UInt64:
+        """
+        Batched payout - withdraws the balance of every listed user in one call
+        Inner payment fees must be covered by the outer transaction (fee pooling)
+        @param users: Addresses to pay out, users without a balance are skipped
+        @return Total balance paid out, box deposits not included
+        """
+        assert Txn.sender == Global.creator_address, "NOT_CREATOR"
+
+        total = UInt64(0)
+        for user in users:
+            total += self.pay_out(Account(user.bytes))
+        return total
 
     @arc4.abimethod
     def withdraw_balance_unsafe(self) -> None:
         """
-        Withdraw balance - UNSAFE version demonstrating reentrancy vulnerability
-        While Algorand's atomic transaction groups make this less dangerous than Ethereum,
-        it's still not recommended to structure code this way
+        Withdraw balance - kept for parity with withdrawBalance() in Reentrancy.sol
+        Routed through the same checks-effects-interactions path as withdraw_balance
         """
-        balance = self.balances[Txn.sender]
-        assert balance > UInt64(0), "NO_BALANCE"
-        
-        # Send payment first (potentially dangerous as it allows reentrancy)
-        itxn.Payment(
-            receiver=Txn.sender,
-            amount=balance,
-            fee=0
-        ).submit()
-        
-        # Update balance after payment (vulnerable)
-        self.balances[Txn.sender] = UInt64(0)
+        assert self.pay_out(Txn.sender) > UInt64(0), "NO_BALANCE"
 
     @arc4.abimethod
     def withdraw_balance_fixed(self) -> None:
         """
-        Withdraw balance - Fixed version that prevents reentrancy
-        by updating state before making payment
-        """
-        # Get and verify balance
-        balance = self.balances[Txn.sender]
-        assert balance > UInt64(0), "NO_BALANCE"
-        
-        # Update state before payment (safe)
-        self.balances[Txn.sender] = UInt64(0)
-        
-        # Send payment after state update
-        itxn.Payment(
-            receiver=Txn.sender,
-            amount=balance,
-            fee=0
-        ).submit()
+        Withdraw balance - kept for parity with withdrawBalance_fixed() in Reentrancy.sol
+        """
+        assert self.pay_out(Txn.sender) > UInt64(0), "NO_BALANCE"
 
     @arc4.abimethod
     def withdraw_balance_fixed_2(self) -> None:
         """
-        Withdraw balance - Alternative fixed version
-        While Algorand doesn't have the same gas concerns as Ethereum,
-        this demonstrates the principle of the Solidity transfer() approach
-        """
-        # Get and verify balance
-        balance = self.balances[Txn.sender]
-        assert balance > UInt64(0), "NO_BALANCE"
-        
-        # Update state first
-        self.balances[Txn.sender] = UInt64(0)
-        
-        # Send payment
+        Withdraw balance - kept for parity with withdrawBalance_fixed_2() in Reentrancy.sol
+        """
+        assert self.pay_out(Txn.sender) > UInt64(0), "NO_BALANCE"
+
+    @subroutine
+    def pay_out(self, user: Account) -> UInt64:
+        """
+        Checks-effects-interactions withdrawal shared by every withdraw path
+        @param user: Account whose balance is paid out
+        @return Balance paid out, zero when the user has no balance;
+                the box deposit is refunded on top of it
+        """
+        # Check
+        balance = self.balances.get(user, default=UInt64(0))
+        if balance == UInt64(0):
+            return balance
+
+        # Effect: clear the balance (and free the box) before any payment
+        del self.balances[user]
+
+        # Interaction
         itxn.Payment(
-            receiver=Txn.sender,
-            amount=balance,
+            receiver=user,
+            amount=balance + BALANCE_MIN_BALANCE,
             fee=0
         ).submit()
+        return balance
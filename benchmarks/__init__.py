@@ -0,0 +1,4 @@
+"""Benchmarks driving the Algorand Python dataset contracts.
+
+Run from the repository root, e.g. ``python -m benchmarks.reentrance_replay``.
+"""
@@ -0,0 +1,178 @@
+"""Per-lock cost of the batched HashedTimeLock app against one app per lock.
+
+Two deployment shapes are compared for ``--locks`` hashed-timelock swaps:
+
+* ``batched``: one ``HashedTimeLock`` app (``HtlcA.py``) holding every lock in a
+  box, claimed ``--batch-size`` secrets per ``claim`` call.
+* ``app-per-lock``: a straight port of ``HtlcE.sol`` where each swap deploys its
+  own app with the Solidity state in global storage, funds it, claims and deletes.
+
+For each shape the report gives the transactions and minimum fees per lock, the
+min balance tied up per open lock and, when the toolchain is installed, the static
+opcode cost per lock (``puyapy``) and the emulator wall time per lock
+(``algorand-python-testing``; app-per-lock is emulated as one ``HashedTimeLock``
+instance per lock claimed alone). A batched lock pays its share of ``claim``'s
+fixed cost plus one iteration of the per-secret loop.
+
+Usage::
+
+    python -m benchmarks.htlc_cost --locks 1000 --batch-size 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from tools.dataset import ALGORAND_DIR, load_contract_module
+from tools.mbr import module_constants
+
+MIN_TXN_FEE = 1000
+#: Min balance of an account (the app account must hold it to receive funds)
+ACCOUNT_MIN_BALANCE = 100_000
+#: Min balance increase per created app and per global schema entry
+APP_MIN_BALANCE = 100_000
+GLOBAL_UINT_MIN_BALANCE = 28_500
+GLOBAL_BYTES_MIN_BALANCE = 50_000
+#: HtlcE.sol state: seller, buyer, secretHash, revealedSecret / feeLimit, timeout, isSecretRevealed
+HTLCE_GLOBAL_BYTES = 4
+HTLCE_GLOBAL_UINTS = 3
+#: Box min balance of one lock, as HtlcA.py charges it
+LOCK_MIN_BALANCE = module_constants(ALGORAND_DIR / "HtlcA.py")["LOCK_MIN_BALANCE"]
+#: Lock timeout used in the emulator, never reached during a run
+FAR_FUTURE = 2**40
+
+
+@dataclass
+class ShapeReport:
+    shape: str
+    txns_per_lock: float
+    fees_per_lock: float
+    min_balance_per_lock: int
+    opcodes_per_lock: float | None = None
+    emulator_us_per_lock: float | None = None
+
+
+def batched_report(batch_size: int) -> ShapeReport:
+    # lock: payment + app call; claim: app call + one inner payment per batch
+    txns = 2 + 2 / batch_size
+    return ShapeReport("batched", txns, txns * MIN_TXN_FEE, LOCK_MIN_BALANCE)
+
+
+def app_per_lock_report() -> ShapeReport:
+    # create app, fund it, claim (app call + inner payment), delete app
+    txns = 5
+    min_balance = (
+        APP_MIN_BALANCE
+        + HTLCE_GLOBAL_BYTES * GLOBAL_BYTES_MIN_BALANCE
+        + HTLCE_GLOBAL_UINTS * GLOBAL_UINT_MIN_BALANCE
+        + ACCOUNT_MIN_BALANCE
+    )
+    return ShapeReport("app-per-lock", txns, txns * MIN_TXN_FEE, min_balance)
+
+
+def _static_costs() -> dict[str, tuple[int, int]]:
+    """(static cost, cost of one more loop iteration) per HtlcA method name."""
+    from tools import teal_cost
+
+    try:
+        costs = teal_cost.analyze_file(ALGORAND_DIR / "HtlcA.py")
+    except RuntimeError:
+        return {}
+    return {
+        signature.split("(")[0]: (ops, contract.loop_costs.get(signature, 0))
+        for contract in costs
+        for signature, ops in contract.method_costs.items()
+    }
+
+
+def emulate(locks: int, batch_size: int) -> float:
+    """Lock and claim ``locks`` swaps in one app; return microseconds per lock."""
+    from algopy import UInt64, arc4, op
+    from algopy_testing import algopy_testing_context
+
+    htlc = load_contract_module("HtlcA")
+    with algopy_testing_context() as ctx:
+        sender, receiver = ctx.any.account(), ctx.any.account()
+        secrets = [htlc.Bytes32.from_bytes(os.urandom(32)) for _ in range(locks)]
+        started = time.perf_counter()
+        contract = htlc.HashedTimeLock()
+        app = ctx.ledger.get_app(contract)
+        for secret in secrets:
+            pay = ctx.any.txn.payment(sender=sender, receiver=app.address, amount=UInt64(LOCK_MIN_BALANCE))
+            hashlock = htlc.Bytes32.from_bytes(op.keccak256(secret.bytes))
+            with ctx.txn.create_group(active_txn_overrides={"sender": sender}):
+                contract.lock(pay, hashlock, arc4.Address(receiver), UInt64(FAR_FUTURE))
+        for start in range(0, locks, batch_size):
+            batch = htlc.Bytes32Array(*secrets[start : start + batch_size])
+            with ctx.txn.create_group(active_txn_overrides={"sender": receiver}):
+                contract.claim(batch)
+        return (time.perf_counter() - started) * 1e6 / locks
+
+
+def emulate_app_per_lock(locks: int) -> float:
+    """Deploy one app per swap, lock and claim it alone; return microseconds per lock."""
+    from algopy import UInt64, arc4, op
+    from algopy_testing import algopy_testing_context
+
+    htlc = load_contract_module("HtlcA")
+    with algopy_testing_context() as ctx:
+        sender, receiver = ctx.any.account(), ctx.any.account()
+        secrets = [htlc.Bytes32.from_bytes(os.urandom(32)) for _ in range(locks)]
+        started = time.perf_counter()
+        for secret in secrets:
+            contract = htlc.HashedTimeLock()
+            app = ctx.ledger.get_app(contract)
+            pay = ctx.any.txn.payment(sender=sender, receiver=app.address, amount=UInt64(LOCK_MIN_BALANCE))
+            hashlock = htlc.Bytes32.from_bytes(op.keccak256(secret.bytes))
+            with ctx.txn.create_group(active_txn_overrides={"sender": sender}):
+                contract.lock(pay, hashlock, arc4.Address(receiver), UInt64(FAR_FUTURE))
+            with ctx.txn.create_group(active_txn_overrides={"sender": receiver}):
+                contract.claim(htlc.Bytes32Array(secret))
+        return (time.perf_counter() - started) * 1e6 / locks
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=8, help="secrets per claim call (box refs per txn)")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    batched, per_app = batched_report(args.batch_size), app_per_lock_report()
+
+    costs = _static_costs()
+    if costs:
+        # claim's static cost runs its per-secret loop once: the fixed part is shared by the batch
+        claim, per_secret = costs["claim"]
+        lock = costs["lock"][0]
+        batched.opcodes_per_lock = lock + (claim - per_secret) / args.batch_size + per_secret
+        per_app.opcodes_per_lock = costs.get("create", (0, 0))[0] + lock + claim
+
+    try:
+        batched.emulator_us_per_lock = emulate(args.locks, args.batch_size)
+        per_app.emulator_us_per_lock = emulate_app_per_lock(args.locks)
+    except ImportError:
+        pass
+
+    reports = [batched, per_app]
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+        return 0
+    print(f"{'shape':<14}{'txns':>7}{'fees':>9}{'min bal':>10}{'opcodes':>9}{'emu us':>9}")
+    for r in reports:
+        opcodes = "n/a" if r.opcodes_per_lock is None else f"{r.opcodes_per_lock:.0f}"
+        emulated = "n/a" if r.emulator_us_per_lock is None else f"{r.emulator_us_per_lock:.0f}"
+        print(
+            f"{r.shape:<14}{r.txns_per_lock:>7.2f}{r.fees_per_lock:>9.0f}"
+            f"{r.min_balance_per_lock:>10}{opcodes:>9}{emulated:>9}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
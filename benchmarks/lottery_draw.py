@@ -0,0 +1,152 @@
+"""Draw cost of WeightedLottery from 100 to 100k entries.
+
+For each size the lottery (``LotteryA.py``) is filled through ``buy`` with random
+ticket weights in the algopy testing emulator, then ``draw`` is timed over
+``--draws`` repeats (the round counters are restored between draws, so every draw
+searches the full set of entries with a fresh block seed). Alongside the timing the
+report gives the binary search probes, which bound the opcode cost and grow with
+log(entries), and the box bytes ``buy`` and ``draw`` read, which set the box
+references the transaction needs. Those grow linearly: the page index adds 8 bytes
+per 256 entries. The report gives the app calls a group needs for the references,
+and flags sizes over the contract's ``MAX_ENTRIES``, where a round is full and
+``buy`` is rejected (they are not emulated). With ``puyapy`` installed the static
+opcode estimate of ``draw`` and ``buy`` is printed too.
+
+Usage::
+
+    python -m benchmarks.lottery_draw --sizes 100,1000,10000,100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from tools.dataset import ALGORAND_DIR, load_contract_module
+from tools.mbr import module_constants
+
+TICKET_PRICE = 1_000
+#: Box layout and limits of LotteryA.py
+LAYOUT = module_constants(ALGORAND_DIR / "LotteryA.py")
+
+
+@dataclass
+class DrawReport:
+    entries: int
+    probes: int
+    box_bytes_read: int
+    box_refs: int
+    #: App calls a group needs for ``box_refs``, each carrying ``MAX_BOX_REFS``
+    app_calls: int
+    #: Over ``MAX_ENTRIES``: the contract rejects the buy that gets there
+    over_limit: bool
+    buy_us: float | None = None
+    draw_us: float | None = None
+
+
+def draw_footprint(entries: int) -> DrawReport:
+    """Binary search probes and box bytes read by a draw over ``entries``."""
+    pages = -(-entries // LAYOUT["ENTRIES_PER_CUM_PAGE"])
+    in_page = min(entries, LAYOUT["ENTRIES_PER_CUM_PAGE"])
+    probes = math.ceil(math.log2(pages)) + math.ceil(math.log2(in_page)) if entries > 1 else 0
+    # page index + one sum page + one owner page
+    index_bytes = pages * LAYOUT["CUM_BYTES"]
+    box_bytes = index_bytes + 2 * LAYOUT["PAGE_BYTES"]
+    refs = -(-index_bytes // LAYOUT["BOX_REF_BYTES"]) + 2 * (LAYOUT["PAGE_BYTES"] // LAYOUT["BOX_REF_BYTES"])
+    return DrawReport(entries, probes, box_bytes, refs, -(-refs // LAYOUT["MAX_BOX_REFS"]),
+                      entries > LAYOUT["MAX_ENTRIES"])
+
+
+def emulate(report: DrawReport, draws: int, rng: random.Random) -> None:
+    """Fill a lottery with ``report.entries`` entries and time ``buy`` and ``draw``."""
+    from algopy import UInt64
+    from algopy_testing import algopy_testing_context
+
+    lottery = load_contract_module("LotteryA")
+    with algopy_testing_context() as ctx:
+        players = [ctx.any.account() for _ in range(min(report.entries, 1000))]
+        contract = lottery.WeightedLottery()
+        with ctx.txn.create_group(active_txn_overrides={"sender": ctx.default_sender}):
+            contract.create(UInt64(TICKET_PRICE))
+        app = ctx.ledger.get_app(contract)
+
+        started = time.perf_counter()
+        for entry in range(report.entries):
+            player = players[entry % len(players)]
+            amount = TICKET_PRICE * rng.randint(1, 100)
+            pay = ctx.any.txn.payment(sender=player, receiver=app.address, amount=UInt64(amount))
+            with ctx.txn.create_group(active_txn_overrides={"sender": player}):
+                contract.buy(pay)
+        report.buy_us = (time.perf_counter() - started) * 1e6 / report.entries
+
+        entry_count, total_tickets, pot = contract.entry_count, contract.total_tickets, contract.pot
+        elapsed = 0.0
+        for draw in range(draws):
+            current_round = 10_000 + draw
+            ctx.ledger.patch_global_fields(round=UInt64(current_round))
+            ctx.ledger.set_block(current_round - 1, seed=rng.getrandbits(64), timestamp=current_round)
+            contract.entry_count, contract.total_tickets, contract.pot = entry_count, total_tickets, pot
+            started = time.perf_counter()
+            with ctx.txn.create_group(active_txn_overrides={"sender": ctx.default_sender}):
+                contract.draw()
+            elapsed += time.perf_counter() - started
+        report.draw_us = elapsed * 1e6 / draws
+
+
+def _static_costs() -> dict[str, int]:
+    from tools import teal_cost
+
+    try:
+        costs = teal_cost.analyze_file(ALGORAND_DIR / "LotteryA.py")
+    except RuntimeError:
+        return {}
+    return {
+        signature.split("(")[0]: ops
+        for contract in costs
+        for signature, ops in contract.method_costs.items()
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000", help="comma separated entry counts")
+    parser.add_argument("--draws", type=int, default=50, help="timed draws per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-emulator", action="store_true", help="only report the static footprint")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    reports = [draw_footprint(int(size)) for size in args.sizes.split(",")]
+    if not args.no_emulator:
+        try:
+            for report in reports:
+                if not report.over_limit:
+                    emulate(report, args.draws, rng)
+        except ImportError as exc:
+            print(f"emulator unavailable ({exc}), reporting static footprint only", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+        return 0
+    costs = _static_costs()
+    if costs:
+        print(f"static opcode estimate: draw={costs.get('draw')} buy={costs.get('buy')}")
+    print(f"{'entries':>8}{'probes':>8}{'box bytes':>11}{'refs':>6}{'calls':>7}{'buy us':>9}{'draw us':>9}")
+    for r in reports:
+        buy = "n/a" if r.buy_us is None else f"{r.buy_us:.0f}"
+        draw = "n/a" if r.draw_us is None else f"{r.draw_us:.0f}"
+        note = f"  over MAX_ENTRIES={LAYOUT['MAX_ENTRIES']}, rejected" if r.over_limit else (
+            f"  needs {r.app_calls - 1} extra app call(s) for references" if r.app_calls > 1 else "")
+        print(f"{r.entries:>8}{r.probes:>8}{r.box_bytes_read:>11}{r.box_refs:>6}{r.app_calls:>7}{buy:>9}{draw:>9}"
+              f"{note}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Emulator throughput of every ARC4 method in the Algorand Python dataset.
+
+For each ABI method of each ``ARC4Contract`` (read as in ``tools.fuzz``) a
+fresh contract is created in the algopy testing emulator and brought into a
+lived-in state by ``--setup`` random calls of all its methods; then
+``--calls`` calls of the method under test are timed one by one after
+``--warmup`` untimed ones. Calls are generated up front, and each call's
+algopy arguments and grouped transactions are built (and the block time
+moved on) before its timer starts, so only the method itself is timed. A
+rejected call is rolled back by replaying the accepted ones, as
+``tools.fuzz.execute`` does, so every call sees the state the accepted calls
+left and the replay is never timed. The report gives calls per second,
+p50/p99 latency, the share of calls the contract accepted (a method whose
+calls are all rejected is timed on its failure path) and the peak memory one
+call allocates, measured with ``tracemalloc`` in a second pass over the same
+calls so tracing does not skew the timings. ``create="require"`` methods run
+once per contract and are not timed.
+
+Every run is stored as JSON in ``--save`` (default ``benchmarks/results``),
+with the interpreter and emulator versions; ``--compare`` prints the change in
+calls per second against an earlier file, or the latest one stored.
+
+Usage::
+
+    python -m benchmarks.method_throughput --calls 2000
+    python -m benchmarks.method_throughput --contracts coinA --compare latest
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+from tools.dataset import ALGORAND_DIR, REPO_ROOT
+from tools.fuzz import AbiMethod, Call, ContractAbi, Emulation, Generator, dataset_abis, rejection, source_integers
+
+DEFAULT_RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+RESULT_PREFIX = "method_throughput-"
+
+
+@dataclass
+class MethodReport:
+    contract: str
+    method: str
+    calls: int
+    accepted: int
+    calls_per_second: float
+    p50_us: float
+    p99_us: float
+    peak_memory_kib: float
+    #: Most common reason calls were rejected, if any were
+    rejection: str | None = None
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _prepared(abi: ContractAbi, method: AbiMethod, args: argparse.Namespace) -> tuple[list[Call], list[Call]]:
+    """Setup calls and the calls of ``method``, the same for the timing and the memory pass."""
+    integers = source_integers(ALGORAND_DIR / f"{abi.stem}.py")
+    generator = Generator(abi, random.Random(f"{args.seed}:{abi.key}"), integers)
+    setup = generator.sequence(args.setup + (abi.create is not None))
+    generator.rng = random.Random(f"{args.seed}:{abi.key}.{method.name}")
+    return setup, [generator.call(method) for _ in range(args.warmup + args.calls)]
+
+
+def _started(abi: ContractAbi, calls: list[Call]) -> Emulation:
+    """An emulation that ran ``calls``, each rejected one rolled back."""
+    run = Emulation(abi)
+    for call in calls:
+        if run.apply(call) is not None:
+            run = run.restart()
+    return run
+
+
+def _prepare(run: Emulation, call: Call) -> list[object] | str:
+    """The arguments of ``call``, or the reason they could not be built."""
+    try:
+        return run.prepare(call)
+    except Exception as exc:  # noqa: BLE001 - rejected as Emulation.apply would
+        return rejection(exc)
+
+
+def measure(abi: ContractAbi, method: AbiMethod, args: argparse.Namespace) -> MethodReport:
+    setup, calls = _prepared(abi, method, args)
+    warmup, timed = calls[: args.warmup], calls[args.warmup :]
+
+    run = _started(abi, setup + warmup)
+    latencies = []
+    rejections: dict[str, int] = {}
+    try:
+        for call in timed:
+            arguments = _prepare(run, call)
+            if isinstance(arguments, str):
+                reason = arguments
+            else:
+                started = time.perf_counter_ns()
+                reason = run.invoke(call, arguments)
+                latencies.append((time.perf_counter_ns() - started) / 1000)
+            if reason is not None:
+                rejections[reason] = rejections.get(reason, 0) + 1
+                run = run.restart()
+    finally:
+        run.close()
+
+    run = _started(abi, setup + warmup)
+    peak = 0
+    tracemalloc.start()
+    try:
+        for call in timed:
+            arguments = _prepare(run, call)
+            if isinstance(arguments, str):
+                run = run.restart()
+                continue
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            reason = run.invoke(call, arguments)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+            if reason is not None:
+                run = run.restart()
+    finally:
+        tracemalloc.stop()
+        run.close()
+
+    total_s = sum(latencies) / 1e6
+    latencies.sort()
+    return MethodReport(
+        abi.key, method.name, len(timed), len(timed) - sum(rejections.values()),
+        len(latencies) / total_s if total_s else 0.0, percentile(latencies, 0.5), percentile(latencies, 0.99),
+        max(0, peak) / 1024, max(rejections, key=rejections.get) if rejections else None,
+    )
+
+
+def _versions() -> dict[str, str | None]:
+    versions: dict[str, str | None] = {"python": platform.python_version()}
+    for package in ("algorand-python-testing", "algorand-python"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def _previous(compare: str, directory: Path) -> Path | None:
+    if compare != "latest":
+        return Path(compare)
+    stored = sorted(directory.glob(f"{RESULT_PREFIX}*.json"))
+    return stored[-1] if stored else None
+
+
+def format_comparison(reports: list[MethodReport], previous: dict) -> list[str]:
+    before = {(r["contract"], r["method"]): r for r in previous["methods"]}
+    lines = [f"compared with {previous['started']}:"]
+    for r in reports:
+        old = before.get((r.contract, r.method))
+        if old is None or not old["calls_per_second"]:
+            continue
+        change = r.calls_per_second / old["calls_per_second"] - 1
+        lines.append(f"    {r.contract}.{r.method}: {old['calls_per_second']:.0f} -> {r.calls_per_second:.0f} calls/s "
+                     f"({change:+.1%})")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", action="append", help="file stems or stem.Class to run (default: all)")
+    parser.add_argument("--methods", action="append", help="limit to these method names")
+    parser.add_argument("--calls", type=int, default=1000, help="timed calls per method")
+    parser.add_argument("--warmup", type=int, default=50, help="untimed calls before timing")
+    parser.add_argument("--setup", type=int, default=50, help="random calls of every method before the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, default=DEFAULT_RESULTS_DIR, help="directory the JSON run is written to")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", help="earlier result file, or 'latest'")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    previous_path = _previous(args.compare, args.save) if args.compare else None
+    reports = []
+    for abi in dataset_abis():
+        if args.contracts and abi.stem not in args.contracts and abi.key not in args.contracts:
+            continue
+        for method in abi.callable:
+            if args.methods and method.name not in args.methods:
+                continue
+            try:
+                reports.append(measure(abi, method, args))
+            except RuntimeError as exc:
+                print(f"error: {exc}", file=sys.stderr)
+                return 2
+
+    result = {"started": started.isoformat(timespec="seconds"), "versions": _versions(),
+              "settings": {"calls": args.calls, "warmup": args.warmup, "setup": args.setup, "seed": args.seed},
+              "methods": [asdict(r) for r in reports]}
+    if not args.no_save:
+        args.save.mkdir(parents=True, exist_ok=True)
+        path = args.save / f"{RESULT_PREFIX}{started.strftime('%Y%m%dT%H%M%SZ')}.json"
+        path.write_text(json.dumps(result, indent=1) + "\n", encoding="utf-8")
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"{'method':<48}{'calls/s':>10}{'p50 us':>9}{'p99 us':>9}{'accepted':>10}{'peak KiB':>10}")
+    for r in reports:
+        print(f"{r.contract + '.' + r.method:<48}{r.calls_per_second:>10.0f}{r.p50_us:>9.1f}{r.p99_us:>9.1f}"
+              f"{r.accepted / r.calls if r.calls else 0:>10.0%}{r.peak_memory_kib:>10.1f}")
+    if previous_path is not None and previous_path.is_file():
+        print("\n".join(format_comparison(reports, json.loads(previous_path.read_text(encoding="utf-8")))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
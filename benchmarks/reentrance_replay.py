@@ -0,0 +1,227 @@
+"""Replay random deposit/withdraw sequences against both Reentrance withdraw paths.
+
+The paths are the single-user ``withdraw_balance`` and the batched
+``payout_balances``; the legacy ``withdraw_balance_unsafe``/``_fixed``/``_fixed_2``
+entry points are aliases of ``withdraw_balance`` (they all call ``pay_out``),
+so they are not replayed separately. Each path gets the same seeded sequence of ``add_to_balance`` deposits and
+withdrawals, driven through the algopy testing emulator. After every call the
+contract's balance boxes and inner payments are checked against a plain Python
+model of the ledger, first deposits and payouts carrying the balance box's min
+balance; any divergence is reported as an inconsistency and makes the
+run exit non-zero. Throughput is measured over the contract calls only. When
+``puyapy`` is installed the static opcode cost of each path's ABI method is
+reported alongside (see ``tools.teal_cost``).
+
+Usage::
+
+    python -m benchmarks.reentrance_replay --sequences 2000 --users 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+
+from tools.dataset import ALGORAND_DIR, load_contract_module
+
+#: Single-user withdraw
+WITHDRAW_VARIANT = "withdraw_balance"
+#: Legacy entry points that only call the same pay_out as WITHDRAW_VARIANT
+WITHDRAW_ALIASES = ("withdraw_balance_unsafe", "withdraw_balance_fixed", "withdraw_balance_fixed_2")
+#: Batched multi-user payout
+BATCH_VARIANT = "payout_balances"
+VARIANTS = (WITHDRAW_VARIANT, BATCH_VARIANT)
+
+BALANCE_PREFIX = b"balance_"
+
+
+@dataclass
+class VariantReport:
+    variant: str
+    calls: int = 0
+    deposits: int = 0
+    withdrawals: int = 0
+    elapsed_s: float = 0.0
+    opcode_cost: int | None = None
+    inconsistencies: list[str] = field(default_factory=list)
+
+    @property
+    def calls_per_second(self) -> float:
+        return self.calls / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def generate_sequence(rng: random.Random, sequences: int, users: int) -> list[tuple[str, int, int]]:
+    """Build ``sequences`` deposit/withdraw steps as ``(kind, user_index, amount)``."""
+    steps = []
+    for _ in range(sequences):
+        user = rng.randrange(users)
+        if rng.random() < 0.6:
+            steps.append(("deposit", user, rng.randint(1, 1_000_000)))
+        else:
+            steps.append(("withdraw", user, 0))
+    return steps
+
+
+def _static_costs() -> dict[str, int]:
+    """Static cost per method name, empty when puyapy is unavailable."""
+    from tools import teal_cost
+
+    try:
+        costs = teal_cost.analyze_file(ALGORAND_DIR / "reentranceA.py")
+    except RuntimeError:
+        return {}
+    return {
+        signature.split("(")[0]: ops
+        for contract in costs
+        for signature, ops in contract.method_costs.items()
+    }
+
+
+def replay(variant: str, steps: list[tuple[str, int, int]], users: int, batch_size: int) -> VariantReport:
+    """Drive one withdraw variant through ``steps`` and verify it against a model."""
+    from algopy import Account, UInt64, arc4
+    from algopy_testing import algopy_testing_context
+
+    reentrance = load_contract_module("reentranceA")
+    report = VariantReport(variant)
+
+    with algopy_testing_context() as ctx:
+        contract = reentrance.Reentrance()
+        app = ctx.ledger.get_app(contract)
+        accounts = [ctx.any.account() for _ in range(users)]
+        model = [0] * users
+        deposited = paid = 0
+        pending: list[int] = []
+
+        def box_balance(user: int) -> int | None:
+            key = BALANCE_PREFIX + accounts[user].bytes.value
+            if not ctx.ledger.box_exists(contract, key):
+                return None
+            return int.from_bytes(ctx.ledger.get_box(contract, key), "big")
+
+        def payments() -> list[tuple[Account, int]]:
+            return [
+                (itxn.receiver, int(itxn.amount))
+                for group in ctx.txn.last_group.itxn_groups
+                for itxn in group
+            ]
+
+        def check_paid(step: int, users_paid: list[int]) -> None:
+            nonlocal paid
+            expected = {
+                accounts[user].bytes.value: model[user] + reentrance.BALANCE_MIN_BALANCE
+                for user in users_paid
+                if model[user]
+            }
+            actual = {receiver.bytes.value: amount for receiver, amount in payments()}
+            if actual != expected:
+                report.inconsistencies.append(f"step {step}: paid {actual}, expected {expected}")
+            for user in users_paid:
+                if box_balance(user) is not None:
+                    report.inconsistencies.append(f"step {step}: user {user} box not cleared")
+                model[user] = 0
+            paid += sum(actual.values()) - len(expected) * reentrance.BALANCE_MIN_BALANCE
+
+        def flush_batch(step: int) -> None:
+            users_paid = list(dict.fromkeys(pending))
+            pending.clear()
+            addresses = arc4.DynamicArray[arc4.Address](*(arc4.Address(accounts[u]) for u in users_paid))
+            started = time.perf_counter()
+            with ctx.txn.create_group(active_txn_overrides={"sender": ctx.default_sender}):
+                total = contract.payout_balances(addresses)
+            report.elapsed_s += time.perf_counter() - started
+            report.calls += 1
+            expected_total = sum(model[user] for user in users_paid)
+            if int(total) != expected_total:
+                report.inconsistencies.append(f"step {step}: payout returned {int(total)}, expected {expected_total}")
+            check_paid(step, users_paid)
+
+        for step, (kind, user, amount) in enumerate(steps):
+            sender = accounts[user]
+            if kind == "deposit":
+                deposit = 0 if model[user] else reentrance.BALANCE_MIN_BALANCE
+                pay = ctx.any.txn.payment(sender=sender, receiver=app.address, amount=UInt64(amount + deposit))
+                started = time.perf_counter()
+                with ctx.txn.create_group(active_txn_overrides={"sender": sender}):
+                    contract.add_to_balance(pay)
+                report.elapsed_s += time.perf_counter() - started
+                report.calls += 1
+                report.deposits += 1
+                model[user] += amount
+                deposited += amount
+                if box_balance(user) != model[user]:
+                    report.inconsistencies.append(f"step {step}: deposit left box at {box_balance(user)}")
+                continue
+
+            report.withdrawals += 1
+            if variant == BATCH_VARIANT:
+                pending.append(user)
+                if len(pending) >= batch_size:
+                    flush_batch(step)
+                continue
+
+            method = getattr(contract, variant)
+            started = time.perf_counter()
+            try:
+                with ctx.txn.create_group(active_txn_overrides={"sender": sender}):
+                    method()
+            except AssertionError:
+                if model[user]:
+                    report.inconsistencies.append(f"step {step}: withdraw of {model[user]} rejected")
+                continue
+            finally:
+                report.elapsed_s += time.perf_counter() - started
+                report.calls += 1
+            if not model[user]:
+                report.inconsistencies.append(f"step {step}: withdraw with no balance accepted")
+            check_paid(step, [user])
+
+        if pending:
+            flush_batch(len(steps))
+
+        for user in range(users):
+            stored = box_balance(user) or 0
+            if stored != model[user]:
+                report.inconsistencies.append(f"end: user {user} box holds {stored}, model {model[user]}")
+        if deposited - paid != sum(model):
+            report.inconsistencies.append(f"end: deposited {deposited} - paid {paid} != owed {sum(model)}")
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sequences", type=int, default=2000, help="steps replayed per variant")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=8, help="users per payout_balances call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variant", action="append", choices=VARIANTS, help="limit to these variants")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    steps = generate_sequence(random.Random(args.seed), args.sequences, args.users)
+    costs = _static_costs()
+    reports = []
+    for variant in args.variant or VARIANTS:
+        report = replay(variant, steps, args.users, args.batch_size)
+        report.opcode_cost = costs.get(variant)
+        reports.append(report)
+
+    if args.json:
+        print(json.dumps([asdict(r) | {"calls_per_second": r.calls_per_second} for r in reports], indent=2))
+    else:
+        print(f"{'variant':<26}{'calls':>8}{'calls/s':>12}{'opcodes':>9}  issues")
+        for r in reports:
+            cost = "n/a" if r.opcode_cost is None else str(r.opcode_cost)
+            print(f"{r.variant:<26}{r.calls:>8}{r.calls_per_second:>12.0f}{cost:>9}  {len(r.inconsistencies)}")
+            for issue in r.inconsistencies[:10]:
+                print(f"    {issue}")
+        print(f"{', '.join(WITHDRAW_ALIASES)} are aliases of {WITHDRAW_VARIANT} and not replayed")
+    return 1 if any(r.inconsistencies for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
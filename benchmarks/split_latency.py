@@ -0,0 +1,111 @@
+"""Wall-clock latency of whole-contract against function-level split translation.
+
+Each contract is translated once as a single request and once with
+``TranslationRunner(split=True)``, against the local stub server. The stub is
+given a per-token generation delay (``--token-latency``) and answers with text
+about as long as the Solidity it was asked to translate, so a request's latency
+grows with the size of its target the way a model's does. The report gives both
+wall-clock times, the latency of the slowest single piece, which bounds the split
+run from below, and the prompt tokens each mode spends.
+
+Usage::
+
+    python -m benchmarks.split_latency --contracts votingE.sol --contracts coin.sol
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.dataset import PROMPTS_DIR, SOLIDITY_DIR
+from tools.translation.backend import OpenAICompatibleBackend
+from tools.translation.runner import Cell, TranslationRunner
+from tools.translation.split import split_contract
+from tools.translation.stub_server import StubServer, echo_contract
+
+
+def sized_responder(payload: dict) -> str:
+    """``echo_contract`` padded to roughly the length of the Solidity in the prompt."""
+    prompt = payload["messages"][-1]["content"]
+    start = prompt.rfind("pragma solidity")
+    target = prompt[start:] if start >= 0 else ""
+    padding = "".join(f"# {line}\n" for line in target.splitlines())
+    return echo_contract(payload).replace("```python\n", f"```python\n{padding}", 1)
+
+
+@dataclass
+class SplitReport:
+    contract: str
+    functions: int
+    whole_s: float
+    split_s: float
+    slowest_piece_s: float
+    whole_prompt_tokens: int
+    split_prompt_tokens: int
+
+
+async def measure(contract: Path, prompt: Path, token_latency: float, concurrency: int) -> SplitReport:
+    async with StubServer(token_latency=token_latency, responder=sized_responder) as server:
+        backend = OpenAICompatibleBackend(server.url, api_key="")
+        cell = Cell(contract, prompt, "stub")
+        timings = {}
+        results = {}
+        for split in (False, True):
+            with tempfile.TemporaryDirectory() as out:
+                runner = TranslationRunner(backend, Path(out), concurrency=concurrency, split=split)
+                started = time.perf_counter()
+                results[split] = await runner.run_cell(cell)
+                timings[split] = time.perf_counter() - started
+        slowest = 0.0
+        for piece in split_contract(runner.source(cell)).pieces:
+            started = time.perf_counter()
+            await runner.request(cell, runner.render(cell, piece.source))
+            slowest = max(slowest, time.perf_counter() - started)
+    for result in results.values():
+        if result.status != "ok":
+            raise RuntimeError(f"{contract.name}: {result.error}")
+    return SplitReport(
+        contract=contract.name,
+        functions=len(split_contract(runner.source(cell)).functions),
+        whole_s=timings[False],
+        split_s=timings[True],
+        slowest_piece_s=slowest,
+        whole_prompt_tokens=results[False].prompt_tokens,
+        split_prompt_tokens=results[True].prompt_tokens,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", action="append", help="Solidity file names (default: votingE.sol, coin.sol)")
+    parser.add_argument("--prompt", default="Zeroshot.txt", help="prompt style")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="stub seconds per answer token")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    names = args.contracts or ["votingE.sol", "coin.sol"]
+    reports = [
+        asyncio.run(measure(SOLIDITY_DIR / name, PROMPTS_DIR / args.prompt, args.token_latency, args.concurrency))
+        for name in names
+    ]
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+        return 0
+    print(f"{'contract':<16}{'functions':>10}{'whole s':>9}{'split s':>9}{'slowest s':>11}"
+          f"{'whole tok':>11}{'split tok':>11}")
+    for r in reports:
+        print(f"{r.contract:<16}{r.functions:>10}{r.whole_s:>9.2f}{r.split_s:>9.2f}{r.slowest_piece_s:>11.2f}"
+              f"{r.whole_prompt_tokens:>11}{r.split_prompt_tokens:>11}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
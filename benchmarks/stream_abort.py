@@ -0,0 +1,118 @@
+"""Tokens and time saved by streaming completions with early abort.
+
+The chain-of-thought prompts are translated for every contract twice against
+the local stub server: once waiting for whole completions, once with
+``TranslationRunner(stream=True)``. The stub answers like a chain-of-thought
+model, with reasoning before the code block and an explanation after it about
+as long as the Solidity target, and breaks a fraction of its answers
+(``--broken``) early in the code block: an import outside ``algopy`` or a line
+of Solidity left in the Python. Waiting, a broken answer is generated to the
+end, checked and then retried; streaming, it is cut at the broken line and
+retried. The report gives per mode the requests sent, the tokens the stub
+generated, the wall-clock time and how many translations came out usable.
+
+Usage::
+
+    python -m benchmarks.stream_abort --broken 0.3 --token-latency 0.0005
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.dataset import prompt_files, solidity_contracts
+from tools.translation.backend import BackendError, Completion, CompletionRequest, OpenAICompatibleBackend
+from tools.translation.runner import TranslationRunner, expand_matrix
+from tools.translation.streaming import replay
+from tools.translation.stub_server import Responder, StubServer, echo_contract
+
+#: What a broken answer carries early in its code block
+DEFECTS = ("import web3\n", "    function transfer(address to) public {\n")
+
+
+def chain_of_thought_responder(broken: float, seed: int) -> Responder:
+    rng = random.Random(seed)
+
+    def respond(payload: dict) -> str:
+        prompt = payload["messages"][-1]["content"]
+        start = prompt.rfind("pragma solidity")
+        target = prompt[start:] if start >= 0 else ""
+        reasoning = "".join(f"Step: consider `{line.strip()}`.\n" for line in target.splitlines()[:40] if line.strip())
+        explanation = "".join(f"- {line.strip()} maps to its algopy equivalent.\n"
+                              for line in target.splitlines() if line.strip())
+        answer = echo_contract(payload)
+        if rng.random() < broken:
+            head, _, tail = answer.partition("\n\n\nclass ")
+            answer = f"{head}\n{rng.choice(DEFECTS)}\n\nclass {tail}" if tail else answer
+        return f"{reasoning}\n{answer}\n{explanation}"
+
+    return respond
+
+
+class CheckedBackend(OpenAICompatibleBackend):
+    """Whole completions, retried when the finished answer fails the same checks."""
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        completion = await super().complete(request)
+        if (reason := replay(completion.text).reason) is not None:
+            raise BackendError(f"unusable answer: {reason}", retryable=True)
+        return completion
+
+
+@dataclass
+class StreamReport:
+    mode: str
+    cells: int
+    requests: int
+    tokens_generated: int
+    wall_s: float
+    usable: int
+
+
+async def measure(stream: bool, args: argparse.Namespace) -> StreamReport:
+    cells = expand_matrix(solidity_contracts(), [p for p in prompt_files() if p.name.lower().startswith("cot")],
+                          ["stub"])
+    responder = chain_of_thought_responder(args.broken, args.seed)
+    async with StubServer(token_latency=args.token_latency, responder=responder) as server:
+        with tempfile.TemporaryDirectory() as out:
+            backend = OpenAICompatibleBackend(server.url, api_key="") if stream else CheckedBackend(server.url, "")
+            runner = TranslationRunner(backend, Path(out), concurrency=args.concurrency, stream=stream,
+                                       base_delay=0.0)
+            started = time.perf_counter()
+            results = await runner.run(cells)
+            wall = time.perf_counter() - started
+            usable = sum(result.status == "ok" and replay(f"```python\n{Path(result.output).read_text()}```\n")
+                         .reason is None for result in results)
+        return StreamReport("stream" if stream else "wait", len(cells), server.requests, server.tokens_sent,
+                            wall, usable)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--broken", type=float, default=0.3, help="fraction of answers broken early")
+    parser.add_argument("--token-latency", type=float, default=0.0005, help="stub seconds per answer token")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    reports = [asyncio.run(measure(stream, args)) for stream in (False, True)]
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+        return 0
+    print(f"{'mode':<8}{'cells':>7}{'requests':>10}{'tokens':>9}{'wall s':>8}{'usable':>8}")
+    for r in reports:
+        print(f"{r.mode:<8}{r.cells:>7}{r.requests:>10}{r.tokens_generated:>9}{r.wall_s:>8.2f}{r.usable:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""Tooling around the Solidity / Algorand Python translation dataset.
+
+Modules here are run from the repository root, e.g. ``python -m tools.teal_cost``.
+Optional dependencies (``puyapy``, ``algopy-testing``) are imported lazily so
+that the pure-Python parts work without an Algorand toolchain installed.
+"""
@@ -0,0 +1,170 @@
+"""Atomic groups of app calls: how calls are laid out in a group and what the AVM accepts.
+
+``layout`` places each call in a transaction of its own with its
+reference-typed arguments and as many of its other references as fit,
+adds padding app calls for the references that do not and for opcode
+budget, and makes the first transaction pay the pooled fee. ``check_group``
+lists what the AVM would reject. ``Node`` is what a group is submitted to,
+``tools.group_packer.AlgodNode`` or ``tools.stand_in_node.StandInNode``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from tools.box_refs import MAX_REFERENCES
+
+MAX_GROUP_SIZE = 16
+MAX_ACCOUNT_REFERENCES = 4
+#: Opcode budget each app call adds to the group's pool
+APP_CALL_BUDGET = 700
+#: Inner transactions a group may send
+MAX_INNER_TRANSACTIONS = 256
+#: Minimum fee per transaction when the node does not say
+MIN_FEE = 1000
+
+_REFERENCE_TYPES = {"account": "accounts", "asset": "assets", "application": "apps"}
+
+
+@dataclass
+class AppCall:
+    #: ARC4 signature, ``mint(account,uint64)void``
+    method: str
+    args: list = field(default_factory=list)
+    #: Address; None for the node's own account
+    sender: str | None = None
+    #: None for the app given on the command line
+    app_id: int | None = None
+    accounts: list[str] = field(default_factory=list)
+    assets: list[int] = field(default_factory=list)
+    apps: list[int] = field(default_factory=list)
+    #: Hex box names in the called app; ``""`` is an empty reference adding I/O budget
+    boxes: list[str] = field(default_factory=list)
+    #: Opcodes the call needs, 0 when unknown
+    cost: int = 0
+    #: Inner transactions it sends, paid from the pooled fee
+    inner: int = 0
+
+    def argument_types(self) -> list[str]:
+        """Top-level argument types of the signature."""
+        inside = self.method[self.method.index("(") + 1:]
+        types, depth, current = [], 0, ""
+        for char in inside:
+            if char == ")" and depth == 0:
+                break
+            if char == "," and depth == 0:
+                types.append(current)
+                current = ""
+                continue
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            current += char
+        return types + [current] if current else types
+
+
+@dataclass
+class Transaction:
+    """One app call of a group and the references it carries; ``call`` is None for a padding call.
+
+    The lists hold the references added to the transaction; those of
+    reference-typed arguments are only counted, the encoder places them.
+    """
+
+    call: AppCall | None
+    fee: int = 0
+    accounts: list[str] = field(default_factory=list)
+    assets: list[int] = field(default_factory=list)
+    apps: list[int] = field(default_factory=list)
+    boxes: list[str] = field(default_factory=list)
+    argument_references: set[tuple[str, object]] = field(default_factory=set)
+    argument_accounts: int = 0
+
+    @property
+    def account_references(self) -> int:
+        return len(self.accounts) + self.argument_accounts
+
+    @property
+    def references(self) -> int:
+        return len(self.accounts) + len(self.assets) + len(self.apps) + len(self.boxes) + len(
+            self.argument_references)
+
+    def room(self, kind: str) -> bool:
+        return self.references < MAX_REFERENCES and (
+            kind != "accounts" or self.account_references < MAX_ACCOUNT_REFERENCES)
+
+
+def layout(calls: list[AppCall], min_fee: int = MIN_FEE) -> list[Transaction]:
+    """The transactions of a group of ``calls``, padding calls and pooled fee included."""
+    transactions, overflow = [], []
+    for call in calls:
+        transaction = Transaction(call)
+        for kind, value in zip(call.argument_types(), call.args):
+            attribute = _REFERENCE_TYPES.get(kind)
+            if attribute is not None and value != call.sender and (attribute, value) not in \
+                    transaction.argument_references:
+                transaction.argument_references.add((attribute, value))
+                transaction.argument_accounts += attribute == "accounts"
+        for kind in ("accounts", "assets", "apps", "boxes"):
+            for value in getattr(call, kind):
+                if (kind, value) in transaction.argument_references:
+                    continue
+                if transaction.room(kind):
+                    getattr(transaction, kind).append(value)
+                else:
+                    overflow.append((kind, value))
+        transactions.append(transaction)
+    while overflow:
+        padding = Transaction(None)
+        for kind, value in list(overflow):
+            if padding.room(kind):
+                getattr(padding, kind).append(value)
+                overflow.remove((kind, value))
+        transactions.append(padding)
+    cost = sum(call.cost for call in calls)
+    while cost > APP_CALL_BUDGET * len(transactions):
+        transactions.append(Transaction(None))
+    transactions[0].fee = min_fee * (len(transactions) + sum(call.inner for call in calls))
+    return transactions
+
+
+def check_group(transactions: list[Transaction], min_fee: int = MIN_FEE) -> list[str]:
+    """What the AVM would reject in a group, as messages; empty when it can be sent."""
+    problems = []
+    calls = [t.call for t in transactions if t.call is not None]
+    if len(transactions) > MAX_GROUP_SIZE:
+        problems.append(f"{len(transactions)} transactions, at most {MAX_GROUP_SIZE} in a group")
+    for index, t in enumerate(transactions):
+        if t.references > MAX_REFERENCES or t.account_references > MAX_ACCOUNT_REFERENCES:
+            problems.append(f"transaction {index}: {t.references} references, {t.account_references} accounts")
+        if t.fee < 0:
+            problems.append(f"transaction {index}: negative fee")
+    inner = sum(call.inner for call in calls)
+    if inner > MAX_INNER_TRANSACTIONS:
+        problems.append(f"{inner} inner transactions, at most {MAX_INNER_TRANSACTIONS}")
+    fees, needed = sum(t.fee for t in transactions), min_fee * (len(transactions) + inner)
+    if fees < needed:
+        problems.append(f"fees {fees} below the pooled minimum {needed}")
+    cost, budget = sum(call.cost for call in calls), APP_CALL_BUDGET * len(transactions)
+    if cost > budget:
+        problems.append(f"cost {cost} over the pooled budget {budget}")
+    return problems
+
+
+class NodeError(Exception):
+    """A group was not confirmed; ``retryable`` tells whether sending it again can help."""
+
+    def __init__(self, message: str, *, retryable: bool = False) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class Confirmation:
+    txid: str
+    round: int
+
+
+class Node(Protocol):
+    async def min_fee(self) -> int: ...
+
+    async def submit(self, transactions: list[Transaction]) -> Confirmation: ...
@@ -0,0 +1,437 @@
+"""Minimal box references for ABI calls, found by running them in the emulator.
+
+A call is run in the ``algopy_testing`` emulator (as in ``tools.fuzz``) on a
+shadow of the contract that has seen the calls planned before it, with the
+ledger's box operations recorded. Every box the call reads, checks, writes or
+deletes needs a reference. Each reference also grants ``BOX_IO_BUDGET`` bytes
+of box I/O, so boxes larger in total than their references get empty
+references on top. A transaction carries at most ``MAX_REFERENCES``, and
+references are shared across a group, so more are spread over extra app
+calls in the group.
+
+Each key is kept as a template: a key the contract declares literally, or a
+literal prefix and suffix around the sender's address or an argument (an
+address, an integer as ``itob``, raw bytes). Plans are cached per method and
+argument shape, meaning the kinds of the arguments, the lengths of dynamic
+ones and which accounts are the sender. A later call with the same shape
+gets its keys from the templates without running; the shadow catches up with
+such calls the next time it has to run one. A call rejected in the emulator,
+or touching a key no template explains (``BoxMap`` entries keyed by a
+counter, say), is planned but not cached. A cached plan follows the path the
+first call of its shape took, so a call taking another branch can need other
+boxes.
+
+Emulated calls come from the emulator's actors. ``render_keys`` (``--keys``)
+fills a cached plan's templates with a real call's sender and arguments to
+give the box names its transaction must reference.
+
+Usage::
+
+    python -m tools.box_refs --contracts DutchauctionA --calls 50
+    python -m tools.box_refs --contracts coinA --replay fuzz-failures/coinA.Coin.supply_is_minted.json
+    python -m tools.box_refs --cache box-plans.json --json
+    python -m tools.box_refs --cache box-plans.json --contracts coinA --keys mint --sender ADDR \\
+        --args '{"receiver": "ADDR", "amount": 5}'
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import math
+import random
+import sys
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import ALGORAND_DIR
+from tools.fuzz import (ACTORS, AbiMethod, AbiType, Call, ContractAbi, Emulation, Generator, dataset_abis,
+                        decode_address, source_integers)
+from tools.mbr import analyze
+
+#: Bytes of box reads and writes each box reference pays for
+BOX_IO_BUDGET = 1024
+#: Accounts, assets, apps and boxes one transaction may reference
+MAX_REFERENCES = 8
+
+#: Ledger method -> the access it is
+_LEDGER_OPERATIONS = {"box_exists": "read", "get_box": "read", "set_box": "write", "delete_box": "delete"}
+_ACCESS_RANK = {"read": 0, "write": 1, "create": 2, "delete": 2}
+
+
+@dataclass(frozen=True)
+class KeyTemplate:
+    #: Hex of the literal bytes before and after ``source``
+    prefix: str
+    #: ``sender`` or an argument name; None for a literal key
+    source: str | None = None
+    suffix: str = ""
+
+    def render(self, sources: dict[str, bytes]) -> bytes:
+        middle = sources[self.source] if self.source is not None else b""
+        return bytes.fromhex(self.prefix) + middle + bytes.fromhex(self.suffix)
+
+    def describe(self) -> str:
+        parts = [repr(bytes.fromhex(self.prefix))] if self.prefix or self.source is None else []
+        if self.source is not None:
+            parts.append(self.source)
+        if self.suffix:
+            parts.append(repr(bytes.fromhex(self.suffix)))
+        return " + ".join(parts)
+
+
+@dataclass
+class BoxUse:
+    key: KeyTemplate
+    #: Largest size the box had during the call
+    size: int
+    #: ``read``, ``write``, ``create`` or ``delete``
+    access: str
+
+
+@dataclass
+class BoxPlan:
+    method: str
+    shape: str
+    boxes: list[BoxUse] = field(default_factory=list)
+    #: Every key has a template and the call was accepted
+    cacheable: bool = True
+    rejection: str | None = None
+
+    @property
+    def io_bytes(self) -> int:
+        return sum(box.size for box in self.boxes)
+
+    @property
+    def references(self) -> int:
+        return max(len(self.boxes), math.ceil(self.io_bytes / BOX_IO_BUDGET))
+
+    @property
+    def empty_references(self) -> int:
+        return self.references - len(self.boxes)
+
+    @property
+    def transactions(self) -> int:
+        """App calls needed to carry the references, the call itself included."""
+        return max(1, math.ceil(self.references / MAX_REFERENCES))
+
+
+@dataclass
+class PlannedCall:
+    call: Call
+    plan: BoxPlan
+    #: Box names to reference, in the order of ``plan.boxes``
+    keys: list[bytes]
+    cached: bool
+
+
+def _plan_from_json(data: dict) -> BoxPlan:
+    boxes = [BoxUse(KeyTemplate(**box["key"]), box["size"], box["access"]) for box in data["boxes"]]
+    return BoxPlan(data["method"], data["shape"], boxes, data["cacheable"], data.get("rejection"))
+
+
+# ---- recording ---------------------------------------------------------------
+
+
+def _key_bytes(key: object) -> bytes:
+    if isinstance(key, str):
+        return key.encode()
+    value = getattr(key, "value", key)
+    return bytes(value)
+
+
+class BoxRecorder:
+    """Box operations of the emulator's ledger while installed, with the size of each box."""
+
+    def __init__(self, ledger: object) -> None:
+        self.ledger = ledger
+        self.accesses: dict[bytes, str] = {}
+        self.sizes: dict[bytes, int] = {}
+        self._originals: dict[str, Callable] = {}
+        self._app: object = None
+
+    def __enter__(self) -> BoxRecorder:
+        for name, access in _LEDGER_OPERATIONS.items():
+            original = getattr(self.ledger, name, None)
+            if original is not None:
+                self._originals[name] = original
+                setattr(self.ledger, name, self._recording(original, access))
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        for name, original in self._originals.items():
+            setattr(self.ledger, name, original)
+        for key in self.accesses:
+            self.sizes[key] = max(self.sizes[key], self._size(self._app, key))
+
+    def _size(self, app: object, key: bytes) -> int:
+        return len(self._originals["get_box"](app, key)) if self._originals["box_exists"](app, key) else 0
+
+    def _recording(self, original: Callable, access: str) -> Callable:
+        def recorded(app: object, key: object, *args: object, **kwargs: object) -> object:
+            name = _key_bytes(key)
+            self._app = app
+            if name not in self.sizes:
+                self.sizes[name] = self._size(app, name)
+            if access == "write" and not self._originals["box_exists"](app, name):
+                access_now = "create"
+            else:
+                access_now = access
+            known = self.accesses.get(name)
+            if known is None or _ACCESS_RANK[access_now] > _ACCESS_RANK[known]:
+                self.accesses[name] = access_now
+            return original(app, key, *args, **kwargs)
+
+        return recorded
+
+
+# ---- planning ----------------------------------------------------------------
+
+
+def _literal_keys(abi: ContractAbi) -> set[bytes]:
+    """Box keys the contract spells out in its source."""
+    keys = set()
+    for layout in analyze(ALGORAND_DIR / f"{abi.stem}.py"):
+        if layout.contract == abi.name:
+            keys |= {ast.literal_eval(box.key) for box in layout.boxes if box.scaling == "once"}
+    return keys
+
+
+def key_source(t: AbiType, value: object) -> bytes | None:
+    """Bytes a box key can embed for an argument of type ``t``: address, ``itob`` or raw bytes; None if none."""
+    if t.kind == "account":
+        return decode_address(value) if isinstance(value, str) else bytes(value)
+    if t.kind == "asset":
+        return int(value).to_bytes(8, "big")
+    if t.kind in ("bytes", "string") and value:
+        return bytes.fromhex(value) if t.kind == "bytes" else value.encode()
+    if t.kind == "uint" and (t.size or 64) <= 64:
+        return value.to_bytes((t.size or 64) // 8, "big")
+    return None
+
+
+def argument_shape(method: AbiMethod, args: dict[str, object], sender: object) -> str:
+    parts = []
+    for name, t in method.parameters:
+        value = args[name]
+        if t.kind == "bytes":
+            parts.append(f"bytes[{len(value) // 2}]")
+        elif t.kind in ("string", "array"):
+            parts.append(f"{t.kind}[{len(value)}]")
+        elif t.kind == "account":
+            parts.append("account=sender" if value == sender else "account")
+        elif t.kind in ("pay", "axfer"):
+            parts.append(f"{t.kind}{'->app' if value['to_app'] else ''}")
+        else:
+            parts.append(t.kind)
+    return ", ".join(parts)
+
+
+class BoxPlanner:
+    """Box references for the calls of one contract, planned in the order they are sent."""
+
+    def __init__(self, abi: ContractAbi, cache: dict[str, BoxPlan] | None = None, actors: int = ACTORS) -> None:
+        self.abi = abi
+        self.cache = {} if cache is None else cache
+        self.literal_keys = _literal_keys(abi)
+        self._methods = {m.name: m for m in abi.methods}
+        self.run = Emulation(abi, actors)
+        #: Calls answered from the cache that the shadow has not run yet
+        self.pending: list[Call] = []
+        self.simulations = 0
+
+    def close(self) -> None:
+        self.run.close()
+
+    def sources(self, call: Call) -> dict[str, bytes]:
+        """Byte strings a key can be built from, ``sender`` first."""
+        found = {"sender": self.run.accounts[call.sender].bytes.value}
+        for name, t in self._methods[call.method].parameters:
+            value = call.args[name]
+            if t.kind == "account":
+                value = self.run.accounts[value].bytes.value
+            elif t.kind == "asset":
+                value = int(self.run.assets[value].id)
+            if (source := key_source(t, value)) is not None:
+                found[name] = source
+        return found
+
+    def template(self, key: bytes, sources: dict[str, bytes]) -> KeyTemplate | None:
+        if key in self.literal_keys:
+            return KeyTemplate(key.hex())
+        for name, value in sources.items():
+            at = key.find(value)
+            if at >= 0:
+                return KeyTemplate(key[:at].hex(), name, key[at + len(value):].hex())
+        return None
+
+    def _roll_back(self) -> None:
+        """Undo a rejected call by replaying the accepted ones on a fresh shadow."""
+        self.run = self.run.restart()
+
+    def plan(self, call: Call) -> PlannedCall:
+        method = self._methods[call.method]
+        shape = argument_shape(method, call.args, call.sender)
+        cache_key = f"{self.abi.key}.{call.method}({shape})"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.pending.append(call)
+            sources = self.sources(call)
+            return PlannedCall(call, cached, [box.key.render(sources) for box in cached.boxes], True)
+
+        for earlier in self.pending:
+            self.simulations += 1
+            if self.run.apply(earlier) is not None:
+                self._roll_back()
+        self.pending.clear()
+        sources = self.sources(call)
+        recorder = BoxRecorder(self.run.ctx.ledger)
+        self.simulations += 1
+        with recorder:
+            reason = self.run.apply(call)
+        if reason is not None:
+            self._roll_back()
+        plan = BoxPlan(call.method, shape, rejection=reason, cacheable=reason is None)
+        keys = []
+        for key, access in recorder.accesses.items():
+            template = self.template(key, sources)
+            if template is None:
+                template, plan.cacheable = KeyTemplate(key.hex()), False
+            plan.boxes.append(BoxUse(template, recorder.sizes[key], access))
+            keys.append(key)
+        if plan.cacheable:
+            self.cache[cache_key] = plan
+        return PlannedCall(call, plan, keys, False)
+
+
+def render_keys(cache: dict[str, BoxPlan], abi: ContractAbi, method: str, sender: str,
+                args: dict[str, object]) -> tuple[BoxPlan, list[bytes]] | None:
+    """The cached plan of a real call and the box names it must reference; None if its shape was never planned.
+
+    ``sender`` and ``account`` arguments are Algorand addresses, ``asset``
+    arguments asset IDs, ``bytes`` hex strings and group transactions
+    ``{"to_app": bool}``, as in a fuzz ``Call`` otherwise.
+    """
+    abi_method = next((m for m in abi.methods if m.name == method), None)
+    if abi_method is None:
+        raise ValueError(f"{abi.key} has no ABI method {method!r}")
+    shape = argument_shape(abi_method, args, sender)
+    plan = cache.get(f"{abi.key}.{method}({shape})")
+    if plan is None:
+        return None
+    sources = {"sender": decode_address(sender)}
+    for name, t in abi_method.parameters:
+        if (source := key_source(t, args[name])) is not None:
+            sources[name] = source
+    return plan, [box.key.render(sources) for box in plan.boxes]
+
+
+# ---- reporting ---------------------------------------------------------------
+
+
+def format_planned(planned: PlannedCall) -> str:
+    plan = planned.plan
+    boxes = ", ".join(f"{box.key.describe()} ({box.access}, {box.size} B)" for box in plan.boxes) or "no boxes"
+    line = f"    {planned.call.method} from actor {planned.call.sender}: {boxes}"
+    if plan.boxes:
+        line += f"; {plan.references} references"
+        if plan.empty_references:
+            line += f" ({plan.empty_references} empty)"
+        if plan.transactions > 1:
+            line += f" over {plan.transactions} app calls"
+    if planned.cached:
+        line += " [cached]"
+    elif not plan.cacheable:
+        line += f" [not cached: {plan.rejection or 'key not explained by the arguments'}]"
+    return line
+
+
+def _replayed_calls(path: Path) -> list[Call]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [Call(**call) for call in (data["calls"] if isinstance(data, dict) else data)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", action="append", help="file stems or stem.Class to plan (default: all)")
+    parser.add_argument("--calls", type=int, default=20, help="random calls to plan per contract")
+    parser.add_argument("--replay", type=Path, help="plan the calls of a JSON file (a list, or a fuzz failure)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", type=Path, help="JSON file plans are loaded from and saved to")
+    parser.add_argument("--json", action="store_true", help="print the planned calls as JSON")
+    parser.add_argument("--keys", metavar="METHOD", help="render the cached plan of one real call instead")
+    parser.add_argument("--sender", help="the real call's sender address (with --keys)")
+    parser.add_argument("--args", default="{}", help="the real call's arguments as JSON (with --keys)")
+    args = parser.parse_args(argv)
+
+    abis = [abi for abi in dataset_abis()
+            if not args.contracts or abi.stem in args.contracts or abi.key in args.contracts]
+    if args.replay is not None and len(abis) != 1:
+        parser.error("--replay needs --contracts naming one contract")
+    cache: dict[str, BoxPlan] = {}
+    if args.cache is not None and args.cache.is_file():
+        cache = {key: _plan_from_json(plan) for key, plan in json.loads(args.cache.read_text(encoding="utf-8")).items()}
+
+    if args.keys is not None:
+        if len(abis) != 1 or args.cache is None or args.sender is None:
+            parser.error("--keys needs --contracts naming one contract, --cache and --sender")
+        try:
+            rendered = render_keys(cache, abis[0], args.keys, args.sender, json.loads(args.args))
+        except (ValueError, KeyError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+        if rendered is None:
+            print(f"error: no cached plan for {args.keys} with these arguments, plan such a call first",
+                  file=sys.stderr)
+            return 1
+        plan, keys = rendered
+        if args.json:
+            print(json.dumps({"boxes": [key.hex() for key in keys], "references": plan.references,
+                              "empty_references": plan.empty_references, "transactions": plan.transactions}))
+        else:
+            for box, key in zip(plan.boxes, keys):
+                print(f"{key.hex()}  {box.key.describe()} ({box.access}, {box.size} B)")
+            print(f"{plan.references} references ({plan.empty_references} empty) over {plan.transactions} app calls")
+        return 0
+
+    results = []
+    for abi in abis:
+        if args.replay is not None:
+            calls = _replayed_calls(args.replay)
+        else:
+            generator = Generator(abi, random.Random(f"{args.seed}:{abi.key}"), source_integers(
+                ALGORAND_DIR / f"{abi.stem}.py"))
+            calls = generator.sequence(args.calls)
+        try:
+            planner = BoxPlanner(abi, cache)
+        except RuntimeError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+        try:
+            planned = [planner.plan(call) for call in calls]
+        finally:
+            planner.close()
+        results.append((abi, planned, planner.simulations))
+
+    if args.cache is not None:
+        args.cache.write_text(json.dumps({key: asdict(plan) for key, plan in cache.items()}, indent=1) + "\n",
+                              encoding="utf-8")
+    if args.json:
+        print(json.dumps([{"contract": abi.key, "simulations": simulations, "calls": [
+            {"call": asdict(p.call), "cached": p.cached, "keys": [key.hex() for key in p.keys],
+             "references": p.plan.references, "empty_references": p.plan.empty_references,
+             "io_bytes": p.plan.io_bytes, "plan": asdict(p.plan)} for p in planned]}
+            for abi, planned, simulations in results], indent=2))
+        return 0
+    for abi, planned, simulations in results:
+        print(f"{abi.key}: {len(planned)} calls, {sum(p.cached for p in planned)} from the cache, "
+              f"{simulations} emulator runs")
+        for p in planned:
+            print(format_planned(p))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
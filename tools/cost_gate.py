@@ -0,0 +1,158 @@
+"""Opcode-cost and program-size regression gate for the dataset contracts.
+
+Every file in ``Algorand Python Dataset/`` is compiled with ``puyapy`` and costed
+with ``tools.teal_cost``. The result is compared against a stored snapshot; the
+gate fails (exit code 1) with a diff when
+
+* an ABI method's static cost grows by more than ``--threshold`` (relative),
+* an approval program grows by more than ``--threshold``,
+* a contract needs more extra pages than it did, or more than the AVM allows,
+* a contract that compiled in the snapshot no longer compiles.
+
+New contracts or methods and improvements are listed but never fail the gate.
+
+Usage::
+
+    python -m tools.cost_gate --update        # record the snapshot
+    python -m tools.cost_gate                 # check against it
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tools import teal_cost
+from tools.dataset import REPO_ROOT, algorand_contracts
+
+DEFAULT_SNAPSHOT = REPO_ROOT / "tools" / "cost_snapshot.json"
+DEFAULT_THRESHOLD = 0.05
+
+
+def read_snapshot(path: Path) -> dict[str, dict]:
+    """The snapshot at ``path``; RuntimeError saying how to record it when there is none."""
+    if not path.is_file():
+        raise RuntimeError(
+            f"no cost snapshot at {path}: record it with `python -m tools.cost_gate --update` "
+            "(needs puyapy) and commit it"
+        )
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def measure_file(path: Path) -> dict:
+    """Snapshot entry for one contract file: per contract costs, or the compile error."""
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            costs = teal_cost.analyze_file(path, Path(tmp))
+        except RuntimeError as exc:
+            return {"error": str(exc).splitlines()[0]}
+    return {
+        "contracts": {
+            cost.contract: {
+                "approval_size": cost.approval_size,
+                "clear_size": cost.clear_size,
+                "extra_pages": cost.extra_pages_required,
+                "methods": dict(sorted(cost.method_costs.items())),
+            }
+            for cost in costs
+        }
+    }
+
+
+def measure(paths: list[Path], jobs: int | None = None) -> dict[str, dict]:
+    """Compile and cost ``paths`` concurrently, keyed by file name."""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip((p.name for p in paths), pool.map(measure_file, paths)))
+
+
+def _grew(old: int | None, new: int | None, threshold: float) -> bool:
+    return old is not None and new is not None and new > old * (1 + threshold)
+
+
+def _change(old: int, new: int) -> str:
+    return f"{old} -> {new} ({(new - old) / old:+.1%})" if old else f"{old} -> {new}"
+
+
+def compare(old: dict[str, dict], new: dict[str, dict], threshold: float) -> tuple[list[str], list[str]]:
+    """Return ``(regressions, notes)`` between two snapshots."""
+    regressions: list[str] = []
+    notes: list[str] = []
+    for file_name, entry in sorted(new.items()):
+        before = old.get(file_name)
+        if "error" in entry:
+            if before is not None and "error" not in before:
+                regressions.append(f"{file_name}: no longer compiles: {entry['error']}")
+            else:
+                notes.append(f"{file_name}: does not compile: {entry['error']}")
+            continue
+        if before is None or "error" in before:
+            notes.append(f"{file_name}: new in snapshot")
+            before = {"contracts": {}}
+        for contract, costs in sorted(entry["contracts"].items()):
+            prefix = f"{file_name}::{contract}"
+            previous = before["contracts"].get(contract)
+            pages = costs["extra_pages"]
+            if pages is not None and pages > teal_cost.MAX_EXTRA_PAGES:
+                regressions.append(f"{prefix}: needs {pages} extra pages, limit is {teal_cost.MAX_EXTRA_PAGES}")
+            if previous is None:
+                notes.append(f"{prefix}: new contract")
+                continue
+            if previous["extra_pages"] is not None and pages is not None and pages > previous["extra_pages"]:
+                regressions.append(f"{prefix}: extra pages {previous['extra_pages']} -> {pages}")
+            if _grew(previous["approval_size"], costs["approval_size"], threshold):
+                regressions.append(
+                    f"{prefix}: approval size {_change(previous['approval_size'], costs['approval_size'])}"
+                )
+            for method, ops in costs["methods"].items():
+                was = previous["methods"].get(method)
+                if was is None:
+                    notes.append(f"{prefix}.{method}: new method ({ops})")
+                elif _grew(was, ops, threshold):
+                    regressions.append(f"{prefix}.{method}: {_change(was, ops)}")
+                elif ops < was:
+                    notes.append(f"{prefix}.{method}: {_change(was, ops)}")
+            for method in previous["methods"].keys() - costs["methods"].keys():
+                notes.append(f"{prefix}.{method}: removed")
+    return regressions, notes
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help="contract files (default: whole dataset)")
+    parser.add_argument("--snapshot", type=Path, default=DEFAULT_SNAPSHOT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative growth")
+    parser.add_argument("--update", action="store_true", help="write the snapshot instead of checking")
+    parser.add_argument("--jobs", type=int, default=None, help="concurrent compilations")
+    args = parser.parse_args(argv)
+
+    if not args.update:
+        try:
+            snapshot = read_snapshot(args.snapshot)
+        except RuntimeError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+
+    paths = args.paths or algorand_contracts()
+    current = measure(paths, args.jobs)
+    if args.update:
+        snapshot = read_snapshot(args.snapshot) if args.snapshot.is_file() and args.paths else {}
+        snapshot.update(current)
+        args.snapshot.write_text(json.dumps(dict(sorted(snapshot.items())), indent=2) + "\n")
+        print(f"wrote {len(current)} files to {args.snapshot}")
+        return 0
+
+    regressions, notes = compare(snapshot, current, args.threshold)
+    for note in notes:
+        print(f"  {note}")
+    for regression in regressions:
+        print(f"- {regression}")
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%} in {len(current)} files")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Locations of the dataset directories and helpers to load contracts from them."""
+
+from __future__ import annotations
+
+import importlib.util
+import re
+import sys
+from pathlib import Path
+from types import ModuleType
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ALGORAND_DIR = REPO_ROOT / "Algorand Python Dataset"
+SOLIDITY_DIR = REPO_ROOT / "Solidity dataset"
+PROMPTS_DIR = REPO_ROOT / "Prompts"
+
+
+def algorand_contracts() -> list[Path]:
+    """Return every Algorand Python contract file, sorted by name."""
+    return sorted(ALGORAND_DIR.glob("*.py"))
+
+
+def solidity_contracts() -> list[Path]:
+    """Return every Solidity contract file, sorted by name."""
+    return sorted(SOLIDITY_DIR.glob("*.sol"))
+
+
+def prompt_files() -> list[Path]:
+    """Return every prompt style in ``Prompts``, sorted by name."""
+    return sorted(path for path in PROMPTS_DIR.iterdir() if path.is_file())
+
+
+#: Pairs whose file names and contract names both differ
+_PAIR_ALIASES = {"calc": "cal"}
+
+#: Algorand files that redesign their Solidity counterpart (another ABI and
+#: storage layout) rather than translate it
+REDESIGNS = frozenset({"HtlcA.py", "LotteryA.py"})
+
+_CONTRACT_NAME = re.compile(r"^\s*(?:contract|class)\s+(\w+)", re.MULTILINE)
+
+
+def _pair_stem(path: Path) -> str:
+    stem = re.sub(r"(Et|E|A)$", "", path.stem).lower()
+    return _PAIR_ALIASES.get(stem, stem)
+
+
+def contract_pairs(redesigns: bool = True) -> list[tuple[Path, Path]]:
+    """Match Solidity contracts with their Algorand Python translations.
+
+    Files are paired by stem without the ``E``/``A`` suffix (``coin.sol`` and
+    ``coinA.py``), and otherwise by a shared contract/class name. Contracts
+    without a translation are left out, and so are the :data:`REDESIGNS`
+    unless ``redesigns`` is true.
+    """
+    algorand = {_pair_stem(path): path for path in algorand_contracts()}
+    by_name = {name: path for path in algorand_contracts()
+               for name in _CONTRACT_NAME.findall(path.read_text(encoding="utf-8"))}
+    pairs = []
+    for solidity in solidity_contracts():
+        match = algorand.get(_pair_stem(solidity))
+        if match is None:
+            names = _CONTRACT_NAME.findall(solidity.read_text(encoding="utf-8"))
+            match = next((by_name[name] for name in names if name in by_name), None)
+        if match is not None and (redesigns or match.name not in REDESIGNS):
+            pairs.append((solidity, match))
+    return pairs
+
+
+def load_contract_module(name: str) -> ModuleType:
+    """Import a file from ``Algorand Python Dataset`` by stem, e.g. ``"coinA"``.
+
+    The directory name contains spaces, so it cannot be imported as a package;
+    the module is registered in ``sys.modules`` under ``dataset.<stem>``.
+    ``algopy`` must be importable, which for offline runs means
+    ``algorand-python-testing`` is installed.
+    """
+    module_name = f"dataset.{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    path = ALGORAND_DIR / f"{name}.py"
+    if not path.is_file():
+        raise FileNotFoundError(f"no dataset contract named {name!r} in {ALGORAND_DIR}")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
@@ -0,0 +1,563 @@
+"""Behavioural equivalence of the Solidity and Algorand Python contract pairs.
+
+One scenario trace (who calls what, with which arguments, value and block
+time) is replayed against both contracts of a pair (``tools.dataset.contract_pairs``):
+
+* the Solidity contract is compiled with ``py-solc-x`` and deployed on an
+  in-process EVM (``web3`` over ``eth-tester``/``py-evm``);
+* the Algorand Python contract runs in the ``algopy_testing`` emulator.
+
+After each step the harness compares whether the call succeeded or reverted,
+its return value, and the contract state: every public Solidity state variable
+(and, for mappings keyed by address or integer, its entry for each actor)
+against the Algorand attribute of the same name in snake_case, whether plain,
+``GlobalState`` or ``BoxMap``. Addresses are compared as actor numbers, so the
+two chains' accounts line up. A step's value is sent as ``msg.value`` on the
+EVM and as the payment transaction argument of the Algorand method.
+
+Methods are matched by name (``transferOwnership`` and ``transfer_ownership``);
+functions only one side has, or whose argument types the harness cannot
+build, are left out of generated traces and listed as not compared.
+Traces are generated from the shared methods with a seed, or loaded from
+``<pair>.json`` files in ``--traces``; ``--save-traces`` writes the generated
+ones there for editing. Pairs run in parallel across a process pool.
+
+Usage::
+
+    python -m tools.equivalence                        # every pair, generated traces
+    python -m tools.equivalence --pairs coin --steps 200 --seed 7
+    python -m tools.equivalence --save-traces traces/ --dry-run   # write the traces, run nothing
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import contract_pairs, load_contract_module
+from tools.translation.pretranslate import python_name
+from tools.translation.solidity import SolidityError, parse
+from tools.translation.split import contract_class, flatten
+
+#: Block time of the first step; later steps move it forward
+START_TIMESTAMP = 1_700_000_000
+ACTORS = 4
+#: Upper bound of generated integers and values, small enough for either chain's balances
+MAX_AMOUNT = 1_000_000
+
+_UINT_RE = re.compile(r"u?int\d*")
+#: Algorand parameter annotations the harness can build, by argument kind
+_ALGORAND_KINDS = {
+    "UInt64": "uint", "algopy.UInt64": "uint",
+    "arc4.UInt8": "uint", "arc4.UInt32": "uint", "arc4.UInt64": "uint", "arc4.UInt256": "uint",
+    "Account": "address", "arc4.Address": "address",
+    "bool": "bool", "arc4.Bool": "bool",
+    "String": "string", "arc4.String": "string",
+    "Bytes": "bytes", "arc4.DynamicBytes": "bytes",
+    "gtxn.PaymentTransaction": "payment",
+}
+
+
+def _comparable(name: str) -> str:
+    return python_name(name).replace("_", "")
+
+
+# ---- traces ------------------------------------------------------------------
+
+
+@dataclass
+class Step:
+    call: str
+    #: Actor number of the sender; 0 deploys the contracts
+    sender: int = 0
+    #: msg.value on the EVM, the payment argument on Algorand
+    value: int = 0
+    timestamp: int = START_TIMESTAMP
+    #: Integers, booleans, strings, ``{"actor": n}`` for addresses, ``{"hex": ...}`` for bytes
+    args: list = field(default_factory=list)
+
+
+@dataclass
+class Trace:
+    pair: str
+    actors: int = ACTORS
+    #: Constructor arguments, in the same encoding as step arguments
+    deploy: list = field(default_factory=list)
+    steps: list[Step] = field(default_factory=list)
+
+    @classmethod
+    def from_json(cls, data: dict) -> Trace:
+        return cls(data["pair"], data.get("actors", ACTORS), data.get("deploy", []),
+                   [Step(**step) for step in data.get("steps", [])])
+
+
+@dataclass(frozen=True)
+class SolidityMethod:
+    name: str
+    #: Parameter kinds: uint, address, bool, string, bytes, or the unsupported type
+    parameters: tuple[str, ...]
+    payable: bool = False
+
+
+@dataclass(frozen=True)
+class AlgorandMethod:
+    name: str
+    #: Parameter kinds as for Solidity, ``payment`` for a payment transaction argument
+    parameters: tuple[str, ...]
+    #: Parameter annotations as written, e.g. ``arc4.UInt64``
+    annotations: tuple[str, ...] = ()
+    create: bool = False
+
+
+def _solidity_kind(type_: str) -> str:
+    type_ = type_.replace(" payable", "").replace(" memory", "").replace(" calldata", "").strip()
+    if _UINT_RE.fullmatch(type_):
+        return "uint"
+    if type_ in ("address", "bool", "string", "bytes"):
+        return type_
+    if re.fullmatch(r"bytes\d+", type_):
+        return "bytes"
+    return type_
+
+
+def _deployed(source: str):
+    unit = parse(source)
+    contract = unit.contract()
+    return unit, contract
+
+
+def solidity_methods(source: str) -> tuple[dict[str, SolidityMethod], SolidityMethod | None]:
+    """Public and external functions of the deployed contract by comparable name, and its constructor."""
+    unit, contract = _deployed(source)
+    methods = {}
+    constructor = None
+    for owner, member in flatten(unit, contract):
+        if member.kind not in ("function", "constructor"):
+            continue
+        method = SolidityMethod(member.name, tuple(_solidity_kind(p.type) for p in member.parameters),
+                                member.mutability == "payable")
+        # before Solidity 0.4.22 a constructor is the function named after its contract
+        if member.kind == "constructor" or member.name == owner.name:
+            if owner is contract:
+                constructor = method
+        elif member.visibility not in ("internal", "private"):
+            methods[_comparable(member.name)] = method
+    return methods, constructor
+
+
+def algorand_methods(source: str) -> dict[str, AlgorandMethod]:
+    """ABI methods of the Algorand Python contract by comparable name, with their parameter kinds."""
+    contract = contract_class(ast.parse(source))
+    methods = {}
+    for node in contract.body if contract is not None else []:
+        if not isinstance(node, ast.FunctionDef):
+            continue
+        decorators = [ast.unparse(d) for d in node.decorator_list]
+        if not any("abimethod" in d for d in decorators):
+            continue
+        annotations = tuple(ast.unparse(a.annotation) if a.annotation else "" for a in node.args.args[1:])
+        kinds = tuple(_ALGORAND_KINDS.get(annotation, "?") for annotation in annotations)
+        methods[_comparable(node.name)] = AlgorandMethod(node.name, kinds, annotations,
+                                                         any("create=" in d for d in decorators))
+    return methods
+
+
+def shared_methods(solidity: str, algorand: str) -> tuple[dict[str, tuple[SolidityMethod, AlgorandMethod]], list[str]]:
+    """Methods both contracts have with arguments the harness can build, and the names left out."""
+    evm, _ = solidity_methods(solidity)
+    avm = algorand_methods(algorand)
+    shared = {}
+    skipped = []
+    for key in sorted(evm.keys() | avm.keys()):
+        sol, alg = evm.get(key), avm.get(key)
+        if alg is None:
+            skipped.append(f"{sol.name} (Solidity only)")
+            continue
+        if sol is None or alg.create:
+            skipped.append(f"{alg.name} ({'create method' if alg.create else 'Algorand only'})")
+            continue
+        avm_args = tuple(kind for kind in alg.parameters if kind != "payment")
+        if avm_args != sol.parameters or any(k not in ("uint", "address", "bool", "string", "bytes")
+                                             for k in sol.parameters):
+            skipped.append(f"{sol.name} (arguments {', '.join(sol.parameters) or '-'} vs "
+                           f"{', '.join(alg.parameters) or '-'})")
+            continue
+        shared[key] = sol, alg
+    return shared, skipped
+
+
+def _argument(kind: str, rng: random.Random, actors: int):
+    if kind == "uint":
+        return rng.choice([0, 1, rng.randint(2, 100), rng.randint(101, MAX_AMOUNT)])
+    if kind == "address":
+        return {"actor": rng.randrange(actors)}
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "string":
+        return rng.choice(["", "a", "algosol", "proposal"])
+    return {"hex": rng.randbytes(32).hex()}
+
+
+def generate_trace(pair: str, solidity: str, algorand: str, steps: int, seed: int, actors: int = ACTORS) -> Trace:
+    """Random calls of the shared methods by random actors, with moving block time."""
+    rng = random.Random(f"{seed}:{pair}")
+    shared, _ = shared_methods(solidity, algorand)
+    _, constructor = solidity_methods(solidity)
+    trace = Trace(pair, actors)
+    if constructor is not None:
+        trace.deploy = [_argument(kind, rng, actors) for kind in constructor.parameters]
+    timestamp = START_TIMESTAMP
+    for _ in range(steps if shared else 0):
+        sol, alg = shared[rng.choice(sorted(shared))]
+        timestamp += rng.choice([0, 1, 60, 3600, 86400])
+        value = rng.randint(1, MAX_AMOUNT) if sol.payable or "payment" in alg.parameters else 0
+        trace.steps.append(Step(sol.name, rng.randrange(actors), value, timestamp,
+                                [_argument(kind, rng, actors) for kind in sol.parameters]))
+    return trace
+
+
+# ---- observations ------------------------------------------------------------
+
+
+@dataclass
+class Observation:
+    ok: bool
+    returned: object = None
+    state: dict[str, object] = field(default_factory=dict)
+
+
+def _public_state(source: str) -> list[tuple[str, str | None]]:
+    """(name, mapping key kind or None) of the deployed contract's public state variables."""
+    unit, contract = _deployed(source)
+    variables = []
+    for _, member in flatten(unit, contract):
+        if member.kind != "state" or "public" not in member.tokens or "constant" in member.tokens:
+            continue
+        key = None
+        if member.tokens[0] == "mapping":
+            key = _solidity_kind(member.tokens[2])
+            if key not in ("address", "uint") or member.tokens.count("mapping") > 1:
+                continue
+        variables.append((member.name, key))
+    return variables
+
+
+class EvmSide:
+    """The Solidity contract deployed on an in-process EVM."""
+
+    def __init__(self, source: str, trace: Trace) -> None:
+        try:
+            import solcx
+            from eth_tester import EthereumTester, PyEVMBackend
+            from web3 import Web3
+            from web3.providers.eth_tester import EthereumTesterProvider
+        except ImportError as exc:
+            raise RuntimeError("the EVM side needs web3[tester] and py-solc-x (pip install 'web3[tester]' "
+                               "py-solc-x)") from exc
+        pragma = next(("".join(d.tokens[2:-1]) for d in parse(source).directives
+                       if d.tokens[:2] == ("pragma", "solidity")), None)
+        try:
+            if pragma is not None:
+                solcx.set_solc_version_pragma(pragma)
+            compiled = solcx.compile_source(source, output_values=["abi", "bin"])
+        except solcx.exceptions.SolcNotInstalled as exc:
+            raise RuntimeError(f"no installed solc matches {pragma!r} (python -m solcx.install <version>)") from exc
+        name = parse(source).contract().name
+        artifact = next(value for key, value in compiled.items() if key.rsplit(":", 1)[-1] == name)
+        self.tester = EthereumTester(PyEVMBackend())
+        self.w3 = Web3(EthereumTesterProvider(self.tester))
+        self.accounts = self.w3.eth.accounts[: trace.actors]
+        self.variables = _public_state(source)
+        factory = self.w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bin"])
+        self.tester.time_travel(START_TIMESTAMP)
+        tx = factory.constructor(*self.arguments(trace.deploy)).transact({"from": self.accounts[0]})
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx)
+        self.contract = self.w3.eth.contract(address=receipt.contractAddress, abi=artifact["abi"])
+
+    def arguments(self, args: list) -> list:
+        return [self.accounts[arg["actor"]] if isinstance(arg, dict) and "actor" in arg
+                else bytes.fromhex(arg["hex"]) if isinstance(arg, dict) else arg for arg in args]
+
+    def normalize(self, value: object) -> object:
+        if isinstance(value, str) and self.w3.is_address(value):
+            return _address(value, self.accounts, self.contract.address)
+        if isinstance(value, bytes):
+            return value.rstrip(b"\0").hex()
+        if isinstance(value, (list, tuple)):
+            return [self.normalize(v) for v in value]
+        return value
+
+    def call(self, step: Step) -> Observation:
+        if step.timestamp > self.w3.eth.get_block("latest").timestamp:
+            self.tester.time_travel(step.timestamp)
+        function = getattr(self.contract.functions, step.call)(*self.arguments(step.args))
+        options = {"from": self.accounts[step.sender], "value": step.value}
+        try:
+            returned = function.call(options)
+            function.transact(options)
+        except Exception:  # noqa: BLE001 - every revert flavour of web3/eth-tester
+            return Observation(False, state=self.state())
+        return Observation(True, self.normalize(returned), self.state())
+
+    def state(self) -> dict[str, object]:
+        state = {}
+        for name, key in self.variables:
+            getter = getattr(self.contract.functions, name)
+            if key is None:
+                state[python_name(name)] = self.normalize(getter().call())
+                continue
+            keys = self.accounts if key == "address" else range(len(self.accounts))
+            for index, item in enumerate(keys):
+                state[f"{python_name(name)}[{index}]"] = self.normalize(getter(item).call())
+        return state
+
+
+def _address(value: object, accounts: list, contract: object) -> object:
+    if value in accounts:
+        return {"actor": accounts.index(value)}
+    if value == contract:
+        return "contract"
+    if str(value).strip("0x") == "" or str(value) == "0x0000000000000000000000000000000000000000":
+        return "zero"
+    return "other"
+
+
+class AvmSide:
+    """The Algorand Python contract in the ``algopy_testing`` emulator."""
+
+    def __init__(self, stem: str, source: str, solidity: str, trace: Trace) -> None:
+        try:
+            from algopy_testing import algopy_testing_context
+        except ImportError as exc:
+            raise RuntimeError("the Algorand side needs algorand-python-testing "
+                               "(pip install algorand-python-testing)") from exc
+        self._context = algopy_testing_context()
+        self.ctx = self._context.__enter__()
+        module = load_contract_module(stem)
+        self.methods = algorand_methods(source)
+        self.accounts = [self.ctx.default_sender, *(self.ctx.any.account() for _ in range(trace.actors - 1))]
+        self.variables = _public_state(solidity)
+        self.ctx.ledger.patch_global_fields(latest_timestamp=START_TIMESTAMP)
+        self.contract = getattr(module, contract_class(ast.parse(source)).name)()
+        self.app = self.ctx.ledger.get_app(self.contract)
+        create = next((m for m in self.methods.values() if m.create), None)
+        if create is not None:
+            if len(trace.deploy) != sum(kind != "payment" for kind in create.parameters):
+                self.close()
+                raise RuntimeError(f"{create.name} and the Solidity constructor take different arguments")
+            self.invoke(create, Step(create.name, args=trace.deploy))
+
+    def close(self) -> None:
+        self._context.__exit__(None, None, None)
+
+    def argument(self, kind: str, annotation: str, arg: object, step: Step) -> object:
+        from algopy import Bytes, String, UInt64, arc4
+
+        if kind == "payment":
+            return self.ctx.any.txn.payment(sender=self.accounts[step.sender], receiver=self.app.address,
+                                            amount=UInt64(step.value))
+        if kind == "address":
+            value = self.accounts[arg["actor"]]
+        elif kind == "bytes":
+            value = Bytes(bytes.fromhex(arg["hex"]))
+        elif kind == "string":
+            value = String(arg)
+        elif kind == "uint":
+            value = UInt64(arg)
+        else:
+            value = arg
+        if annotation.startswith("arc4."):
+            # ARC-4 types are built from their native counterparts
+            return getattr(arc4, annotation.removeprefix("arc4."))(value)
+        return value
+
+    def invoke(self, method: AlgorandMethod, step: Step) -> object:
+        args = iter(step.args)
+        values = [self.argument(kind, annotation, None if kind == "payment" else next(args), step)
+                  for kind, annotation in zip(method.parameters, method.annotations)]
+        with self.ctx.txn.create_group(active_txn_overrides={"sender": self.accounts[step.sender]}):
+            return getattr(self.contract, method.name)(*values)
+
+    def normalize(self, value: object) -> object:
+        from algopy import Account, Bytes, String, UInt64, arc4
+
+        if isinstance(value, arc4.Address):
+            value = value.native
+        if isinstance(value, Account):
+            if value in self.accounts:
+                return {"actor": self.accounts.index(value)}
+            if value == self.app.address:
+                return "contract"
+            return "zero" if value.bytes == bytes(32) else "other"
+        if isinstance(value, (arc4.UIntN, arc4.BigUIntN, arc4.Bool, arc4.String)):
+            value = value.native
+        if isinstance(value, UInt64):
+            return int(value)
+        if isinstance(value, String):
+            return str(value)
+        if isinstance(value, Bytes):
+            return value.value.rstrip(b"\0").hex()
+        if isinstance(value, tuple):
+            return [self.normalize(v) for v in value]
+        return value
+
+    def call(self, step: Step) -> Observation:
+        method = self.methods[_comparable(step.call)]
+        self.ctx.ledger.patch_global_fields(latest_timestamp=step.timestamp)
+        try:
+            returned = self.invoke(method, step)
+        except Exception:  # noqa: BLE001 - assert, arithmetic and emulator errors all mean a rejected call
+            return Observation(False, state=self.state())
+        return Observation(True, self.normalize(returned), self.state())
+
+    def state(self) -> dict[str, object]:
+        from algopy import BoxMap, GlobalState, UInt64
+
+        state = {}
+        for name, key in self.variables:
+            attribute = getattr(self.contract, python_name(name), None)
+            if attribute is None:
+                continue
+            if key is None:
+                if isinstance(attribute, GlobalState):
+                    attribute = attribute.value if attribute.maybe()[1] else None
+                state[python_name(name)] = self.normalize(attribute)
+                continue
+            if not isinstance(attribute, BoxMap):
+                continue
+            keys = self.accounts if key == "address" else [UInt64(i) for i in range(len(self.accounts))]
+            for index, item in enumerate(keys):
+                value, exists = attribute.maybe(item)
+                state[f"{python_name(name)}[{index}]"] = self.normalize(value) if exists else 0
+        return state
+
+
+# ---- comparison --------------------------------------------------------------
+
+
+@dataclass
+class PairReport:
+    pair: str
+    algorand: str
+    steps: int = 0
+    compared: int = 0
+    divergences: list[str] = field(default_factory=list)
+    #: Methods left out of the trace and why
+    not_compared: list[str] = field(default_factory=list)
+    #: State variables only the Solidity side exposes
+    unmapped_state: list[str] = field(default_factory=list)
+    elapsed_s: float = 0.0
+    error: str | None = None
+
+
+def compare(step_index: int, step: Step, evm: Observation, avm: Observation) -> list[str]:
+    where = f"step {step_index} {step.call}"
+    if evm.ok != avm.ok:
+        return [f"{where}: EVM {'accepted' if evm.ok else 'reverted'}, AVM {'accepted' if avm.ok else 'rejected'}"]
+    issues = []
+    if evm.ok and evm.returned != avm.returned and not (evm.returned == [] and avm.returned is None):
+        issues.append(f"{where}: returned {evm.returned!r} on the EVM, {avm.returned!r} on the AVM")
+    for name in sorted(evm.state.keys() & avm.state.keys()):
+        if evm.state[name] != avm.state[name]:
+            issues.append(f"{where}: {name} is {evm.state[name]!r} on the EVM, {avm.state[name]!r} on the AVM")
+    return issues
+
+
+def run_pair(solidity_path: Path, algorand_path: Path, trace: Trace, max_divergences: int = 10) -> PairReport:
+    """Replay ``trace`` on both sides of a pair; stops after ``max_divergences``."""
+    solidity = solidity_path.read_text(encoding="utf-8")
+    algorand = algorand_path.read_text(encoding="utf-8")
+    report = PairReport(trace.pair, algorand_path.name)
+    started = time.perf_counter()
+    try:
+        _, report.not_compared = shared_methods(solidity, algorand)
+        evm = EvmSide(solidity, trace)
+        avm = AvmSide(algorand_path.stem, algorand, solidity, trace)
+    except (RuntimeError, SolidityError) as exc:
+        report.error = str(exc)
+        return report
+    try:
+        report.unmapped_state = sorted(avm.state().keys() ^ evm.state().keys())
+        for index, step in enumerate(trace.steps):
+            report.steps += 1
+            issues = compare(index, step, evm.call(step), avm.call(step))
+            report.compared += 1
+            report.divergences.extend(issues)
+            if len(report.divergences) >= max_divergences:
+                break
+    finally:
+        avm.close()
+        report.elapsed_s = time.perf_counter() - started
+    return report
+
+
+def _run(job: tuple[Path, Path, dict]) -> PairReport:
+    solidity_path, algorand_path, trace = job
+    return run_pair(solidity_path, algorand_path, Trace.from_json(trace))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pairs", action="append", help="Solidity stems to run, e.g. coin (default: all)")
+    parser.add_argument("--steps", type=int, default=50, help="steps per generated trace")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--traces", type=Path, help="directory of <pair>.json traces used instead of generated ones")
+    parser.add_argument("--save-traces", type=Path, help="write the traces used to this directory")
+    parser.add_argument("--dry-run", action="store_true", help="build the traces only")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    for solidity_path, algorand_path in contract_pairs():
+        pair = solidity_path.stem
+        if args.pairs and pair not in args.pairs:
+            continue
+        stored = args.traces / f"{pair}.json" if args.traces else None
+        if stored is not None and stored.is_file():
+            trace = Trace.from_json(json.loads(stored.read_text(encoding="utf-8")))
+        else:
+            try:
+                trace = generate_trace(pair, solidity_path.read_text(encoding="utf-8"),
+                                       algorand_path.read_text(encoding="utf-8"), args.steps, args.seed)
+            except SolidityError as exc:
+                print(f"{pair}: cannot build a trace: {exc}", file=sys.stderr)
+                continue
+        if args.save_traces is not None:
+            args.save_traces.mkdir(parents=True, exist_ok=True)
+            (args.save_traces / f"{pair}.json").write_text(json.dumps(asdict(trace), indent=1) + "\n",
+                                                          encoding="utf-8")
+        jobs.append((solidity_path, algorand_path, asdict(trace)))
+    if args.dry_run:
+        for _, algorand_path, trace in jobs:
+            print(f"{trace['pair']:<16}{algorand_path.name:<18}{len(trace['steps']):>5} steps")
+        return 0
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        reports = list(pool.map(_run, jobs))
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], indent=2))
+    else:
+        for r in reports:
+            status = f"error: {r.error}" if r.error else f"{r.compared} steps, {len(r.divergences)} divergences"
+            print(f"{r.pair:<16}{r.algorand:<18}{status}")
+            for issue in r.divergences:
+                print(f"    {issue}")
+            if r.not_compared:
+                print(f"    not compared: {', '.join(r.not_compared)}")
+        print(f"{len(reports)} pairs in {elapsed:.1f}s")
+    return 1 if any(r.error or r.divergences for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
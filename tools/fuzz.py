@@ -0,0 +1,772 @@
+"""Property-based fuzzing of every ABI method in the Algorand Python dataset.
+
+The ABI of each ``ARC4Contract`` in ``Algorand Python Dataset/`` is read from
+its source: every ``@arc4.abimethod`` with its parameter types, type aliases
+(``Bytes32``, ``VoteIndexArray``) and ``arc4.Struct`` fields resolved. Random
+call sequences are generated from it, starting with the ``create="require"``
+method when there is one: typed arguments biased towards edge values and the
+integer literals of the contract, senders drawn from a few actors (actor 0
+creates the app), block time moving forward, and payment or asset transfer
+transactions grouped before the call for ``gtxn`` parameters. Sequences run in
+the ``algopy_testing`` emulator, spread over worker processes.
+
+A call that raises is a rejected transaction: the emulator does not roll back
+what the call wrote before failing, so the sequence is replayed without it.
+After every accepted call the contract's invariants are checked; they are
+declared with ``tools.invariants.invariant``, in ``tools/invariants.py`` for
+the dataset and in any ``--invariants FILE`` given::
+
+    @invariant("coinA.Coin")
+    def supply_is_minted(run: Emulation) -> bool:
+        minted = sum(call.args["amount"] for call in run.accepted("mint"))
+        return run.box_total(run.contract.balances) == minted
+
+An invariant returns True (or None) when it holds, and False or a message when
+it does not. A failing sequence is shrunk, calls first and then arguments, to
+the shortest one that still breaks the same invariant, and written to
+``--out`` as JSON; ``--replay`` runs such a file again step by step.
+
+Usage::
+
+    python -m tools.fuzz                                  # every contract, 200 sequences each
+    python -m tools.fuzz --contracts coinA --sequences 2000 --length 40 -j 4
+    python -m tools.fuzz --replay fuzz-failures/coinA.Coin.supply_is_minted.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import base64
+import contextlib
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import ALGORAND_DIR, algorand_contracts, load_contract_module
+from tools.invariants import INVARIANTS
+
+#: Block time of the first call
+START_TIMESTAMP = 1_700_000_000
+#: Accounts sending calls; actor 0 is the creator
+ACTORS = 4
+#: Assets created for asset and asset transfer arguments
+ASSETS = 2
+#: Executions a shrink may spend on one failure
+SHRINK_BUDGET = 2000
+
+_NATIVE_UINTS = {"UInt64": 64, "BigUInt": 512}
+_GROUP_TRANSACTIONS = {"gtxn.PaymentTransaction": "pay", "gtxn.AssetTransferTransaction": "axfer"}
+
+
+# ---- ABI ---------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class AbiType:
+    """A parameter type: its ``kind``, the annotation to build it from, and element types."""
+
+    kind: str
+    annotation: str
+    #: Bits of a uint, length of a static array
+    size: int | None = None
+    #: Element type of an array, or the field types of a struct or tuple
+    items: tuple[AbiType, ...] = ()
+    #: Field names of a struct
+    names: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class AbiMethod:
+    name: str
+    parameters: tuple[tuple[str, AbiType], ...]
+    #: ``"require"``, ``"allow"`` or None
+    create: str | None = None
+    readonly: bool = False
+
+    @property
+    def supported(self) -> bool:
+        return all(_supported(t) for _, t in self.parameters)
+
+
+@dataclass(frozen=True)
+class ContractAbi:
+    stem: str
+    name: str
+    methods: tuple[AbiMethod, ...]
+
+    @property
+    def key(self) -> str:
+        return f"{self.stem}.{self.name}"
+
+    @property
+    def create(self) -> AbiMethod | None:
+        return next((m for m in self.methods if m.create == "require"), None)
+
+    @property
+    def callable(self) -> list[AbiMethod]:
+        """Methods a sequence picks from after creation."""
+        return [m for m in self.methods if m.create != "require" and m.supported]
+
+
+def _supported(t: AbiType) -> bool:
+    return t.kind != "unknown" and all(_supported(item) for item in t.items)
+
+
+def _literal_int(node: ast.expr) -> int | None:
+    if isinstance(node, ast.Subscript) and ast.unparse(node.value).split(".")[-1] == "Literal":
+        node = node.slice
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    return None
+
+
+class TypeReader:
+    """Resolves annotations of one module: its aliases and ``arc4.Struct`` classes."""
+
+    def __init__(self, module: ast.Module) -> None:
+        self.aliases: dict[str, ast.expr] = {}
+        self.structs: dict[str, list[tuple[str, ast.expr]]] = {}
+        for node in module.body:
+            if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.value is not None:
+                self.aliases[node.target.id] = node.value
+            elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                if isinstance(node.value, (ast.Subscript, ast.Attribute)):
+                    self.aliases[node.targets[0].id] = node.value
+            elif isinstance(node, ast.ClassDef) and any(ast.unparse(b).endswith("Struct") for b in node.bases):
+                self.structs[node.name] = [(f.target.id, f.annotation) for f in node.body
+                                           if isinstance(f, ast.AnnAssign) and isinstance(f.target, ast.Name)]
+
+    def read(self, node: ast.expr, annotation: str | None = None) -> AbiType:
+        text = annotation or ast.unparse(node)
+        name = ast.unparse(node).removeprefix("algopy.").removeprefix("typing.")
+        if isinstance(node, ast.Name) and node.id in self.aliases:
+            return self.read(self.aliases[node.id], text)
+        if isinstance(node, ast.Name) and node.id in self.structs:
+            fields = self.structs[node.id]
+            return AbiType("struct", text, items=tuple(self.read(a) for _, a in fields),
+                           names=tuple(n for n, _ in fields))
+        if isinstance(node, ast.Subscript):
+            base = ast.unparse(node.value).removeprefix("algopy.")
+            args = list(node.slice.elts) if isinstance(node.slice, ast.Tuple) else [node.slice]
+            if base == "arc4.DynamicArray":
+                return AbiType("array", text, items=(self.read(args[0]),))
+            if base == "arc4.StaticArray" and len(args) == 2:
+                return AbiType("array", text, _literal_int(args[1]), (self.read(args[0]),))
+            if base in ("arc4.Tuple", "tuple"):
+                return AbiType("tuple", text, items=tuple(self.read(a) for a in args))
+            if base in ("arc4.UIntN", "arc4.BigUIntN"):
+                return AbiType("uint", text, _literal_int(args[0]))
+            return AbiType("unknown", text)
+        if name in _NATIVE_UINTS:
+            return AbiType("uint", text, _NATIVE_UINTS[name])
+        if name.startswith(("arc4.UInt", "arc4.BigUInt")) and name.rsplit("UInt", 1)[1].isdigit():
+            return AbiType("uint", text, int(name.rsplit("UInt", 1)[1]))
+        if name == "arc4.Byte":
+            return AbiType("uint", text, 8)
+        if name in ("bool", "arc4.Bool"):
+            return AbiType("bool", text)
+        if name in ("Account", "arc4.Address"):
+            return AbiType("account", text)
+        if name in ("Bytes", "arc4.DynamicBytes"):
+            return AbiType("bytes", text)
+        if name in ("String", "arc4.String"):
+            return AbiType("string", text)
+        if name in ("Asset", "Application"):
+            return AbiType(name.lower(), text)
+        if name in _GROUP_TRANSACTIONS:
+            return AbiType(_GROUP_TRANSACTIONS[name], text)
+        return AbiType("unknown", text)
+
+
+def read_abi(path: Path) -> list[ContractAbi]:
+    """ABI of every ``ARC4Contract`` class declared in a dataset file."""
+    module = ast.parse(path.read_text(encoding="utf-8"))
+    types = TypeReader(module)
+    contracts = []
+    for node in module.body:
+        if not isinstance(node, ast.ClassDef) or not any(ast.unparse(b).endswith("ARC4Contract") for b in node.bases):
+            continue
+        methods = []
+        for item in node.body:
+            if not isinstance(item, ast.FunctionDef):
+                continue
+            decorator = next((d for d in item.decorator_list if "abimethod" in ast.unparse(d)), None)
+            if decorator is None:
+                continue
+            options = {k.arg: k.value for k in decorator.keywords} if isinstance(decorator, ast.Call) else {}
+            create = options.get("create")
+            readonly = options.get("readonly")
+            methods.append(AbiMethod(
+                item.name,
+                tuple((a.arg, types.read(a.annotation) if a.annotation else AbiType("unknown", ""))
+                      for a in item.args.args[1:]),
+                create.value if isinstance(create, ast.Constant) else None,
+                isinstance(readonly, ast.Constant) and readonly.value is True,
+            ))
+        contracts.append(ContractAbi(path.stem, node.name, tuple(methods)))
+    return contracts
+
+
+def dataset_abis() -> list[ContractAbi]:
+    return [abi for path in algorand_contracts() for abi in read_abi(path)]
+
+
+def source_integers(path: Path) -> list[int]:
+    """Integer literals of a contract, used as a dictionary of interesting values."""
+    return sorted({node.value for node in ast.walk(ast.parse(path.read_text(encoding="utf-8")))
+                   if isinstance(node, ast.Constant) and type(node.value) is int and node.value >= 0})
+
+
+# ---- generation --------------------------------------------------------------
+
+
+@dataclass
+class Call:
+    method: str
+    sender: int = 0
+    #: Seconds the block time moves forward before the call
+    advance: int = 0
+    #: Arguments by parameter name: ints, bools, strings, hex strings for bytes,
+    #: lists for arrays/structs/tuples, actor/asset indexes, ``{"amount", "to_app"}`` for transactions
+    args: dict = field(default_factory=dict)
+
+
+class Generator:
+    """Random calls for one contract."""
+
+    def __init__(self, abi: ContractAbi, rng: random.Random, integers: list[int] = (), actors: int = ACTORS) -> None:
+        self.abi = abi
+        self.rng = rng
+        self.integers = list(integers)
+        self.actors = actors
+
+    def uint(self, bits: int | None) -> int:
+        top = 2 ** (bits or 64) - 1
+        rng = self.rng
+        choice = rng.random()
+        if choice < 0.2:
+            return rng.choice([0, 1, 2, top])
+        if choice < 0.45 and self.integers:
+            value = rng.choice(self.integers)
+            return min(top, max(0, value + rng.choice([-1, 0, 0, 1])))
+        if choice < 0.8:
+            return min(top, rng.randint(0, 1000))
+        return rng.randint(0, min(top, 10**7))
+
+    def value(self, t: AbiType) -> object:
+        rng = self.rng
+        if t.kind == "uint":
+            return self.uint(t.size)
+        if t.kind == "bool":
+            return rng.random() < 0.5
+        if t.kind == "account":
+            return rng.randrange(self.actors)
+        if t.kind == "asset":
+            return rng.randrange(ASSETS)
+        if t.kind == "application":
+            return 0
+        if t.kind == "bytes":
+            return rng.randbytes(rng.choice([0, 1, 8, 32, 64])).hex()
+        if t.kind == "string":
+            return rng.choice(["", "a", "fuzz", "x" * 64])
+        if t.kind == "array":
+            length = t.size if t.size is not None else rng.choice([0, 1, 2, 3, 8])
+            return [self.value(t.items[0]) for _ in range(length)]
+        if t.kind in ("struct", "tuple"):
+            return [self.value(item) for item in t.items]
+        if t.kind in ("pay", "axfer"):
+            return {"amount": self.uint(64), "to_app": rng.random() < 0.9,
+                    **({"asset": rng.randrange(ASSETS)} if t.kind == "axfer" else {})}
+        raise ValueError(f"cannot generate {t.annotation}")
+
+    def call(self, method: AbiMethod, sender: int | None = None) -> Call:
+        rng = self.rng
+        if sender is None:
+            sender = 0 if rng.random() < 0.3 else rng.randrange(self.actors)
+        return Call(method.name, sender, rng.choice([0, 0, 1, 60, 3600, 86400]),
+                    {name: self.value(t) for name, t in method.parameters})
+
+    def sequence(self, length: int) -> list[Call]:
+        calls = []
+        create = self.abi.create
+        if create is not None:
+            calls.append(self.call(create, sender=0))
+        methods = self.abi.callable
+        while methods and len(calls) < length:
+            calls.append(self.call(self.rng.choice(methods)))
+        return calls
+
+
+# ---- invariants --------------------------------------------------------------
+
+
+def load_invariants(paths: list[Path] = ()) -> None:
+    """Load user files declaring more invariants; the dataset's are in ``tools.invariants``."""
+    for path in paths:
+        spec = importlib.util.spec_from_file_location(f"fuzz_invariants.{path.stem}", path)
+        assert spec is not None and spec.loader is not None
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+
+# ---- emulation ---------------------------------------------------------------
+
+
+def encode_address(public_key: bytes) -> str:
+    """Algorand address of a 32-byte public key."""
+    checksum = hashlib.new("sha512_256", public_key).digest()[-4:]
+    return base64.b32encode(public_key + checksum).decode().rstrip("=")
+
+
+def decode_address(address: str) -> bytes:
+    """The 32-byte public key of an Algorand address."""
+    try:
+        raw = base64.b32decode(address + "=" * (-len(address) % 8))
+    except ValueError:
+        raw = b""
+    if len(raw) != 36 or hashlib.new("sha512_256", raw[:32]).digest()[-4:] != raw[32:]:
+        raise ValueError(f"not an Algorand address: {address!r}")
+    return raw[:32]
+
+
+def rejection(exc: Exception) -> str:
+    """How a call failing with ``exc`` is reported: the exception type and first line."""
+    return f"{type(exc).__name__}: {str(exc).splitlines()[0] if str(exc) else ''}".rstrip(": ")
+
+
+def actor_address(index: int) -> str:
+    """Address of actor ``index``, the same in every emulation so keys built from it are too."""
+    return encode_address(hashlib.sha256(f"tools.fuzz actor {index}".encode()).digest())
+
+
+class Emulation:
+    """One contract instance in a fresh emulator, and what the accepted calls did.
+
+    Invariants read the contract through ``contract`` and the bookkeeping
+    here: ``paid_in`` and ``paid_out`` are the microAlgos moved into the app by
+    grouped payments and out of it by inner payments. Actors have fixed
+    addresses (:func:`actor_address`), so a sequence replayed in another
+    emulation touches the same boxes.
+    """
+
+    def __init__(self, abi: ContractAbi, actors: int = ACTORS) -> None:
+        try:
+            from algopy_testing import algopy_testing_context
+        except ImportError as exc:
+            raise RuntimeError("algorand-python-testing is not installed (pip install algorand-python-testing)") \
+                from exc
+        self.abi = abi
+        self._methods = {m.name: m for m in abi.methods}
+        self._stack = contextlib.ExitStack()
+        self.ctx = self._stack.enter_context(algopy_testing_context(default_sender=actor_address(0)))
+        self.module = load_contract_module(abi.stem)
+        self.timestamp = START_TIMESTAMP
+        self.ctx.ledger.patch_global_fields(latest_timestamp=self.timestamp)
+        self.accounts = [self.ctx.default_sender,
+                         *(self.ctx.any.account(address=actor_address(index)) for index in range(1, actors))]
+        self.assets = [self.ctx.any.asset(total=10**12) for _ in range(ASSETS)]
+        self.contract = getattr(self.module, abi.name)()
+        self.app = self.ctx.ledger.get_app(self.contract)
+        self.calls: list[Call] = []
+        self.paid_in = 0
+        self.paid_out = 0
+
+    def close(self) -> None:
+        self._stack.close()
+
+    def accepted(self, method: str) -> list[Call]:
+        return [call for call in self.calls if call.method == method]
+
+    def box_total(self, box_map: object, keys: list | None = None) -> int:
+        """Sum of a ``BoxMap``'s integer values over ``keys`` (default: every actor)."""
+        total = 0
+        for key in self.accounts if keys is None else keys:
+            value, exists = box_map.maybe(key)
+            total += int(value) if exists else 0
+        return total
+
+    def build(self, t: AbiType, value: object, sender: int) -> object:
+        from algopy import UInt64
+
+        if t.kind in ("pay", "axfer"):
+            receiver = self.app.address if value["to_app"] else self.accounts[(sender + 1) % len(self.accounts)]
+            if t.kind == "pay":
+                return self.ctx.any.txn.payment(sender=self.accounts[sender], receiver=receiver,
+                                                amount=UInt64(value["amount"]))
+            return self.ctx.any.txn.asset_transfer(sender=self.accounts[sender], asset_receiver=receiver,
+                                                   xfer_asset=self.assets[value["asset"]],
+                                                   asset_amount=UInt64(value["amount"]))
+        if t.kind == "account":
+            cls = self._type(t)
+            return cls(self.accounts[value]) if cls.__name__ == "Address" else self.accounts[value]
+        if t.kind == "asset":
+            return self.assets[value]
+        if t.kind == "application":
+            return self.app
+        if t.kind == "array":
+            return self._type(t)(*(self.build(t.items[0], item, sender) for item in value))
+        if t.kind == "struct":
+            return self._type(t)(**{name: self.build(item, v, sender)
+                                    for name, item, v in zip(t.names, t.items, value)})
+        if t.kind == "tuple":
+            return self._type(t)(tuple(self.build(item, v, sender) for item, v in zip(t.items, value)))
+        if t.kind == "bytes":
+            value = bytes.fromhex(value)
+        cls = self._type(t)
+        return value if cls in (bool, int) else cls(value)
+
+    def _type(self, t: AbiType) -> type:
+        return eval(t.annotation, vars(self.module))  # noqa: S307 - annotations of the dataset's own code
+
+    def apply(self, call: Call) -> str | None:
+        """Run one call; the reason it was rejected, or None once it is accepted."""
+        try:
+            arguments = self.prepare(call)
+        except Exception as exc:  # noqa: BLE001 - any failure rejects the transaction
+            return rejection(exc)
+        return self.invoke(call, arguments)
+
+    def prepare(self, call: Call) -> list[object]:
+        """Move the block time on for ``call`` and build its arguments, grouped transactions included."""
+        self.timestamp += call.advance
+        self.ctx.ledger.patch_global_fields(latest_timestamp=self.timestamp)
+        return [self.build(t, call.args[name], call.sender) for name, t in self._methods[call.method].parameters]
+
+    def invoke(self, call: Call, arguments: list[object]) -> str | None:
+        """Run a call :meth:`prepare` built the ``arguments`` of; the reason it was rejected, or None."""
+        method = self._methods[call.method]
+        try:
+            with self.ctx.txn.create_group(active_txn_overrides={"sender": self.accounts[call.sender]}):
+                getattr(self.contract, call.method)(*arguments)
+        except Exception as exc:  # noqa: BLE001 - any failure rejects the transaction
+            return rejection(exc)
+        self.calls.append(call)
+        for name, t in method.parameters:
+            if t.kind == "pay" and call.args[name]["to_app"]:
+                self.paid_in += call.args[name]["amount"]
+        for group in self.ctx.txn.last_group.itxn_groups:
+            for itxn in group:
+                with contextlib.suppress(AttributeError, TypeError, ValueError):
+                    if getattr(itxn, "sender", self.app.address) == self.app.address and hasattr(itxn, "receiver"):
+                        self.paid_out += int(itxn.amount)
+        return None
+
+    def restart(self) -> Emulation:
+        """A new emulation that ran only the accepted calls, this one closed.
+
+        The emulator keeps what a rejected call wrote before it failed; this
+        is how a rejection is rolled back.
+        """
+        fresh = Emulation(self.abi, len(self.accounts))
+        for call in self.calls:
+            fresh.apply(call)
+        fresh.timestamp = self.timestamp
+        self.close()
+        return fresh
+
+    def violations(self) -> list[tuple[str, str]]:
+        """(invariant, message) of every declared invariant that does not hold."""
+        broken = []
+        for inv in INVARIANTS.get(self.abi.key, []):
+            try:
+                result = inv.check(self)
+            except Exception as exc:  # noqa: BLE001 - a crashing invariant counts as broken
+                result = f"raised {type(exc).__name__}: {exc}"
+            if result is False or isinstance(result, str):
+                broken.append((inv.name, result if isinstance(result, str) else f"{inv.name} does not hold"))
+        return broken
+
+
+@dataclass
+class Outcome:
+    accepted: int = 0
+    rejected: int = 0
+    #: Index of the call after which ``invariant`` broke
+    failed_at: int | None = None
+    invariant: str | None = None
+    message: str | None = None
+    #: Per call: None if accepted, else why it was rejected
+    results: list[str | None] = field(default_factory=list)
+
+
+def execute(abi: ContractAbi, calls: list[Call], actors: int = ACTORS) -> Outcome:
+    """Run a sequence; rejected calls are rolled back by replaying the accepted ones."""
+    outcome = Outcome()
+    run = Emulation(abi, actors)
+    try:
+        for index, call in enumerate(calls):
+            reason = run.apply(call)
+            outcome.results.append(reason)
+            if reason is not None:
+                outcome.rejected += 1
+                if index == 0 and abi.create is not None:
+                    break  # never created: nothing else can run
+                run = run.restart()
+                continue
+            outcome.accepted += 1
+            broken = run.violations()
+            if broken:
+                outcome.failed_at = index
+                outcome.invariant, outcome.message = broken[0]
+                break
+    finally:
+        run.close()
+    return outcome
+
+
+# ---- shrinking ---------------------------------------------------------------
+
+
+def _simpler(value: object) -> list[object]:
+    """Candidate replacements for an argument value, simplest first."""
+    if isinstance(value, bool):
+        return [False] if value else []
+    if isinstance(value, int):
+        return [v for v in dict.fromkeys([0, 1, value // 2, value - 1]) if 0 <= v < value]
+    if isinstance(value, str):
+        return [v for v in ("", value[: len(value) // 2]) if len(v) < len(value)]
+    if isinstance(value, list):
+        candidates = [value[:i] + value[i + 1 :] for i in range(len(value))]
+        for i, item in enumerate(value):
+            candidates.extend(value[:i] + [simpler] + value[i + 1 :] for simpler in _simpler(item))
+        return candidates
+    if isinstance(value, dict):
+        return [{**value, key: simpler} for key in value for simpler in _simpler(value[key])]
+    return []
+
+
+def shrink(abi: ContractAbi, calls: list[Call], invariant_name: str, actors: int = ACTORS,
+           budget: int = SHRINK_BUDGET) -> list[Call]:
+    """The smallest sequence found that still breaks ``invariant_name``."""
+    runs = 0
+
+    def fails(candidate: list[Call]) -> bool:
+        nonlocal runs
+        runs += 1
+        return execute(abi, candidate, actors).invariant == invariant_name
+
+    outcome = execute(abi, calls, actors)
+    calls = calls[: outcome.failed_at + 1]
+    fixed = 1 if abi.create is not None else 0
+    progress = True
+    while progress and runs < budget:
+        progress = False
+        # drop chunks of calls, halving the chunk size down to single calls
+        chunk = max(1, (len(calls) - fixed) // 2)
+        while chunk >= 1 and runs < budget:
+            start = fixed
+            while start < len(calls) and runs < budget:
+                candidate = calls[:start] + calls[start + chunk :]
+                if len(candidate) < len(calls) and fails(candidate):
+                    calls, progress = candidate, True
+                else:
+                    start += chunk
+            chunk //= 2
+        # then simplify senders, time steps and arguments, one value at a time
+        for index in range(len(calls)):
+            improved = True
+            while improved and runs < budget:
+                improved = False
+                for option in _simpler_calls(calls[index]):
+                    if runs >= budget:
+                        break
+                    if fails(calls[:index] + [option] + calls[index + 1 :]):
+                        calls[index] = option
+                        improved = progress = True
+                        break
+    return calls
+
+
+def _simpler_calls(call: Call) -> list[Call]:
+    options = [Call(call.method, 0, call.advance, call.args)] if call.sender else []
+    options += [Call(call.method, call.sender, 0, call.args)] if call.advance else []
+    options += [Call(call.method, call.sender, call.advance, {**call.args, name: simpler})
+                for name, value in call.args.items() for simpler in _simpler(value)]
+    return options
+
+
+# ---- runs --------------------------------------------------------------------
+
+
+@dataclass
+class Failure:
+    contract: str
+    invariant: str
+    message: str
+    #: Length of the sequence as generated, before shrinking
+    original_length: int
+    calls: list[Call]
+
+
+@dataclass
+class ContractReport:
+    contract: str
+    sequences: int = 0
+    calls: int = 0
+    #: Calls per method
+    accepted: dict[str, int] = field(default_factory=dict)
+    rejected: dict[str, int] = field(default_factory=dict)
+    #: Methods left out because a parameter type cannot be generated
+    unsupported: list[str] = field(default_factory=list)
+    invariants: int = 0
+    failures: list[Failure] = field(default_factory=list)
+    elapsed_s: float = 0.0
+    error: str | None = None
+
+    def merge(self, other: ContractReport) -> None:
+        self.sequences += other.sequences
+        self.calls += other.calls
+        for method, count in other.accepted.items():
+            self.accepted[method] = self.accepted.get(method, 0) + count
+        for method, count in other.rejected.items():
+            self.rejected[method] = self.rejected.get(method, 0) + count
+        self.elapsed_s += other.elapsed_s
+        self.error = self.error or other.error
+        for failure in other.failures:
+            known = next((f for f in self.failures if f.invariant == failure.invariant), None)
+            if known is None:
+                self.failures.append(failure)
+            elif len(failure.calls) < len(known.calls):
+                self.failures[self.failures.index(known)] = failure
+
+
+@dataclass(frozen=True)
+class FuzzJob:
+    abi: ContractAbi
+    seed: int
+    sequences: int
+    length: int
+    actors: int = ACTORS
+    invariant_files: tuple[Path, ...] = ()
+
+
+def fuzz(job: FuzzJob) -> ContractReport:
+    """Run ``job.sequences`` random sequences; each broken invariant is shrunk once."""
+    load_invariants(list(job.invariant_files))
+    abi = job.abi
+    report = ContractReport(abi.key, invariants=len(INVARIANTS.get(abi.key, [])),
+                            unsupported=[m.name for m in abi.methods if not m.supported])
+    rng = random.Random(f"{job.seed}:{abi.key}")
+    generator = Generator(abi, rng, source_integers(ALGORAND_DIR / f"{abi.stem}.py"), job.actors)
+    started = time.perf_counter()
+    try:
+        for _ in range(job.sequences):
+            calls = generator.sequence(job.length)
+            outcome = execute(abi, calls, job.actors)
+            report.sequences += 1
+            report.calls += len(outcome.results)
+            for call, reason in zip(calls, outcome.results):
+                counts = report.accepted if reason is None else report.rejected
+                counts[call.method] = counts.get(call.method, 0) + 1
+            if outcome.invariant is not None and all(f.invariant != outcome.invariant for f in report.failures):
+                shrunk = shrink(abi, calls, outcome.invariant, job.actors)
+                report.failures.append(Failure(abi.key, outcome.invariant, outcome.message or "",
+                                               outcome.failed_at + 1, shrunk))
+    except RuntimeError as exc:
+        report.error = str(exc)
+    report.elapsed_s = time.perf_counter() - started
+    return report
+
+
+def _failure_from_json(data: dict) -> Failure:
+    return Failure(data["contract"], data["invariant"], data.get("message", ""), data.get("original_length", 0),
+                   [Call(**call) for call in data["calls"]])
+
+
+def replay(path: Path, invariant_files: list[Path] = ()) -> int:
+    """Run a saved failing sequence and print what every call did."""
+    load_invariants(list(invariant_files))
+    failure = _failure_from_json(json.loads(path.read_text(encoding="utf-8")))
+    abi = next(a for a in dataset_abis() if a.key == failure.contract)
+    outcome = execute(abi, failure.calls)
+    for index, (call, reason) in enumerate(zip(failure.calls, outcome.results)):
+        print(f"{index:>3} actor {call.sender} +{call.advance}s {call.method}({json.dumps(call.args)}): "
+              f"{'ok' if reason is None else reason}")
+    if outcome.invariant is None:
+        print("no invariant broken")
+        return 0
+    print(f"broken after call {outcome.failed_at}: {outcome.invariant}: {outcome.message}")
+    return 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", action="append", help="file stems or stem.Class to fuzz (default: all)")
+    parser.add_argument("--sequences", type=int, default=200, help="sequences per contract")
+    parser.add_argument("--length", type=int, default=25, help="calls per sequence")
+    parser.add_argument("--actors", type=int, default=ACTORS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--invariants", type=Path, action="append", default=[], help="extra file of @invariant")
+    parser.add_argument("--out", type=Path, default=Path("fuzz-failures"), help="where shrunk failures are written")
+    parser.add_argument("--replay", type=Path, help="run a saved failure instead of fuzzing")
+    parser.add_argument("--list", action="store_true", help="print the ABI read from each contract and exit")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    if args.replay is not None:
+        return replay(args.replay, args.invariants)
+    load_invariants(args.invariants)
+    abis = [abi for abi in dataset_abis()
+            if not args.contracts or abi.stem in args.contracts or abi.key in args.contracts]
+    if args.list:
+        for abi in abis:
+            print(f"{abi.key}  ({len(INVARIANTS.get(abi.key, []))} invariants)")
+            for m in abi.methods:
+                params = ", ".join(f"{name}: {t.annotation}" for name, t in m.parameters)
+                flags = "".join([f" create={m.create}" if m.create else "", " readonly" if m.readonly else "",
+                                 "" if m.supported else " (unsupported)"])
+                print(f"    {m.name}({params}){flags}")
+        return 0
+
+    # split every contract's sequences into chunks so the pool stays busy
+    workers = args.jobs or os.cpu_count() or 1
+    chunks = max(1, min(args.sequences, workers * 4 // max(1, len(abis)) or 1))
+    jobs = [FuzzJob(abi, args.seed * 1000 + chunk, args.sequences // chunks + (chunk < args.sequences % chunks),
+                    args.length, args.actors, tuple(args.invariants))
+            for abi in abis for chunk in range(chunks)]
+    started = time.perf_counter()
+    reports: dict[str, ContractReport] = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for report in pool.map(fuzz, jobs):
+            if report.contract in reports:
+                reports[report.contract].merge(report)
+            else:
+                reports[report.contract] = report
+    elapsed = time.perf_counter() - started
+
+    failures = [failure for report in reports.values() for failure in report.failures]
+    if failures:
+        args.out.mkdir(parents=True, exist_ok=True)
+        for failure in failures:
+            path = args.out / f"{failure.contract}.{failure.invariant}.json"
+            path.write_text(json.dumps(asdict(failure), indent=1) + "\n", encoding="utf-8")
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports.values()], indent=2))
+    else:
+        print(f"{'contract':<34}{'seqs':>6}{'calls':>8}{'accepted':>10}{'invariants':>12}  result")
+        for r in reports.values():
+            accepted = sum(r.accepted.values())
+            result = f"error: {r.error}" if r.error else f"{len(r.failures)} broken" if r.failures else "ok"
+            print(f"{r.contract:<34}{r.sequences:>6}{r.calls:>8}{accepted:>10}{r.invariants:>12}  {result}")
+            never = sorted({m.name for m in next(a for a in abis if a.key == r.contract).callable} - set(r.accepted))
+            if never and not r.error:
+                print(f"    never accepted: {', '.join(never)}")
+            for failure in r.failures:
+                print(f"    {failure.invariant}: {failure.message} "
+                      f"({failure.original_length} calls shrunk to {len(failure.calls)}, "
+                      f"{args.out / f'{failure.contract}.{failure.invariant}.json'})")
+        total = sum(r.calls for r in reports.values())
+        print(f"{total} calls in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} calls/s)")
+    return 1 if failures or any(r.error for r in reports.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
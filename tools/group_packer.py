@@ -0,0 +1,350 @@
+"""Pack a stream of ABI calls into atomic groups and submit them with a bounded window.
+
+Calls are taken in order and packed first-fit into groups of at most
+``MAX_GROUP_SIZE`` transactions, laid out by ``tools.atomic_group``. Each
+call keeps its reference-typed arguments (``account``, ``asset``,
+``application``) in its own transaction. Its other references (accounts,
+assets, apps and box names, with ``""`` for an empty box reference that only
+adds I/O budget, as ``tools.box_refs`` plans them) fill its transaction up to
+``MAX_REFERENCES`` (at most ``MAX_ACCOUNT_REFERENCES`` accounts). Whatever
+does not fit goes to padding app calls, which references shared across the
+group make usable by every call. Padding calls are also added when the calls'
+opcode costs exceed the pooled budget of ``APP_CALL_BUDGET`` per app call. The
+first transaction pays the minimum fee for the whole group, inner transactions
+included, and the others pay nothing.
+
+Groups are submitted as soon as they are full, at most ``--window`` at a time.
+A node error worth retrying (rate limiting, timeouts) is retried with backoff.
+A group the node rejects is split in halves and each half resubmitted, so one
+failing call does not sink the calls packed with it. Groups run
+concurrently, so calls that depend on each other need ``--window 1``.
+
+Calls are JSON lines::
+
+    {"method": "mint(account,uint64)void", "args": ["<address>", 10], "boxes": ["<hex name>"], "cost": 120}
+
+``--stand-in`` submits to the in-process node of ``tools.stand_in_node``,
+which enforces the same limits, with optional latency, transient failures and
+rejected calls. ``--algod`` submits to a real node with ``py-algorand-sdk``,
+signing every transaction with the account of ``SENDER_MNEMONIC``. ``--demo``
+generates ``Coin.mint`` calls to ``--count`` receivers, or
+``ProofOfAttendance.confirm_attendance`` calls from ``--count`` attendees.
+Opcode costs of demo calls, and of calls to ``--contract``, come from the
+``tools.cost_gate`` snapshot; without one the packer stops rather than
+packing with no opcode budget, unless ``--no-costs`` is given.
+
+Usage::
+
+    python -m tools.group_packer --demo mint --count 1000 --stand-in --latency 0.2 --window 8
+    python -m tools.group_packer calls.jsonl --stand-in --failure-rate 0.1 --reject-rate 0.01
+    python -m tools.group_packer calls.jsonl --algod http://localhost:4001 --app-id 1234
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.atomic_group import (MAX_GROUP_SIZE, MIN_FEE, AppCall, Confirmation, Node, NodeError, Transaction,
+                                 check_group, layout)
+from tools.cost_gate import DEFAULT_SNAPSHOT, read_snapshot
+from tools.fuzz import encode_address
+from tools.stand_in_node import StandInNode
+
+_DEMO_FILES = {"mint": ("coinA.py", "Coin"), "attendance": ("AttendenceA.py", "ProofOfAttendance")}
+
+
+# ---- nodes -------------------------------------------------------------------
+
+
+class AlgodNode:
+    """An algod node reached with ``py-algorand-sdk``; every transaction is signed by one account."""
+
+    def __init__(self, url: str, token: str, app_id: int, mnemonic_phrase: str, padding_method: str | None = None,
+                 wait_rounds: int = 4) -> None:
+        try:
+            from algosdk import abi, account, mnemonic
+            from algosdk.atomic_transaction_composer import AccountTransactionSigner
+            from algosdk.v2client.algod import AlgodClient
+        except ImportError as exc:
+            raise RuntimeError("py-algorand-sdk is not installed (pip install py-algorand-sdk)") from exc
+        self.client = AlgodClient(token, url)
+        self.app_id = app_id
+        private_key = mnemonic.to_private_key(mnemonic_phrase)
+        self.address = account.address_from_private_key(private_key)
+        self.signer = AccountTransactionSigner(private_key)
+        self.padding_method = abi.Method.from_signature(padding_method) if padding_method else None
+        self.wait_rounds = wait_rounds
+
+    async def min_fee(self) -> int:
+        params = await asyncio.to_thread(self.client.suggested_params)
+        return params.min_fee
+
+    async def submit(self, transactions: list[Transaction]) -> Confirmation:
+        return await asyncio.to_thread(self._submit, transactions)
+
+    def _submit(self, transactions: list[Transaction]) -> Confirmation:
+        from algosdk import abi
+        from algosdk.atomic_transaction_composer import AtomicTransactionComposer
+        from algosdk.error import AlgodHTTPError
+
+        params = self.client.suggested_params()
+        composer = AtomicTransactionComposer()
+        for index, t in enumerate(transactions):
+            if t.call is None and self.padding_method is None:
+                raise NodeError("the group needs padding calls; pass --padding-method")
+            fee = copy.copy(params)
+            fee.flat_fee, fee.fee = True, t.fee
+            call = t.call
+            composer.add_method_call(
+                app_id=(call.app_id or self.app_id) if call is not None else self.app_id,
+                method=abi.Method.from_signature(call.method) if call is not None else self.padding_method,
+                sender=self.address, sp=fee, signer=self.signer,
+                method_args=call.args if call is not None else [],
+                accounts=t.accounts, foreign_assets=t.assets, foreign_apps=t.apps,
+                boxes=[(0, bytes.fromhex(name)) for name in t.boxes],
+                note=f"group-packer {index}".encode() if call is None else None,
+            )
+        try:
+            result = composer.execute(self.client, self.wait_rounds)
+        except AlgodHTTPError as exc:
+            raise NodeError(str(exc), retryable=exc.code in (408, 429, 500, 502, 503, 504)) from exc
+        except Exception as exc:  # noqa: BLE001 - confirmation timeouts are worth another try
+            raise NodeError(str(exc), retryable="timeout" in str(exc).lower()) from exc
+        return Confirmation(result.tx_ids[0], result.confirmed_round)
+
+
+# ---- packing and sending -----------------------------------------------------
+
+
+@dataclass
+class CallResult:
+    index: int
+    method: str
+    txid: str | None = None
+    round: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class PackReport:
+    calls: int = 0
+    confirmed: int = 0
+    failed: int = 0
+    groups: int = 0
+    transactions: int = 0
+    #: Padding app calls among ``transactions``
+    padding: int = 0
+    fees: int = 0
+    retries: int = 0
+    #: Rejected groups split to isolate the failing calls
+    splits: int = 0
+    max_in_flight: int = 0
+    elapsed_s: float = 0.0
+
+
+class GroupPacker:
+    def __init__(self, node: Node, *, window: int = 4, attempts: int = 5, base_delay: float = 0.5,
+                 seed: int | None = None) -> None:
+        self.node = node
+        self.window = window
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.report = PackReport()
+        self.results: list[CallResult] = []
+        self._rng = random.Random(seed)
+        self._in_flight = 0
+
+    def pack(self, calls: Iterable[AppCall], min_fee: int = MIN_FEE) -> Iterator[list[tuple[int, AppCall]]]:
+        """Groups of (index, call) in order, each yielded as soon as the next call does not fit."""
+        group: list[tuple[int, AppCall]] = []
+        for index, call in enumerate(calls):
+            self.results.append(CallResult(index, call.method))
+            self.report.calls += 1
+            problems = check_group(layout([call], min_fee), min_fee)
+            if problems:
+                self._fail([(index, call)], "cannot be sent: " + "; ".join(problems))
+                continue
+            candidate = [c for _, c in group] + [call]
+            if group and len(layout(candidate, min_fee)) > MAX_GROUP_SIZE:
+                yield group
+                group = []
+            group.append((index, call))
+        if group:
+            yield group
+
+    def _fail(self, group: list[tuple[int, AppCall]], error: str) -> None:
+        for index, _ in group:
+            self.results[index].error = error
+            self.report.failed += 1
+
+    async def send(self, group: list[tuple[int, AppCall]], min_fee: int) -> None:
+        transactions = layout([call for _, call in group], min_fee)
+        for attempt in range(self.attempts):
+            try:
+                confirmation = await self.node.submit(transactions)
+                break
+            except NodeError as exc:
+                if exc.retryable and attempt < self.attempts - 1:
+                    self.report.retries += 1
+                    await asyncio.sleep(self._rng.uniform(0, self.base_delay * 2**attempt))
+                    continue
+                if not exc.retryable and len(group) > 1:
+                    self.report.splits += 1
+                    middle = len(group) // 2
+                    await self.send(group[:middle], min_fee)
+                    await self.send(group[middle:], min_fee)
+                else:
+                    self._fail(group, str(exc))
+                return
+        self.report.groups += 1
+        self.report.transactions += len(transactions)
+        self.report.padding += sum(t.call is None for t in transactions)
+        self.report.fees += sum(t.fee for t in transactions)
+        for index, _ in group:
+            self.results[index].txid, self.results[index].round = confirmation.txid, confirmation.round
+            self.report.confirmed += 1
+
+    async def run(self, calls: Iterable[AppCall]) -> PackReport:
+        started = time.perf_counter()
+        min_fee = await self.node.min_fee()
+        slots = asyncio.Semaphore(self.window)
+
+        async def sent(group: list[tuple[int, AppCall]]) -> None:
+            try:
+                await self.send(group, min_fee)
+            finally:
+                self._in_flight -= 1
+                slots.release()
+
+        tasks = []
+        for group in self.pack(calls, min_fee):
+            await slots.acquire()
+            self._in_flight += 1
+            self.report.max_in_flight = max(self.report.max_in_flight, self._in_flight)
+            tasks.append(asyncio.create_task(sent(group)))
+        await asyncio.gather(*tasks)
+        self.report.elapsed_s = time.perf_counter() - started
+        return self.report
+
+
+# ---- input -------------------------------------------------------------------
+
+
+def read_calls(lines: Iterable[str]) -> Iterator[AppCall]:
+    for line in lines:
+        if line.strip():
+            yield AppCall(**json.loads(line))
+
+
+def demo_calls(kind: str, count: int, seed: int) -> Iterator[AppCall]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        key = rng.randbytes(32)
+        if kind == "mint":
+            # Coin.balances is a BoxMap keyed by the account under its attribute name
+            yield AppCall("mint(account,uint64)void", [encode_address(key), rng.randint(1, 10**6)],
+                          boxes=[(b"balances" + key).hex()])
+        else:
+            # the attendee's box is keyed by their address; confirming mints an asset
+            yield AppCall("confirm_attendance()void", sender=encode_address(key), boxes=[key.hex()], inner=1)
+
+
+def with_costs(calls: Iterable[AppCall], snapshot: Path, file_name: str, contract: str) -> Iterator[AppCall]:
+    """``calls`` with the static cost of their method from a ``tools.cost_gate`` snapshot.
+
+    The snapshot is read before any call is taken, so a missing one fails
+    straight away (RuntimeError) instead of packing without opcode budget.
+    """
+    entry = read_snapshot(snapshot).get(file_name, {})
+    methods = entry.get("contracts", {}).get(contract, {}).get("methods", {})
+
+    def costed() -> Iterator[AppCall]:
+        for call in calls:
+            if not call.cost and call.method in methods:
+                call.cost = methods[call.method]
+            yield call
+
+    return costed()
+
+
+async def _main(args: argparse.Namespace) -> int:
+    if args.demo is not None:
+        file_name, contract = _DEMO_FILES[args.demo]
+        calls = demo_calls(args.demo, args.count, args.seed)
+    else:
+        source = sys.stdin if str(args.calls) == "-" else args.calls.open(encoding="utf-8")
+        calls = read_calls(source)
+        file_name, _, contract = (args.contract or "").partition(":")
+    if file_name and not args.no_costs:
+        try:
+            calls = with_costs(calls, args.costs, file_name, contract)
+        except RuntimeError as exc:
+            print(f"error: {exc} (or pass --no-costs)", file=sys.stderr)
+            return 2
+    if args.algod is not None:
+        try:
+            node: Node = AlgodNode(args.algod, os.environ.get("ALGOD_TOKEN", ""), args.app_id,
+                                   os.environ.get("SENDER_MNEMONIC", ""), args.padding_method)
+        except RuntimeError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 2
+    else:
+        node = StandInNode(latency=args.latency, failure_rate=args.failure_rate, reject_rate=args.reject_rate,
+                           seed=args.seed)
+    packer = GroupPacker(node, window=args.window, seed=args.seed)
+    report = await packer.run(calls)
+    if args.json:
+        print(json.dumps({"report": asdict(report), "calls": [asdict(r) for r in packer.results]}, indent=2))
+    else:
+        print(f"{report.calls} calls in {report.groups} groups ({report.transactions} transactions, "
+              f"{report.padding} padding), fees {report.fees:,} microAlgos")
+        print(f"confirmed {report.confirmed}, failed {report.failed}; {report.retries} retries, "
+              f"{report.splits} splits, at most {report.max_in_flight} groups in flight, {report.elapsed_s:.2f} s")
+        if report.groups:
+            print(f"{report.confirmed / max(report.elapsed_s, 1e-9):.0f} confirmed calls/s, "
+                  f"{report.confirmed / report.groups:.1f} calls per group")
+        for result in packer.results:
+            if result.error is not None:
+                print(f"    call {result.index} {result.method}: {result.error}")
+    return 0 if report.failed == 0 else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("calls", nargs="?", type=Path, help="JSON lines of calls, - for stdin")
+    parser.add_argument("--demo", choices=sorted(_DEMO_FILES), help="generate calls instead of reading them")
+    parser.add_argument("--count", type=int, default=100, help="calls generated by --demo")
+    parser.add_argument("--window", type=int, default=4, help="groups in flight at once")
+    parser.add_argument("--contract", help="FILE:Class the calls go to, for costs from the snapshot")
+    parser.add_argument("--costs", type=Path, default=DEFAULT_SNAPSHOT, help="tools.cost_gate snapshot")
+    parser.add_argument("--no-costs", action="store_true", help="pack without opcode costs from the snapshot")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report and every call's result as JSON")
+    node = parser.add_argument_group("node")
+    node.add_argument("--stand-in", action="store_true", help="submit to the in-process stand-in node (default)")
+    node.add_argument("--latency", type=float, default=0.0, help="stand-in seconds per group")
+    node.add_argument("--failure-rate", type=float, default=0.0, help="stand-in share of groups failing transiently")
+    node.add_argument("--reject-rate", type=float, default=0.0, help="stand-in share of calls rejected")
+    node.add_argument("--algod", help="algod URL (ALGOD_TOKEN, SENDER_MNEMONIC from the environment)")
+    node.add_argument("--app-id", type=int, default=0, help="app called by calls without app_id")
+    node.add_argument("--padding-method", help="no-op ARC4 method signature for padding calls")
+    args = parser.parse_args(argv)
+    if (args.calls is None) == (args.demo is None):
+        parser.error("give a calls file or --demo")
+    if args.algod is not None and args.stand_in:
+        parser.error("--algod and --stand-in exclude each other")
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
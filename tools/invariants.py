@@ -0,0 +1,88 @@
+"""Invariants of the dataset contracts, checked by ``tools.fuzz`` after every accepted call.
+
+Each function takes the :class:`tools.fuzz.Emulation` of a sequence and
+returns whether the property holds, or a message saying how it does not.
+Balances are summed over the fuzzing actors, the only accounts a sequence
+can credit. Files passed to ``fuzz --invariants`` declare more with the same
+decorator.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from tools.fuzz import Emulation
+
+
+@dataclass(frozen=True)
+class Invariant:
+    name: str
+    check: Callable[[Emulation], object]
+
+
+#: Declared invariants by contract, ``"<file stem>.<class name>"``
+INVARIANTS: dict[str, list[Invariant]] = defaultdict(list)
+
+
+def invariant(contract: str) -> Callable[[Callable], Callable]:
+    """Declare ``check(run)`` an invariant of ``contract``, written ``"coinA.Coin"``."""
+
+    def register(check: Callable) -> Callable:
+        INVARIANTS[contract].append(Invariant(check.__name__, check))
+        return check
+
+    return register
+
+
+@invariant("coinA.Coin")
+def supply_is_minted(run: Emulation) -> bool | str:
+    """Coins are only created by ``mint``; ``send`` moves them around."""
+    minted = sum(call.args["amount"] for call in run.accepted("mint"))
+    held = run.box_total(run.contract.balances)
+    return held == minted or f"balances sum to {held}, {minted} minted"
+
+
+@invariant("reentranceA.Reentrance")
+def balances_are_escrowed(run: Emulation) -> bool | str:
+    """Every balance and balance box is backed by a deposit that was not paid out yet."""
+    owed = run.box_total(run.contract.balances)
+    boxes = sum(bool(run.contract.balances.maybe(account)[1]) for account in run.accounts)
+    deposits = boxes * run.module.BALANCE_MIN_BALANCE
+    held = run.paid_in - run.paid_out
+    return owed + deposits == held or f"balances sum to {owed} with {deposits} in box deposits, app holds {held}"
+
+
+@invariant("auctionA.Auction")
+def escrow_matches_bids(run: Emulation) -> bool | str:
+    """The app holds every escrow, the deposits of the boxes still there and the settled winning bid."""
+    contract = run.contract
+    escrowed = run.box_total(contract.escrow)
+    boxes = sum(bool(contract.escrow.maybe(account)[1]) for account in run.accounts)
+    listed = int(contract.bidder_count) - int(contract.refund_cursor)
+    deposits = boxes * run.module.ESCROW_MIN_BALANCE + listed * run.module.BIDDER_MIN_BALANCE
+    proceeds = int(contract.previous_bid) if contract.settled and contract.previous_bidder in run.accounts else 0
+    held = run.paid_in - run.paid_out
+    return escrowed + deposits + proceeds == held or (
+        f"escrow sums to {escrowed} with {deposits} in box deposits and {proceeds} proceeds, app holds {held}")
+
+
+@invariant("auctionA.Auction")
+def winning_bid_is_escrowed(run: Emulation) -> bool | str:
+    """The leading bidder's escrow covers the leading bid until the auction is settled."""
+    contract = run.contract
+    if contract.previous_bidder not in run.accounts or contract.settled:
+        return True
+    escrowed = run.box_total(contract.escrow, [contract.previous_bidder])
+    return escrowed >= int(contract.previous_bid) or f"leading bid {int(contract.previous_bid)}, escrow {escrowed}"
+
+
+@invariant("VotingA.VotingRoundApp")
+def one_vote_per_voter(run: Emulation) -> bool | str:
+    """``voter_count`` counts voters, not answers."""
+    voters = sum(bool(run.contract.votes_by_account.maybe(account)[1]) for account in run.accounts)
+    count = int(run.contract.voter_count)
+    return count == voters or f"voter_count is {count} with {voters} voters"
@@ -0,0 +1,594 @@
+"""Minimum balance (MBR) of the dataset contracts, read from their storage declarations.
+
+Every contract class is scanned for the state it keeps: ``GlobalState`` and
+plain ``self.x = ...`` attributes (global schema, paid by the creator),
+``LocalState`` (local schema, paid by each account that opts in), and
+``Box``, ``BoxMap`` and ``BoxRef`` declared in ``__init__`` or inside methods,
+with their keys, key prefixes and value types (paid by the app account). A
+box whose key is a literal is created once; a ``BoxMap`` entry, or a box keyed
+by an account's bytes, is created once per user; boxes under any other
+computed key are listed but left out of the totals. Only boxes some method
+writes (``[k] = ``, ``.value = ``, ``.create``, ``.put``, ``op.Box.put``) are
+counted, and a write is taken to create the box, except a decrement
+(``= x - y`` or an augmented assignment, which reads the box first) and a
+``del``, which only touch a box that exists. Values of dynamic size
+(``Bytes``, ``String``, dynamic arrays, a ``BoxRef`` of computed size) are
+assumed to be ``--dynamic-size`` bytes and the figures marked ``~``.
+
+From this the report gives the creator's MBR, the app account's fixed MBR
+(its own 100,000 microAlgos and the boxes with literal keys), the growth per
+user and the app account's total for ``--users`` users; the local state MBR
+those users hold in their own accounts is reported on its own. Per ABI method, with the
+subroutines it calls, it lists the MBR the call can add (boxes, and assets
+the app opts into or creates), next to the payment amount the method itself
+asserts, if any (``VotingA.py`` sums the constants by hand). ``--constants``
+prints the payment each method asserts as an Algorand Python constant to
+paste into a contract, when it evaluates to a number from literals, module
+constants and local constants; a payment that depends on state or arguments
+is marked as not derivable.
+
+Usage::
+
+    python -m tools.mbr                                    # every dataset contract, 1000 users
+    python -m tools.mbr "Algorand Python Dataset/VotingA.py" --users 10000 --constants
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import algorand_contracts
+from tools.fuzz import AbiType, TypeReader
+
+#: Minimum balance of any account, and per asset it holds or created
+ACCOUNT_MIN_BALANCE = 100_000
+ASSET_MIN_BALANCE = 100_000
+#: Per box, and per byte of its key and value
+BOX_FLAT_MIN_BALANCE = 2_500
+BOX_BYTE_MIN_BALANCE = 400
+#: Paid by the creator per program page (no extra pages assumed)
+APP_PAGE_MIN_BALANCE = 100_000
+#: Per state schema entry, plus the value part for integers or byte slices
+SCHEMA_MIN_BALANCE = 25_000
+SCHEMA_UINT_MIN_BALANCE = 3_500
+SCHEMA_BYTES_MIN_BALANCE = 25_000
+#: Size assumed for values and keys whose size is only known at run time
+DEFAULT_DYNAMIC_SIZE = 32
+
+_UINT_TYPES = {"UInt64", "bool", "Asset", "Application"}
+_UINT_ATTRIBUTES = {"latest_timestamp", "round", "id", "amount", "asset_amount", "length"}
+BOX_KINDS = ("Box", "BoxMap", "BoxRef")
+BOX_WRITES = {"create", "put", "resize"}
+_PROGRAMS = {"approval_program", "clear_state_program"}
+
+
+@dataclass
+class StateEntry:
+    name: str
+    #: ``uint`` or ``bytes`` in the schema
+    schema: str
+    #: The value type could not be told from the code; counted as bytes
+    guessed: bool = False
+
+
+@dataclass
+class BoxSpec:
+    """A box, or the family of boxes of a ``BoxMap`` or of a key computed per user."""
+
+    name: str
+    kind: str
+    key: str
+    key_size: int | None
+    value_size: int | None
+    #: ``once`` for a literal key, ``per user`` for map entries and account keys, ``computed`` otherwise
+    scaling: str
+    #: ABI methods writing it, directly or through a subroutine
+    writers: list[str] = field(default_factory=list)
+    #: Value type as written, without the ``algopy.`` prefix
+    value_type: str | None = None
+
+    def min_balance(self, dynamic_size: int = DEFAULT_DYNAMIC_SIZE) -> int:
+        size = (self.key_size if self.key_size is not None else dynamic_size) + (
+            self.value_size if self.value_size is not None else dynamic_size)
+        return BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * size
+
+    @property
+    def exact(self) -> bool:
+        return self.key_size is not None and self.value_size is not None
+
+
+@dataclass
+class MethodFunding:
+    name: str
+    #: Keys of the boxes the call writes
+    boxes: list[str] = field(default_factory=list)
+    #: Assets the app opts into or creates in the call
+    assets: int = 0
+    #: ``<txn>.amount == <expr>`` (or ``>=``) asserted by the method, as written
+    expected: str | None = None
+    #: ``expected`` evaluated, when it only uses literals and module constants
+    expected_value: int | None = None
+
+
+@dataclass
+class StorageLayout:
+    path: str
+    contract: str
+    global_state: list[StateEntry] = field(default_factory=list)
+    local_state: list[StateEntry] = field(default_factory=list)
+    boxes: list[BoxSpec] = field(default_factory=list)
+    methods: list[MethodFunding] = field(default_factory=list)
+
+    def schema(self, entries: list[StateEntry]) -> tuple[int, int]:
+        uints = sum(entry.schema == "uint" for entry in entries)
+        return uints, len(entries) - uints
+
+    @property
+    def creator_min_balance(self) -> int:
+        """What creating the app adds to the creator's MBR."""
+        uints, slices = self.schema(self.global_state)
+        return (APP_PAGE_MIN_BALANCE + uints * (SCHEMA_MIN_BALANCE + SCHEMA_UINT_MIN_BALANCE)
+                + slices * (SCHEMA_MIN_BALANCE + SCHEMA_BYTES_MIN_BALANCE))
+
+    @property
+    def opt_in_min_balance(self) -> int:
+        """What opting in adds to a user's MBR; zero without local state."""
+        uints, slices = self.schema(self.local_state)
+        return uints * (SCHEMA_MIN_BALANCE + SCHEMA_UINT_MIN_BALANCE) + slices * (
+            SCHEMA_MIN_BALANCE + SCHEMA_BYTES_MIN_BALANCE)
+
+    def box(self, key: str) -> BoxSpec:
+        return next(box for box in self.boxes if box.key == key)
+
+    def method_min_balance(self, method: MethodFunding, dynamic_size: int = DEFAULT_DYNAMIC_SIZE) -> int:
+        """MBR a call can add to the app account, every box it writes counted as new."""
+        return method.assets * ASSET_MIN_BALANCE + sum(self.box(name).min_balance(dynamic_size)
+                                                       for name in method.boxes)
+
+    def app_min_balance(self, dynamic_size: int = DEFAULT_DYNAMIC_SIZE) -> int:
+        """The app account's MBR before any user: its own and the boxes with literal keys."""
+        return ACCOUNT_MIN_BALANCE + sum(
+            box.min_balance(dynamic_size) for box in self.boxes if box.writers and box.scaling == "once")
+
+    def per_user_min_balance(self, dynamic_size: int = DEFAULT_DYNAMIC_SIZE) -> int:
+        """Growth of the app account's MBR per user; the user's own opt-in is separate."""
+        return sum(box.min_balance(dynamic_size) for box in self.boxes if box.writers and box.scaling == "per user")
+
+    @property
+    def exact(self) -> bool:
+        return all(box.exact for box in self.boxes if box.writers) and not any(
+            entry.guessed for entry in self.global_state + self.local_state)
+
+
+# ---- reading -----------------------------------------------------------------
+
+
+def call_name(node: ast.AST) -> str | None:
+    if isinstance(node, ast.Call):
+        return ast.unparse(node.func).split(".")[-1]
+    return None
+
+
+def _constants(module: ast.Module) -> dict[str, int]:
+    constants: dict[str, int] = {}
+    for node in module.body:
+        target = node.targets[0] if isinstance(node, ast.Assign) and len(node.targets) == 1 else getattr(
+            node, "target", None)
+        value = getattr(node, "value", None)
+        if isinstance(target, ast.Name) and value is not None and (number := evaluate(value, constants)) is not None:
+            constants[target.id] = number
+    return constants
+
+
+def module_constants(path: Path) -> dict[str, int]:
+    """Integer constants declared at module level in ``path``, evaluated without importing it."""
+    return _constants(ast.parse(path.read_text(encoding="utf-8")))
+
+
+def evaluate(node: ast.expr, constants: dict[str, int]) -> int | None:
+    """Value of an integer expression over literals and ``constants``, or None."""
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node.value
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    if isinstance(node, ast.Call) and call_name(node) == "UInt64" and len(node.args) == 1:
+        return evaluate(node.args[0], constants)
+    if isinstance(node, ast.BinOp):
+        left, right = evaluate(node.left, constants), evaluate(node.right, constants)
+        if left is None or right is None:
+            return None
+        operations = {ast.Add: int.__add__, ast.Sub: int.__sub__, ast.Mult: int.__mul__, ast.FloorDiv: int.__floordiv__}
+        operation = operations.get(type(node.op))
+        return operation(left, right) if operation is not None and (right or not isinstance(node.op, ast.FloorDiv)) \
+            else None
+    return None
+
+
+def fixed_size(t: AbiType) -> int | None:
+    """Encoded size of a stored value, None when it is dynamic."""
+    name = t.annotation.removeprefix("algopy.")
+    if t.kind == "uint":
+        return 64 if name == "BigUInt" else (t.size or 64) // 8
+    if t.kind == "bool":
+        return 8 if name == "bool" else 1
+    if t.kind == "account":
+        return 32
+    if t.kind in ("asset", "application"):
+        return 8
+    if t.kind == "array" and t.size is not None:
+        item = fixed_size(t.items[0])
+        return None if item is None else item * t.size
+    if t.kind in ("struct", "tuple"):
+        sizes = [fixed_size(item) for item in t.items]
+        return None if None in sizes else sum(sizes)
+    return None
+
+
+def is_entry_method(function: ast.FunctionDef) -> bool:
+    """An ABI or bare method, or a program method of a plain ``Contract``."""
+    decorators = [ast.unparse(d) for d in function.decorator_list]
+    return any("abimethod" in d or "baremethod" in d for d in decorators) or function.name in _PROGRAMS
+
+
+def literal_bytes(node: ast.expr | None) -> bytes | None:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (bytes, str)):
+        return node.value if isinstance(node.value, bytes) else node.value.encode()
+    if isinstance(node, ast.Call) and call_name(node) in ("Bytes", "String"):
+        return literal_bytes(node.args[0]) if node.args else b""
+    return None
+
+
+def _key_scaling(text: str) -> str:
+    return "per user" if text.endswith(".bytes") or "sender" in text else "computed"
+
+
+class ClassReader:
+    """Storage declarations of one contract class, and the boxes each entry method writes."""
+
+    def __init__(self, path: Path, module: ast.Module, node: ast.ClassDef) -> None:
+        self.types = TypeReader(module)
+        self.constants = _constants(module)
+        self.layout = StorageLayout(str(path), node.name)
+        self.node = node
+        #: Storage attribute -> box name, per method local name -> box name
+        self.attributes: dict[str, str] = {}
+        self.parameters: dict[str, ast.expr] = {}
+
+    def read(self) -> StorageLayout:
+        functions = [item for item in self.node.body if isinstance(item, ast.FunctionDef)]
+        init = next((f for f in functions if f.name == "__init__"), None)
+        if init is not None:
+            for statement in ast.walk(init):
+                if isinstance(statement, ast.Assign):
+                    for target in statement.targets:
+                        if (name := self_attribute(target)) is not None:
+                            self.declare(name, statement.value)
+        declared = {entry.name for entry in self.layout.global_state + self.layout.local_state} | set(self.attributes)
+        effects: dict[str, tuple[MethodFunding, set[str]]] = {}
+        for function in functions:
+            if function.name == "__init__":
+                continue
+            self.parameters = {a.arg: a.annotation for a in function.args.args if a.annotation is not None}
+            for statement in ast.walk(function):
+                # state assigned outside __init__ is global state too
+                targets = statement.targets if isinstance(statement, ast.Assign) else []
+                for target in targets:
+                    name = self_attribute(target)
+                    if name is not None and name not in declared:
+                        declared.add(name)
+                        self.declare(name, statement.value)
+            effects[function.name] = self.method(function)
+
+        # subroutines count towards the methods calling them
+        def folded(name: str, seen: frozenset[str]) -> MethodFunding:
+            funding, callees = effects[name]
+            total = MethodFunding(name, list(funding.boxes), funding.assets, funding.expected, funding.expected_value)
+            for callee in sorted(callees - seen):
+                inner = folded(callee, seen | {callee})
+                total.boxes.extend(box for box in inner.boxes if box not in total.boxes)
+                total.assets += inner.assets
+            return total
+
+        for function in functions:
+            if is_entry_method(function):
+                funding = folded(function.name, frozenset({function.name}))
+                self.layout.methods.append(funding)
+                for key in funding.boxes:
+                    self.layout.box(key).writers.append(function.name)
+        return self.layout
+
+    def value_schema(self, node: ast.expr) -> tuple[str, bool]:
+        """(schema, guessed) of a value assigned to plain state."""
+        if isinstance(node, ast.Constant):
+            return ("uint", False) if isinstance(node.value, (bool, int)) else ("bytes", False)
+        if isinstance(node, (ast.BinOp, ast.Compare, ast.BoolOp)) or (
+                isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+            return "uint", False
+        if isinstance(node, ast.Name) and node.id in self.parameters:
+            return self.type_schema(self.parameters[node.id]), False
+        if isinstance(node, ast.Call):
+            name = call_name(node)
+            if name in _UINT_TYPES:
+                return "uint", False
+            if name in ("Bytes", "String", "Account") or ast.unparse(node.func).startswith(("arc4.", "algopy.arc4.")):
+                return "bytes", False
+        if isinstance(node, ast.Attribute):
+            if node.attr in _UINT_ATTRIBUTES:
+                return "uint", False
+            if node.attr.endswith(("address", "sender", "receiver")):
+                return "bytes", False
+        return "bytes", True
+
+    def type_schema(self, node: ast.expr) -> str:
+        name = ast.unparse(node).removeprefix("algopy.")
+        return "uint" if name in _UINT_TYPES else "bytes"
+
+    def declare(self, name: str, value: ast.expr) -> None:
+        kind = call_name(value)
+        if kind in ("GlobalState", "LocalState"):
+            keywords = {k.arg: k.value for k in value.keywords}
+            argument = value.args[0] if value.args else keywords.get("value_type", keywords.get("type_"))
+            if argument is None:
+                schema, guessed = "bytes", True
+            elif isinstance(argument, (ast.Name, ast.Attribute)) and not isinstance(argument, ast.Constant):
+                schema, guessed = self.type_schema(argument), False
+            else:
+                schema, guessed = self.value_schema(argument)
+            entries = self.layout.global_state if kind == "GlobalState" else self.layout.local_state
+            entries.append(StateEntry(name, schema, guessed))
+        elif kind in BOX_KINDS:
+            self.attributes[name] = self.box(value, name).key
+        else:
+            schema, guessed = self.value_schema(value)
+            self.layout.global_state.append(StateEntry(name, schema, guessed))
+
+    def box(self, call: ast.Call, name: str | None = None) -> BoxSpec:
+        """The box a ``Box``/``BoxMap``/``BoxRef`` constructor refers to, registered once.
+
+        ``name`` is the attribute it is stored in, also its default key.
+        """
+        kind = call_name(call)
+        default_key = name.encode() if name is not None else None
+        keywords = {k.arg: k.value for k in call.keywords}
+        if kind == "BoxMap":
+            key_type, value_type = call.args[:2] if len(call.args) >= 2 else (keywords.get("key_type"),
+                                                                               keywords.get("value_type"))
+            prefix_node = keywords.get("key_prefix")
+            prefix = literal_bytes(prefix_node) if prefix_node is not None else default_key
+            key_size = fixed_size(self.types.read(key_type)) if key_type is not None else None
+            prefix_text = repr(prefix) if prefix is not None else ast.unparse(prefix_node)
+            key_text = ast.unparse(key_type) if key_type is not None else "key"
+            spec = BoxSpec(
+                name or prefix_text, kind, f"{prefix_text} + {key_text}",
+                None if key_size is None or prefix is None else len(prefix) + key_size,
+                fixed_size(self.types.read(value_type)) if value_type is not None else None, "per user",
+                value_type=_type_name(value_type))
+        else:
+            key_node = keywords.get("key")
+            key = literal_bytes(key_node) if key_node is not None else default_key
+            value_type = call.args[0] if kind == "Box" and call.args else keywords.get("type_")
+            value_size = fixed_size(self.types.read(value_type)) if value_type is not None else None
+            if key is not None:
+                spec = BoxSpec(name or key.decode(errors="replace"), kind, repr(key), len(key), value_size, "once",
+                               value_type=_type_name(value_type))
+            else:
+                text = ast.unparse(key_node).removeprefix("algopy.")
+                spec = BoxSpec(name or text, kind, text, 32 if text.endswith(".bytes") else None, value_size,
+                               _key_scaling(text), value_type=_type_name(value_type))
+        return self.register(spec)
+
+    def register(self, spec: BoxSpec) -> BoxSpec:
+        for known in self.layout.boxes:
+            if known.key == spec.key:
+                known.value_type = known.value_type or spec.value_type
+                # one key seen through several declarations: keep the largest value
+                if spec.value_size is None or (known.value_size is not None and spec.value_size > known.value_size):
+                    known.value_size = spec.value_size
+                return known
+        self.layout.boxes.append(spec)
+        return spec
+
+    def method(self, function: ast.FunctionDef) -> tuple[MethodFunding, set[str]]:
+        """What a function itself writes, and the methods of the class it calls."""
+        funding = MethodFunding(function.name)
+        callees = {ast.unparse(node.func).removeprefix("self.") for node in ast.walk(function)
+                   if isinstance(node, ast.Call) and self_attribute(node.func) is not None} & {
+            item.name for item in self.node.body if isinstance(item, ast.FunctionDef)}
+        local_boxes: dict[str, str] = {}
+        assignments: dict[str, ast.expr] = {}
+        for node in ast.walk(function):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                assignments[node.targets[0].id] = node.value
+                if call_name(node.value) in BOX_KINDS:
+                    local_boxes[node.targets[0].id] = self.box(node.value).key
+
+        def written(reference: ast.expr) -> str | None:
+            if isinstance(reference, ast.Name):
+                return local_boxes.get(reference.id)
+            name = self_attribute(reference)
+            return self.attributes.get(name) if name is not None else None
+
+        for node in ast.walk(function):
+            box = None
+            # a decrement reads the box, so it exists already and gains no MBR
+            if isinstance(node, ast.Assign) and not (isinstance(node.value, ast.BinOp)
+                                                     and isinstance(node.value.op, ast.Sub)):
+                for target in node.targets:
+                    if isinstance(target, ast.Subscript) or (
+                            isinstance(target, ast.Attribute) and target.attr == "value"):
+                        if (target_box := written(target.value)) is not None:
+                            box = target_box
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+                callee = ast.unparse(node.func).removeprefix("algopy.")
+                if node.func.attr in BOX_WRITES:
+                    box = written(node.func.value)
+                    if box is not None and node.func.attr == "create":
+                        size = next((k.value for k in node.keywords if k.arg == "size"), None)
+                        if size is not None and self.layout.box(box).kind == "BoxRef":
+                            self.layout.box(box).value_size = self.size(size, assignments)
+                if callee in ("op.Box.put", "op.Box.create") and node.args:
+                    key = literal_bytes(node.args[0])
+                    text = ast.unparse(node.args[0]).removeprefix("algopy.")
+                    value = node.args[1] if len(node.args) > 1 else None
+                    value_size = (8 if call_name(value) == "itob" else None) if callee == "op.Box.put" else \
+                        self.size(value, assignments) if value is not None else None
+                    spec = BoxSpec(key.decode(errors="replace"), "op.Box", repr(key), len(key), value_size, "once") \
+                        if key is not None else BoxSpec(text, "op.Box", text, 32 if text.endswith(".bytes") else None,
+                                                        value_size, _key_scaling(text))
+                    box = self.register(spec).key
+                if callee in ("itxn.AssetConfig",):
+                    funding.assets += 1
+                elif callee == "itxn.AssetTransfer":
+                    # an opt-in is a transfer to itself of nothing, asset_amount left out or a literal 0
+                    keywords = {k.arg: k.value for k in node.keywords}
+                    receiver = ast.unparse(keywords["asset_receiver"]) if "asset_receiver" in keywords else ""
+                    if receiver.endswith("current_application_address") and (
+                            "asset_amount" not in keywords or evaluate(keywords["asset_amount"], {}) == 0):
+                        funding.assets += 1
+            elif isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], (ast.Eq, ast.GtE)):
+                if isinstance(node.left, ast.Attribute) and node.left.attr == "amount":
+                    expected = node.comparators[0]
+                    if isinstance(expected, ast.Name) and expected.id in assignments:
+                        expected = assignments[expected.id]
+                    funding.expected = ast.unparse(expected)
+                    funding.expected_value = evaluate(expected, self.local_constants(assignments))
+            if box is not None and box not in funding.boxes:
+                funding.boxes.append(box)
+        return funding, callees
+
+    def local_constants(self, assignments: dict[str, ast.expr]) -> dict[str, int]:
+        """Module constants and the locals computed from them alone."""
+        constants = dict(self.constants)
+        pending = True
+        while pending:
+            pending = False
+            for name, value in assignments.items():
+                if name not in constants and (number := evaluate(value, constants)) is not None:
+                    constants[name] = number
+                    pending = True
+        return constants
+
+    def size(self, node: ast.expr, assignments: dict[str, ast.expr]) -> int | None:
+        if isinstance(node, ast.Name) and node.id in assignments:
+            node = assignments[node.id]
+        return evaluate(node, self.constants)
+
+
+def _type_name(node: ast.expr | None) -> str | None:
+    return ast.unparse(node).removeprefix("algopy.") if node is not None else None
+
+
+def self_attribute(node: ast.expr) -> str | None:
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+        return node.attr
+    return None
+
+
+def analyze(path: Path) -> list[StorageLayout]:
+    """Storage layout of every contract class in a file."""
+    module = ast.parse(path.read_text(encoding="utf-8"))
+    return [ClassReader(path, module, node).read() for node in module.body
+            if isinstance(node, ast.ClassDef) and any(ast.unparse(b).endswith("Contract") for b in node.bases)]
+
+
+# ---- reporting ---------------------------------------------------------------
+
+
+def _amount(value: int, exact: bool = True) -> str:
+    return f"{'' if exact else '~'}{value:,}"
+
+
+def _constant_name(text: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", text).upper()
+
+
+def format_layout(layout: StorageLayout, users: int, dynamic_size: int) -> list[str]:
+    exact = layout.exact
+    uints, slices = layout.schema(layout.global_state)
+    local_uints, local_slices = layout.schema(layout.local_state)
+    per_user = layout.per_user_min_balance(dynamic_size)
+    app = layout.app_min_balance(dynamic_size)
+    lines = [f"{Path(layout.path).stem}.{layout.contract}",
+             f"    global schema {uints} uint / {slices} bytes: creator +{_amount(layout.creator_min_balance)}"]
+    guessed = [entry.name for entry in layout.global_state + layout.local_state if entry.guessed]
+    if guessed:
+        lines[-1] += f" (type guessed for {', '.join(guessed)})"
+    if layout.local_state:
+        lines.append(f"    local schema {local_uints} uint / {local_slices} bytes: "
+                     f"+{_amount(layout.opt_in_min_balance)} per opted-in user")
+    for box in layout.boxes:
+        if not box.writers:
+            continue
+        key_size = box.key_size if box.key_size is not None else "?"
+        size = f"{key_size}+{box.value_size if box.value_size is not None else '?'} B"
+        lines.append(f"    {box.kind} {box.name} ({box.scaling}, {size}): "
+                     f"{_amount(box.min_balance(dynamic_size), box.exact)}, written by {', '.join(box.writers)}")
+    lines.append(f"    app account {_amount(app, exact)} before users, +{_amount(per_user, exact)} per user; "
+                 f"{users:,} users: {_amount(app + users * per_user, exact)} "
+                 f"(+ creator {_amount(layout.creator_min_balance)})")
+    if layout.local_state:
+        lines.append(f"    users' accounts: {users:,} opted in hold {_amount(users * layout.opt_in_min_balance)} "
+                     f"of local state MBR, not the app account")
+    for method in layout.methods:
+        added = layout.method_min_balance(method, dynamic_size)
+        if not added and method.expected is None:
+            continue
+        line = f"    {method.name}: adds up to {_amount(added, all(layout.box(b).exact for b in method.boxes))}"
+        if method.expected is not None:
+            value = f" = {method.expected_value:,}" if method.expected_value is not None else ""
+            line += f"; asserts payment {method.expected}{value}"
+        lines.append(line)
+    return lines
+
+
+def format_constants(layout: StorageLayout, dynamic_size: int) -> list[str]:
+    """Funding amounts as Algorand Python constants; method payments only as they are asserted."""
+    lines = [f"# {layout.contract}: generated by tools.mbr"
+             + ("" if layout.exact else f", dynamic sizes taken as {dynamic_size} bytes"),
+             f"APP_FUNDING = {layout.app_min_balance(dynamic_size)}",
+             f"PER_USER_FUNDING = {layout.per_user_min_balance(dynamic_size)}"]
+    for method in layout.methods:
+        name = f"{_constant_name(method.name)}_FUNDING"
+        if method.expected_value is not None:
+            lines.append(f"{name} = {method.expected_value}")
+        elif method.expected is not None:
+            lines.append(f"# {name} not derivable: {method.name} asserts a payment of {method.expected}")
+        elif added := layout.method_min_balance(method, dynamic_size):
+            lines.append(f"# {name}: {method.name} asserts no payment but can add {added} of MBR")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help="contract files (default: the Algorand dataset)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--dynamic-size", type=int, default=DEFAULT_DYNAMIC_SIZE,
+                        help="bytes assumed for keys and values of dynamic size")
+    parser.add_argument("--constants", action="store_true", help="print funding amounts as Python constants")
+    parser.add_argument("--json", action="store_true", help="print the layouts as JSON")
+    args = parser.parse_args(argv)
+
+    layouts = [layout for path in args.paths or algorand_contracts() for layout in analyze(path)]
+    if args.json:
+        print(json.dumps([asdict(layout) | {
+            "creator_min_balance": layout.creator_min_balance,
+            "app_min_balance": layout.app_min_balance(args.dynamic_size),
+            "per_user_min_balance": layout.per_user_min_balance(args.dynamic_size),
+            "opt_in_min_balance": layout.opt_in_min_balance,
+        } for layout in layouts], indent=2))
+        return 0
+    for layout in layouts:
+        lines = format_constants(layout, args.dynamic_size) if args.constants else format_layout(
+            layout, args.users, args.dynamic_size)
+        print("\n".join(lines))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
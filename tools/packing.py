@@ -0,0 +1,565 @@
+"""Storage-layout advisor: packs flags, small counters and scalar boxes of the dataset contracts.
+
+Every contract class is read as in ``tools.mbr``, together with each ABI
+method's static reads and writes of its global state and boxes (the
+subroutines it calls included). From these the advisor proposes:
+
+- ``constants``: integer state only ever set to a literal in ``__init__``,
+  which can be a module constant and free its schema slot;
+- ``bitfield``: two or more ``UInt64`` flags (only ever 0/1, a bool or a
+  comparison) as bits of one word, read with ``getbit`` and set with
+  ``setbit``;
+- ``counters``: two or more small counters (set to literals below 2**32 or
+  stepped by literals) as 32-bit lanes of one word;
+- ``merged box``: scalar boxes under literal keys merged into one
+  ``arc4.Struct`` box of at most ``MERGED_BOX_LIMIT`` bytes, so a call needs
+  one box reference instead of one per box.
+
+Each proposal gives the schema slots or boxes it saves, the MBR that frees
+(the creator's for global slots, the app account's for boxes), the box
+references per method and the change in opcodes per method under the rough
+per-access costs of ``OPCODE_COSTS``. Packing trades opcodes for storage: a
+packed flag costs a few more opcodes per access, so the figures are there to
+weigh one against the other; ``tools.teal_cost`` measures the real cost once
+a contract is rewritten. Local state is left as it is.
+
+``--emit DIR`` writes, per contract with proposals, a module of
+``@subroutine`` accessors for the packed layout (``<stem>_packed.py``) to
+import in place of the direct state accesses.
+
+Usage::
+
+    python -m tools.packing
+    python -m tools.packing "Algorand Python Dataset/GAmeGamblingA.py" --emit packed/
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import algorand_contracts
+from tools.mbr import (
+    BOX_BYTE_MIN_BALANCE,
+    BOX_FLAT_MIN_BALANCE,
+    BOX_KINDS,
+    BOX_WRITES,
+    SCHEMA_MIN_BALANCE,
+    SCHEMA_UINT_MIN_BALANCE,
+    ClassReader,
+    StorageLayout,
+    call_name,
+    evaluate,
+    is_entry_method,
+    literal_bytes,
+    self_attribute,
+)
+
+WORD_BITS = 64
+#: Width of a packed counter; counters are only ever set to literals or stepped by literals
+COUNTER_BITS = 32
+#: Largest merged box: the I/O budget a single box reference grants
+MERGED_BOX_LIMIT = 1024
+MERGED_BOX_KEY = b"state"
+
+#: Approximate opcodes of one access, not counting the value read or written
+OPCODE_COSTS = {
+    "global read": 2,  # bytec, app_global_get
+    "global write": 2,  # bytec, app_global_put
+    "constant read": 1,  # pushint
+    "bit read": 4,  # global read, pushint, getbit
+    "bit write": 6,  # global read, pushint, setbit, bytec, app_global_put
+    "lane read": 6,  # global read, pushint, shr, pushint, &
+    "lane write": 10,  # global read, clear the lane, shift the value in, |, global write
+    "box read": 4,  # bytec, box_get, assert, btoi
+    "box write": 3,  # bytec, itob, box_put
+    "field read": 5,  # bytec, pushint, pushint, box_extract, btoi
+    "field write": 4,  # bytec, pushint, itob, box_replace
+}
+
+#: How each proposal kind changes the access costs of the fields it moves
+_COSTS_AFTER = {
+    "constants": ("constant read", "global write"),
+    "bitfield": ("bit read", "bit write"),
+    "counters": ("lane read", "lane write"),
+    "merged box": ("field read", "field write"),
+}
+
+#: Stored type -> (struct field type, getter, setter) for a merged box
+_STRUCT_FIELDS = {
+    "UInt64": ("arc4.UInt64", "{}.native", "arc4.UInt64({})"),
+    "Account": ("arc4.Address", "{}.native", "arc4.Address({})"),
+    "Asset": ("arc4.UInt64", "Asset({}.native)", "arc4.UInt64({}.id)"),
+    "Application": ("arc4.UInt64", "Application({}.native)", "arc4.UInt64({}.id)"),
+    "bool": ("arc4.Bool", "{}.native", "arc4.Bool({})"),
+}
+_ARC4_SCALAR = re.compile(r"arc4\.(UInt\d+|Bool|Address|Byte)")
+_SLOT_MIN_BALANCE = SCHEMA_MIN_BALANCE + SCHEMA_UINT_MIN_BALANCE
+
+
+@dataclass
+class Accesses:
+    """Static reads and writes of each piece of state in one method, keyed by state name or box key."""
+
+    method: str
+    reads: dict[str, int] = field(default_factory=dict)
+    writes: dict[str, int] = field(default_factory=dict)
+
+    def add(self, other: Accesses) -> None:
+        for mine, theirs in ((self.reads, other.reads), (self.writes, other.writes)):
+            for key, count in theirs.items():
+                mine[key] = mine.get(key, 0) + count
+
+
+@dataclass
+class FieldWrites:
+    """What every write of one integer global field allows it to be packed as."""
+
+    #: Subset of ``flag`` and ``counter``; None until a value is written
+    kinds: set[str] | None = None
+    #: Some write steps the value by a literal
+    stepped: bool = False
+    #: Written outside ``__init__``
+    written_later: bool = False
+    #: Literal set in ``__init__``
+    initial: int | None = None
+
+
+@dataclass
+class PackedField:
+    name: str
+    #: Global state name or box key it is kept under today
+    source: str
+    #: Bit shift in a word, byte offset in a merged box, or the value of a constant
+    offset: int
+    #: Bits in a word, bytes in a merged box
+    width: int
+    value_type: str = "UInt64"
+
+
+@dataclass
+class Proposal:
+    #: ``constants``, ``bitfield``, ``counters`` or ``merged box``
+    kind: str
+    #: Global state name or box key the fields move into; None for constants
+    into: str | None
+    fields: list[PackedField]
+    slots_saved: int = 0
+    boxes_saved: int = 0
+    #: Creator's MBR for global slots, app account's for boxes
+    min_balance_saved: int = 0
+    #: Box references a method needs, before and after
+    references: dict[str, tuple[int, int]] = field(default_factory=dict)
+    #: Change in opcodes per method; negative when it saves
+    opcodes: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ContractAdvice:
+    path: str
+    contract: str
+    proposals: list[Proposal]
+    accesses: list[Accesses]
+
+
+# ---- reading -----------------------------------------------------------------
+
+
+def _is_flag(node: ast.expr, assignments: dict[str, ast.expr], parameters: dict[str, str], depth: int = 0) -> bool:
+    if depth > 8:
+        return False
+    if isinstance(node, ast.Constant):
+        return node.value in (0, 1) and not isinstance(node.value, (str, bytes))
+    if isinstance(node, (ast.Compare, ast.BoolOp)) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+        return True
+    if isinstance(node, ast.IfExp):
+        return all(_is_flag(branch, assignments, parameters, depth + 1) for branch in (node.body, node.orelse))
+    if isinstance(node, ast.Call) and call_name(node) in ("UInt64", "bool") and len(node.args) == 1:
+        return _is_flag(node.args[0], assignments, parameters, depth + 1)
+    if isinstance(node, ast.Attribute) and node.attr == "native":
+        node = node.value
+    if isinstance(node, ast.Name):
+        if parameters.get(node.id, "").removeprefix("algopy.") in ("bool", "arc4.Bool"):
+            return True
+        if node.id in assignments:
+            return _is_flag(assignments[node.id], assignments, parameters, depth + 1)
+    return False
+
+
+def _write_kinds(node: ast.Assign | ast.AugAssign, name: str, constants: dict[str, int],
+                 assignments: dict[str, ast.expr], parameters: dict[str, str]) -> tuple[set[str] | None, bool]:
+    """(kinds, stepped) one write allows; no kinds for a ``GlobalState`` declared by its type alone."""
+
+    def small(node: ast.expr) -> bool:
+        number = evaluate(node, constants)
+        return number is not None and 0 <= number < 2**COUNTER_BITS
+
+    if isinstance(node, ast.AugAssign):
+        return ({"counter"} if isinstance(node.op, (ast.Add, ast.Sub)) and small(node.value) else set()), True
+    value = node.value
+    if call_name(value) == "GlobalState":
+        value = value.args[0] if value.args and isinstance(value.args[0], (ast.Call, ast.Constant)) else None
+        if value is None:
+            return None, False
+    kinds = {"flag"} if _is_flag(value, assignments, parameters) else set()
+    if small(value):
+        kinds.add("counter")
+    elif isinstance(value, ast.BinOp) and isinstance(value.op, (ast.Add, ast.Sub)) and ast.unparse(value.left) in (
+            f"self.{name}", f"self.{name}.value") and small(value.right):
+        return {"counter"}, True
+    return kinds, False
+
+
+def _state_base(target: ast.expr) -> ast.expr:
+    """The state reference an assignment target writes: ``x`` in ``x.value = ``, ``x[k] = `` and ``x = ``."""
+    if isinstance(target, ast.Subscript) or (isinstance(target, ast.Attribute) and target.attr == "value"):
+        return target.value
+    return target
+
+
+class AccessReader:
+    """Reads and writes of the global state and boxes of a class read by :class:`tools.mbr.ClassReader`."""
+
+    def __init__(self, reader: ClassReader, layout: StorageLayout) -> None:
+        self.reader = reader
+        self.layout = layout
+        self.globals = {entry.name for entry in layout.global_state}
+        self.writes = {entry.name: FieldWrites() for entry in layout.global_state if entry.schema == "uint"}
+
+    def read(self) -> list[Accesses]:
+        functions = [item for item in self.reader.node.body if isinstance(item, ast.FunctionDef)]
+        names = {function.name for function in functions}
+        effects = {function.name: self.function(function, names) for function in functions}
+
+        # subroutines count towards the methods calling them, once per call site
+        def folded(name: str, seen: frozenset[str]) -> Accesses:
+            own, callees = effects[name]
+            total = Accesses(name)
+            total.add(own)
+            for callee in callees:
+                if callee not in seen:
+                    total.add(folded(callee, seen | {callee}))
+            return total
+
+        return [folded(function.name, frozenset({function.name})) for function in functions
+                if is_entry_method(function)]
+
+    def function(self, function: ast.FunctionDef, names: set[str]) -> tuple[Accesses, list[str]]:
+        """What a function itself reads and writes, and the methods of the class it calls."""
+        parameters = {a.arg: ast.unparse(a.annotation) for a in function.args.args if a.annotation is not None}
+        assignments: dict[str, ast.expr] = {}
+        local_boxes: dict[str, str] = {}
+        for node in ast.walk(function):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                assignments[node.targets[0].id] = node.value
+                if call_name(node.value) in BOX_KINDS:
+                    local_boxes[node.targets[0].id] = self.reader.box(node.value).key
+
+        def state(node: ast.expr) -> str | None:
+            if isinstance(node, ast.Name):
+                return local_boxes.get(node.id) if isinstance(node.ctx, ast.Load) else None
+            name = self_attribute(node)
+            if name is None:
+                return None
+            return name if name in self.globals else self.reader.attributes.get(name)
+
+        accesses = Accesses(function.name)
+
+        def count(counts: dict[str, int], key: str) -> None:
+            counts[key] = counts.get(key, 0) + 1
+
+        #: id of a written reference -> whether the write reads it too
+        written: dict[int, bool] = {}
+        callees = []
+        for node in ast.walk(function):
+            if isinstance(node, (ast.Assign, ast.AugAssign)):
+                for target in node.targets if isinstance(node, ast.Assign) else [node.target]:
+                    base = _state_base(target)
+                    name = state(base)
+                    if name is None:
+                        continue
+                    written[id(base)] = isinstance(node, ast.AugAssign)
+                    if name in self.writes and len(getattr(node, "targets", [target])) == 1:
+                        self.record(name, node, function.name == "__init__", assignments, parameters)
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+                callee = ast.unparse(node.func).removeprefix("algopy.")
+                if node.func.attr in BOX_WRITES and state(node.func.value) is not None:
+                    written[id(node.func.value)] = False
+                elif callee.startswith("op.Box.") and node.args and (key := literal_bytes(node.args[0])) is not None:
+                    write = node.func.attr in BOX_WRITES or node.func.attr in ("replace", "splice")
+                    count(accesses.writes if write else accesses.reads, repr(key))
+                elif self_attribute(node.func) in names:
+                    callees.append(node.func.attr)
+        for node in ast.walk(function):
+            if not isinstance(node, (ast.Name, ast.Attribute)) or (name := state(node)) is None:
+                continue
+            if id(node) in written:
+                count(accesses.writes, name)
+                if written[id(node)]:
+                    count(accesses.reads, name)
+            else:
+                count(accesses.reads, name)
+        return accesses, callees
+
+    def record(self, name: str, node: ast.Assign | ast.AugAssign, in_init: bool,
+               assignments: dict[str, ast.expr], parameters: dict[str, str]) -> None:
+        writes = self.writes[name]
+        kinds, stepped = _write_kinds(node, name, self.reader.constants, assignments, parameters)
+        if kinds is not None:
+            writes.kinds = kinds if writes.kinds is None else writes.kinds & kinds
+        writes.stepped |= stepped
+        if in_init and isinstance(node, ast.Assign):
+            value = node.value.args[0] if call_name(node.value) == "GlobalState" and node.value.args else node.value
+            writes.initial = evaluate(value, self.reader.constants)
+        else:
+            writes.written_later = True
+
+
+# ---- proposing ---------------------------------------------------------------
+
+
+def _unused(name: str, taken: set[str]) -> str:
+    candidate, suffix = name, 2
+    while candidate in taken:
+        candidate, suffix = f"{name}_{suffix}", suffix + 1
+    taken.add(candidate)
+    return candidate
+
+
+def _opcodes(proposal: Proposal, accesses: list[Accesses], before: tuple[str, str]) -> dict[str, int]:
+    read_after, write_after = _COSTS_AFTER[proposal.kind]
+    change = {}
+    for method in accesses:
+        delta = sum(
+            method.reads.get(f.source, 0) * (OPCODE_COSTS[read_after] - OPCODE_COSTS[before[0]])
+            + method.writes.get(f.source, 0) * (OPCODE_COSTS[write_after] - OPCODE_COSTS[before[1]])
+            for f in proposal.fields)
+        if delta:
+            change[method.method] = delta
+    return change
+
+
+def _words(kind: str, names: list[str], width: int, into: str, taken: set[str]) -> list[Proposal]:
+    """``names`` packed ``WORD_BITS // width`` to a word, one proposal per word."""
+    per_word = WORD_BITS // width
+    proposals = []
+    for start in range(0, len(names), per_word):
+        chunk = names[start:start + per_word]
+        if len(chunk) < 2:
+            break
+        proposals.append(Proposal(kind, _unused(into, taken), [
+            PackedField(name, name, index * width, width) for index, name in enumerate(chunk)]))
+    for proposal in proposals:
+        proposal.slots_saved = len(proposal.fields) - 1
+        proposal.min_balance_saved = proposal.slots_saved * _SLOT_MIN_BALANCE
+    return proposals
+
+
+def _struct_type(value_type: str | None) -> str | None:
+    if value_type in _STRUCT_FIELDS:
+        return _STRUCT_FIELDS[value_type][0]
+    if value_type is not None and _ARC4_SCALAR.fullmatch(value_type):
+        return value_type
+    return None
+
+
+def propose(layout: StorageLayout, accesses: list[Accesses], writes: dict[str, FieldWrites]) -> list[Proposal]:
+    taken = {entry.name for entry in layout.global_state}
+    proposals = []
+
+    constants = [name for name, w in writes.items() if not w.written_later and w.initial is not None]
+    if constants:
+        proposal = Proposal("constants", None, [PackedField(name, name, writes[name].initial, WORD_BITS)
+                                                for name in constants],
+                            slots_saved=len(constants), min_balance_saved=len(constants) * _SLOT_MIN_BALANCE)
+        proposals.append(proposal)
+    packable = [name for name in writes if name not in constants]
+    flags = [name for name in packable if "flag" in (writes[name].kinds or ())]
+    counters = [name for name in packable if name not in flags and "counter" in (writes[name].kinds or ())
+                and writes[name].stepped]
+    proposals += _words("bitfield", flags, 1, "flags", taken)
+    proposals += _words("counters", counters, COUNTER_BITS, "counters", taken)
+    for proposal in proposals:
+        proposal.opcodes = _opcodes(proposal, accesses, ("global read", "global write"))
+
+    scalars = [box for box in layout.boxes if box.kind == "Box" and box.scaling == "once" and box.writers
+               and box.value_size is not None and _struct_type(box.value_type) is not None]
+    keys = {box.key for box in layout.boxes}
+    key = MERGED_BOX_KEY
+    while repr(key) in keys:
+        key = b"packed_" + key
+    group, size = [], len(key)
+    for box in scalars:
+        if size + box.value_size <= MERGED_BOX_LIMIT:
+            group.append(box)
+            size += box.value_size
+    if len(group) >= 2:
+        offset, fields = 0, []
+        for box in group:
+            fields.append(PackedField(re.sub(r"\W", "_", box.name), box.key, offset, box.value_size, box.value_type))
+            offset += box.value_size
+        merged = BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (len(key) + offset)
+        proposal = Proposal("merged box", repr(key), fields, boxes_saved=len(group) - 1,
+                            min_balance_saved=sum(box.min_balance() for box in group) - merged)
+        sources = {box.key for box in group}
+        for method in accesses:
+            used = sources & (method.reads.keys() | method.writes.keys())
+            if len(used) > 1:
+                proposal.references[method.method] = (len(used), 1)
+        proposal.opcodes = _opcodes(proposal, accesses, ("box read", "box write"))
+        proposals.append(proposal)
+    return proposals
+
+
+def advise(path: Path) -> list[ContractAdvice]:
+    """Packing proposals for every contract class in a file."""
+    module = ast.parse(path.read_text(encoding="utf-8"))
+    advice = []
+    for node in module.body:
+        if not isinstance(node, ast.ClassDef) or not any(ast.unparse(b).endswith("Contract") for b in node.bases):
+            continue
+        reader = ClassReader(path, module, node)
+        layout = reader.read()
+        accesses = AccessReader(reader, layout)
+        methods = accesses.read()
+        advice.append(ContractAdvice(str(path), node.name, propose(layout, methods, accesses.writes), methods))
+    return advice
+
+
+# ---- reporting ---------------------------------------------------------------
+
+
+def _position(proposal: Proposal, f: PackedField) -> str:
+    if proposal.kind == "constants":
+        return f"{f.name} = {f.offset}"
+    if proposal.kind == "bitfield":
+        return f"{f.name} (bit {f.offset})"
+    if proposal.kind == "counters":
+        return f"{f.name} (bits {f.offset}-{f.offset + f.width - 1})"
+    return f"{f.name} ({f.value_type}, bytes {f.offset}-{f.offset + f.width - 1})"
+
+
+def format_advice(advice: ContractAdvice) -> list[str]:
+    lines = [f"{Path(advice.path).stem}.{advice.contract}"]
+    if not advice.proposals:
+        lines.append("    nothing to pack")
+    for proposal in advice.proposals:
+        target = f" {proposal.into}" if proposal.into else ""
+        lines.append(f"    {proposal.kind}{target} <- {', '.join(_position(proposal, f) for f in proposal.fields)}")
+        if proposal.slots_saved:
+            lines.append(f"        global schema -{proposal.slots_saved} uint: "
+                         f"creator MBR -{proposal.min_balance_saved:,}")
+        if proposal.boxes_saved:
+            lines.append(f"        boxes -{proposal.boxes_saved}: app account MBR -{proposal.min_balance_saved:,}")
+        if proposal.references:
+            lines.append("        box references: " + ", ".join(
+                f"{method} {before} -> {after}" for method, (before, after) in proposal.references.items()))
+        if proposal.opcodes:
+            lines.append("        opcodes: " + ", ".join(f"{method} {change:+d}"
+                                                          for method, change in proposal.opcodes.items()))
+    return lines
+
+
+def _constant(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).upper()
+
+
+def render_module(advice: ContractAdvice) -> str:
+    """Algorand Python accessors for the proposed layout of one contract."""
+    imports: set[str] = set()
+    #: Top-level blocks, two blank lines apart
+    blocks: list[str] = []
+    for proposal in advice.proposals:
+        if proposal.kind == "constants":
+            blocks.append("\n".join([f"# constants replacing {', '.join(f'self.{f.name}' for f in proposal.fields)}"]
+                                    + [f"{_constant(f.name)} = {f.offset}" for f in proposal.fields]))
+        elif proposal.kind == "bitfield":
+            imports.update({"UInt64", "op", "subroutine"})
+            word = proposal.into
+            blocks.append("\n".join([f"# bits of self.{word}"]
+                                    + [f"{_constant(f.name)}_BIT = {f.offset}" for f in proposal.fields]))
+            for f in proposal.fields:
+                bit = f"{_constant(f.name)}_BIT"
+                blocks += [f"@subroutine\ndef get_{f.name}({word}: UInt64) -> bool:\n"
+                           f"    return op.getbit({word}, {bit}) == 1",
+                           f"@subroutine\ndef set_{f.name}({word}: UInt64, value: bool) -> UInt64:\n"
+                           f"    return op.setbit_uint64({word}, {bit}, value)"]
+        elif proposal.kind == "counters":
+            imports.update({"UInt64", "subroutine"})
+            word = proposal.into
+            # clear masks are precomputed: ~ of a Python int is negative, which no UInt64 can hold
+            blocks.append("\n".join([f"# {COUNTER_BITS}-bit lanes of self.{word}"]
+                                    + [f"{_constant(f.name)}_SHIFT = {f.offset}" for f in proposal.fields]
+                                    + [f"{_constant(f.name)}_CLEAR = "
+                                       f"{~((2**COUNTER_BITS - 1) << f.offset) & (2**64 - 1):#_x}"
+                                       for f in proposal.fields]
+                                    + [f"COUNTER_MASK = {2**COUNTER_BITS - 1:#x}"]))
+            for f in proposal.fields:
+                shift, clear = f"{_constant(f.name)}_SHIFT", f"{_constant(f.name)}_CLEAR"
+                blocks += [f"@subroutine\ndef get_{f.name}({word}: UInt64) -> UInt64:\n"
+                           f"    return ({word} >> {shift}) & COUNTER_MASK",
+                           f"@subroutine\ndef set_{f.name}({word}: UInt64, value: UInt64) -> UInt64:\n"
+                           f"    assert value <= COUNTER_MASK, \"counter overflow\"\n"
+                           f"    return ({word} & {clear}) | (value << {shift})"]
+        else:
+            imports.update({"Box", "arc4", "subroutine"})
+            struct = f"{advice.contract}State"
+            key = f"{_constant(struct)}_KEY"
+            box = f"Box({struct}, key={key})"
+            sources = ", ".join(f.source for f in proposal.fields)
+            blocks.append("\n".join([f"class {struct}(arc4.Struct):", f'    """Boxes {sources} in one."""', ""]
+                                    + [f"    {f.name}: {_struct_type(f.value_type)}" for f in proposal.fields]))
+            blocks.append(f"{key} = {proposal.into}")
+            blocks.append(f"@subroutine\ndef create_{_constant(struct).lower()}() -> None:\n"
+                          f"    assert {box}.create(), \"state box exists\"")
+            for f in proposal.fields:
+                if f.value_type in _STRUCT_FIELDS:
+                    native, (getter, setter) = f.value_type, _STRUCT_FIELDS[f.value_type][1:]
+                    imports.add(native)
+                else:
+                    native, getter, setter = f.value_type, "{}", "{}"
+                blocks += [f"@subroutine\ndef get_{f.name}() -> {native}:\n"
+                           f"    return {getter.format(f'{box}.value.{f.name}')}",
+                           f"@subroutine\ndef set_{f.name}(value: {native}) -> None:\n"
+                           f"    box = {box}\n"
+                           f"    state = box.value.copy()\n"
+                           f"    state.{f.name} = {setter.format('value')}\n"
+                           f"    box.value = state.copy()"]
+    header = f'"""Packed state of {advice.contract} ({Path(advice.path).name}), generated by tools.packing."""'
+    if imports:
+        header += f"\n\nfrom algopy import {', '.join(sorted(imports, key=lambda name: (name[0].islower(), name)))}"
+    return "\n\n\n".join([header, *blocks]) + "\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help="contract files (default: the Algorand dataset)")
+    parser.add_argument("--emit", type=Path, help="write <stem>_packed.py accessor modules to this directory")
+    parser.add_argument("--all", action="store_true", help="also list contracts with nothing to pack")
+    parser.add_argument("--json", action="store_true", help="print the proposals as JSON")
+    args = parser.parse_args(argv)
+
+    advice = [a for path in args.paths or algorand_contracts() for a in advise(path)]
+    if args.emit is not None:
+        args.emit.mkdir(parents=True, exist_ok=True)
+        for a in advice:
+            if a.proposals:
+                path = args.emit / f"{Path(a.path).stem}_packed.py"
+                path.write_text(render_module(a), encoding="utf-8")
+                print(f"wrote {path}", file=sys.stderr)
+    if args.json:
+        print(json.dumps([asdict(a) for a in advice], indent=2))
+        return 0
+    for a in advice:
+        if a.proposals or args.all:
+            print("\n".join(format_advice(a)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
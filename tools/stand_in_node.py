@@ -0,0 +1,71 @@
+"""In-process stand-in for an algod node, to exercise ``tools.group_packer`` offline.
+
+The stand-in confirms every group that passes ``check_group`` (group size,
+references per transaction, pooled fee and opcode budget) in a round of its
+own, after an optional ``latency``. It can be told to fail a fraction of
+submissions transiently (as a rate-limited node would, retryable) and to
+reject a fraction of calls as a failing contract would, which rejects the
+whole group. Whether a call is rejected depends only on the call, so a
+resubmitted call is rejected again. It keeps what a test wants to assert on:
+the groups confirmed and the most submissions it had in flight at once::
+
+    node = StandInNode(latency=0.01, reject_rate=0.05)
+    report = await GroupPacker(node, window=4).run(calls)
+    assert node.max_in_flight <= 4
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+from dataclasses import asdict
+
+from tools.atomic_group import MIN_FEE, AppCall, Confirmation, NodeError, Transaction, check_group
+
+
+class StandInNode:
+    def __init__(self, *, latency: float = 0.0, failure_rate: float = 0.0, reject_rate: float = 0.0,
+                 min_fee: int = MIN_FEE, seed: int | None = None) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.reject_rate = reject_rate
+        self.fee = min_fee
+        self.round = 0
+        self.submissions = 0
+        #: Confirmed groups, in the order they were confirmed
+        self.groups: list[list[Transaction]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._seed = seed
+
+    async def min_fee(self) -> int:
+        return self.fee
+
+    def rejects(self, call: AppCall) -> bool:
+        """Whether the contract rejects ``call``; the same answer every time it is sent."""
+        digest = hashlib.sha256(f"{self._seed}:{json.dumps(asdict(call), sort_keys=True)}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64 < self.reject_rate
+
+    async def submit(self, transactions: list[Transaction]) -> Confirmation:
+        self.submissions += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                raise NodeError("stand-in: 503 service unavailable", retryable=True)
+            problems = check_group(transactions, self.fee)
+            if problems:
+                raise NodeError("stand-in: group rejected: " + "; ".join(problems))
+            for index, t in enumerate(transactions):
+                if t.call is not None and self.rejects(t.call):
+                    raise NodeError(f"stand-in: transaction {index} rejected by the app: logic eval error")
+            self.round += 1
+            self.groups.append(transactions)
+            return Confirmation(f"STANDIN{self.round:06d}", self.round)
+        finally:
+            self.in_flight -= 1
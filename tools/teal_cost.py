@@ -0,0 +1,461 @@
+"""Static opcode cost and program size of compiled dataset contracts.
+
+Contracts are compiled with ``puyapy`` and the approval TEAL is split into basic
+blocks. The cost of an ABI method is the cost of the router dispatch plus the most
+expensive path from the method's route label to a ``return``/``err``, where each
+``callsub`` adds the most expensive path through the callee. Back edges are not
+followed, so a loop body is counted once: the figure is a per-iteration static
+estimate to compare contract revisions, not the exact budget of a given call.
+``ContractCost.loop_costs`` gives the cost of one more iteration of a
+method's loops, to scale the estimate to a number of iterations.
+``--self-check`` costs a few inline TEAL programs with known figures, without
+compiling anything, to check the path search itself.
+
+Usage::
+
+    python -m tools.teal_cost "Algorand Python Dataset/reentranceA.py"
+    python -m tools.teal_cost --self-check
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+#: Bytes per program page; an app may request up to MAX_EXTRA_PAGES extra pages
+PAGE_SIZE = 2048
+MAX_EXTRA_PAGES = 3
+
+#: Opcodes whose cost is not 1 (AVM v10), keyed by opcode then first immediate
+OPCODE_COSTS: dict[str, int | dict[str, int]] = {
+    "sha256": 35,
+    "keccak256": 130,
+    "sha512_256": 45,
+    "sha3_256": 130,
+    "ed25519verify": 1900,
+    "ed25519verify_bare": 1900,
+    "ecdsa_verify": {"Secp256k1": 1700, "Secp256r1": 2500},
+    "ecdsa_pk_decompress": {"Secp256k1": 650, "Secp256r1": 2400},
+    "ecdsa_pk_recover": 2000,
+    "vrf_verify": 5700,
+    "falcon_verify": 1700,
+    "sumhash512": 150,
+    "bn256_add": 70,
+    "bn256_scalar_mul": 970,
+    "bn256_pairing": 8700,
+    "ec_add": {"BN254g1": 125, "BN254g2": 170, "BLS12_381g1": 205, "BLS12_381g2": 290},
+    "ec_scalar_mul": {"BN254g1": 1810, "BN254g2": 3430, "BLS12_381g1": 2950, "BLS12_381g2": 6530},
+    "ec_subgroup_check": {"BN254g1": 20, "BN254g2": 3100, "BLS12_381g1": 1850, "BLS12_381g2": 2340},
+    "ec_map_to": {"BN254g1": 630, "BN254g2": 3300, "BLS12_381g1": 1950, "BLS12_381g2": 8150},
+    "ec_pairing_check": {"BN254g1": 8000, "BN254g2": 8000, "BLS12_381g1": 13000, "BLS12_381g2": 13000},
+    "ec_multi_scalar_mul": {"BN254g1": 3600, "BN254g2": 7200, "BLS12_381g1": 6500, "BLS12_381g2": 14850},
+    "json_ref": 25,
+    "divmodw": 20,
+    "sqrt": 4,
+    "expw": 10,
+    "b+": 10,
+    "b-": 10,
+    "b*": 20,
+    "b/": 20,
+    "b%": 20,
+    "b|": 6,
+    "b&": 6,
+    "b^": 6,
+    "b~": 4,
+    "bsqrt": 40,
+}
+
+_TERMINATORS = frozenset({"return", "retsub", "err"})
+_CONDITIONAL = frozenset({"bz", "bnz"})
+_MULTIWAY = frozenset({"switch", "match"})
+_METHOD_RE = re.compile(r'method\s+"([^"]+)"')
+
+#: Inline programs checked by ``--self-check``: name, TEAL, entry label, its max cost and loop costs
+_SELF_CHECKS: list[tuple[str, str, str, int, dict[str, int]]] = [
+    (
+        "loop",
+        """
+        start:
+            int 3
+        header:
+            dup
+            bz after
+            keccak256
+            b header
+        after:
+            return
+        """,
+        "start", 134, {"header": 133},
+    ),
+    (
+        # P and Q form an inner loop inside the outer loop; the outer
+        # iteration header -> Q -> P -> T is only found if the cost of Q,
+        # computed while P is on the path, is not reused when entering at Q
+        "loop with a branch into an inner loop",
+        """
+        start:
+            int 1
+            b header
+        header:
+            int 1
+            bz done
+            int 1
+            bz P
+        Q:
+            int 1
+            bz P
+            b T
+        P:
+            int 1
+            bz Q
+            keccak256
+            b T
+        T:
+            int 1
+            pop
+            b header
+        done:
+            int 1
+            return
+        """,
+        "start", 144, {"header": 142, "P": 142},
+    ),
+]
+
+
+def opcode_cost(op: str, args: list[str]) -> int:
+    """Return the static cost of a single TEAL instruction."""
+    cost = OPCODE_COSTS.get(op, 1)
+    if isinstance(cost, dict):
+        return cost.get(args[0], max(cost.values())) if args else max(cost.values())
+    return cost
+
+
+@dataclass
+class Instruction:
+    op: str
+    args: list[str]
+    comment: str = ""
+
+    @property
+    def cost(self) -> int:
+        return opcode_cost(self.op, self.args)
+
+
+@dataclass
+class Block:
+    label: str
+    instructions: list[Instruction] = field(default_factory=list)
+    successors: list[str] = field(default_factory=list)
+    calls: list[str] = field(default_factory=list)
+
+    @property
+    def cost(self) -> int:
+        return sum(instruction.cost for instruction in self.instructions)
+
+
+def _split_line(line: str) -> tuple[str, str]:
+    """Split a TEAL line into code and comment, ignoring ``//`` inside strings."""
+    in_string = escaped = False
+    for i, char in enumerate(line):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif line.startswith("//", i):
+            return line[:i].strip(), line[i + 2 :].strip()
+    return line.strip(), ""
+
+
+def _tokenize(code: str) -> list[str]:
+    return re.findall(r'"(?:[^"\\]|\\.)*"|\S+', code)
+
+
+class TealProgram:
+    """Basic-block view of a TEAL program with max-path cost queries."""
+
+    def __init__(self, source: str) -> None:
+        self.blocks: dict[str, Block] = {}
+        self.order: list[str] = []
+        #: ABI method signature -> route label, taken from the router ``match``
+        self.routes: dict[str, str] = {}
+        self._dispatch_cost: int | None = None
+        #: Path costs keyed by block, target and the blocks on the path that can cut the search
+        self._cost_memo: dict[tuple[str, frozenset[str]], int] = {}
+        self._path_memo: dict[tuple[str, str, frozenset[str]], int | None] = {}
+        self._reach_memo: dict[tuple[str, str | None], frozenset[str]] = {}
+        self._parse(source)
+
+    def _new_block(self, label: str) -> Block:
+        block = Block(label)
+        self.blocks[label] = block
+        self.order.append(label)
+        return block
+
+    def _parse(self, source: str) -> None:
+        block = self._new_block("__entry__")
+        pending_methods: list[str] = []
+        anonymous = 0
+        dispatch_cost = 0
+        for raw_line in source.splitlines():
+            code, comment = _split_line(raw_line)
+            if not code or code.startswith("#pragma"):
+                continue
+            if code.endswith(":") and " " not in code:
+                label = code[:-1]
+                if block.instructions and not block.successors and block.instructions[-1].op not in _TERMINATORS:
+                    block.successors.append(label)
+                elif not block.instructions and not block.successors:
+                    block.successors.append(label)
+                block = self._new_block(label)
+                continue
+            tokens = _tokenize(code)
+            instruction = Instruction(tokens[0], tokens[1:], comment)
+            block.instructions.append(instruction)
+            op, args = instruction.op, instruction.args
+            if op == "method" and args:
+                pending_methods.append(args[0].strip('"'))
+            elif op in ("pushbytes", "pushbytess", "bytec", "byte") or op.startswith("bytec_"):
+                pending_methods.extend(_METHOD_RE.findall(comment))
+            if self._dispatch_cost is None:
+                dispatch_cost += instruction.cost
+            if op == "callsub":
+                block.calls.append(args[0])
+            elif op == "b":
+                block.successors.append(args[0])
+                block = self._new_block(f"__dead_{anonymous}__")
+                anonymous += 1
+            elif op in _CONDITIONAL or op in _MULTIWAY:
+                if op == "match" and pending_methods and self._dispatch_cost is None:
+                    self.routes.update(zip(pending_methods, args))
+                    self._dispatch_cost = dispatch_cost
+                pending_methods = []
+                fallthrough = f"__fallthrough_{anonymous}__"
+                anonymous += 1
+                block.successors.extend([*args, fallthrough])
+                block = self._new_block(fallthrough)
+            elif op in _TERMINATORS:
+                # Code after a terminator is only reachable through a label
+                block = self._new_block(f"__dead_{anonymous}__")
+                anonymous += 1
+
+    def max_cost(self, label: str) -> int:
+        """Most expensive acyclic path from ``label`` to a terminator."""
+        return self._max_cost(label, set())
+
+    def _max_cost(self, label: str, on_path: set[str]) -> int:
+        if label in on_path or label not in self.blocks:
+            return 0
+        key = (label, frozenset(on_path & self._reachable(label)))
+        if key in self._cost_memo:
+            return self._cost_memo[key]
+        on_path.add(label)
+        block = self.blocks[label]
+        cost = block.cost
+        for callee in block.calls:
+            cost += self._max_cost(callee, on_path)
+        cost += max((self._max_cost(successor, on_path) for successor in block.successors), default=0)
+        on_path.discard(label)
+        self._cost_memo[key] = cost
+        return cost
+
+    def method_costs(self) -> dict[str, int]:
+        """Static cost per ABI method signature, router dispatch included."""
+        dispatch = self._dispatch_cost or 0
+        return {signature: dispatch + self.max_cost(label) for signature, label in self.routes.items()}
+
+    def loop_costs(self, label: str) -> dict[str, int]:
+        """Cost of one iteration of each loop reachable from ``label``, keyed by loop header.
+
+        A back edge ``tail -> header`` closes a loop; an iteration is the most
+        expensive path from the header to the tail, callees included.
+        """
+        back_edges: set[tuple[str, str]] = set()
+        self._back_edges(label, [], set(), back_edges)
+        loops: dict[str, int] = {}
+        for tail, header in back_edges:
+            cost = self._max_path(header, tail, set())
+            if cost is not None:
+                loops[header] = max(loops.get(header, 0), cost)
+        return loops
+
+    def method_loop_costs(self) -> dict[str, int]:
+        """Cost of one more iteration of every loop per ABI method signature (0 without loops)."""
+        return {signature: sum(self.loop_costs(label).values()) for signature, label in self.routes.items()}
+
+    def _back_edges(self, label: str, path: list[str], seen: set[str], found: set[tuple[str, str]]) -> None:
+        if label not in self.blocks or label in seen:
+            return
+        seen.add(label)
+        path.append(label)
+        block = self.blocks[label]
+        for callee in block.calls:
+            self._back_edges(callee, [], seen, found)
+        for successor in block.successors:
+            if successor in path:
+                found.add((label, successor))
+            else:
+                self._back_edges(successor, path, seen, found)
+        path.pop()
+
+    def _reachable(self, label: str, target: str | None = None) -> frozenset[str]:
+        """Blocks reachable from ``label``, through calls unless the path stops at ``target``.
+
+        Only these blocks can cut a path search from ``label``, so a memoized
+        cost holds for any path sharing which of them it has already visited.
+        """
+        key = (label, target)
+        if key not in self._reach_memo:
+            seen: set[str] = set()
+            stack = [label]
+            while stack:
+                current = stack.pop()
+                if current in seen or current not in self.blocks:
+                    continue
+                seen.add(current)
+                if current == target:
+                    continue
+                block = self.blocks[current]
+                stack.extend(block.successors)
+                if target is None:
+                    stack.extend(block.calls)
+            self._reach_memo[key] = frozenset(seen)
+        return self._reach_memo[key]
+
+    def _block_cost(self, label: str) -> int:
+        block = self.blocks[label]
+        return block.cost + sum(self.max_cost(callee) for callee in block.calls)
+
+    def _max_path(self, label: str, target: str, on_path: set[str]) -> int | None:
+        """Most expensive acyclic path from ``label`` to ``target``, None if there is none."""
+        if label == target:
+            return self._block_cost(label)
+        if label in on_path or label not in self.blocks:
+            return None
+        key = (label, target, frozenset(on_path & self._reachable(label, target)))
+        if key in self._path_memo:
+            return self._path_memo[key]
+        on_path.add(label)
+        costs = [self._max_path(successor, target, on_path) for successor in self.blocks[label].successors]
+        on_path.discard(label)
+        reachable = [cost for cost in costs if cost is not None]
+        result = self._block_cost(label) + max(reachable) if reachable else None
+        self._path_memo[key] = result
+        return result
+
+
+@dataclass(frozen=True)
+class ContractCost:
+    contract: str
+    method_costs: dict[str, int]
+    approval_size: int | None = None
+    clear_size: int | None = None
+    #: Cost of one more iteration of each method's loops, by method signature
+    loop_costs: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def extra_pages_required(self) -> int | None:
+        """Extra pages needed to deploy, ``None`` when bytecode was not produced."""
+        if self.approval_size is None or self.clear_size is None:
+            return None
+        total = self.approval_size + self.clear_size
+        return max(0, -(-total // PAGE_SIZE) - 1)
+
+    @property
+    def fits(self) -> bool:
+        pages = self.extra_pages_required
+        return pages is None or pages <= MAX_EXTRA_PAGES
+
+
+def compile_contract(path: Path, out_dir: Path) -> list[Path]:
+    """Compile ``path`` with puyapy into ``out_dir``; return the approval TEAL files."""
+    puyapy = shutil.which("puyapy")
+    if puyapy is None:
+        raise RuntimeError("puyapy is not installed (pip install puyapy)")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(
+        [puyapy, str(path), "--out-dir", str(out_dir), "--output-bytecode"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"puyapy failed on {path.name}:\n{result.stdout}{result.stderr}")
+    return sorted(out_dir.glob("*.approval.teal"))
+
+
+def _size(path: Path) -> int | None:
+    return path.stat().st_size if path.is_file() else None
+
+
+def analyze_teal(approval_teal: Path) -> ContractCost:
+    """Cost a single compiled contract from its ``<Name>.approval.teal`` output."""
+    name = approval_teal.name.removesuffix(".approval.teal")
+    program = TealProgram(approval_teal.read_text())
+    return ContractCost(
+        contract=name,
+        method_costs=program.method_costs(),
+        approval_size=_size(approval_teal.with_name(f"{name}.approval.bin")),
+        clear_size=_size(approval_teal.with_name(f"{name}.clear.bin")),
+        loop_costs=program.method_loop_costs(),
+    )
+
+
+def analyze_file(path: Path, out_dir: Path | None = None) -> list[ContractCost]:
+    """Compile ``path`` and cost every contract it defines."""
+    if out_dir is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return analyze_file(path, Path(tmp))
+    return [analyze_teal(teal) for teal in compile_contract(path, out_dir)]
+
+
+def format_costs(costs: list[ContractCost]) -> str:
+    lines = []
+    for cost in costs:
+        pages = cost.extra_pages_required
+        size = "?" if cost.approval_size is None else f"{cost.approval_size}+{cost.clear_size} B"
+        lines.append(f"{cost.contract}  size={size}  extra_pages={'?' if pages is None else pages}")
+        for signature, ops in sorted(cost.method_costs.items()):
+            lines.append(f"  {ops:>7}  {signature}")
+    return "\n".join(lines)
+
+
+def self_check() -> int:
+    """Cost the ``_SELF_CHECKS`` programs, printing each figure that is off; 1 if any is."""
+    failures = 0
+    for name, source, label, max_cost, loop_costs in _SELF_CHECKS:
+        program = TealProgram(source)
+        got = (program.max_cost(label), program.loop_costs(label))
+        if got != (max_cost, loop_costs):
+            print(f"{name}: max cost {got[0]}, loops {got[1]}; expected {max_cost}, loops {loop_costs}")
+            failures += 1
+    print(f"{len(_SELF_CHECKS) - failures}/{len(_SELF_CHECKS)} self-checks passed")
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, help="Algorand Python contract files")
+    parser.add_argument("--self-check", action="store_true", help="cost inline programs with known figures")
+    args = parser.parse_args(argv)
+    if args.self_check:
+        return self_check()
+    if not args.paths:
+        parser.error("give contract files or --self-check")
+    for path in args.paths:
+        print(format_costs(analyze_file(path)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
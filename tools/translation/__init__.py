@@ -0,0 +1,19 @@
+"""LLM translation pipeline from ``Solidity dataset`` to Algorand Python.
+
+``runner`` expands the contract x prompt x model matrix and drives a pluggable
+OpenAI-compatible ``backend``. Prompts come from ``templates`` (the prompt
+styles compiled into slotted templates), optionally with examples retrieved by
+``fewshot`` and sources shrunk by ``compress``, which relies on the
+``solidity`` lexer/parser and counts with ``tokens``; ``split`` cuts contracts
+into per-function requests and reassembles the answers, ``pretranslate`` writes
+the mechanical pieces with rules, ``memory`` reuses the translations of
+functions equivalent up to renaming and ``incremental`` re-translates only the
+pieces an edit touched. ``cache`` keeps completions keyed by prompt, model and
+sampling parameters, ``extract`` pulls the code out of a completion, and
+``stub_server`` stands in for the model offline. ``compiler`` checks
+translations with a pool of warm ``puyapy`` workers and caches the results by
+source hash; ``repair`` sends a failing function back to the model with the
+compiler's error, and ``streaming`` cuts streamed completions whose code block
+has become unusable. ``race`` sends a contract with several prompt styles and
+keeps the first translation that compiles and passes smoke tests.
+"""
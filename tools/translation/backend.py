@@ -0,0 +1,322 @@
+"""OpenAI-compatible chat completion backend with rate limiting and retries.
+
+Only the standard library is used: requests go over a small asyncio HTTP/1.1
+client, so any server speaking the ``/chat/completions`` protocol works, including
+``tools.translation.stub_server`` for offline runs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import ssl
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Protocol, TypeVar
+from urllib.parse import urlsplit
+
+T = TypeVar("T")
+
+#: HTTP statuses worth retrying: rate limited, timeouts and server errors
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class SamplingParams:
+    temperature: float = 0.0
+    top_p: float = 1.0
+    max_tokens: int = 4096
+    seed: int | None = None
+
+
+@dataclass(frozen=True)
+class CompletionRequest:
+    model: str
+    prompt: str
+    params: SamplingParams = SamplingParams()
+
+
+@dataclass
+class Completion:
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_s: float = 0.0
+    #: Served from a ResponseCache rather than the model
+    cached: bool = False
+
+
+class BackendError(Exception):
+    """A completion request failed; ``retryable`` tells whether to try again."""
+
+    def __init__(self, message: str, *, status: int | None = None, retryable: bool = False) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class StreamAborted(BackendError):
+    """A streamed completion was cancelled because its text had become unusable.
+
+    Retryable: the slot it held goes to a fresh attempt. ``partial`` is what had
+    arrived, with its latency and approximate token count.
+    """
+
+    def __init__(self, reason: str, partial: Completion) -> None:
+        super().__init__(f"stream aborted: {reason}", retryable=True)
+        self.reason = reason
+        self.partial = partial
+
+
+#: Called with each streamed delta of text; returning a reason aborts the stream
+StreamCheck = Callable[[str], "str | None"]
+
+
+class Backend(Protocol):
+    async def complete(self, request: CompletionRequest) -> Completion: ...
+
+    async def complete_streaming(self, request: CompletionRequest, check: StreamCheck | None = None) -> Completion: ...
+
+
+class HttpResponse:
+    """Response of :func:`http_request`; the body is read lazily from the socket."""
+
+    def __init__(self, status: int, headers: dict[str, str], reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self.status = status
+        self.headers = headers
+        self._reader = reader
+        self._writer = writer
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """Yield the body as it arrives, decoding chunked transfer encoding."""
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await self._reader.readline()
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await self._reader.readline()
+                    return
+                chunk = await self._reader.readexactly(size)
+                await self._reader.readline()
+                yield chunk
+        elif "content-length" in self.headers:
+            remaining = int(self.headers["content-length"])
+            while remaining:
+                chunk = await self._reader.read(min(remaining, 65536))
+                if not chunk:
+                    raise BackendError("connection closed mid-body", retryable=True)
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while chunk := await self._reader.read(65536):
+                yield chunk
+
+    async def iter_lines(self) -> AsyncIterator[bytes]:
+        buffer = b""
+        async for chunk in self.iter_chunks():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.rstrip(b"\r")
+        if buffer:
+            yield buffer
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+async def http_request(
+    method: str, url: str, body: bytes = b"", headers: dict[str, str] | None = None
+) -> HttpResponse:
+    """Send one HTTP/1.1 request on a fresh connection and read the status line and headers."""
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    context = ssl.create_default_context() if secure else None
+    try:
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=context)
+    except OSError as exc:
+        raise BackendError(f"cannot connect to {parts.netloc}: {exc}", retryable=True) from exc
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close",
+             f"Content-Length: {len(body)}"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    try:
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise BackendError("empty response", retryable=True)
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as exc:
+        writer.close()
+        raise BackendError(f"bad response from {parts.netloc}: {exc}", retryable=True) from exc
+    return HttpResponse(status, response_headers, reader, writer)
+
+
+class OpenAICompatibleBackend:
+    """Chat completions over HTTP, e.g. ``https://api.openai.com/v1`` or a local server."""
+
+    def __init__(self, base_url: str, api_key: str | None = None, timeout: float = 600.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.timeout = timeout
+
+    def payload(self, request: CompletionRequest, **extra: object) -> dict:
+        params = {key: value for key, value in asdict(request.params).items() if value is not None}
+        return {"model": request.model, "messages": [{"role": "user", "content": request.prompt}],
+                **params, **extra}
+
+    def headers(self) -> dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    async def post(self, payload: dict) -> HttpResponse:
+        """POST a payload to ``/chat/completions``; non-2xx statuses raise BackendError."""
+        url = f"{self.base_url}/chat/completions"
+        response = await http_request("POST", url, json.dumps(payload).encode(), self.headers())
+        if response.status >= 300:
+            detail = (await response.read())[:500].decode(errors="replace")
+            response.close()
+            raise BackendError(f"HTTP {response.status}: {detail}", status=response.status,
+                               retryable=response.status in RETRYABLE_STATUSES)
+        return response
+
+    async def complete(self, request: CompletionRequest) -> Completion:
+        started = time.perf_counter()
+
+        async def call() -> bytes:
+            response = await self.post(self.payload(request))
+            try:
+                return await response.read()
+            finally:
+                response.close()
+
+        try:
+            body = await asyncio.wait_for(call(), self.timeout)
+        except asyncio.TimeoutError as exc:
+            raise BackendError(f"timed out after {self.timeout}s", retryable=True) from exc
+        try:
+            data = json.loads(body)
+            text = data["choices"][0]["message"]["content"] or ""
+        except (ValueError, KeyError, IndexError, TypeError) as exc:
+            raise BackendError(f"malformed completion: {body[:200]!r}", retryable=True) from exc
+        usage = data.get("usage") or {}
+        return Completion(
+            text=text,
+            model=data.get("model", request.model),
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            latency_s=time.perf_counter() - started,
+        )
+
+    async def complete_streaming(self, request: CompletionRequest, check: StreamCheck | None = None) -> Completion:
+        """Stream the completion (server-sent events), aborting as soon as ``check`` objects.
+
+        ``check`` is fed every delta as it arrives and returns a reason to give
+        up, or None; the connection is then closed, so the server stops
+        generating, and :class:`StreamAborted` is raised.
+        """
+        started = time.perf_counter()
+        pieces: list[str] = []
+        usage: dict = {}
+        model = request.model
+
+        async def call() -> None:
+            nonlocal usage, model
+            response = await self.post(self.payload(request, stream=True, stream_options={"include_usage": True}))
+            try:
+                async for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        return
+                    try:
+                        event = json.loads(data)
+                    except ValueError as exc:
+                        raise BackendError(f"malformed stream event: {data[:200]!r}", retryable=True) from exc
+                    usage = event.get("usage") or usage
+                    model = event.get("model", model)
+                    for choice in event.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            pieces.append(delta)
+                            if check is not None and (reason := check(delta)) is not None:
+                                text = "".join(pieces)
+                                raise StreamAborted(reason, Completion(
+                                    text, model, completion_tokens=len(text) // 4,
+                                    latency_s=time.perf_counter() - started))
+            finally:
+                response.close()
+
+        try:
+            await asyncio.wait_for(call(), self.timeout)
+        except asyncio.TimeoutError as exc:
+            raise BackendError(f"timed out after {self.timeout}s", retryable=True) from exc
+        text = "".join(pieces)
+        return Completion(
+            text=text,
+            model=model,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", len(text) // 4),
+            latency_s=time.perf_counter() - started,
+        )
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+async def with_retries(
+    call: Callable[[], Awaitable[T]],
+    *,
+    attempts: int = 5,
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+    rng: random.Random | None = None,
+) -> T:
+    """Await ``call()``, retrying retryable BackendErrors with full-jitter exponential backoff."""
+    rng = rng or random.Random()
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except BackendError as exc:
+            if not exc.retryable or attempt == attempts - 1:
+                raise
+            await asyncio.sleep(rng.uniform(0, min(max_delay, base_delay * 2**attempt)))
+    raise AssertionError("unreachable")
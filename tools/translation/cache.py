@@ -0,0 +1,203 @@
+"""Content-addressed disk cache of model completions.
+
+Entries are keyed by the SHA-256 of the rendered prompt, the model and the
+sampling parameters (seed included), and hold the raw completion plus the code
+extracted from it. The store is a SQLite database in WAL mode, so several worker
+processes can share one cache file; when the stored bytes exceed ``max_bytes``
+the least recently used entries are evicted. Hit/miss/eviction counts are kept
+both per instance and, cumulatively, in the database.
+
+Usage::
+
+    python -m tools.translation.cache            # print statistics
+    python -m tools.translation.cache --clear
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.dataset import REPO_ROOT
+from tools.translation.backend import Completion, CompletionRequest
+from tools.translation.extract import extract_code
+
+DEFAULT_CACHE_PATH = REPO_ROOT / "translations" / ".cache.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    completion TEXT NOT NULL,
+    code TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def cache_key(request: CompletionRequest) -> str:
+    """Hash of everything that determines a completion."""
+    material = {"prompt": request.prompt, "model": request.model, "params": asdict(request.params)}
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    completion: Completion
+    code: str
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of completions shared through a SQLite file."""
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.session = CacheStats()
+        self._local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross threads; keep one per thread
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self) -> _Transaction:
+        return _Transaction(self._connection())
+
+    def _bump(self, db: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        db.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get(self, request: CompletionRequest) -> CacheEntry | None:
+        key = cache_key(request)
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT model, completion, code, prompt_tokens, completion_tokens FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.session.misses += 1
+                self._bump(db, "misses")
+                return None
+            db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.session.hits += 1
+            self._bump(db, "hits")
+        model, text, code, prompt_tokens, completion_tokens = row
+        completion = Completion(text, model, prompt_tokens, completion_tokens, cached=True)
+        return CacheEntry(completion, code)
+
+    def put(self, request: CompletionRequest, completion: Completion, code: str | None = None) -> CacheEntry:
+        """Store a completion (and its extracted code), then evict down to ``max_bytes``."""
+        code = extract_code(completion.text) if code is None else code
+        size = len(completion.text.encode()) + len(code.encode())
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(request), completion.model, completion.text, code,
+                 completion.prompt_tokens, completion.completion_tokens, size, now, now),
+            )
+            self._evict(db)
+        return CacheEntry(completion, code)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self.session.evictions += evicted
+        self._bump(db, "evictions", evicted)
+
+    def stats(self) -> CacheStats:
+        """Cumulative statistics of the cache file."""
+        db = self._connection()
+        counters = dict(db.execute("SELECT name, value FROM stats").fetchall())
+        entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return CacheStats(counters.get("hits", 0), counters.get("misses", 0), counters.get("evictions", 0),
+                          entries, size)
+
+    def clear(self) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM entries")
+            db.execute("DELETE FROM stats")
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT``, so concurrent writers serialize cleanly."""
+
+    def __init__(self, db: sqlite3.Connection) -> None:
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type: type | None, *_: object) -> None:
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def format_stats(stats: CacheStats) -> str:
+    return (
+        f"{stats.hits} hits, {stats.misses} misses ({stats.hit_rate:.0%} hit rate), "
+        f"{stats.evictions} evictions, {stats.entries} entries, {stats.bytes / 1e6:.1f} MB"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", type=Path, default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--clear", action="store_true", help="drop every entry and counter")
+    args = parser.parse_args(argv)
+    cache = ResponseCache(args.path)
+    if args.clear:
+        cache.clear()
+    print(format_stats(cache.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Parallel ``puyapy`` compile check of translated contracts, cached by source hash.
+
+Starting the compiler (interpreter, ``puya`` and the ``algopy`` stubs) costs more
+than compiling one small contract, so candidates are compiled by a pool of
+long-lived worker processes that load the compiler once and then run it in
+process, one file after another, on every core. When ``puyapy`` is only
+available as an executable the workers fall back to one subprocess per file.
+
+Every result (approval/clear TEAL, bytecode, ARC-56 spec and the compiler's
+diagnostics) is stored in a SQLite file keyed by the SHA-256 of the source and
+the compiler version, so checking a file that did not change is a lookup. Two
+files with the same code share one entry whatever their names.
+
+Usage::
+
+    python -m tools.translation.compiler                      # every file under translations/
+    python -m tools.translation.compiler out/stub/FewShot -j 8
+    python -m tools.translation.compiler "Algorand Python Dataset" --no-cache
+    python -m tools.translation.runner --model gpt-4o --compile   # check each translation as it arrives
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from importlib import metadata
+from pathlib import Path
+
+from tools.dataset import REPO_ROOT
+
+DEFAULT_COMPILE_CACHE_PATH = REPO_ROOT / "translations" / ".compile.sqlite"
+
+#: Arguments every candidate is compiled with, part of the cache key
+PUYAPY_OPTIONS = ("--output-bytecode", "--output-arc56")
+
+#: Artifacts kept from the output directory
+ARTIFACT_SUFFIXES = (".teal", ".bin", ".arc56.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    diagnostics TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (key, name)
+);
+"""
+
+
+def compiler_version() -> str | None:
+    """Installed ``puyapy`` version, None when it is not installed."""
+    try:
+        return metadata.version("puyapy")
+    except metadata.PackageNotFoundError:
+        return "executable" if shutil.which("puyapy") else None
+
+
+def source_key(source: str, version: str) -> str:
+    material = "\x00".join([version, *PUYAPY_OPTIONS, source])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+@dataclass
+class CompileResult:
+    name: str
+    ok: bool
+    #: Compiler output with the scratch directory removed from paths
+    diagnostics: str
+    #: Output file name (``Auction.approval.teal``, ``Auction.arc56.json``, ...) -> content
+    artifacts: dict[str, bytes] = field(default_factory=dict)
+    #: Compile time, of the original compilation for a cached result
+    seconds: float = 0.0
+    cached: bool = False
+
+    @property
+    def first_error(self) -> str:
+        lines = [line for line in self.diagnostics.splitlines() if "error" in line.lower()]
+        return (lines or self.diagnostics.splitlines() or [""])[0].strip()
+
+    def teal(self, contract: str, program: str = "approval") -> str | None:
+        data = self.artifacts.get(f"{contract}.{program}.teal")
+        return None if data is None else data.decode()
+
+    def arc56(self, contract: str) -> str | None:
+        data = self.artifacts.get(f"{contract}.arc56.json")
+        return None if data is None else data.decode()
+
+
+@dataclass
+class CompileStats:
+    files: int = 0
+    cached: int = 0
+    failed: int = 0
+    #: Wall-clock time with at least one compile running, however it was submitted
+    seconds: float = 0.0
+
+    @property
+    def files_per_s(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+
+# ---- worker side: runs in the pool processes -------------------------------
+
+_entry_point = None
+
+
+def _load_compiler() -> None:
+    """Pool initializer: import the compiler once per worker, if it is importable."""
+    global _entry_point
+    # diagnostics go into repair prompts and the cache, so no colour escapes
+    os.environ["NO_COLOR"] = "1"
+    for script in metadata.entry_points(group="console_scripts", name="puyapy"):
+        try:
+            _entry_point = script.load()
+        except ImportError:
+            _entry_point = None
+
+
+def _run_in_process(argv: list[str]) -> tuple[int, str]:
+    # puyapy rewraps sys.stdout.buffer once per process, so output is captured at the file descriptors
+    try:
+        import structlog
+    except ImportError:
+        pass
+    else:
+        # puyapy configures its logging on every run, which structlog allows only once per process
+        structlog.reset_defaults()
+    saved_argv = sys.argv
+    sys.argv = ["puyapy", *argv]
+    with tempfile.TemporaryFile() as capture:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved = os.dup(1), os.dup(2)
+        os.dup2(capture.fileno(), 1)
+        os.dup2(capture.fileno(), 2)
+        try:
+            try:
+                _entry_point()
+                code = 0
+            except SystemExit as exc:
+                code = exc.code if isinstance(exc.code, int) else int(exc.code is not None)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, original in zip((1, 2), saved):
+                os.dup2(original, fd)
+                os.close(original)
+            sys.argv = saved_argv
+        capture.seek(0)
+        return code, capture.read().decode("utf-8", errors="replace")
+
+
+def _run_subprocess(argv: list[str]) -> tuple[int, str]:
+    puyapy = shutil.which("puyapy")
+    if puyapy is None:
+        raise RuntimeError("puyapy is not installed (pip install puyapy)")
+    result = subprocess.run([puyapy, *argv], capture_output=True, text=True, env={**os.environ, "NO_COLOR": "1"})
+    return result.returncode, result.stdout + result.stderr
+
+
+def _compile(name: str, source: str, in_process: bool) -> tuple[bool, str, dict[str, bytes], float]:
+    """Compile one source in a scratch directory; return ok, diagnostics, artifacts, seconds."""
+    with tempfile.TemporaryDirectory(prefix="puyapy-") as tmp:
+        scratch = Path(tmp)
+        path = scratch / f"{Path(name).stem or 'contract'}.py"
+        path.write_text(source, encoding="utf-8")
+        out_dir = scratch / "out"
+        argv = [str(path), "--out-dir", str(out_dir), *PUYAPY_OPTIONS]
+        started = time.perf_counter()
+        if in_process and _entry_point is not None:
+            code, diagnostics = _run_in_process(argv)
+        else:
+            code, diagnostics = _run_subprocess(argv)
+        seconds = time.perf_counter() - started
+        artifacts = {
+            item.name: item.read_bytes()
+            for item in sorted(out_dir.glob("*")) if item.is_file() and item.name.endswith(ARTIFACT_SUFFIXES)
+        }
+    return code == 0, diagnostics.replace(f"{scratch}/", ""), artifacts, seconds
+
+
+# ---- main process ----------------------------------------------------------
+
+
+class CompileStage:
+    """Pool of warm compiler workers in front of a source-hash result cache.
+
+    ``cache_path=None`` disables the cache; ``in_process=False`` runs the
+    ``puyapy`` executable for every file, the cold start this stage avoids.
+    """
+
+    def __init__(
+        self,
+        cache_path: Path | None = DEFAULT_COMPILE_CACHE_PATH,
+        jobs: int | None = None,
+        *,
+        in_process: bool = True,
+    ) -> None:
+        version = compiler_version()
+        if version is None:
+            raise RuntimeError("puyapy is not installed (pip install puyapy)")
+        self.version = version
+        self.in_process = in_process
+        self.session = CompileStats()
+        self._pool = ProcessPoolExecutor(max_workers=jobs, initializer=_load_compiler if in_process else None)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._busy_since = 0.0
+        self._db = None
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(cache_path, timeout=60, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self) -> CompileStage:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def lookup(self, key: str) -> tuple[bool, str, dict[str, bytes], float] | None:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT ok, diagnostics, seconds FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            artifacts = dict(self._db.execute("SELECT name, data FROM artifacts WHERE key = ?", (key,)).fetchall())
+        return bool(row[0]), row[1], artifacts, row[2]
+
+    def _store(self, key: str, ok: bool, diagnostics: str, artifacts: dict[str, bytes], seconds: float) -> None:
+        if self._db is None:
+            return
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, ok, diagnostics, seconds))
+            self._db.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            self._db.executemany("INSERT INTO artifacts VALUES (?, ?, ?)",
+                                 [(key, name, data) for name, data in artifacts.items()])
+
+    def submit(self, name: str, source: str) -> Future[CompileResult]:
+        """Compile ``source`` (``name`` labels the result) unless its result is cached."""
+        key = source_key(source, self.version)
+        result: Future[CompileResult] = Future()
+        if (hit := self.lookup(key)) is not None:
+            result.set_result(CompileResult(name, *hit, cached=True))
+            self._count(result.result())
+            return result
+
+        def done(job: Future) -> None:
+            with self._lock:
+                self._running -= 1
+                if not self._running:
+                    self.session.seconds += time.perf_counter() - self._busy_since
+            try:
+                outcome = job.result()
+            except Exception as exc:  # noqa: BLE001 - handed to the caller
+                result.set_exception(exc)
+                return
+            self._store(key, *outcome)
+            result.set_result(CompileResult(name, *outcome))
+            self._count(result.result())
+
+        with self._lock:
+            if not self._running:
+                self._busy_since = time.perf_counter()
+            self._running += 1
+        self._pool.submit(_compile, name, source, self.in_process).add_done_callback(done)
+        return result
+
+    def _count(self, result: CompileResult) -> None:
+        with self._lock:
+            self.session.files += 1
+            self.session.cached += result.cached
+            self.session.failed += not result.ok
+
+    def check(self, paths: list[Path]) -> list[CompileResult]:
+        """Compile every file concurrently; results in the order of ``paths``."""
+        futures = [self.submit(str(path), path.read_text(encoding="utf-8")) for path in paths]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+        if self._db is not None:
+            self._db.close()
+
+
+def format_stats(stats: CompileStats) -> str:
+    compiled = stats.files - stats.cached
+    return (f"{stats.files - stats.failed}/{stats.files} compile, {compiled} compiled, {stats.cached} from cache "
+            f"in {stats.seconds:.1f}s ({stats.files_per_s:.1f} files/s)")
+
+
+def _collect(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*.py") if not p.name.startswith(".")))
+        else:
+            files.append(path)
+    return files
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", type=Path, default=[REPO_ROOT / "translations"],
+                        help="Algorand Python files or directories (default: translations/)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_COMPILE_CACHE_PATH, help="result cache file")
+    parser.add_argument("--no-cache", action="store_true", help="compile every file")
+    parser.add_argument("--cold", action="store_true", help="start puyapy for every file instead of warm workers")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the diagnostics of failing files")
+    args = parser.parse_args(argv)
+
+    files = _collect(args.paths)
+    try:
+        stage = CompileStage(None if args.no_cache else args.cache, args.jobs, in_process=not args.cold)
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    with stage:
+        results = stage.check(files)
+    for result in results:
+        if not result.ok:
+            print(f"FAIL {result.name}: {result.first_error}")
+            if args.verbose:
+                print(result.diagnostics)
+    print(format_stats(stage.session))
+    return 1 if stage.session.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Strip non-semantic text from Solidity sources before they are sent to a model.
+
+Two levels, each keeping every code token:
+
+``comments``  drop comments and NatSpec (SPDX line included), trailing spaces
+              and runs of blank lines
+``layout``    additionally drop blank lines and indent one space per brace level
+
+With ``verify=True`` the compressed source is parsed again and must give the
+same declarations and code tokens as the original (:mod:`tools.translation.solidity`),
+otherwise :class:`SolidityError` is raised. The command line reports the tokens
+saved per contract and, summed over the contracts, per prompt style::
+
+    python -m tools.translation.compress --level layout --tokenizer words --verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass
+
+from tools.dataset import prompt_files, solidity_contracts
+from tools.translation.solidity import COMMENT_KINDS, SolidityError, parse, tokenize
+from tools.translation.templates import load_template
+from tools.translation.tokens import Tokenizer, get_tokenizer
+
+LEVELS = ("none", "comments", "layout")
+
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def _strip_comments(source: str) -> str:
+    pieces = []
+    position = 0
+    for token in tokenize(source):
+        if token.kind not in COMMENT_KINDS:
+            continue
+        pieces.append(source[position : token.start])
+        before = source[token.start - 1] if token.start else " "
+        after = source[token.end] if token.end < len(source) else " "
+        # keep the tokens on either side of an inline comment apart
+        if not before.isspace() and not after.isspace():
+            pieces.append(" ")
+        position = token.end
+    pieces.append(source[position:])
+    lines = [line.rstrip() for line in "".join(pieces).split("\n")]
+    original = source.split("\n")
+    # lines that held only a comment disappear instead of leaving a blank line
+    if len(lines) == len(original):
+        lines = [line for line, before in zip(lines, original) if line or not before.strip()]
+    return _BLANK_RUNS.sub("\n\n", "\n".join(lines)).strip() + "\n"
+
+
+def _reindent(source: str) -> str:
+    lines = []
+    depth = 0
+    for line in source.split("\n"):
+        code = line.strip()
+        if not code:
+            continue
+        # braces inside strings would skew the depth, so count code tokens only
+        braces = [t.text for t in tokenize(code, comments=False) if t.kind == "punct" and t.text in "{}"]
+        leading = len(code) - len(code.lstrip("}"))
+        lines.append(" " * max(depth - leading, 0) + code)
+        depth += braces.count("{") - braces.count("}")
+    return "\n".join(lines) + "\n"
+
+
+def same_ast(original: str, compressed: str) -> bool:
+    """Whether both sources have the same declarations and code token stream."""
+    if parse(original) != parse(compressed):
+        return False
+    code = [t.text for t in tokenize(original, comments=False)]
+    return code == [t.text for t in tokenize(compressed, comments=False)]
+
+
+def compress_source(source: str, level: str = "comments", *, verify: bool = False) -> str:
+    """Compress ``source`` at ``level``; with ``verify`` check the result parses identically."""
+    if level not in LEVELS:
+        raise ValueError(f"unknown compression level {level!r}; expected one of {', '.join(LEVELS)}")
+    if level == "none":
+        return source
+    compressed = _strip_comments(source)
+    if level == "layout":
+        compressed = _reindent(compressed)
+    if verify and not same_ast(source, compressed):
+        raise SolidityError("compressed source does not parse to the same AST")
+    return compressed
+
+
+@dataclass
+class Saving:
+    contract: str
+    prompt: str
+    before: int
+    after: int
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+
+def measure(contracts: list, prompts: list, tokenizer: Tokenizer, level: str, verify: bool) -> list[Saving]:
+    """Tokens of each source (prompt ``""``) and each rendered prompt, before and after compression."""
+    savings = []
+    for path in contracts:
+        source = path.read_text(encoding="utf-8")
+        compressed = compress_source(source, level, verify=verify)
+        savings.append(Saving(path.name, "", tokenizer.count(source), tokenizer.count(compressed)))
+        for prompt in prompts:
+            template = load_template(prompt)
+            savings.append(Saving(path.name, prompt.name, tokenizer.count(template.render(target=source)),
+                                  tokenizer.count(template.render(target=compressed))))
+    return savings
+
+
+def _percent(saved: int, before: int) -> str:
+    return f"{saved / before:.1%}" if before else "-"
+
+
+def format_savings(savings: list[Saving]) -> str:
+    lines = [f"{'contract':<22} {'source':>8} {'compressed':>10} {'saved':>7}"]
+    for s in savings:
+        if not s.prompt:
+            lines.append(f"{s.contract:<22} {s.before:>8} {s.after:>10} {_percent(s.saved, s.before):>7}")
+    prompts = sorted({s.prompt for s in savings if s.prompt})
+    if prompts:
+        lines.append("")
+        lines.append(f"{'prompt (all contracts)':<22} {'before':>8} {'after':>10} {'saved':>7}")
+        for prompt in prompts:
+            before = sum(s.before for s in savings if s.prompt == prompt)
+            after = sum(s.after for s in savings if s.prompt == prompt)
+            lines.append(f"{prompt:<22} {before:>8} {after:>10} {_percent(before - after, before):>7}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--level", choices=LEVELS, default="comments")
+    parser.add_argument("--tokenizer", default="approx", help="approx, words or tiktoken[:<encoding>]")
+    parser.add_argument("--verify", action="store_true", help="check each compressed source parses identically")
+    parser.add_argument("--contracts", action="append", help="Solidity file glob")
+    parser.add_argument("--prompts", action="append", help="prompt file glob")
+    parser.add_argument("--json", action="store_true", help="print every measurement as JSON")
+    args = parser.parse_args(argv)
+
+    def select(paths: list, patterns: list[str] | None) -> list:
+        return [p for p in paths if not patterns or any(fnmatch.fnmatch(p.name, g) for g in patterns)]
+
+    try:
+        savings = measure(select(solidity_contracts(), args.contracts), select(prompt_files(), args.prompts),
+                          get_tokenizer(args.tokenizer), args.level, args.verify)
+    except (SolidityError, RuntimeError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps([asdict(s) | {"saved": s.saved} for s in savings], indent=2))
+    else:
+        print(format_savings(savings))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""Pull the Algorand Python code out of a model completion."""
+
+from __future__ import annotations
+
+import re
+
+_CODE_BLOCK_RE = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.S)
+
+
+def extract_code(completion: str) -> str:
+    """Longest fenced Python block of a completion, or the completion itself."""
+    blocks = _CODE_BLOCK_RE.findall(completion)
+    return max(blocks, key=len) if blocks else completion
@@ -0,0 +1,190 @@
+"""Retrieval of few-shot examples from the dataset's own Solidity/Algorand pairs.
+
+Every pair from :func:`tools.dataset.contract_pairs` is described by a small
+vector of structural features of its Solidity side (mappings, modifiers,
+payable functions, events, loops, ...). For a target contract the index returns
+the ``k`` most similar pairs (cosine similarity) whose formatted examples fit in
+a token budget, skipping the pair whose Solidity source is the target itself.
+Redesigns (``tools.dataset.REDESIGNS``) are not indexed: their Algorand side
+has another ABI than the Solidity one, so it would not teach a translation.
+
+The index is stored as JSON next to the translations and rebuilt
+incrementally: only pairs whose files changed are re-read. Lookups are a dot
+product per pair over precomputed unit vectors.
+
+Usage::
+
+    python -m tools.translation.fewshot "Solidity dataset/bankingE.sol" -k 2 --budget 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.dataset import REPO_ROOT, contract_pairs
+from tools.translation.templates import FewShotExample
+from tools.translation.tokens import approx_tokens
+
+DEFAULT_INDEX_PATH = REPO_ROOT / "translations" / ".fewshot_index.json"
+
+#: Bump when the feature set changes so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+#: Structural features of a Solidity source. Every pattern starts with a
+#: literal so the regex engine can skip ahead to candidate positions.
+FEATURES: dict[str, tuple[str, ...]] = {
+    "functions": (r"function\s+\w",),
+    "mappings": (r"mapping\s*\(",),
+    "nested_mappings": (r"=>\s*mapping\s*\(",),
+    "modifiers": (r"modifier\s+\w",),
+    "payable": (r"payable\b",),
+    "msg_value": (r"msg\.value\b",),
+    "transfers": (r"\.transfer\s*\(", r"\.send\s*\(", r"\.call\s*\{\s*value"),
+    "events": (r"event\s+\w",),
+    "emits": (r"emit\s+\w",),
+    "loops": (r"for\s*\(", r"while\s*\("),
+    "structs": (r"struct\s+\w",),
+    "enums": (r"enum\s+\w",),
+    "arrays": (r"\[\s*\]",),
+    "requires": (r"require\s*\(", r"assert\s*\(", r"revert\s*\("),
+    "time": (r"block\.number\b", r"block\.timestamp\b", r"now\b"),
+    "inheritance": (r"contract\s+\w+\s+is\b",),
+    "interfaces": (r"interface\s+\w",),
+    "strings": (r"string\b",),
+    "hashing": (r"keccak256\s*\(", r"sha256\s*\(", r"sha3\s*\("),
+    "tokens": (r"balanceOf\b", r"totalSupply\b", r"allowance\b"),
+}
+
+_FEATURE_PATTERNS = {name: [re.compile(p) for p in patterns] for name, patterns in FEATURES.items()}
+
+
+def structural_features(source: str) -> dict[str, int]:
+    """Count each structural feature in a Solidity source."""
+    return {name: sum(len(p.findall(source)) for p in patterns) for name, patterns in _FEATURE_PATTERNS.items()}
+
+
+def _unit_vector(features: dict[str, int]) -> list[float]:
+    # log scaling keeps one long contract from dominating on raw counts
+    vector = [math.log1p(features.get(name, 0)) for name in FEATURES]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@dataclass
+class IndexEntry:
+    solidity: str
+    algorand: str
+    solidity_sha: str
+    algorand_sha: str
+    features: dict[str, int]
+    tokens: int
+
+    def example(self) -> FewShotExample:
+        return FewShotExample(
+            (REPO_ROOT / self.solidity).read_text(encoding="utf-8").strip(),
+            (REPO_ROOT / self.algorand).read_text(encoding="utf-8").strip(),
+        )
+
+
+@dataclass(frozen=True)
+class Match:
+    entry: IndexEntry
+    score: float
+
+
+class FewShotIndex:
+    """Structural-similarity index over the dataset's translation pairs."""
+
+    def __init__(self, entries: list[IndexEntry]) -> None:
+        self.entries = entries
+        self._vectors = [_unit_vector(entry.features) for entry in entries]
+
+    @classmethod
+    def build(cls, path: Path | None = DEFAULT_INDEX_PATH,
+              pairs: list[tuple[Path, Path]] | None = None) -> FewShotIndex:
+        """Load the index at ``path``, re-reading only pairs whose files changed, and save it."""
+        previous: dict[tuple[str, str], IndexEntry] = {}
+        if path is not None and path.is_file():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                previous = {(e["solidity"], e["algorand"]): IndexEntry(**e) for e in data["entries"]}
+        entries = []
+        for solidity_path, algorand_path in contract_pairs(redesigns=False) if pairs is None else pairs:
+            solidity = solidity_path.read_text(encoding="utf-8")
+            algorand = algorand_path.read_text(encoding="utf-8")
+            key = (solidity_path.relative_to(REPO_ROOT).as_posix(), algorand_path.relative_to(REPO_ROOT).as_posix())
+            entry = previous.get(key)
+            if entry is None or entry.solidity_sha != _digest(solidity) or entry.algorand_sha != _digest(algorand):
+                entry = IndexEntry(*key, _digest(solidity), _digest(algorand), structural_features(solidity),
+                                   approx_tokens(solidity) + approx_tokens(algorand))
+            entries.append(entry)
+        index = cls(entries)
+        if path is not None and entries != list(previous.values()):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({"version": INDEX_VERSION, "entries": [asdict(e) for e in entries]}),
+                            encoding="utf-8")
+        return index
+
+    def select(self, source: str, k: int = 2, budget: int | None = None) -> list[Match]:
+        """The ``k`` pairs most similar to ``source`` whose examples fit in ``budget`` tokens."""
+        target = _unit_vector(structural_features(source))
+        target_sha = _digest(source)
+        # a translation paired with the target itself would give the answer away
+        own = {entry.algorand for entry in self.entries if entry.solidity_sha == target_sha}
+        scored = sorted(
+            (
+                Match(entry, sum(a * b for a, b in zip(target, vector)))
+                for entry, vector in zip(self.entries, self._vectors)
+                if entry.algorand not in own
+            ),
+            key=lambda match: match.score,
+            reverse=True,
+        )
+        chosen: list[Match] = []
+        spent = 0
+        for match in scored:
+            if len(chosen) == k:
+                break
+            if budget is not None and spent + match.entry.tokens > budget:
+                continue
+            chosen.append(match)
+            spent += match.entry.tokens
+        return chosen
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("contract", type=Path, help="Solidity file to find examples for")
+    parser.add_argument("-k", type=int, default=2, help="examples to select")
+    parser.add_argument("--budget", type=int, default=None, help="token budget for the examples")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    index = FewShotIndex.build(args.index)
+    built = time.perf_counter() - started
+    source = args.contract.read_text(encoding="utf-8")
+    rounds = 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        matches = index.select(source, args.k, args.budget)
+    lookup = (time.perf_counter() - started) / rounds
+    print(f"{len(index.entries)} pairs indexed in {built * 1e3:.1f} ms; lookup {lookup * 1e6:.0f} us")
+    for match in matches:
+        print(f"  {match.score:.3f}  {match.entry.tokens:>6} tokens  {match.entry.solidity} -> {match.entry.algorand}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Incremental re-translation of edited Solidity contracts.
+
+Each piece of a split contract gets a fingerprint over the code tokens it
+depends on (comments and layout do not count):
+
+* a function: its own tokens, the declarations it names (state variables,
+  modifiers, events, structs, ...) and the headers of the functions it calls;
+* the context: every shared declaration.
+
+After a split translation the runner stores each piece's translation and
+fingerprint next to the output (``<contract>.pieces.json``). With
+``--incremental`` a later run compares the new fingerprints with the stored
+ones and requests only the pieces that changed: an edited function body
+re-translates that function, and an edited state variable re-translates the
+context and the functions that use it, nothing else. The stored translations of
+the other pieces are reassembled with the new ones into the output file.
+
+``python -m tools.translation.incremental OLD.sol NEW.sol`` prints the plan for
+an edit without translating anything::
+
+    python -m tools.translation.incremental "Solidity dataset/Ownable.sol" edited/Ownable.sol
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tools.translation.solidity import SolidityError
+from tools.translation.split import CONTEXT, SplitContract, split_contract
+
+SIDECAR_SUFFIX = ".pieces.json"
+
+#: Bumped when fingerprints are computed differently, which invalidates every sidecar
+SIDECAR_VERSION = 1
+
+
+def _digest(*parts: tuple[str, ...]) -> str:
+    hasher = hashlib.sha256()
+    for tokens in parts:
+        hasher.update(b"\x00".join(token.encode() for token in tokens))
+        hasher.update(b"\x01")
+    return hasher.hexdigest()
+
+
+def dependencies(split: SplitContract) -> dict[str, set[str]]:
+    """Names of the declarations and functions each function piece refers to."""
+    declared = {member.name for member in split.context_members if member.name}
+    functions = {piece.member.name: piece.name for piece in split.functions}
+    result = {}
+    for piece in split.functions:
+        names = set(piece.member.tokens[1:])
+        called = {functions[n] for n in names & functions.keys()} - {piece.name}
+        result[piece.name] = (names & declared) | called
+    return result
+
+
+def _declaration_digests(split: SplitContract) -> dict[str, str]:
+    """Digest of each shared declaration, and of each function's header by piece name.
+
+    A callee's body may change freely; only its signature shapes the call.
+    """
+    digests = {member.name: _digest(member.tokens) for member in split.context_members if member.name}
+    digests.update({piece.name: _digest(piece.member.header) for piece in split.functions})
+    return digests
+
+
+def fingerprints(split: SplitContract) -> dict[str, str]:
+    """Piece name -> digest of the tokens its translation depends on."""
+    digests = _declaration_digests(split)
+    result = {CONTEXT: _digest(*(member.tokens for member in split.context_members))}
+    for piece, (name, names) in zip(split.functions, dependencies(split).items()):
+        result[name] = _digest(piece.member.tokens, tuple(f"{n}:{digests[n]}" for n in sorted(names)))
+    return result
+
+
+@dataclass
+class Plan:
+    """Which pieces of a contract to translate again and which to keep."""
+
+    #: Piece name -> why it has to be translated again
+    stale: dict[str, str] = field(default_factory=dict)
+    #: Piece name -> the stored translation that is still valid
+    reuse: dict[str, str] = field(default_factory=dict)
+    #: Pieces of the previous translation the contract no longer has
+    removed: list[str] = field(default_factory=list)
+
+
+def plan(split: SplitContract, previous: dict | None) -> Plan:
+    """Compare ``split`` with a sidecar written by :func:`sidecar` (None: translate everything)."""
+    current = fingerprints(split)
+    if previous is None or previous.get("version") != SIDECAR_VERSION:
+        return Plan(stale={name: "new" for name in current})
+    stored = previous["pieces"]
+    result = Plan(removed=sorted(stored.keys() - current.keys()))
+    digests = _declaration_digests(split)
+    members = {piece.name: piece.member for piece in split.functions}
+    for name, fingerprint in current.items():
+        if name not in stored:
+            result.stale[name] = "new"
+        elif stored[name]["fingerprint"] == fingerprint:
+            result.reuse[name] = stored[name]["code"]
+        elif name == CONTEXT:
+            result.stale[name] = "shared declarations changed"
+        elif stored[name].get("body") != _digest(members[name].tokens):
+            result.stale[name] = "body changed"
+        else:
+            before = stored[name].get("dependencies", {})
+            moved = sorted(n for n in before.keys() | dependencies(split)[name] if before.get(n) != digests.get(n))
+            result.stale[name] = f"depends on {', '.join(moved)}"
+    return result
+
+
+def sidecar(split: SplitContract, codes: dict[str, str]) -> dict:
+    """The record :func:`plan` compares the next version of the contract against."""
+    current = fingerprints(split)
+    digests = _declaration_digests(split)
+    depends = dependencies(split)
+    members = {piece.name: piece.member for piece in split.functions}
+    pieces = {}
+    for name, code in codes.items():
+        entry = {"fingerprint": current[name], "code": code}
+        if name != CONTEXT:
+            entry["body"] = _digest(members[name].tokens)
+            entry["dependencies"] = {n: digests[n] for n in sorted(depends[name])}
+        pieces[name] = entry
+    return {"version": SIDECAR_VERSION, "contract": split.name, "pieces": pieces}
+
+
+def sidecar_path(output: Path) -> Path:
+    return output.with_name(output.stem + SIDECAR_SUFFIX)
+
+
+def load_sidecar(output: Path) -> dict | None:
+    path = sidecar_path(output)
+    if not path.is_file():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return None
+
+
+def write_sidecar(output: Path, record: dict) -> None:
+    sidecar_path(output).write_text(json.dumps(record, indent=1) + "\n", encoding="utf-8")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old", type=Path, help="Solidity source the existing translation was made from")
+    parser.add_argument("new", type=Path, help="edited Solidity source")
+    parser.add_argument("--contract", help="contract to compare (default: the last in each file)")
+    args = parser.parse_args(argv)
+
+    try:
+        old = split_contract(args.old.read_text(encoding="utf-8"), args.contract)
+        new = split_contract(args.new.read_text(encoding="utf-8"), args.contract)
+    except SolidityError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    result = plan(new, sidecar(old, {piece.name: "" for piece in old.pieces}))
+    for name, reason in result.stale.items():
+        print(f"translate {name}: {reason}")
+    for name in result.reuse:
+        print(f"keep      {name}")
+    for name in result.removed:
+        print(f"remove    {name}")
+    print(f"{len(result.stale)} of {len(result.stale) + len(result.reuse)} pieces to translate")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""Translation memory of Solidity functions, keyed by a normalized AST hash.
+
+A function is normalized by renaming every user identifier to its order of
+first appearance (``$0``, ``$1``, ...) and replacing every literal by a
+placeholder, keeping keywords, types and globals such as ``msg.sender``. The
+declarations the function refers to (state variables, modifiers, events,
+structs) are normalized with the same renaming and appended, so ``onlyOwner``
+over an ``address owner`` and ``onlyCreator`` over an ``address creator``
+share a key, while the same body over a mapping does not.
+
+Stored translations are templates: each identifier and literal of the original
+function is replaced, in the Python code, by a slot for its position, matching
+the name as written, in snake_case and with surrounding underscores dropped.
+A hit fills the slots with the new function's identifiers and literals. A hit
+whose identifier or literal differs from the stored one but never appeared in
+the stored translation could not be rebound safely, and counts as a miss.
+
+Only translations whose contract compiled are stored, so the runner checks
+every translation with puyapy when it uses the memory (``--memory``). Within
+a run, a translation is offered to other cells as soon as it arrives, before
+its contract is checked, so a function repeated across cells is requested
+once; offered translations are forgotten with the run. The memory is a
+SQLite file next to the translations.
+
+Usage::
+
+    python -m tools.translation.runner --model gpt-4o --split --memory
+    python -m tools.translation.memory        # stored functions and lifetime hits
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import json
+import keyword
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from tools.dataset import REPO_ROOT
+from tools.translation.solidity import Member
+
+DEFAULT_MEMORY_PATH = REPO_ROOT / "translations" / ".memory.sqlite"
+
+#: Names that keep their meaning across contracts and are never renamed
+RESERVED = frozenset("""
+    abstract address anonymous as assembly assert bool break byte bytes calldata catch constant constructor
+    continue contract delete do else emit enum error event external fallback false for function if immutable
+    import indexed interface internal is library mapping memory modifier new override payable pragma private
+    public pure receive return returns revert require storage string struct super this throw true try type
+    unchecked using var view virtual while
+    msg sender value data sig gas block number timestamp coinbase difficulty gaslimit chainid basefee
+    tx origin gasprice now abi encode encodePacked encodeWithSelector encodeWithSignature decode
+    keccak256 sha256 sha3 ripemd160 ecrecover addmod mulmod selfdestruct suicide gasleft blockhash
+    balance transfer send call delegatecall staticcall code codehash length push pop
+    wei gwei ether seconds minutes hours days weeks years
+""".split())
+
+_IDENT = re.compile(r"[A-Za-z_$][\w$]*")
+_ELEMENTARY = re.compile(r"(?:u?int|bytes|fixed|ufixed)\d*(?:x\d+)?")
+_SLOT = "\x00{}\x00"
+_SLOT_RE = re.compile("\x00(\\d+)\x00")
+
+
+def _is_reserved(token: str) -> bool:
+    return token in RESERVED or _ELEMENTARY.fullmatch(token) is not None
+
+
+def _is_literal(token: str) -> bool:
+    return token[0] in "\"'0123456789" or token.startswith(("hex\"", "hex'", "unicode\"")) or (
+        token[0] == "." and token[1:2].isdigit()
+    )
+
+
+def snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+@dataclass(frozen=True)
+class Normalized:
+    key: str
+    #: Identifiers and literals in order of first appearance, as written in Solidity
+    bindings: tuple[str, ...]
+
+
+def normalize(function: Member, context: tuple[Member, ...] = ()) -> Normalized:
+    """Hash ``function`` with identifiers renamed and literals abstracted."""
+    declarations = {member.name: member for member in context if member.name}
+    bindings: dict[str, int] = {}
+    normalized: list[str] = []
+    pending = [function]
+    seen = {id(function)}
+    while pending:
+        member = pending.pop(0)
+        normalized.append(f"<{member.kind}>")
+        for token in member.tokens:
+            if _is_literal(token):
+                slot = bindings.setdefault(token, len(bindings))
+                normalized.append(f"#{slot}")
+            elif _IDENT.fullmatch(token) and not _is_reserved(token):
+                slot = bindings.setdefault(token, len(bindings))
+                normalized.append(f"${slot}")
+                referenced = declarations.get(token)
+                if referenced is not None and id(referenced) not in seen:
+                    seen.add(id(referenced))
+                    pending.append(referenced)
+            else:
+                normalized.append(token)
+    key = hashlib.sha256(" ".join(normalized).encode()).hexdigest()
+    return Normalized(key, tuple(bindings))
+
+
+def _variants(binding: str) -> list[tuple[str, str]]:
+    """(style, spelling) pairs under which a Solidity name may appear in the translation."""
+    if _is_literal(binding):
+        if binding[0] in "\"'":
+            inner = binding[1:-1]
+            return [("string", inner)] if len(inner) >= 3 else []
+        return [("number", binding)] if binding not in ("0", "1") else []
+    spellings: dict[str, str] = {}
+    for style in ("exact", "snake", "bare"):
+        spellings.setdefault(_spell(style, binding), style)
+    # a parameter named ``from`` must not capture the imports
+    return [(style, spelling) for spelling, style in spellings.items()
+            if spelling and not keyword.iskeyword(spelling)]
+
+
+_STYLES = ("exact", "snake", "bare", "string", "number")
+
+
+def _spell(style: str, binding: str) -> str:
+    if style == "string":
+        return binding[1:-1]
+    if style == "snake":
+        return snake_case(binding)
+    if style == "bare":
+        return snake_case(binding.strip("_"))
+    return binding
+
+
+def make_template(code: str, bindings: tuple[str, ...]) -> tuple[str, set[int]]:
+    """Replace the bindings' spellings in ``code`` by slots; return the bindings located."""
+    candidates = []
+    for index, binding in enumerate(bindings):
+        for style, spelling in _variants(binding):
+            candidates.append((spelling, index, style))
+    # longest spellings first so ``owner`` does not split ``new_owner``
+    candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+    located: set[int] = set()
+    for spelling, index, style in candidates:
+        pattern = re.escape(spelling) if style == "string" else rf"(?<![\w$]){re.escape(spelling)}(?![\w$])"
+        slot = _SLOT.format(index * len(_STYLES) + _STYLES.index(style))
+        # odd parts are slot numbers already placed and must not be matched again
+        parts = _SLOT_RE.split(code)
+        for i in range(0, len(parts), 2):
+            parts[i], count = re.subn(pattern, slot, parts[i])
+            if count:
+                located.add(index)
+        code = "".join(part if i % 2 == 0 else _SLOT.format(part) for i, part in enumerate(parts))
+    return code, located
+
+
+def fill_template(template: str, bindings: tuple[str, ...]) -> str:
+    def fill(match: re.Match) -> str:
+        index, style = divmod(int(match.group(1)), len(_STYLES))
+        return _spell(_STYLES[style], bindings[index])
+
+    return _SLOT_RE.sub(fill, template)
+
+
+@dataclass
+class MemoryStats:
+    lookups: int = 0
+    hits: int = 0
+    tokens_saved: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS functions (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    bindings TEXT NOT NULL,
+    template TEXT NOT NULL,
+    located TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+);
+"""
+
+
+class TranslationMemory:
+    """Validated function translations shared through a SQLite file."""
+
+    def __init__(self, path: Path = DEFAULT_MEMORY_PATH) -> None:
+        self.path = path
+        self.session = MemoryStats()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        #: Translations offered during this run, as rows of the table
+        self._offered: dict[tuple[str, str], tuple[str, str, str, int]] = {}
+
+    def lookup(self, scope: str, normalized: Normalized) -> str | None:
+        """The translation stored or offered under ``scope``, rebound to ``normalized.bindings``; or None."""
+        self.session.lookups += 1
+        row = self._db.execute(
+            "SELECT bindings, template, located, tokens FROM functions WHERE scope = ? AND key = ?",
+            (scope, normalized.key),
+        ).fetchone()
+        if row is None:
+            row = self._offered.get((scope, normalized.key))
+        if row is None:
+            return None
+        stored, template, located, tokens = json.loads(row[0]), row[1], set(json.loads(row[2])), row[3]
+        for index, (old, new) in enumerate(zip(stored, normalized.bindings)):
+            if old != new and index not in located:
+                return None
+        code = fill_template(template, normalized.bindings)
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            # a binding rebound into a spot where its new spelling is not valid Python
+            return None
+        self.session.hits += 1
+        self.session.tokens_saved += tokens
+        with self._db:
+            self._db.execute("UPDATE functions SET hits = hits + 1 WHERE scope = ? AND key = ?",
+                             (scope, normalized.key))
+        return code
+
+    def offer(self, scope: str, normalized: Normalized, code: str, tokens: int) -> None:
+        """Share ``code`` with the rest of the run, without storing it."""
+        template, located = make_template(code, normalized.bindings)
+        self._offered[(scope, normalized.key)] = (
+            json.dumps(normalized.bindings), template, json.dumps(sorted(located)), tokens)
+
+    def store(self, scope: str, normalized: Normalized, code: str, tokens: int | None = None) -> None:
+        """Remember ``code`` as the translation of the normalized function; ``tokens`` it cost.
+
+        Without ``tokens`` the cost already known for the function is kept, for
+        a translation that replaces one taken from the memory.
+        """
+        if tokens is None:
+            row = self._db.execute("SELECT tokens FROM functions WHERE scope = ? AND key = ?",
+                                   (scope, normalized.key)).fetchone()
+            offered = self._offered.get((scope, normalized.key))
+            tokens = row[0] if row is not None else offered[3] if offered is not None else 0
+        template, located = make_template(code, normalized.bindings)
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO functions (scope, key, bindings, template, located, tokens)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (scope, normalized.key, json.dumps(normalized.bindings), template, json.dumps(sorted(located)), tokens),
+            )
+
+    def forget(self, scope: str, normalized: Normalized) -> None:
+        """Drop the translation of the normalized function, stored or offered."""
+        self._offered.pop((scope, normalized.key), None)
+        with self._db:
+            self._db.execute("DELETE FROM functions WHERE scope = ? AND key = ?", (scope, normalized.key))
+
+    def totals(self) -> tuple[int, int, int]:
+        """Stored functions, lifetime hits and lifetime tokens saved."""
+        return self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * tokens), 0) FROM functions"
+        ).fetchone()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def format_stats(stats: MemoryStats) -> str:
+    return (f"{stats.hits}/{stats.lookups} functions from memory ({stats.hit_rate:.0%}), "
+            f"{stats.tokens_saved} tokens saved")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", type=Path, default=DEFAULT_MEMORY_PATH)
+    args = parser.parse_args(argv)
+    memory = TranslationMemory(args.path)
+    functions, hits, saved = memory.totals()
+    print(f"{functions} functions stored, {hits} hits, {saved} tokens saved")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
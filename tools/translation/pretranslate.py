@@ -0,0 +1,834 @@
+"""Rule-based translation of the mechanical parts of a Solidity contract.
+
+Much of every translation in ``Algorand Python Dataset/`` follows fixed
+idioms: ``require`` becomes ``assert``, ``msg.sender`` becomes ``Txn.sender``,
+``mapping(address => uint)`` becomes ``BoxMap(Account, UInt64)``, events become
+``arc4.Struct`` classes passed to ``arc4.emit`` and modifiers become
+``@subroutine`` checks called at the top of the method (``ownableA.py``,
+``recoverableA.py``). :func:`pretranslate` applies these rules to the pieces of
+a :class:`~tools.translation.split.SplitContract`:
+
+* the context (state, events, modifiers, parameterless constructor) becomes the
+  module and contract class, with state initialised in ``__init__``;
+* each function whose every statement matches a rule becomes a snippet the
+  runner can pass to :func:`~tools.translation.split.assemble` unchanged.
+
+Anything the rules do not cover (loops, arrays, structs, payable functions,
+external calls, ...) makes its piece *residual*; residual pieces are the only
+ones sent to the model. If the context itself is residual, every piece is, so
+state, event and modifier names always come from the same translation; a
+function calling a residual subroutine is residual too, so the model names
+the subroutine and its callers in one translation. Names
+follow the dataset: snake_case, with the underscores around ``_OWNER_``-style
+names dropped.
+
+Usage::
+
+    python -m tools.translation.pretranslate                  # coverage per contract
+    python -m tools.translation.pretranslate --show Ownable.sol
+    python -m tools.translation.runner --model gpt-4o --pretranslate
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import keyword
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tools.dataset import solidity_contracts
+from tools.translation.solidity import Member, SolidityError
+from tools.translation.split import CONTEXT, SplitContract, assemble, split_contract
+
+
+class Residual(Exception):
+    """A construct no rule covers; the piece containing it goes to the model."""
+
+
+#: Kind of an elementary Solidity type -> (native type, ARC-4 type, zero value)
+_KINDS = {
+    "account": ("Account", "arc4.Address", "Global.zero_address"),
+    "uint": ("UInt64", "arc4.UInt64", "UInt64(0)"),
+    "bool": ("bool", "arc4.Bool", "False"),
+    "string": ("String", "arc4.String", "String()"),
+    "bytes": ("Bytes", "arc4.DynamicBytes", "Bytes()"),
+}
+
+_TIME_UNITS = {"seconds": 1, "minutes": 60, "hours": 3600, "days": 86400, "weeks": 604800}
+_DECLARATION_KEYWORDS = frozenset({"public", "private", "internal", "constant", "immutable", "override"})
+_ALGOPY_NAMES = ("Account", "ARC4Contract", "BoxMap", "Bytes", "Global", "String", "Txn", "UInt64", "arc4", "op",
+                 "subroutine")
+
+
+def _kind(type_name: str) -> str:
+    """Kind of an elementary Solidity type; :class:`Residual` for anything else."""
+    if type_name in ("address", "address payable"):
+        return "account"
+    if re.fullmatch(r"uint\d*", type_name):
+        return "uint"
+    if type_name in ("bool", "string"):
+        return type_name
+    if re.fullmatch(r"bytes\d*", type_name):
+        return "bytes"
+    raise Residual(f"type {type_name}")
+
+
+def python_name(name: str) -> str:
+    """``_NEW_OWNER_`` -> ``new_owner``, ``transferOwnership`` -> ``transfer_ownership``."""
+    snake = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name.strip("_") or name).lower()
+    return snake + "_" if keyword.iskeyword(snake) else snake
+
+
+@dataclass(frozen=True)
+class _State:
+    name: str
+    kind: str
+    #: Key kinds of a (nested) ``mapping``, empty for a plain variable
+    keys: tuple[str, ...] = ()
+    constant: bool = False
+
+    @property
+    def target(self) -> str:
+        return self.name if self.constant else f"self.{self.name}"
+
+
+@dataclass(frozen=True)
+class _Expr:
+    text: str
+    kind: str
+    #: Python precedence: 1 or, 2 and, 3 not, 4 comparison, 5..10 operators, 12 power, 13 atom
+    precedence: int = 13
+    literal: bool = False
+
+
+_BINARY = {
+    # Solidity operator: (binding power, Python operator, Python precedence)
+    "||": (1, "or", 1), "&&": (2, "and", 2),
+    "==": (3, "==", 4), "!=": (3, "!=", 4),
+    "<": (4, "<", 4), ">": (4, ">", 4), "<=": (4, "<=", 4), ">=": (4, ">=", 4),
+    "|": (5, "|", 5), "^": (6, "^", 6), "&": (7, "&", 7), "<<": (8, "<<", 8), ">>": (8, ">>", 8),
+    "+": (9, "+", 9), "-": (9, "-", 9), "*": (10, "*", 10), "/": (10, "//", 10), "%": (10, "%", 10),
+    "**": (11, "**", 12),
+}
+_COMPARISONS = frozenset({"==", "!=", "<", ">", "<=", ">="})
+_ASSIGNMENTS = frozenset({"=", "+=", "-=", "*=", "/=", "%=", "|=", "&=", "^=", "<<=", ">>="})
+
+
+def _wrap(expr: _Expr, minimum: int) -> str:
+    return expr.text if expr.precedence >= minimum else f"({expr.text})"
+
+
+def _split_top(tokens: tuple[str, ...], separator: str) -> list[tuple[str, ...]]:
+    parts: list[tuple[str, ...]] = []
+    depth = 0
+    start = 0
+    for index, token in enumerate(tokens):
+        if token in "([{":
+            depth += 1
+        elif token in ")]}":
+            depth -= 1
+        elif token == separator and depth == 0:
+            parts.append(tokens[start:index])
+            start = index + 1
+    parts.append(tokens[start:])
+    return parts
+
+
+def _closing(tokens: tuple[str, ...], index: int) -> int:
+    """Index of the bracket closing the one at ``index``."""
+    depth = 0
+    for position in range(index, len(tokens)):
+        if tokens[position] in "([{":
+            depth += 1
+        elif tokens[position] in ")]}":
+            depth -= 1
+            if depth == 0:
+                return position
+    raise Residual("unbalanced brackets")
+
+
+class _Translator:
+    """Rules shared by the pieces of one contract: its state, events and modifiers."""
+
+    def __init__(self, split: SplitContract) -> None:
+        self.state: dict[str, _State] = {}
+        self.events: dict[str, list[tuple[str, str]]] = {}
+        self.modifiers: dict[str, Member] = {}
+        for member in split.context_members:
+            if member.kind == "state":
+                self.state[member.name] = self._state(member)
+            elif member.kind == "event":
+                self.events[member.name] = self._event(member)
+            elif member.kind == "modifier":
+                self.modifiers[member.name] = member
+        # internal functions become subroutines other methods can call; overloads are left to the model
+        names = [piece.member.name for piece in split.functions]
+        self.subroutines = {
+            piece.member.name: piece.member for piece in split.functions
+            if piece.member.visibility in ("internal", "private") and names.count(piece.member.name) == 1
+        }
+        self.locals: dict[str, str] = {}
+        #: Subroutines called by the function being translated
+        self.callees: set[str] = set()
+
+    # ---- declarations
+
+    def _state(self, member: Member) -> _State:
+        tokens = member.tokens[: member.tokens.index("=")] if "=" in member.tokens else member.tokens[:-1]
+        words = [t for t in tokens if t not in _DECLARATION_KEYWORDS]
+        if not words or words[-1] != member.name:
+            raise Residual(f"declaration of {member.name}")
+        type_tokens = tuple(words[:-1])
+        constant = "constant" in tokens or "immutable" in tokens
+        keys = []
+        while type_tokens[:1] == ("mapping",):
+            inner = _split_top(type_tokens[2:-1], "=>")
+            if len(inner) != 2:
+                raise Residual(f"mapping {member.name}")
+            keys.append(_kind(" ".join(inner[0])))
+            type_tokens = inner[1]
+        if len(keys) > 1 and not set(keys) <= {"account", "uint"}:
+            raise Residual(f"mapping {member.name} keyed by {', '.join(keys)}")
+        if keys:
+            return _State(python_name(member.name), _kind(" ".join(type_tokens)), tuple(keys))
+        name = member.name.upper() if constant else python_name(member.name)
+        return _State(name, _kind(" ".join(type_tokens)), constant=constant)
+
+    def constant_value(self, member: Member) -> str:
+        """Module-level constants must be Python literals for the compiler to fold them."""
+        self.locals = {}
+        value = self.expression(member.tokens[member.tokens.index("=") + 1 : -1])
+        if not value.literal:
+            raise Residual(f"computed constant {member.name}")
+        return value.text
+
+    def _event(self, member: Member) -> list[tuple[str, str]]:
+        if "anonymous" in member.tokens:
+            raise Residual(f"anonymous event {member.name}")
+        fields = []
+        for parameter in member.parameters:
+            if not parameter.name:
+                raise Residual(f"unnamed field of event {member.name}")
+            fields.append((python_name(parameter.name), _kind(parameter.type)))
+        return fields
+
+    def initial_value(self, member: Member) -> str:
+        state = self.state[member.name]
+        if state.keys:
+            # nested mappings are flattened into one box per key combination
+            key_type = _KINDS[state.keys[0]][0] if len(state.keys) == 1 else "Bytes"
+            return f'BoxMap({key_type}, {_KINDS[state.kind][0]}, key_prefix=b"{state.name}")'
+        if "=" not in member.tokens:
+            return _KINDS[state.kind][2]
+        self.locals = {}
+        return self.coerce(self.expression(member.tokens[member.tokens.index("=") + 1 : -1]), state.kind)
+
+    # ---- expressions
+
+    def coerce(self, expr: _Expr, kind: str) -> str:
+        if expr.literal and kind == "uint" and expr.kind == "uint":
+            return f"UInt64({expr.text})"
+        if expr.literal and kind == "string" and expr.kind == "string":
+            return f"String({expr.text})"
+        if expr.literal and kind == "bytes" and expr.kind == "string" and expr.text[0] in "\"'":
+            return f"Bytes(b{expr.text})"
+        if expr.kind != kind:
+            raise Residual(f"{expr.text} is not {kind}")
+        return expr.text
+
+    def arc4_value(self, expr: _Expr, kind: str) -> str:
+        if expr.kind != kind:
+            raise Residual(f"{expr.text} is not {kind}")
+        if expr.kind == "account" and expr.text.endswith(".native"):
+            return expr.text[: -len(".native")]
+        return f"{_KINDS[kind][1]}({expr.text})"
+
+    def expression(self, tokens: tuple[str, ...]) -> _Expr:
+        expr, rest = self._binary(self._units(tuple(tokens)), 0)
+        if rest:
+            raise Residual(f"expression {' '.join(tokens)}")
+        return expr
+
+    def _binary(self, tokens: tuple[str, ...], minimum: int) -> tuple[_Expr, tuple[str, ...]]:
+        left, tokens = self._unary(tokens)
+        while tokens and tokens[0] in _BINARY and _BINARY[tokens[0]][0] > minimum:
+            operator = tokens[0]
+            power, python, precedence = _BINARY[operator]
+            # ``**`` is right-associative
+            right, tokens = self._binary(tokens[1:], power - 1 if operator == "**" else power)
+            left = self._combine(operator, left, right, python, precedence)
+        return left, tokens
+
+    def _combine(self, operator: str, left: _Expr, right: _Expr, python: str, precedence: int) -> _Expr:
+        if operator in ("||", "&&"):
+            if left.kind != "bool" or right.kind != "bool":
+                raise Residual(f"{operator} on {left.kind} and {right.kind}")
+            kind = "bool"
+        elif operator in _COMPARISONS:
+            # ``to != 0x0`` in pre-0.5 code compares an address with the zero literal
+            if left.kind == "account" and right.literal and right.text in ("0", "0x0"):
+                right = _Expr("Global.zero_address", "account")
+            if left.kind != right.kind or (operator not in ("==", "!=") and left.kind != "uint"):
+                raise Residual(f"{operator} on {left.kind} and {right.kind}")
+            kind = "bool"
+        elif left.kind == right.kind == "uint":
+            kind = "uint"
+        else:
+            raise Residual(f"{operator} on {left.kind} and {right.kind}")
+        # comparisons chain in Python, so a comparison operand of a comparison is parenthesised
+        left_min = precedence + 1 if precedence == 4 or operator == "**" else precedence
+        right_min = precedence if operator == "**" else precedence + 1
+        text = f"{_wrap(left, left_min)} {python} {_wrap(right, right_min)}"
+        return _Expr(text, kind, precedence, literal=left.literal and right.literal)
+
+    def _unary(self, tokens: tuple[str, ...]) -> tuple[_Expr, tuple[str, ...]]:
+        if tokens[:1] == ("!",):
+            operand, rest = self._unary(tokens[1:])
+            if operand.kind != "bool":
+                raise Residual(f"! on {operand.kind}")
+            return _Expr(f"not {_wrap(operand, 3)}", "bool", 3), rest
+        if tokens[:1] in (("-",), ("~",), ("++",), ("--",), ("delete",), ("new",)):
+            raise Residual(f"unary {tokens[0]}")
+        return self._postfix(tokens)
+
+    def _postfix(self, tokens: tuple[str, ...]) -> tuple[_Expr, tuple[str, ...]]:
+        if not tokens:
+            raise Residual("empty expression")
+        head = tokens[0]
+        if head == "(":
+            end = _closing(tokens, 0)
+            inner = tokens[1:end]
+            if len(_split_top(inner, ",")) != 1:
+                raise Residual("tuple")
+            return self.expression(inner), tokens[end + 1 :]
+        if tokens[1:2] == (".",) and len(tokens) > 2:
+            special = {
+                ("msg", "sender"): _Expr("Txn.sender", "account"),
+                ("block", "timestamp"): _Expr("Global.latest_timestamp", "uint"),
+                ("block", "number"): _Expr("Global.round", "uint"),
+            }.get((head, tokens[2]))
+            if special is None:
+                raise Residual(f"{head}.{tokens[2]}")
+            return special, tokens[3:]
+        if tokens[1:2] == ("(",):
+            end = _closing(tokens, 1)
+            if head in self.subroutines:
+                return self._call(self.subroutines[head], tokens[2:end]), tokens[end + 1 :]
+            return self._conversion(head, tokens[2:end]), tokens[end + 1 :]
+        if tokens[1:2] == ("[",):
+            state = self.state.get(head)
+            if head in self.locals or state is None or not state.keys:
+                raise Residual(f"index into {head}")
+            key, rest = self.mapping_key(state, tokens[1:])
+            default = _KINDS[state.kind][2]
+            return _Expr(f"self.{state.name}.get({key}, default={default})", state.kind), rest
+        return self._atom(head), tokens[1:]
+
+    def mapping_key(self, state: _State, tokens: tuple[str, ...]) -> tuple[str, tuple[str, ...]]:
+        """The box key for the ``[...]`` groups at the start of ``tokens``, and the tokens after them."""
+        parts = []
+        for kind in state.keys:
+            if tokens[:1] != ("[",):
+                raise Residual(f"partial index into {state.name}")
+            end = _closing(tokens, 0)
+            key = self.coerce(self.expression(tokens[1:end]), kind)
+            parts.append(key if len(state.keys) == 1 else f"{key}.bytes" if kind == "account" else f"op.itob({key})")
+            tokens = tokens[end + 1 :]
+        return " + ".join(parts), tokens
+
+    def _call(self, function: Member, arguments: tuple[str, ...]) -> _Expr:
+        values = [a for a in _split_top(arguments, ",") if a]
+        kinds = [_kind(p.type) for p in function.parameters]
+        returns = function.returns
+        if len(values) != len(kinds) or len(returns) > 1:
+            raise Residual(f"call {function.name}(...)")
+        rendered = ", ".join(self.coerce(self.expression(v), k) for v, k in zip(values, kinds))
+        self.callees.add(function.name)
+        return _Expr(f"self.{python_name(function.name)}({rendered})", _kind(returns[0].type) if returns else "none")
+
+    def _conversion(self, name: str, arguments: tuple[str, ...]) -> _Expr:
+        if name == "address" and arguments == ("0",):
+            return _Expr("Global.zero_address", "account")
+        if name == "address" and arguments == ("this",):
+            return _Expr("Global.current_application_address", "account")
+        if name in ("address", "payable") or re.fullmatch(r"uint\d*", name):
+            value = self.expression(arguments)
+            kind = "uint" if name.startswith("uint") else "account"
+            if value.kind == kind:
+                return _Expr(self.coerce(value, kind), kind)
+        raise Residual(f"call {name}(...)")
+
+    def _atom(self, token: str) -> _Expr:
+        if token in ("true", "false"):
+            return _Expr(token.capitalize(), "bool")
+        if token == "now":
+            return _Expr("Global.latest_timestamp", "uint")
+        if re.fullmatch(r"0[xX][0-9a-fA-F_]+|\d[\d_]*", token):
+            return _Expr(token, "uint", literal=True)
+        if token[0] in "\"'" and "\\" not in token:
+            return _Expr(token, "string", literal=True)
+        if token in self.locals:
+            kind = self.locals[token]
+            if kind == "arc4.Address":
+                return _Expr(f"{python_name(token)}.native", "account")
+            return _Expr(python_name(token), kind)
+        state = self.state.get(token)
+        if state is not None and not state.keys:
+            return _Expr(state.target, state.kind, literal=state.constant)
+        raise Residual(f"name {token}")
+
+    def _units(self, tokens: tuple[str, ...]) -> tuple[str, ...]:
+        """Fold ``3 days`` into ``259200``; currency units have no Algorand counterpart."""
+        folded: list[str] = []
+        for token in tokens:
+            if token in ("wei", "gwei", "ether", "finney", "szabo"):
+                raise Residual(f"{token} amount")
+            if token in _TIME_UNITS and folded and re.fullmatch(r"\d+", folded[-1]):
+                folded[-1] = str(int(folded[-1]) * _TIME_UNITS[token])
+            else:
+                folded.append(token)
+        return tuple(folded)
+
+    # ---- statements
+
+    def block(self, tokens: tuple[str, ...], indent: str) -> list[str]:
+        lines: list[str] = []
+        while tokens:
+            statement, tokens = self._next_statement(tokens)
+            lines.extend(self.statement(statement, indent))
+        return lines
+
+    def _next_statement(self, tokens: tuple[str, ...]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        if tokens[0] == "{":
+            end = _closing(tokens, 0)
+            return tokens[: end + 1], tokens[end + 1 :]
+        if tokens[0] == "if":
+            end = _closing(tokens, 1)
+            _, rest = self._next_statement(tokens[end + 1 :])
+            if rest[:1] == ("else",):
+                _, rest = self._next_statement(rest[1:])
+            return tokens[: len(tokens) - len(rest)], rest
+        depth = 0
+        for index, token in enumerate(tokens):
+            if token in "([{":
+                depth += 1
+            elif token in ")]}":
+                depth -= 1
+            elif token == ";" and depth == 0:
+                return tokens[:index], tokens[index + 1 :]
+        raise Residual("statement without ';'")
+
+    def statement(self, tokens: tuple[str, ...], indent: str) -> list[str]:
+        head = tokens[0] if tokens else ""
+        if head == "{":
+            return self.block(tokens[1:-1], indent)
+        if head == "if":
+            return self._if(tokens, indent)
+        if head in ("require", "assert") and tokens[1] == "(" and _closing(tokens, 1) == len(tokens) - 1:
+            arguments = _split_top(tokens[2:-1], ",")
+            condition = self.expression(arguments[0])
+            if condition.kind != "bool" or len(arguments) > 2:
+                raise Residual(f"{head} form")
+            if len(arguments) == 2:
+                message = self.expression(arguments[1])
+                if not message.literal or message.kind != "string":
+                    raise Residual("computed require message")
+                return [f"{indent}assert {condition.text}, {message.text}"]
+            return [f"{indent}assert {condition.text}"]
+        if head == "revert" and tokens[1:2] == ("(",):
+            arguments = tokens[2:-1]
+            message = self.expression(arguments) if arguments else None
+            if message is not None and not (message.literal and message.kind == "string"):
+                raise Residual("custom error")
+            return [f"{indent}assert False" + (f", {message.text}" if message else "")]
+        if head == "emit":
+            return self._emit(tokens[1:], indent)
+        if head == "return":
+            return [f"{indent}{self._return(tokens[1:])}"]
+        if head == "delete":
+            return [f"{indent}{self._delete(tokens[1:])}"]
+        if len(tokens) >= 2 and tokens[-1] in ("++", "--"):
+            return [self._assign(tokens[:-1], "+=" if tokens[-1] == "++" else "-=", ("1",), indent)]
+        if head in self.subroutines and tokens[1:2] == ("(",) and _closing(tokens, 1) == len(tokens) - 1:
+            return [f"{indent}{self._call(self.subroutines[head], tokens[2:-1]).text}"]
+        assignments = [i for i, t in enumerate(tokens) if t in _ASSIGNMENTS]
+        if assignments:
+            index = assignments[0]
+            return [self._assign(tokens[:index], tokens[index], tokens[index + 1 :], indent)]
+        tokens = tuple(t for t in tokens if t not in ("memory", "storage", "calldata"))
+        if re.fullmatch(r"uint\d*|address|bool|string|bytes\d*", head) and len(tokens) == 2:
+            kind = _kind(head)
+            self.locals[tokens[1]] = kind
+            return [f"{indent}{python_name(tokens[1])} = {_KINDS[kind][2]}"]
+        raise Residual(f"statement {' '.join(tokens[:4])} ...")
+
+    def _if(self, tokens: tuple[str, ...], indent: str) -> list[str]:
+        end = _closing(tokens, 1)
+        condition = self.expression(tokens[2:end])
+        if condition.kind != "bool":
+            raise Residual("non-boolean condition")
+        body, rest = self._next_statement(tokens[end + 1 :])
+        lines = [f"{indent}if {condition.text}:", *(self.statement(body, indent + "    ") or [indent + "    pass"])]
+        if rest[:1] == ("else",):
+            alternative = rest[1:]
+            if alternative[:1] == ("if",):
+                nested = self._if(alternative, indent)
+                lines.append(f"{indent}el{nested[0].lstrip()}")
+                lines.extend(nested[1:])
+            else:
+                lines.append(f"{indent}else:")
+                lines.extend(self.statement(alternative, indent + "    ") or [indent + "    pass"])
+        return lines
+
+    def _emit(self, tokens: tuple[str, ...], indent: str) -> list[str]:
+        name = tokens[0]
+        if name not in self.events or tokens[1:2] != ("(",) or _closing(tokens, 1) != len(tokens) - 1:
+            raise Residual(f"emit {name}")
+        fields = self.events[name]
+        arguments = [a for a in _split_top(tokens[2:-1], ",") if a]
+        if len(arguments) != len(fields):
+            raise Residual(f"emit {name} with {len(arguments)} arguments")
+        values = [f"{field}={self.arc4_value(self.expression(a), kind)}" for (field, kind), a in zip(fields, arguments)]
+        line = f"{indent}arc4.emit({name}({', '.join(values)}))"
+        if len(line) <= 100:
+            return [line]
+        # one field per line, as the dataset writes long events
+        return [f"{indent}arc4.emit({name}(", *(f"{indent}    {value}," for value in values), f"{indent}))"]
+
+    def _return(self, tokens: tuple[str, ...]) -> str:
+        kind = self.locals.get("<return>")
+        if not tokens:
+            if kind is not None:
+                raise Residual("return without value")
+            return "return"
+        if kind is None:
+            raise Residual("return value from a function returning nothing")
+        value = self.expression(tokens)
+        if kind == "account":
+            return f"return {self.arc4_value(value, kind)}"
+        return f"return {self.coerce(value, kind)}"
+
+    def _delete(self, tokens: tuple[str, ...]) -> str:
+        state = self.state.get(tokens[0])
+        if state is None or state.constant:
+            raise Residual(f"delete {tokens[0]}")
+        if state.keys and tokens[1:2] == ("[",):
+            key, rest = self.mapping_key(state, tokens[1:])
+            if not rest:
+                return f"del self.{state.name}[{key}]"
+        if not state.keys and len(tokens) == 1:
+            return f"self.{state.name} = {_KINDS[state.kind][2]}"
+        raise Residual(f"delete {' '.join(tokens)}")
+
+    def _assign(self, target: tuple[str, ...], operator: str, value: tuple[str, ...], indent: str) -> str:
+        if operator not in _ASSIGNMENTS:
+            raise Residual(f"assignment {operator}")
+        declared = None
+        target = tuple(t for t in target if t not in ("memory", "storage", "calldata"))
+        if len(target) == 2 and re.fullmatch(r"uint\d*|address|bool|string|bytes\d*", target[0]):
+            declared, target = _kind(target[0]), target[1:]
+        elif len(target) == 3 and target[:2] == ("address", "payable"):
+            declared, target = "account", target[2:]
+        name = target[0]
+        state = self.state.get(name)
+        if declared is not None:
+            self.locals[name] = declared
+            lvalue, kind, current = python_name(name), declared, None
+        elif name in self.locals and len(target) == 1:
+            kind = self.locals[name]
+            if kind == "arc4.Address":
+                raise Residual(f"assignment to parameter {name}")
+            lvalue, current = python_name(name), python_name(name)
+        elif state is not None and not state.constant and not state.keys and len(target) == 1:
+            lvalue, kind, current = state.target, state.kind, state.target
+        elif state is not None and state.keys and target[1:2] == ("[",) and not self.mapping_key(state, target[1:])[1]:
+            key = self.mapping_key(state, target[1:])[0]
+            lvalue, kind = f"self.{state.name}[{key}]", state.kind
+            # a missing box reads as the type's zero value, like an unset Solidity mapping entry
+            current = f"self.{state.name}.get({key}, default={_KINDS[state.kind][2]})"
+        else:
+            raise Residual(f"assignment to {' '.join(target)}")
+        expr = self.expression(value)
+        if operator == "=":
+            return f"{indent}{lvalue} = {self.coerce(expr, kind)}"
+        if current is None:
+            raise Residual(f"{operator} in a declaration")
+        _, python, precedence = _BINARY[operator[:-1]]
+        combined = self._combine(operator[:-1], _Expr(current, kind), expr, python, precedence)
+        if combined.kind != kind:
+            raise Residual(f"{operator} changes the type of {' '.join(target)}")
+        if current == lvalue:
+            return f"{indent}{lvalue} {python}= {expr.text}"
+        return f"{indent}{lvalue} = {combined.text}"
+
+    # ---- members
+
+    def parameters(self, member: Member) -> list[str]:
+        """Bind ``member``'s parameters as locals and return their annotated Python names."""
+        self.locals = {}
+        annotated = []
+        for parameter in member.parameters:
+            if not parameter.name:
+                raise Residual(f"unnamed parameter of {member.name}")
+            kind = _kind(parameter.type)
+            # addresses arrive as ABI ``address`` values and are used as accounts
+            abi = "arc4.Address" if kind == "account" else _KINDS[kind][0]
+            self.locals[parameter.name] = abi if kind == "account" else kind
+            annotated.append(f"{python_name(parameter.name)}: {abi}")
+        return annotated
+
+    def modifier_calls(self, member: Member) -> list[str]:
+        """``self.only_owner()`` lines for the modifiers invoked in ``member``'s header."""
+        header = member.header
+        start = header.index("(") if "(" in header else len(header)
+        position = _closing(header, start) + 1 if start < len(header) else len(header)
+        calls = []
+        while position < len(header):
+            token = header[position]
+            if token == "returns":
+                break
+            arguments: tuple[str, ...] = ()
+            end = position
+            if header[position + 1 : position + 2] == ("(",):
+                end = _closing(header, position + 1)
+                arguments = header[position + 2 : end]
+            if token in self.modifiers:
+                target = self.modifiers[token]
+                values = [a for a in _split_top(arguments, ",") if a]
+                kinds = [_kind(p.type) for p in target.parameters]
+                if len(values) != len(kinds):
+                    raise Residual(f"modifier {token} arguments")
+                rendered = [self.coerce(self.expression(v), k) for v, k in zip(values, kinds)]
+                calls.append(f"self.{python_name(token)}({', '.join(rendered)})")
+            elif token not in ("public", "external", "internal", "private", "view", "pure", "constant",
+                               "virtual", "override"):
+                raise Residual(f"header keyword {token}")
+            position = end + 1
+        return calls
+
+    def modifier(self, member: Member) -> list[str]:
+        body = member.body
+        if body[-2:] != ("_", ";") or "_" in body[:-2]:
+            raise Residual(f"modifier {member.name} does not end in '_'")
+        self.locals = {}
+        arguments = []
+        for parameter in member.parameters:
+            kind = _kind(parameter.type)
+            self.locals[parameter.name] = kind
+            arguments.append(f"{python_name(parameter.name)}: {_KINDS[kind][0]}")
+        lines = self.block(body[:-2], " " * 8) or [" " * 8 + "pass"]
+        signature = ", ".join(["self", *arguments])
+        return ["    @subroutine", f"    def {python_name(member.name)}({signature}) -> None:", *lines]
+
+    def function(self, member: Member) -> list[str]:
+        if member.kind != "function" or member.body_index is None:
+            raise Residual(f"{member.kind} {member.name}")
+        if member.mutability == "payable" or "msg" in member.body and "value" in member.body:
+            raise Residual(f"{member.name} handles payments")
+        arguments = self.parameters(member)
+        returns = member.returns
+        if len(returns) > 1:
+            raise Residual(f"{member.name} returns a tuple")
+        result = _kind(returns[0].type) if returns else None
+        if result is not None:
+            self.locals["<return>"] = result
+        calls = self.modifier_calls(member)
+        body = self.block(member.body, " " * 8)
+        lines = [f"        {call}" for call in calls] + body
+        if result is not None and not any(line.strip().startswith("return ") for line in lines):
+            raise Residual(f"{member.name} returns through named results")
+        if member.visibility in ("internal", "private"):
+            decorator = "@subroutine"
+        elif member.mutability in ("view", "pure", "constant"):
+            decorator = "@arc4.abimethod(readonly=True)"
+        else:
+            decorator = "@arc4.abimethod"
+        annotation = "None" if result is None else "arc4.Address" if result == "account" else _KINDS[result][0]
+        signature = ", ".join(["self", *arguments])
+        return [f"    {decorator}", f"    def {python_name(member.name)}({signature}) -> {annotation}:",
+                *(lines or ["        pass"])]
+
+
+def _imports(code: str) -> str:
+    names = [name for name in _ALGOPY_NAMES if re.search(rf"(?<![\w.]){name}\b", code)]
+    # classes first, then modules and functions, as isort orders them
+    names.sort(key=lambda name: (name[0].islower(), name.lower()))
+    return f"from algopy import {', '.join(names)}\n"
+
+
+def _module(declarations: list[str], class_name: str, body: list[str]) -> str:
+    code = "\n\n\n".join([*declarations, f"class {class_name}(ARC4Contract):\n" + "\n".join(body or ["    pass"])])
+    return _imports(code) + "\n\n" + code + "\n"
+
+
+@dataclass(frozen=True)
+class Pretranslation:
+    """The rule-based part of a split contract's translation."""
+
+    #: Python module for the context piece, None if the context is residual
+    context: str | None
+    #: Piece name -> snippet for each function produced by rules
+    functions: dict[str, str]
+    #: Piece name -> the construct that kept it from the rules
+    residual: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def pieces(self) -> dict[str, str]:
+        if self.context is None:
+            return {}
+        return {CONTEXT: self.context, **self.functions}
+
+
+def pretranslate(split: SplitContract) -> Pretranslation:
+    """Translate every piece of ``split`` the rules fully cover."""
+    functions = [piece.name for piece in split.functions]
+    try:
+        translator = _Translator(split)
+        context = _context(translator, split)
+    except Residual as exc:
+        return Pretranslation(None, {}, {name: str(exc) for name in [CONTEXT, *functions]})
+    translated: dict[str, str] = {}
+    residual: dict[str, str] = {}
+    callees: dict[str, set[str]] = {}
+    for piece in split.functions:
+        translator.callees = set()
+        try:
+            body = translator.function(piece.member)
+        except Residual as exc:
+            residual[piece.name] = str(exc)
+            continue
+        translated[piece.name] = _module([], "Snippet", body)
+        callees[piece.name] = set(translator.callees)
+    # the model may name a residual subroutine differently, so its callers go with it
+    pending = True
+    while pending:
+        pending = False
+        for name in list(translated):
+            missing = sorted(callees[name] & residual.keys())
+            if missing:
+                del translated[name]
+                residual[name] = f"calls residual {missing[0]}"
+                pending = True
+    return Pretranslation(context, translated, residual)
+
+
+def _context(translator: _Translator, split: SplitContract) -> str:
+    constants = []
+    events = []
+    defaults = []
+    init = []
+    methods = []
+    for member in split.context_members:
+        if member.kind == "state":
+            state = translator.state[member.name]
+            if state.constant:
+                constants.append(f"{state.name} = {translator.constant_value(member)}")
+            else:
+                defaults.append(f"        {state.target} = {translator.initial_value(member)}")
+        elif member.kind == "event":
+            fields = [f"    {name}: {_KINDS[kind][1]}" for name, kind in translator.events[member.name]]
+            events.append(f"class {member.name}(arc4.Struct):\n" + "\n".join(fields or ["    pass"]))
+        elif member.kind == "modifier":
+            methods.append("\n".join(translator.modifier(member)))
+        elif member.kind in ("constructor", "function"):
+            if member.modifiers or member.mutability == "payable":
+                raise Residual("constructor with modifiers or payment")
+            if member.parameters:
+                # state cannot be initialised from arguments in __init__; the dataset uses a create method
+                arguments = translator.parameters(member)
+                body = translator.block(member.body, " " * 8) or ["        pass"]
+                signature = ", ".join(["self", *arguments])
+                methods.insert(0, "\n".join(['    @arc4.abimethod(create="require")',
+                                             f"    def create({signature}) -> None:", *body]))
+            else:
+                translator.locals = {}
+                init.extend(translator.block(member.body, " " * 8))
+        else:
+            raise Residual(f"{member.kind} {member.name}")
+    init = _without_overwritten_defaults(defaults, init)
+    body = []
+    if init:
+        body.append("    def __init__(self) -> None:\n" + "\n".join(init))
+    body.extend(methods)
+    declarations = (["\n".join(constants)] if constants else []) + events
+    return _module(declarations, split.name, ["\n\n".join(body)] if body else [])
+
+
+def _without_overwritten_defaults(defaults: list[str], constructor: list[str]) -> list[str]:
+    """Drop the zero value of state the constructor assigns before reading it."""
+    kept = []
+    for default in defaults:
+        target = default.split(" = ", 1)[0]
+        first = next((line for line in constructor if re.search(rf"{re.escape(target.strip())}\b", line)), None)
+        if first is None or not first.startswith(target + " = ") or target.strip() in first.split(" = ", 1)[1]:
+            kept.append(default)
+    return kept + constructor
+
+
+def count_lines(code: str) -> int:
+    """Non-blank lines of ``code``."""
+    return sum(1 for line in code.splitlines() if line.strip())
+
+
+@dataclass
+class Coverage:
+    contract: str
+    functions: int
+    rule_functions: int
+    #: Non-blank lines of the assembled rule-based part
+    rule_lines: int
+    reasons: dict[str, str]
+
+
+def coverage(name: str, source: str) -> Coverage:
+    split = split_contract(source)
+    result = pretranslate(split)
+    rule_lines = count_lines(assemble(result.context, result.functions)) if result.context is not None else 0
+    return Coverage(name, len(split.functions), len(result.functions), rule_lines, result.residual)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contracts", action="append", help="Solidity file glob")
+    parser.add_argument("--show", metavar="CONTRACT",
+                        help="print the rule-based translation of one contract, by file name or path")
+    args = parser.parse_args(argv)
+
+    contracts = solidity_contracts()
+    if args.show:
+        path = Path(args.show)
+        if not path.is_file():
+            path = next((p for p in contracts if p.name == path.name), None)
+        if path is None:
+            print(f"error: no contract {args.show}", file=sys.stderr)
+            return 1
+        result = pretranslate(split_contract(path.read_text(encoding="utf-8")))
+        if result.context is not None:
+            print(assemble(result.context, result.functions), end="")
+        for piece, reason in result.residual.items():
+            print(f"# residual {piece}: {reason}")
+        return 0
+    print(f"{'contract':<22}{'functions':>10}{'by rules':>10}{'lines':>7}  residual")
+    total = by_rules = 0
+    for path in contracts:
+        if args.contracts and not any(fnmatch.fnmatch(path.name, g) for g in args.contracts):
+            continue
+        try:
+            result = coverage(path.name, path.read_text(encoding="utf-8"))
+        except SolidityError as exc:
+            print(f"{path.name:<22}{'-':>10}{'-':>10}{'-':>7}  {exc}")
+            continue
+        total += result.functions
+        by_rules += result.rule_functions
+        reasons = "; ".join(f"{piece}: {reason}" for piece, reason in list(result.reasons.items())[:2])
+        counts = f"{result.functions:>10}{result.rule_functions:>10}{result.rule_lines:>7}"
+        print(f"{result.contract:<22}{counts}  {reasons}")
+    print(f"{by_rules}/{total} functions translated by rules")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""Hedged translation: race several prompt styles and keep the first valid contract.
+
+For a migration the prompt style does not matter, only getting a valid
+contract quickly. Each contract is sent with the ``--width`` (two or three) best
+styles of the pool, one after another: the next style starts ``--stagger``
+seconds after the previous one, or at once if the previous one fails, so a
+contract the first style handles well costs a single request. The first
+translation that passes the checks wins and the other contestants are
+cancelled, which closes their connections; styles not started yet never are.
+
+A translation passes when it compiles with ``puyapy`` (``tools.translation.compiler``)
+and passes the smoke tests: it parses, declares a contract class and, for an
+``ARC4Contract``, has an ABI method for every public or external function of
+the Solidity contract. ``--no-compile`` races on the smoke tests alone.
+
+Wins are counted per style in ``translations/.race_wins.json``; the pool is
+ordered by win rate (smoothed, so new styles get a chance), so the default
+order adapts as races are run. The winner is written to
+``<out>/<model>/race/<contract>.py``.
+
+Usage::
+
+    python -m tools.translation.race --model gpt-4o --prompts 'COT*' --prompts Zeroshot.txt --stagger 20
+    python -m tools.translation.race --model stub --stub --no-compile --stagger 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import REPO_ROOT, prompt_files, solidity_contracts
+from tools.translation.backend import BackendError, OpenAICompatibleBackend
+from tools.translation.compiler import DEFAULT_COMPILE_CACHE_PATH, CompileStage
+from tools.translation.pretranslate import python_name
+from tools.translation.runner import (
+    DEFAULT_OUT_DIR,
+    Cell,
+    Translation,
+    TranslationRunner,
+    add_backend_arguments,
+    rate_limit,
+    response_cache,
+    sampling_params,
+    select_paths,
+)
+from tools.translation.solidity import SolidityError, parse
+from tools.translation.split import contract_class, flatten
+
+DEFAULT_WINS_PATH = REPO_ROOT / "translations" / ".race_wins.json"
+DEFAULT_STAGGER = 20.0
+RACE_DIR = "race"
+
+
+def public_functions(source: str) -> list[str]:
+    """Names of the deployed contract's public and external functions, inherited ones included."""
+    unit = parse(source)
+    contract = unit.contract()
+    # before Solidity 0.4.22 a constructor is the function named after its contract
+    return [member.name for owner, member in flatten(unit, contract)
+            if member.kind == "function" and member.name and member.name != owner.name
+            and member.visibility not in ("internal", "private")]
+
+
+def _abi_methods(contract: ast.ClassDef) -> set[str]:
+    names = set()
+    for node in contract.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and any(
+            "abimethod" in ast.unparse(decorator) for decorator in node.decorator_list
+        ):
+            names.add(node.name)
+    return names
+
+
+def _comparable(name: str) -> str:
+    return python_name(name).replace("_", "")
+
+
+def smoke_test(solidity: str, code: str) -> str | None:
+    """Why the translation of ``solidity`` is unusable, or None if it passes."""
+    try:
+        module = ast.parse(code)
+    except SyntaxError as exc:
+        return f"not valid Python: {exc.msg} (line {exc.lineno})"
+    contract = contract_class(module)
+    if contract is None:
+        return "declares no contract class"
+    if not any(getattr(base, "attr", getattr(base, "id", "")) == "ARC4Contract" for base in contract.bases):
+        return None
+    try:
+        expected = public_functions(solidity)
+    except SolidityError:
+        return None
+    provided = {_comparable(name) for name in _abi_methods(contract)}
+    missing = [name for name in expected if _comparable(name) not in provided]
+    return f"no ABI method for {', '.join(missing)}" if missing else None
+
+
+class WinRates:
+    """Races entered and won per prompt style, kept in a JSON file."""
+
+    def __init__(self, path: Path = DEFAULT_WINS_PATH) -> None:
+        self.path = path
+        self.counts: dict[str, dict[str, int]] = {}
+        if path.is_file():
+            with contextlib.suppress(json.JSONDecodeError):
+                self.counts = json.loads(path.read_text(encoding="utf-8"))
+
+    def rate(self, style: str) -> float:
+        """Win rate with one win and one loss added, so untried styles sit in the middle."""
+        counts = self.counts.get(style, {})
+        return (counts.get("wins", 0) + 1) / (counts.get("races", 0) + 2)
+
+    def order(self, prompts: list[Path]) -> list[Path]:
+        # sorted() is stable: equal rates keep the order given
+        return sorted(prompts, key=lambda prompt: -self.rate(prompt.stem))
+
+    def record(self, entered: list[str], winner: str | None) -> None:
+        for style in entered:
+            counts = self.counts.setdefault(style, {"races": 0, "wins": 0})
+            counts["races"] += 1
+            counts["wins"] += style == winner
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.counts, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+
+
+@dataclass
+class Contestant:
+    style: str
+    #: not started, cancelled, failed, lost (passed after the winner) or won
+    outcome: str = "not started"
+    reason: str | None = None
+    tokens: int = 0
+    latency_s: float = 0.0
+
+
+@dataclass
+class RaceResult:
+    key: str
+    winner: str | None
+    #: Seconds from the start of the race to the winning check
+    latency_s: float
+    contestants: list[Contestant] = field(default_factory=list)
+    output: str | None = None
+
+    @property
+    def tokens(self) -> int:
+        return sum(c.tokens for c in self.contestants)
+
+
+class HedgedRace:
+    """Races prompt styles per contract through a :class:`TranslationRunner`."""
+
+    def __init__(
+        self,
+        runner: TranslationRunner,
+        prompts: list[Path],
+        *,
+        width: int = 2,
+        stagger: float = DEFAULT_STAGGER,
+        wins: WinRates | None = None,
+    ) -> None:
+        self.runner = runner
+        self.prompts = prompts
+        self.width = width
+        self.stagger = stagger
+        self.wins = wins if wins is not None else WinRates()
+
+    async def check(self, cell: Cell, translation: Translation) -> str | None:
+        if (reason := smoke_test(cell.contract.read_text(encoding="utf-8"), translation.code)) is not None:
+            return reason
+        if self.runner.compiler is None:
+            return None
+        checked = await asyncio.wrap_future(self.runner.compiler.submit(cell.key, translation.code))
+        return None if checked.ok else checked.first_error
+
+    async def race(self, contract: Path, model: str) -> RaceResult:
+        prompts = self.wins.order(self.prompts)[: self.width]
+        contestants = [Contestant(prompt.stem) for prompt in prompts]
+        go = [asyncio.Event() for _ in prompts]
+        go[0].set()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        timers = []
+
+        async def run(index: int, prompt: Path) -> tuple[int, Translation | None]:
+            await go[index].wait()
+            contestant = contestants[index]
+            contestant.outcome = "cancelled"
+            if index + 1 < len(go):
+                timers.append(loop.call_later(self.stagger, go[index + 1].set))
+            cell = Cell(contract, prompt, model)
+            try:
+                translation = await self.runner.translate(cell)
+            except (BackendError, ValueError) as exc:
+                translation, reason = None, str(exc)
+            else:
+                reason = await self.check(cell, translation)
+                contestant.tokens = sum(c.prompt_tokens + c.completion_tokens for c in translation.completions)
+            contestant.latency_s = time.perf_counter() - started
+            contestant.outcome, contestant.reason = ("failed", reason) if reason is not None else ("lost", None)
+            if reason is not None and index + 1 < len(go):
+                # a failed contestant hands over at once instead of after the stagger
+                go[index + 1].set()
+            return index, translation if reason is None else None
+
+        tasks = [asyncio.create_task(run(index, prompt)) for index, prompt in enumerate(prompts)]
+        winner = None
+        for finished in asyncio.as_completed(tasks):
+            index, translation = await finished
+            if translation is not None:
+                winner = contestants[index]
+                winner.outcome = "won"
+                break
+        for task in tasks:
+            task.cancel()
+        for timer in timers:
+            timer.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.wins.record([c.style for c in contestants if c.outcome != "not started"],
+                         winner.style if winner else None)
+
+        key = f"{Cell(contract, prompts[0], model).key.split('/')[0]}/{RACE_DIR}/{contract.stem}"
+        result = RaceResult(key, winner.style if winner else None,
+                            winner.latency_s if winner else time.perf_counter() - started, contestants)
+        if winner is not None:
+            path = self.runner.out_dir / f"{key}.py"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(translation.code, encoding="utf-8")
+            path.with_suffix(".md").write_text(f"<!-- winner: {winner.style} -->\n{translation.raw}", encoding="utf-8")
+            result.output = str(path)
+        return result
+
+    async def run(self, contracts: list[Path], models: list[str]) -> list[RaceResult]:
+        """Race every contract for every model, appending each result to the manifest."""
+        self.runner.out_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        races = [self.race(contract, model) for model in models for contract in contracts]
+        with (self.runner.out_dir / "manifest.jsonl").open("a", encoding="utf-8") as manifest:
+            for finished in asyncio.as_completed(races):
+                result = await finished
+                results.append(result)
+                manifest.write(json.dumps(asdict(result)) + "\n")
+                manifest.flush()
+        self.wins.save()
+        return results
+
+
+def summarize(results: list[RaceResult], wins: WinRates) -> str:
+    won = [r for r in results if r.winner is not None]
+    contestants = [c for r in results for c in r.contestants]
+    cancelled = sum(c.outcome == "cancelled" for c in contestants)
+    skipped = sum(c.outcome == "not started" for c in contestants)
+    latency = sum(r.latency_s for r in won) / len(won) if won else 0.0
+    lines = [f"{len(won)}/{len(results)} contracts won, {latency:.1f}s to a valid contract on average; "
+             f"{cancelled} contestants cancelled, {skipped} never started; "
+             f"{sum(r.tokens for r in results)} tokens spent"]
+    styles = sorted({c.style for c in contestants}, key=lambda style: -wins.rate(style))
+    for style in styles:
+        mine = [c for c in contestants if c.style == style]
+        lines.append(f"  {style}: won {sum(c.outcome == 'won' for c in mine)} of "
+                     f"{sum(c.outcome != 'not started' for c in mine)} started, "
+                     f"failed {sum(c.outcome == 'failed' for c in mine)}; win rate overall {wins.rate(style):.0%}")
+    for result in results:
+        if result.winner is None:
+            reasons = "; ".join(f"{c.style}: {c.reason}" for c in result.contestants if c.reason)
+            lines.append(f"  {result.key}: no valid translation ({reasons})")
+    return "\n".join(lines)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    contracts = select_paths(solidity_contracts(), args.contracts)
+    prompts = select_paths(prompt_files(), args.prompts)
+    compiler = None
+    if not args.no_compile:
+        try:
+            compiler = CompileStage(args.compile_cache, args.compile_jobs)
+        except RuntimeError as exc:
+            print(f"error: {exc} (or race on smoke tests alone with --no-compile)", file=sys.stderr)
+            return 1
+
+    def hedged(backend: OpenAICompatibleBackend) -> HedgedRace:
+        runner = TranslationRunner(backend, args.out, concurrency=args.concurrency, rate_limit=rate_limit(args),
+                                   params=sampling_params(args), attempts=args.attempts,
+                                   cache=response_cache(args), compiler=compiler)
+        return HedgedRace(runner, prompts, width=args.width, stagger=args.stagger, wins=WinRates(args.wins))
+
+    if args.stub:
+        from tools.translation.stub_server import StubServer
+
+        async with StubServer() as server:
+            race = hedged(OpenAICompatibleBackend(server.url, api_key=""))
+            results = await race.run(contracts, args.model)
+    else:
+        race = hedged(OpenAICompatibleBackend(args.base_url))
+        results = await race.run(contracts, args.model)
+    if compiler is not None:
+        compiler.close()
+    print(summarize(results, race.wins))
+    return 0 if all(r.winner is not None for r in results) else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_backend_arguments(parser)
+    parser.add_argument("--contracts", action="append", help="Solidity file glob, e.g. 'coin*.sol'")
+    parser.add_argument("--prompts", action="append", help="prompt styles to race (globs; default: all)")
+    parser.add_argument("--width", type=int, default=2, help="styles raced per contract")
+    parser.add_argument("--stagger", type=float, default=DEFAULT_STAGGER,
+                        help="seconds before the next style starts while the previous one is still running")
+    parser.add_argument("--wins", type=Path, default=DEFAULT_WINS_PATH, help="win counts per style")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR)
+    parser.add_argument("--no-compile", action="store_true", help="accept on smoke tests alone")
+    parser.add_argument("--compile-jobs", type=int, default=None, help="compiler worker processes")
+    parser.add_argument("--compile-cache", type=Path, default=DEFAULT_COMPILE_CACHE_PATH)
+    return asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Compiler-feedback repair of translations, one failing function at a time.
+
+When a translation does not compile, the first error ``puyapy`` reports is
+located in the code: the method (or module-level function) around its line is
+cut out and sent to the model with the error message alone, not the whole
+contract, and the corrected function the model answers is spliced back in place
+(imports it adds are merged). An error outside any function (a class-level
+declaration, a broken import) sends the whole module instead. The runner
+repeats compile and repair up to ``--repair N`` rounds.
+
+Every state is cached: repair completions in the response cache, each
+intermediate module's compile result in the compile cache, so a re-run replays
+the same rounds without a request or a compile. Each round is appended to the
+cell's raw ``.md``.
+
+Usage::
+
+    python -m tools.translation.runner --model gpt-4o --repair 3
+    python -m tools.translation.repair translations/gpt-4o/COT1prompt/Auction.py   # the prompt round 1 sends
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import re
+import sys
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+
+from tools.translation.extract import extract_code
+
+REPAIR_PROMPT = """\
+The following {what} of an Algorand Python (algopy) smart contract does not compile with puyapy.
+
+Compiler error:
+{error}
+
+```python
+{code}
+```
+
+Fix the error and answer with the corrected {what} only, in a single ```python block. \
+Keep its name and signature unless the error is about them."""
+
+#: ``path:line[:column] error: message`` as printed by puyapy
+_DIAGNOSTIC_RE = re.compile(
+    r"^(?P<file>\S+?\.py):(?P<line>\d+)(?::\d+)?:?\s+(?P<level>error|critical):\s*(?P<message>.*)$",
+    re.MULTILINE | re.IGNORECASE,
+)
+_DEF_RE = re.compile(r"^(?P<indent>\s*)(?:async\s+)?def\s+(?P<name>\w+)")
+
+
+@dataclass(frozen=True)
+class Diagnostic:
+    line: int | None
+    message: str
+
+
+def first_error(diagnostics: str) -> Diagnostic | None:
+    """The first error of a puyapy run, with its line when it names one."""
+    match = _DIAGNOSTIC_RE.search(diagnostics)
+    if match is not None:
+        return Diagnostic(int(match["line"]), match["message"].strip())
+    errors = [line.strip() for line in diagnostics.splitlines() if "error" in line.lower()]
+    return Diagnostic(None, errors[0]) if errors else None
+
+
+@dataclass(frozen=True)
+class Region:
+    """Lines ``start``..``end`` (1-based, inclusive) of a function, or the whole module."""
+
+    name: str
+    start: int
+    end: int
+    indent: str = ""
+
+    @property
+    def is_module(self) -> bool:
+        return self.name == "<module>"
+
+
+def _ast_region(code: str, line: int) -> Region | None:
+    try:
+        module = ast.parse(code)
+    except SyntaxError:
+        return None
+    found = None
+    for node in ast.walk(module):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            start = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+            end = node.end_lineno or node.lineno
+            # the innermost function wins; nested helpers are rare but possible
+            if start <= line <= end and (found is None or start >= found.start):
+                found = Region(node.name, start, end, " " * node.col_offset)
+    return found
+
+
+def _indent_region(lines: list[str], line: int) -> Region | None:
+    """Locate the function around ``line`` by indentation, for code that does not parse."""
+    for start in range(min(line, len(lines)), 0, -1):
+        match = _DEF_RE.match(lines[start - 1])
+        if match is None:
+            continue
+        indent = match["indent"]
+        end = start
+        for number in range(start + 1, len(lines) + 1):
+            text = lines[number - 1]
+            if text.strip() and len(text) - len(text.lstrip()) <= len(indent):
+                break
+            end = number
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        if end < line:
+            return None
+        while start > 1 and lines[start - 2].startswith(f"{indent}@"):
+            start -= 1
+        return Region(match["name"], start, end, indent)
+    return None
+
+
+def failing_region(code: str, line: int | None) -> Region:
+    """The function to send for an error at ``line``; the module when there is none."""
+    lines = code.splitlines()
+    module = Region("<module>", 1, len(lines))
+    if line is None:
+        return module
+    return _ast_region(code, line) or _indent_region(lines, line) or module
+
+
+@dataclass(frozen=True)
+class RepairRequest:
+    code: str
+    region: Region
+    error: Diagnostic
+
+    @property
+    def what(self) -> str:
+        return "module" if self.region.is_module else "method"
+
+    @property
+    def snippet(self) -> str:
+        lines = self.code.splitlines()[self.region.start - 1 : self.region.end]
+        return textwrap.dedent("\n".join(lines))
+
+    @property
+    def prompt(self) -> str:
+        location = "" if self.region.is_module or self.error.line is None else (
+            f" (line {self.error.line - self.region.start + 1} of the {self.what} below)"
+        )
+        return REPAIR_PROMPT.format(what=self.what, error=f"{self.error.message}{location}", code=self.snippet)
+
+    def apply(self, answer: str) -> str:
+        """``code`` with the region replaced by the function in the model's ``answer``."""
+        fixed = extract_code(answer).strip("\n")
+        if self.region.is_module:
+            return fixed + "\n"
+        imports, function = _answer_parts(fixed, self.region.name)
+        lines = self.code.splitlines()
+        replacement = textwrap.indent(function, self.region.indent).splitlines()
+        lines[self.region.start - 1 : self.region.end] = replacement
+        new_imports = [line for line in imports if line not in lines]
+        if new_imports:
+            # after the module's own imports
+            at = max((i + 1 for i, line in enumerate(lines[: self.region.start])
+                      if line.startswith(("import ", "from "))), default=0)
+            lines[at:at] = new_imports
+        return "\n".join(lines) + "\n"
+
+
+def _answer_parts(fixed: str, name: str) -> tuple[list[str], str]:
+    """Import lines and the text of the function named ``name`` (or the first) in an answer.
+
+    Models often answer with the whole class around the method; only the
+    method is kept.
+    """
+    try:
+        module = ast.parse(fixed)
+    except SyntaxError:
+        return [], textwrap.dedent(fixed)
+    lines = fixed.splitlines()
+    imports = [ast.get_source_segment(fixed, node) for node in module.body
+               if isinstance(node, (ast.Import, ast.ImportFrom))]
+    functions = [node for node in ast.walk(module) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    if not functions:
+        return imports, textwrap.dedent(fixed)
+    node = next((f for f in functions if f.name == name), functions[0])
+    start = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+    return imports, textwrap.dedent("\n".join(lines[start - 1 : node.end_lineno]))
+
+
+def repair_request(code: str, diagnostics: str) -> RepairRequest | None:
+    """What to send for the first error in ``diagnostics``; None when it reports none."""
+    error = first_error(diagnostics)
+    if error is None:
+        return None
+    return RepairRequest(code, failing_region(code, error.line), error)
+
+
+@dataclass
+class RepairStats:
+    """Outcome of the cells of one prompt style."""
+
+    cells: int = 0
+    compiled: int = 0
+    #: Cells that compiled only after at least one repair round
+    repaired: int = 0
+    tokens: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        return self.compiled / self.cells if self.cells else 0.0
+
+    @property
+    def tokens_per_success(self) -> float | None:
+        return self.tokens / self.compiled if self.compiled else None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="Algorand Python file")
+    parser.add_argument("--diagnostics", type=Path, help="saved puyapy output instead of compiling")
+    args = parser.parse_args(argv)
+
+    code = args.path.read_text(encoding="utf-8")
+    if args.diagnostics is not None:
+        diagnostics = args.diagnostics.read_text(encoding="utf-8")
+    else:
+        from tools.translation.compiler import CompileStage
+
+        try:
+            with CompileStage() as stage:
+                [result] = stage.check([args.path])
+        except RuntimeError as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            return 1
+        diagnostics = result.diagnostics
+    request = repair_request(code, diagnostics)
+    if request is None:
+        print(f"{args.path.name}: no compiler error to repair")
+        return 0
+    print(request.prompt)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
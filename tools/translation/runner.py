@@ -0,0 +1,680 @@
+"""Concurrent batch translation over the contract x prompt x model matrix.
+
+Every Solidity file is rendered into the ``target`` slot of every prompt
+template (``tools.translation.templates``) and sent to every model through an
+OpenAI-compatible backend. Requests run concurrently up to
+``--concurrency``, are paced by a token bucket (``--rps``) and retried with
+jittered exponential backoff on rate limits and server errors. Each result is
+written as soon as it arrives, and completions are kept in a content-addressed
+cache (``tools.translation.cache``) so cells whose rendered prompt, model and
+sampling parameters are unchanged cost no call on a re-run::
+
+    <out>/<model>/<prompt>/<contract>.py   extracted Algorand Python code
+    <out>/<model>/<prompt>/<contract>.md   raw completion
+    <out>/manifest.jsonl                  one line per finished cell
+
+Usage::
+
+    python -m tools.translation.runner --model gpt-4o --concurrency 32 --rps 8
+    python -m tools.translation.runner --model stub --stub   # offline, local stub server
+    python -m tools.translation.runner --model gpt-4o --fewshot 2 --fewshot-budget 3000
+    python -m tools.translation.runner --model gpt-4o --split   # one request per function
+    python -m tools.translation.runner --model gpt-4o --memory  # reuse equivalent functions
+    python -m tools.translation.runner --model gpt-4o --pretranslate  # rules for mechanical idioms
+    python -m tools.translation.runner --model gpt-4o --incremental   # only what changed since the last run
+    python -m tools.translation.runner --model gpt-4o --compile       # puyapy check of every translation
+    python -m tools.translation.runner --model gpt-4o --repair 3      # feed compiler errors back, 3 rounds at most
+    python -m tools.translation.runner --model gpt-4o --stream        # cut broken answers while they stream
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import itertools
+import json
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from tools.dataset import REPO_ROOT, prompt_files, solidity_contracts
+from tools.translation.backend import (
+    Backend,
+    BackendError,
+    Completion,
+    CompletionRequest,
+    OpenAICompatibleBackend,
+    SamplingParams,
+    StreamAborted,
+    TokenBucket,
+    with_retries,
+)
+from tools.translation.cache import DEFAULT_CACHE_PATH, ResponseCache, format_stats
+from tools.translation.extract import extract_code
+from tools.translation.compiler import DEFAULT_COMPILE_CACHE_PATH, CompileStage
+from tools.translation.compiler import format_stats as format_compile_stats
+from tools.translation.compress import LEVELS, compress_source
+from tools.translation.fewshot import FewShotIndex
+from tools.translation.incremental import load_sidecar, plan, sidecar, write_sidecar
+from tools.translation.memory import DEFAULT_MEMORY_PATH, Normalized, TranslationMemory, normalize
+from tools.translation.memory import format_stats as format_memory_stats
+from tools.translation.pretranslate import count_lines, pretranslate
+from tools.translation.repair import Region, RepairStats, repair_request
+from tools.translation.solidity import SolidityError
+from tools.translation.split import (CONTEXT, AssemblyError, assemble, function_snippet, replace_method,
+                                     split_contract)
+from tools.translation.streaming import CodeStreamMonitor, StreamStats
+from tools.translation.streaming import format_stats as format_stream_stats
+from tools.translation.templates import format_examples, load_template
+from tools.translation.tokens import approx_tokens
+
+DEFAULT_OUT_DIR = REPO_ROOT / "translations"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name)
+
+
+@dataclass(frozen=True)
+class Cell:
+    contract: Path
+    prompt: Path
+    model: str
+
+    @property
+    def key(self) -> str:
+        return f"{_safe_name(self.model)}/{self.prompt.stem}/{self.contract.stem}"
+
+
+def expand_matrix(contracts: list[Path], prompts: list[Path], models: list[str]) -> list[Cell]:
+    return [Cell(c, p, m) for m, p, c in itertools.product(models, prompts, contracts)]
+
+
+@dataclass
+class CellResult:
+    key: str
+    status: str
+    latency_s: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = False
+    #: Non-blank lines of the translation, and how many of them the pre-translator wrote
+    lines: int = 0
+    rule_lines: int = 0
+    requests: int = 0
+    #: Pieces whose previous translation was kept by an incremental run
+    kept: int = 0
+    #: Whether the translation passed puyapy, None when not checked
+    compiles: bool | None = None
+    #: Compile-and-repair rounds the translation went through
+    repair_rounds: int = 0
+    output: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class Translation:
+    raw: str
+    code: str
+    completions: list[Completion]
+    rule_lines: int = 0
+    kept: int = 0
+    #: Sidecar record of the split pieces, for the next incremental run
+    pieces: dict | None = None
+    #: Functions to store in the memory once the contract compiles: normalized function and tokens it cost
+    memorable: dict[str, tuple[Normalized, int]] = field(default_factory=dict)
+    #: Functions taken from the memory
+    remembered: dict[str, Normalized] = field(default_factory=dict)
+    #: Pieces a repair rewrote, and pieces it changed in a way they could not follow
+    repaired: set[str] = field(default_factory=set)
+    dropped: set[str] = field(default_factory=set)
+
+
+class TranslationRunner:
+    """Runs cells against a backend with bounded concurrency and rate limiting."""
+
+    def __init__(
+        self,
+        backend: Backend,
+        out_dir: Path = DEFAULT_OUT_DIR,
+        *,
+        concurrency: int = 8,
+        rate_limit: TokenBucket | None = None,
+        params: SamplingParams = SamplingParams(),
+        attempts: int = 5,
+        base_delay: float = 0.5,
+        resume: bool = False,
+        cache: ResponseCache | None = None,
+        fewshot: FewShotIndex | None = None,
+        fewshot_k: int = 2,
+        fewshot_budget: int | None = None,
+        compression: str = "none",
+        verify_compression: bool = False,
+        split: bool = False,
+        memory: TranslationMemory | None = None,
+        pretranslate: bool = False,
+        incremental: bool = False,
+        compiler: CompileStage | None = None,
+        repair_rounds: int = 0,
+        stream: bool = False,
+    ) -> None:
+        self.backend = backend
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.params = params
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.resume = resume
+        self.cache = cache
+        self.fewshot = fewshot
+        self.fewshot_k = fewshot_k
+        self.fewshot_budget = fewshot_budget
+        self.compression = compression
+        self.verify_compression = verify_compression
+        self.split = split
+        self.memory = memory
+        self.pretranslate = pretranslate
+        self.incremental = incremental
+        self.compiler = compiler
+        self.repair_rounds = repair_rounds
+        self.stream = stream
+        self.stream_stats = StreamStats()
+        self._slots = asyncio.Semaphore(concurrency)
+        #: Functions a cell is requesting, by scope and normalized key; resolved once offered to the memory
+        self._claims: dict[tuple[str, str], asyncio.Future] = {}
+
+    def output_path(self, cell: Cell) -> Path:
+        return self.out_dir / f"{cell.key}.py"
+
+    def source(self, cell: Cell) -> str:
+        return compress_source(cell.contract.read_text(encoding="utf-8"), self.compression,
+                               verify=self.verify_compression)
+
+    def render(self, cell: Cell, source: str | None = None) -> str:
+        """Fill the cell's template with ``source`` (default: the cell's contract).
+
+        Few-shot styles get retrieved examples if an index is set; without an
+        explicit budget they may not outgrow the template's own, so retrieval
+        never lengthens a prompt.
+        """
+        template = load_template(cell.prompt)
+        source = self.source(cell) if source is None else source
+        if self.fewshot is None or not template.has_examples:
+            return template.render(target=source)
+        budget = self.fewshot_budget
+        if budget is None:
+            budget = approx_tokens(template.defaults["examples"])
+        matches = self.fewshot.select(source, self.fewshot_k, budget)
+        return template.render(target=source, examples=format_examples([m.entry.example() for m in matches]))
+
+    async def request(self, cell: Cell, prompt: str) -> Completion:
+        """Answer from the cache, or send the prompt paced by the rate limit and retried."""
+        request = CompletionRequest(cell.model, prompt, self.params)
+        if self.cache is not None and (entry := self.cache.get(request)) is not None:
+            return entry.completion
+
+        attempt = 0
+
+        async def call() -> Completion:
+            nonlocal attempt
+            attempt += 1
+            if self.rate_limit is not None:
+                await self.rate_limit.acquire()
+            if not self.stream:
+                return await self.backend.complete(request)
+            # the last attempt runs to the end, so the cell gets an answer to repair
+            check = CodeStreamMonitor() if attempt < self.attempts else None
+            try:
+                completion = await self.backend.complete_streaming(request, check)
+            except StreamAborted as exc:
+                self.stream_stats.record_abort(exc)
+                raise
+            self.stream_stats.record(completion)
+            return completion
+
+        async with self._slots:
+            completion = await with_retries(call, attempts=self.attempts, base_delay=self.base_delay)
+        if self.cache is not None:
+            self.cache.put(request, completion)
+        return completion
+
+    async def translate(self, cell: Cell) -> Translation:
+        """Raw completion text, extracted code and the completions behind them.
+
+        In split mode the contract's context and each function are requested
+        concurrently and the answers reassembled; a contract without functions
+        is sent whole. Pieces the rule-based pre-translator covers are not
+        requested, nor are functions a translation memory already holds. A
+        function another cell of the run is already requesting waits for that
+        answer instead, and is requested only when it cannot be rebound.
+        In incremental mode, pieces whose Solidity did not change since the
+        previous translation keep their stored translation.
+        """
+        source = self.source(cell)
+        try:
+            split = split_contract(source) if self.split else None
+        except SolidityError:
+            split = None
+        if split is None:
+            completion = await self.request(cell, self.render(cell, source))
+            return Translation(completion.text, extract_code(completion.text), [completion])
+        output = self.output_path(cell)
+        kept = {}
+        if self.incremental and output.is_file():
+            kept = plan(split, load_sidecar(output)).reuse
+        ruled = {}
+        if self.pretranslate:
+            ruled = {name: code for name, code in pretranslate(split).pieces.items() if name not in kept}
+        scope = f"{cell.model}/{cell.prompt.stem}"
+        normalized = {}
+        remembered = {}
+        waiting = {}
+        claimed = {}
+        if self.memory is not None:
+            for piece in split.functions:
+                if piece.name in ruled or piece.name in kept:
+                    continue
+                normalized[piece.name] = found = normalize(piece.member, split.context_members)
+                claim = (scope, found.key)
+                if claim in self._claims:
+                    waiting[piece.name] = self._claims[claim]
+                elif (snippet := self.memory.lookup(scope, found)) is not None:
+                    remembered[piece.name] = snippet
+                else:
+                    self._claims[claim] = asyncio.get_running_loop().create_future()
+                    claimed[piece.name] = claim
+        done = kept.keys() | ruled.keys() | remembered.keys() | waiting.keys()
+        pieces = [piece for piece in split.pieces if piece.name not in done]
+        snippets = {}
+        try:
+            completions = list(await asyncio.gather(*(self.request(cell, self.render(cell, p.source))
+                                                      for p in pieces)))
+            answers = {piece.name: extract_code(c.text) for piece, c in zip(pieces, completions)}
+            answers.update(kept | ruled)
+            context_code = answers[CONTEXT]
+            snippets = self._snippets(context_code, pieces, completions, answers)
+            for name, (snippet, tokens) in snippets.items():
+                if name in claimed:
+                    self.memory.offer(scope, normalized[name], snippet, tokens)
+        finally:
+            for claim in claimed.values():
+                self._claims.pop(claim).set_result(None)
+        for name, claim in waiting.items():
+            await claim
+            if (snippet := self.memory.lookup(scope, normalized[name])) is not None:
+                remembered[name] = snippet
+        late = [piece for piece in split.functions if piece.name in waiting and piece.name not in remembered]
+        if late:
+            more = await asyncio.gather(*(self.request(cell, self.render(cell, p.source)) for p in late))
+            answers.update({piece.name: extract_code(c.text) for piece, c in zip(late, more)})
+            snippets.update(self._snippets(context_code, late, more, answers))
+            pieces += late
+            completions += more
+        answers.update(remembered)
+        code = assemble(context_code, {piece.name: answers[piece.name] for piece in split.functions})
+        stored = dict(answers) | {name: snippet for name, (snippet, _) in snippets.items()}
+        raw = "\n\n".join(f"<!-- {piece.name} -->\n{c.text}" for piece, c in zip(pieces, completions))
+        for origin, pieces_from in (("kept", kept), ("memory", remembered), ("rules", ruled)):
+            raw += "".join(f"\n\n<!-- {name} ({origin}) -->\n```python\n{snippet}```"
+                           for name, snippet in pieces_from.items())
+        rule_lines = 0
+        if CONTEXT in ruled:
+            rule_lines = count_lines(assemble(ruled[CONTEXT], {n: c for n, c in ruled.items() if n != CONTEXT}))
+        translation = Translation(raw.lstrip("\n"), code, completions, rule_lines, len(kept), sidecar(split, stored))
+        translation.memorable = {name: (normalized[name], tokens) for name, (_, tokens) in snippets.items()
+                                 if name in normalized}
+        translation.remembered = {name: normalized[name] for name in remembered}
+        return translation
+
+    @staticmethod
+    def _snippets(context_code: str, pieces: list, completions: list[Completion],
+                  answers: dict[str, str]) -> dict[str, tuple[str, int]]:
+        """Requested function pieces as stored (see ``function_snippet``), with the tokens each cost."""
+        snippets = {}
+        for piece, completion in zip(pieces, completions):
+            if piece.name == CONTEXT:
+                continue
+            try:
+                snippet = function_snippet(context_code, answers[piece.name], piece.name)
+            except AssemblyError:
+                continue
+            snippets[piece.name] = (snippet, completion.prompt_tokens + completion.completion_tokens)
+        return snippets
+
+    def remember(self, cell: Cell, translation: Translation, compiles: bool | None) -> None:
+        """Store the cell's new and repaired functions once its contract compiled.
+
+        Functions taken from the memory that a repair could not be written back
+        into are forgotten, compiled or not: their stored translation failed.
+        """
+        scope = f"{cell.model}/{cell.prompt.stem}"
+        for name in translation.dropped & translation.remembered.keys():
+            self.memory.forget(scope, translation.remembered[name])
+        if not compiles or translation.pieces is None:
+            return
+        entries = translation.pieces["pieces"]
+        for name, (found, tokens) in translation.memorable.items():
+            if name in entries:
+                self.memory.store(scope, found, entries[name]["code"], tokens)
+        for name in translation.repaired & translation.remembered.keys():
+            if name in entries:
+                self.memory.store(scope, translation.remembered[name], entries[name]["code"])
+
+    async def run_cell(self, cell: Cell) -> CellResult:
+        path = self.output_path(cell)
+        if self.resume and path.is_file():
+            return CellResult(cell.key, "skipped", output=str(path))
+        try:
+            translation = await self.translate(cell)
+        except (BackendError, ValueError) as exc:
+            return CellResult(cell.key, "error", error=str(exc))
+        compiles = error = None
+        repairs: list[Completion] = []
+        if self.compiler is not None:
+            compiles, error, repairs = await self.check(cell, translation)
+        if self.memory is not None:
+            self.remember(cell, translation, compiles)
+        completions = translation.completions
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.with_suffix(".md").write_text(translation.raw, encoding="utf-8")
+        path.write_text(translation.code, encoding="utf-8")
+        if translation.pieces is not None:
+            write_sidecar(path, translation.pieces)
+        return CellResult(
+            key=cell.key,
+            status="ok",
+            # concurrent pieces: the cell takes as long as its slowest request; repairs follow one another
+            latency_s=max((c.latency_s for c in completions), default=0.0) + sum(c.latency_s for c in repairs),
+            prompt_tokens=sum(c.prompt_tokens for c in [*completions, *repairs]),
+            completion_tokens=sum(c.completion_tokens for c in [*completions, *repairs]),
+            cached=bool(completions) and all(c.cached for c in [*completions, *repairs]),
+            lines=count_lines(translation.code),
+            rule_lines=translation.rule_lines,
+            requests=len(completions) + len(repairs),
+            kept=translation.kept,
+            compiles=compiles,
+            repair_rounds=len(repairs),
+            output=str(path),
+            error=error,
+        )
+
+    async def check(self, cell: Cell, translation: Translation) -> tuple[bool, str | None, list[Completion]]:
+        """Compile the translation, repairing its failing function up to ``repair_rounds`` times.
+
+        ``translation`` is updated with the repaired code and each round's
+        completion, and the repaired function is written back into its split
+        pieces; returns whether it compiles, the remaining error and the repair
+        completions.
+        """
+        repairs = []
+        checked = await asyncio.wrap_future(self.compiler.submit(cell.key, translation.code))
+        while not checked.ok and len(repairs) < self.repair_rounds:
+            request = repair_request(translation.code, checked.diagnostics)
+            if request is None:
+                break
+            completion = await self.request(cell, request.prompt)
+            repairs.append(completion)
+            translation.code = request.apply(completion.text)
+            self.write_back(translation, request.region)
+            translation.raw += (f"\n\n<!-- repair {len(repairs)}: {request.region.name}: {request.error.message} -->"
+                                f"\n{completion.text}")
+            checked = await asyncio.wrap_future(self.compiler.submit(cell.key, translation.code))
+        return checked.ok, None if checked.ok else checked.first_error, repairs
+
+    @staticmethod
+    def write_back(translation: Translation, region: Region) -> None:
+        """Put the repaired ``region`` of ``translation.code`` into the pieces that define it.
+
+        Pieces it cannot be put into are dropped, so an incremental run
+        translates them again rather than reusing what failed; a repair of the
+        whole module drops every piece.
+        """
+        if translation.pieces is None:
+            return
+        entries = translation.pieces["pieces"]
+        for name, entry in list(entries.items()):
+            if not region.is_module:
+                try:
+                    snippet = replace_method(entry["code"], translation.code, region.name)
+                except AssemblyError:
+                    snippet = ""
+                if snippet is None:
+                    continue
+                if snippet:
+                    entry["code"] = snippet
+                    translation.repaired.add(name)
+                    continue
+            del entries[name]
+            translation.repaired.discard(name)
+            translation.dropped.add(name)
+
+    async def run(self, cells: list[Cell]) -> list[CellResult]:
+        """Run every cell, appending each result to the manifest as it finishes.
+
+        ``concurrency`` bounds the requests in flight, not the cells, so the
+        pieces of split contracts share the same limit.
+        """
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        results = []
+        with (self.out_dir / "manifest.jsonl").open("a", encoding="utf-8") as manifest:
+            for finished in asyncio.as_completed([self.run_cell(cell) for cell in cells]):
+                result = await finished
+                results.append(result)
+                if result.status != "skipped":
+                    manifest.write(json.dumps(asdict(result)) + "\n")
+                    manifest.flush()
+        return results
+
+
+def select_paths(paths: list[Path], patterns: list[str] | None) -> list[Path]:
+    if not patterns:
+        return paths
+    return [p for p in paths if any(fnmatch.fnmatch(p.name, pattern) for pattern in patterns)]
+
+
+def summarize(results: list[CellResult], elapsed: float) -> str:
+    counts = {status: sum(r.status == status for r in results) for status in ("ok", "error", "skipped")}
+    cached = sum(r.cached for r in results)
+    tokens = sum(r.prompt_tokens + r.completion_tokens for r in results if not r.cached)
+    line = ", ".join(f"{count} {status}" for status, count in counts.items())
+    return f"{len(results)} cells in {elapsed:.1f}s: {line} ({cached} from cache); {tokens} tokens spent"
+
+
+def format_rule_lines(results: list[CellResult]) -> str:
+    lines = sum(r.lines for r in results)
+    rule_lines = sum(r.rule_lines for r in results)
+    share = f"{rule_lines / lines:.0%}" if lines else "-"
+    offline = sum(r.status == "ok" and r.rule_lines > 0 and r.rule_lines == r.lines for r in results)
+    return f"{rule_lines}/{lines} lines ({share}) written without the model, {offline} cells without a request"
+
+
+def format_compiles(results: list[CellResult]) -> str:
+    checked = [r for r in results if r.compiles is not None]
+    passed = sum(r.compiles for r in checked)
+    share = f"{passed / len(checked):.0%}" if checked else "-"
+    return f"{passed}/{len(checked)} translations compile ({share})"
+
+
+def repair_stats(results: list[CellResult]) -> dict[str, RepairStats]:
+    """Compile success and tokens spent per prompt style, over the checked cells."""
+    stats: dict[str, RepairStats] = {}
+    for result in results:
+        if result.compiles is None:
+            continue
+        style = stats.setdefault(result.key.split("/")[1], RepairStats())
+        style.cells += 1
+        style.compiled += result.compiles
+        style.repaired += result.compiles and result.repair_rounds > 0
+        style.tokens += result.prompt_tokens + result.completion_tokens
+    return stats
+
+
+def format_repair_stats(stats: dict[str, RepairStats]) -> str:
+    lines = []
+    for prompt, style in sorted(stats.items()):
+        cost = "-" if style.tokens_per_success is None else f"{style.tokens_per_success:.0f}"
+        lines.append(f"  {prompt}: {style.compiled}/{style.cells} compile ({style.success_rate:.0%}, "
+                     f"{style.repaired} after repair), {cost} tokens per compiling contract")
+    return "\n".join(lines)
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """Backend and pacing options shared by the translation commands."""
+    parser.add_argument("--model", action="append", required=True, help="model name, repeatable")
+    parser.add_argument("--base-url", default="https://api.openai.com/v1")
+    parser.add_argument("--stub", action="store_true", help="serve completions from a local stub server")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--rps", type=float, default=0.0, help="requests per second, 0 for no limit")
+    parser.add_argument("--burst", type=float, default=None, help="token bucket capacity")
+    parser.add_argument("--attempts", type=int, default=5, help="tries per request")
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--max-tokens", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE_PATH, help="response cache file")
+    parser.add_argument("--cache-max-mb", type=float, default=512.0, help="cache size before LRU eviction")
+    parser.add_argument("--no-cache", action="store_true", help="always query the model")
+
+
+def sampling_params(args: argparse.Namespace) -> SamplingParams:
+    return SamplingParams(temperature=args.temperature, max_tokens=args.max_tokens, seed=args.seed)
+
+
+def rate_limit(args: argparse.Namespace) -> TokenBucket | None:
+    return TokenBucket(args.rps, args.burst) if args.rps > 0 else None
+
+
+def response_cache(args: argparse.Namespace) -> ResponseCache | None:
+    return None if args.no_cache else ResponseCache(args.cache, int(args.cache_max_mb * 1024 * 1024))
+
+
+def compile_stage(args: argparse.Namespace) -> CompileStage | None:
+    """The puyapy stage ``--compile`` asks for; RuntimeError when puyapy is not installed."""
+    if not (args.compile or args.repair or args.memory):
+        return None
+    return CompileStage(args.compile_cache, args.compile_jobs)
+
+
+def _compiler_needed_by(args: argparse.Namespace) -> str:
+    """Why a run without ``--compile`` needs puyapy, for the error when it is missing."""
+    if args.compile:
+        return ""
+    if args.repair:
+        return " (--repair sends compiler errors back to the model)"
+    if args.memory:
+        return " (--memory stores only translations that compile)"
+    return ""
+
+
+async def _main(args: argparse.Namespace) -> int:
+    try:
+        compiler = compile_stage(args)
+    except RuntimeError as exc:
+        print(f"error: {exc}{_compiler_needed_by(args)}", file=sys.stderr)
+        return 1
+    cells = expand_matrix(
+        select_paths(solidity_contracts(), args.contracts), select_paths(prompt_files(), args.prompts), args.model
+    )
+    started = time.perf_counter()
+    if args.stub:
+        from tools.translation.stub_server import StubServer
+
+        async with StubServer() as server:
+            runner = _runner(args, OpenAICompatibleBackend(server.url, api_key=""), compiler)
+            results = await runner.run(cells)
+    else:
+        runner = _runner(args, OpenAICompatibleBackend(args.base_url), compiler)
+        results = await runner.run(cells)
+    print(summarize(results, time.perf_counter() - started))
+    if runner.cache is not None:
+        print(f"cache: {format_stats(runner.cache.stats())}")
+    if runner.memory is not None:
+        print(f"memory: {format_memory_stats(runner.memory.session)}")
+    if runner.pretranslate:
+        print(f"rules: {format_rule_lines(results)}")
+    if runner.incremental:
+        kept = sum(r.kept for r in results)
+        print(f"incremental: {kept} unchanged pieces kept, {sum(r.requests for r in results)} requested")
+    if runner.stream:
+        print(f"stream: {format_stream_stats(runner.stream_stats)}")
+    if runner.compiler is not None:
+        runner.compiler.close()
+        print(f"compile: {format_compiles(results)}; {format_compile_stats(runner.compiler.session)}")
+        if runner.repair_rounds:
+            print(format_repair_stats(repair_stats(results)))
+        for result in results:
+            if result.compiles is False:
+                print(f"  {result.key}: {result.error}")
+    for result in results:
+        if result.status == "error":
+            print(f"  {result.key}: {result.error}")
+    return 1 if any(r.status == "error" for r in results) else 0
+
+
+def _runner(args: argparse.Namespace, backend: Backend, compiler: CompileStage | None) -> TranslationRunner:
+    return TranslationRunner(
+        backend,
+        args.out,
+        concurrency=args.concurrency,
+        rate_limit=rate_limit(args),
+        params=sampling_params(args),
+        attempts=args.attempts,
+        resume=args.resume,
+        cache=response_cache(args),
+        fewshot=FewShotIndex.build() if args.fewshot else None,
+        fewshot_k=args.fewshot,
+        fewshot_budget=args.fewshot_budget,
+        compression=args.compress,
+        verify_compression=args.verify_compression,
+        split=args.split or args.memory or args.pretranslate or args.incremental,
+        memory=TranslationMemory(args.memory_path) if args.memory else None,
+        pretranslate=args.pretranslate,
+        incremental=args.incremental,
+        compiler=compiler,
+        repair_rounds=args.repair,
+        stream=args.stream,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_backend_arguments(parser)
+    parser.add_argument("--contracts", action="append", help="Solidity file glob, e.g. 'coin*.sol'")
+    parser.add_argument("--prompts", action="append", help="prompt file glob, e.g. 'COT*'")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT_DIR)
+    parser.add_argument("--resume", action="store_true", help="skip cells that already have output")
+    parser.add_argument("--fewshot", type=int, default=0, metavar="K",
+                        help="replace few-shot prompts' fixed examples with the K most similar dataset pairs")
+    parser.add_argument("--fewshot-budget", type=int, default=None, metavar="TOKENS",
+                        help="token budget for the retrieved examples (default: the template's own)")
+    parser.add_argument("--compress", choices=LEVELS, default="none",
+                        help="strip comments (and layout) from the Solidity source first")
+    parser.add_argument("--verify-compression", action="store_true",
+                        help="fail a cell whose compressed source does not parse to the same AST")
+    parser.add_argument("--split", action="store_true",
+                        help="translate each function concurrently and reassemble the contract")
+    parser.add_argument("--memory", action="store_true",
+                        help="reuse remembered translations of equivalent functions; only compiling ones are stored "
+                             "(implies --split and --compile)")
+    parser.add_argument("--memory-path", type=Path, default=DEFAULT_MEMORY_PATH, help="translation memory file")
+    parser.add_argument("--pretranslate", action="store_true",
+                        help="write mechanical pieces with rules and send only the rest (implies --split)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="re-translate only the pieces whose Solidity changed since the last run (implies --split)")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream completions and retry those whose code block breaks before they finish")
+    parser.add_argument("--compile", action="store_true", help="check every translation with puyapy")
+    parser.add_argument("--repair", type=int, default=0, metavar="N",
+                        help="send the failing function and compiler error back to the model, N rounds at most "
+                             "(implies --compile)")
+    parser.add_argument("--compile-jobs", type=int, default=None, help="compiler worker processes")
+    parser.add_argument("--compile-cache", type=Path, default=DEFAULT_COMPILE_CACHE_PATH,
+                        help="compile result cache file")
+    return asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
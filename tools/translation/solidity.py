@@ -0,0 +1,426 @@
+"""A small Solidity lexer and declaration-level parser.
+
+This is not a full Solidity grammar. It tokenizes complete sources (comments,
+NatSpec, strings, numbers, identifiers, operators) and groups the tokens into
+the declarations the translation tools work with: pragmas and imports,
+contracts with their bases, and contract members (state variables, structs,
+enums, events, errors, modifiers, constructors and functions). Statements
+inside bodies are kept as token sequences.
+
+Node equality ignores positions and comments, so ``parse(a) == parse(b)`` holds
+exactly when two sources have the same declarations and the same code tokens;
+the compression stage relies on this to prove it only touched comments and
+layout.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<natspec>///[^\n]*|/\*\*(?!/).*?\*/)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>(?:unicode|hex)?"(?:\\.|[^"\\\n])*"|(?:unicode|hex)?'(?:\\.|[^'\\\n])*')
+  | (?P<number>0[xX][0-9a-fA-F_]+|(?:\d[\d_]*(?:\.\d[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_$][\w$]*)
+  | (?P<punct>>>>=|>>=|<<=|>>>|\*\*|=>|==|!=|<=|>=|&&|\|\||\+\+|--|\+=|-=|\*=|/=|%=|&=|\|=|\^=|<<|>>|->
+               |[{}()\[\];,.?:=+\-*/%<>!~&|^@])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+COMMENT_KINDS = frozenset({"comment", "natspec"})
+
+#: Members whose declaration is followed by a ``{ ... }`` body (or ``;`` if abstract)
+CALLABLE_KINDS = frozenset({"function", "constructor", "modifier", "fallback", "receive"})
+
+#: Header keywords that are not modifier invocations
+FUNCTION_KEYWORDS = frozenset({
+    "public", "external", "internal", "private", "view", "pure", "payable", "constant",
+    "virtual", "override", "returns",
+})
+
+
+class SolidityError(ValueError):
+    """The source could not be tokenized or grouped into declarations."""
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+def tokenize(source: str, *, comments: bool = True) -> list[Token]:
+    """Split ``source`` into tokens, dropping whitespace (and comments unless asked)."""
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = _TOKEN_RE.match(source, position)
+        if match is None:
+            line = source.count("\n", 0, position) + 1
+            raise SolidityError(f"unexpected character {source[position]!r} on line {line}")
+        kind = match.lastgroup
+        if kind != "ws" and (comments or kind not in COMMENT_KINDS):
+            tokens.append(Token(kind, match.group(), match.start(), match.end()))
+        position = match.end()
+    return tokens
+
+
+@dataclass(frozen=True)
+class Parameter:
+    type: str
+    name: str
+
+
+@dataclass(frozen=True)
+class Member:
+    """One declaration; ``tokens`` are the code tokens from its keyword to its end."""
+
+    kind: str
+    name: str
+    tokens: tuple[str, ...]
+    start: int = field(default=0, compare=False)
+    end: int = field(default=0, compare=False)
+    doc: str = field(default="", compare=False)
+
+    def text(self, source: str) -> str:
+        return source[self.start : self.end]
+
+    @property
+    def body_index(self) -> int | None:
+        """Index in ``tokens`` of the body's opening brace, if there is a body."""
+        if self.kind not in CALLABLE_KINDS:
+            return None
+        depth = 0
+        for index, token in enumerate(self.tokens):
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif token == "{" and depth == 0:
+                return index
+        return None
+
+    @property
+    def header(self) -> tuple[str, ...]:
+        index = self.body_index
+        return self.tokens if index is None else self.tokens[:index]
+
+    @property
+    def body(self) -> tuple[str, ...]:
+        """Tokens between the body's braces."""
+        index = self.body_index
+        return () if index is None else self.tokens[index + 1 : -1]
+
+    @property
+    def parameters(self) -> list[Parameter]:
+        groups = _paren_groups(self.header)
+        return _parameters(groups[0]) if groups else []
+
+    @property
+    def returns(self) -> list[Parameter]:
+        header = self.header
+        if "returns" not in header:
+            return []
+        groups = _paren_groups(header[header.index("returns") :])
+        return _parameters(groups[0]) if groups else []
+
+    @property
+    def modifiers(self) -> list[str]:
+        """Names of the modifiers invoked in a function header, e.g. ``["onlyOwner"]``."""
+        header = self.header
+        if "(" not in header:
+            return []
+        names = []
+        depth = 0
+        after_params = False
+        for token in header[header.index("(") :]:
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+                after_params = True
+            elif depth == 0 and after_params and re.fullmatch(r"[A-Za-z_$][\w$]*", token):
+                if token == "returns":
+                    break
+                if token not in FUNCTION_KEYWORDS:
+                    names.append(token)
+        return names
+
+    @property
+    def visibility(self) -> str | None:
+        return next((t for t in self.header if t in ("public", "external", "internal", "private")), None)
+
+    @property
+    def mutability(self) -> str | None:
+        return next((t for t in self.header if t in ("view", "pure", "payable", "constant")), None)
+
+
+@dataclass(frozen=True)
+class Contract:
+    kind: str
+    name: str
+    bases: tuple[str, ...]
+    members: tuple[Member, ...]
+    start: int = field(default=0, compare=False)
+    end: int = field(default=0, compare=False)
+    doc: str = field(default="", compare=False)
+
+    def of_kind(self, *kinds: str) -> list[Member]:
+        return [member for member in self.members if member.kind in kinds]
+
+    @property
+    def functions(self) -> list[Member]:
+        return self.of_kind("function", "constructor", "fallback", "receive")
+
+    def member(self, name: str) -> Member | None:
+        return next((member for member in self.members if member.name == name), None)
+
+
+@dataclass(frozen=True)
+class SourceUnit:
+    directives: tuple[Member, ...]
+    contracts: tuple[Contract, ...]
+    members: tuple[Member, ...] = ()
+
+    def contract(self, name: str | None = None) -> Contract:
+        """The named contract, or by default the last one (the one usually deployed)."""
+        if not self.contracts:
+            raise SolidityError("source declares no contract")
+        if name is None:
+            return self.contracts[-1]
+        for contract in self.contracts:
+            if contract.name == name:
+                return contract
+        raise SolidityError(f"no contract named {name!r}")
+
+
+def _paren_groups(tokens: tuple[str, ...]) -> list[tuple[str, ...]]:
+    """Contents of the top-level parenthesised groups in ``tokens``."""
+    groups = []
+    depth = 0
+    start = 0
+    for index, token in enumerate(tokens):
+        if token == "(":
+            if depth == 0:
+                start = index + 1
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                groups.append(tokens[start:index])
+    return groups
+
+
+def _parameters(tokens: tuple[str, ...]) -> list[Parameter]:
+    parameters = []
+    depth = 0
+    current: list[str] = []
+    for token in (*tokens, ","):
+        if token in "([":
+            depth += 1
+        elif token in ")]":
+            depth -= 1
+        if token == "," and depth == 0:
+            if current:
+                words = [t for t in current if t not in ("memory", "storage", "calldata", "indexed")]
+                named = len(words) > 1 and re.fullmatch(r"[A-Za-z_$][\w$]*", words[-1]) is not None
+                type_tokens = words[:-1] if named else words
+                parameters.append(Parameter(_join(type_tokens), words[-1] if named else ""))
+            current = []
+        else:
+            current.append(token)
+    return parameters
+
+
+def _join(tokens: list[str] | tuple[str, ...]) -> str:
+    """Re-space type tokens: ``mapping(address => uint256)``, ``uint256[]``."""
+    text = " ".join(tokens)
+    return re.sub(r"\s*([()\[\].,])\s*", r"\1", text).replace(",", ", ")
+
+
+class _Parser:
+    def __init__(self, source: str) -> None:
+        self.source = source
+        everything = tokenize(source)
+        self.tokens = [t for t in everything if t.kind not in COMMENT_KINDS]
+        # NatSpec/comments directly before each code token, for member docs
+        self.docs: dict[int, str] = {}
+        pending: list[str] = []
+        code_index = 0
+        for token in everything:
+            if token.kind in COMMENT_KINDS:
+                pending.append(token.text)
+            else:
+                if pending:
+                    self.docs[code_index] = "\n".join(pending)
+                    pending = []
+                code_index += 1
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> str | None:
+        index = self.position + offset
+        return self.tokens[index].text if index < len(self.tokens) else None
+
+    def expect(self, text: str) -> Token:
+        token = self.tokens[self.position] if self.position < len(self.tokens) else None
+        if token is None or token.text != text:
+            found = token.text if token else "end of file"
+            raise SolidityError(f"expected {text!r}, found {found!r}")
+        self.position += 1
+        return token
+
+    def skip_to(self, terminator: str) -> int:
+        """Advance past the next ``terminator`` outside brackets; return its index."""
+        depth = 0
+        while self.position < len(self.tokens):
+            text = self.tokens[self.position].text
+            self.position += 1
+            if text in "({[":
+                depth += 1
+            elif text in ")}]":
+                depth -= 1
+                if depth < 0:
+                    raise SolidityError(f"unbalanced {text!r}")
+            if depth == 0 and text == terminator:
+                return self.position - 1
+        raise SolidityError(f"missing {terminator!r}")
+
+    def skip_block(self) -> int:
+        """From just before a ``{``, advance past its matching ``}``; return that index."""
+        depth = 0
+        while self.position < len(self.tokens):
+            text = self.tokens[self.position].text
+            self.position += 1
+            if text == "{":
+                depth += 1
+            elif text == "}":
+                depth -= 1
+                if depth == 0:
+                    return self.position - 1
+        raise SolidityError("unterminated block")
+
+    def span(self, first: int, last: int) -> tuple[tuple[str, ...], int, int]:
+        tokens = self.tokens[first : last + 1]
+        return tuple(t.text for t in tokens), tokens[0].start, tokens[-1].end
+
+    def parse(self) -> SourceUnit:
+        directives: list[Member] = []
+        contracts: list[Contract] = []
+        members: list[Member] = []
+        while self.position < len(self.tokens):
+            first = self.position
+            word = self.peek()
+            if word in ("pragma", "import"):
+                tokens, start, end = self.span(first, self.skip_to(";"))
+                directives.append(Member(word, tokens[1] if len(tokens) > 1 else "", tokens, start, end))
+            elif word in ("contract", "interface", "library") or (
+                word == "abstract" and self.peek(1) == "contract"
+            ):
+                contracts.append(self.contract())
+            else:
+                members.append(self.member())
+        return SourceUnit(tuple(directives), tuple(contracts), tuple(members))
+
+    def contract(self) -> Contract:
+        first = self.position
+        kind = self.tokens[self.position].text
+        self.position += 1
+        if kind == "abstract":
+            kind = "abstract contract"
+            self.position += 1
+        name = self.tokens[self.position].text
+        self.position += 1
+        bases: list[str] = []
+        if self.peek() == "is":
+            self.position += 1
+            expecting_name = True
+            depth = 0
+            while self.peek() not in ("{", None):
+                text = self.tokens[self.position].text
+                if text == "(":
+                    depth += 1
+                elif text == ")":
+                    depth -= 1
+                elif text == "," and depth == 0:
+                    expecting_name = True
+                elif expecting_name and depth == 0:
+                    bases.append(text)
+                    expecting_name = False
+                self.position += 1
+        self.expect("{")
+        members = []
+        while self.peek() not in ("}", None):
+            members.append(self.member())
+        closing = self.expect("}")
+        return Contract(kind, name, tuple(bases), tuple(members), self.tokens[first].start, closing.end,
+                        self.docs.get(first, ""))
+
+    def member(self) -> Member:
+        first = self.position
+        word = self.peek()
+        if word in ("function", "constructor", "modifier", "fallback", "receive"):
+            kind = word
+            if word == "function":
+                following = self.peek(1)
+                kind, name = ("fallback", "fallback") if following == "(" else ("function", following)
+            elif word == "modifier":
+                name = self.peek(1)
+            else:
+                name = word
+            last = self.callable_end()
+        elif word in ("struct", "enum"):
+            kind, name = word, self.peek(1)
+            last = self.skip_block()
+        elif word in ("event", "error", "using"):
+            kind, name = word, self.peek(1)
+            last = self.skip_to(";")
+        else:
+            kind = "state"
+            last = self.skip_to(";")
+            name = self.declared_name(first, last)
+        tokens, start, end = self.span(first, last)
+        return Member(kind, name or "", tokens, start, end, self.docs.get(first, ""))
+
+    def callable_end(self) -> int:
+        """Advance past a callable's header and its body (or ``;``)."""
+        depth = 0
+        while self.position < len(self.tokens):
+            text = self.tokens[self.position].text
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            elif depth == 0 and text == ";":
+                self.position += 1
+                return self.position - 1
+            elif depth == 0 and text == "{":
+                return self.skip_block()
+            self.position += 1
+        raise SolidityError("unterminated declaration")
+
+    def declared_name(self, first: int, last: int) -> str:
+        """Name in ``<type> [keywords] name [= value];``."""
+        depth = 0
+        name = ""
+        for token in self.tokens[first:last]:
+            if token.text in "([":
+                depth += 1
+            elif token.text in ")]":
+                depth -= 1
+            elif depth == 0 and token.text == "=":
+                break
+            elif depth == 0 and token.kind == "ident":
+                name = token.text
+        return name
+
+
+def parse(source: str) -> SourceUnit:
+    """Group a Solidity source into declarations; raises SolidityError when it cannot."""
+    return _Parser(source).parse()
@@ -0,0 +1,295 @@
+"""Function-level splitting of Solidity contracts and reassembly of the translations.
+
+:func:`split_contract` flattens the deployed contract with the bases declared in
+the same file (derived members win) and cuts it into self-contained pieces:
+
+* ``context``: the contract with its state variables, structs, enums, events,
+  errors, modifiers and constructors, but no functions;
+* one piece per function: the same context plus that single function.
+
+Every piece is a valid contract, so any prompt style can translate it and the
+pieces can be sent concurrently. :func:`assemble` then takes the translated
+context as the skeleton and adds each piece's new methods to the contract
+class, along with module-level declarations (event structs, helpers) it does not
+have yet. Imports of all pieces are merged.
+"""
+
+from __future__ import annotations
+
+import ast
+import textwrap
+from dataclasses import dataclass
+
+from tools.translation.solidity import Contract, Member, SolidityError, SourceUnit, parse
+
+CONTEXT = "__context__"
+
+_CONTEXT_KINDS = frozenset({"state", "struct", "enum", "event", "error", "using", "modifier", "constructor"})
+
+
+class AssemblyError(ValueError):
+    """Translated pieces could not be put back together."""
+
+
+@dataclass(frozen=True)
+class Piece:
+    name: str
+    source: str
+    #: The function this piece translates; None for the context piece
+    member: Member | None = None
+
+
+@dataclass(frozen=True)
+class SplitContract:
+    name: str
+    context: Piece
+    functions: tuple[Piece, ...]
+    #: Declarations shared by every piece (state, modifiers, events, ...)
+    context_members: tuple[Member, ...] = ()
+
+    @property
+    def pieces(self) -> tuple[Piece, ...]:
+        return (self.context, *self.functions)
+
+
+def _is_constructor(member: Member, contract: Contract) -> bool:
+    # before Solidity 0.4.22 the constructor is the function named after the contract
+    return member.kind == "constructor" or (member.kind == "function" and member.name == contract.name)
+
+
+def _member_key(member: Member) -> tuple:
+    if member.kind in ("function", "modifier"):
+        return member.kind, member.name, tuple(p.type for p in member.parameters)
+    return member.kind, member.name
+
+
+def flatten(unit: SourceUnit, contract: Contract) -> list[tuple[Contract, Member]]:
+    """Members of ``contract`` and its in-file bases, most-base first, overrides replaced."""
+    by_name = {c.name: c for c in unit.contracts}
+    order: list[Contract] = []
+
+    def visit(current: Contract) -> None:
+        for base in current.bases:
+            if base in by_name and by_name[base] not in order:
+                visit(by_name[base])
+        if current not in order:
+            order.append(current)
+
+    visit(contract)
+    members: dict[tuple, tuple[Contract, Member]] = {}
+    for owner in order:
+        for member in owner.members:
+            key = _member_key(member)
+            members.pop(key, None)
+            members[key] = owner, member
+    return list(members.values())
+
+
+def split_contract(source: str, name: str | None = None) -> SplitContract:
+    """Cut the named (default: last) contract into a context piece and one piece per function."""
+    unit = parse(source)
+    contract = unit.contract(name)
+    if contract.kind in ("interface", "library"):
+        raise SolidityError(f"{contract.name} is an {contract.kind}, not a deployable contract")
+    members = flatten(unit, contract)
+    # some dataset files repeat their contracts; keep one copy of each directive and interface
+    header = list({directive.tokens: directive.text(source) for directive in unit.directives}.values())
+    # interfaces and libraries are referenced by name, keep them whole
+    extras = list({c.name: source[c.start : c.end] for c in unit.contracts
+                   if c.kind in ("interface", "library")}.values())
+    context = [m for owner, m in members if m.kind in _CONTEXT_KINDS or _is_constructor(m, owner)]
+    functions = [m for owner, m in members if m not in context and m.kind in ("function", "fallback", "receive")]
+
+    def render(body: list[Member]) -> str:
+        parts = [*header, "", *extras, "" if extras else None, f"contract {contract.name} {{"]
+        # members keep their original indentation after the first line
+        parts.extend(f"    {member.text(source)}" for member in body)
+        parts.append("}")
+        return "\n".join(part for part in parts if part is not None) + "\n"
+
+    if not functions:
+        raise SolidityError(f"{contract.name} has no functions to split")
+    return SplitContract(
+        contract.name,
+        Piece(CONTEXT, render(context)),
+        tuple(Piece(_piece_name(f, functions), render([*context, f]), f) for f in functions),
+        tuple(context),
+    )
+
+
+def _piece_name(function: Member, functions: list[Member]) -> str:
+    same_name = [f for f in functions if f.name == function.name]
+    if len(same_name) == 1:
+        return function.name
+    return f"{function.name}_{same_name.index(function)}"
+
+
+def _node_lines(node: ast.stmt) -> tuple[int, int]:
+    decorators = getattr(node, "decorator_list", [])
+    start = min([node.lineno, *(d.lineno for d in decorators)])
+    return start, node.end_lineno or node.lineno
+
+
+def _node_text(lines: list[str], node: ast.stmt) -> str:
+    start, end = _node_lines(node)
+    return textwrap.dedent("\n".join(lines[start - 1 : end]))
+
+
+def contract_class(module: ast.Module) -> ast.ClassDef | None:
+    classes = [node for node in module.body if isinstance(node, ast.ClassDef)]
+
+    def is_contract(node: ast.ClassDef) -> bool:
+        names = {getattr(base, "attr", getattr(base, "id", "")) for base in node.bases}
+        return bool(names & {"ARC4Contract", "Contract"})
+
+    contracts = [node for node in classes if is_contract(node)]
+    return (contracts or classes or [None])[-1]
+
+
+def _parse(code: str, piece: str) -> ast.Module:
+    try:
+        return ast.parse(code)
+    except SyntaxError as exc:
+        raise AssemblyError(f"translation of {piece} is not valid Python: {exc}") from exc
+
+
+def _declared_name(node: ast.stmt) -> str | None:
+    if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+        return node.name
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return node.target.id
+    return None
+
+
+def _merge_imports(modules: list[ast.Module]) -> list[str]:
+    plain: dict[str, None] = {}
+    from_imports: dict[str, dict[str, None]] = {}
+    for module in modules:
+        for node in module.body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    plain[f"import {alias.name}" + (f" as {alias.asname}" if alias.asname else "")] = None
+            elif isinstance(node, ast.ImportFrom):
+                names = from_imports.setdefault("." * node.level + (node.module or ""), {})
+                for alias in node.names:
+                    names[alias.name + (f" as {alias.asname}" if alias.asname else "")] = None
+    lines = list(plain)
+    lines.extend(f"from {module} import {', '.join(names)}" for module, names in from_imports.items())
+    return lines
+
+
+def _new_declarations(
+    module_names: set[str], method_names: set[str], code: str, piece: str
+) -> tuple[ast.Module, list[str], list[str]]:
+    """Module-level declarations and contract methods of ``code`` not yet in the names given.
+
+    The names are updated in place so later pieces do not repeat them.
+    """
+    module = _parse(code, piece)
+    lines = code.splitlines()
+    piece_contract = contract_class(module)
+    extras = []
+    methods = []
+    for node in module.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)) or node is piece_contract:
+            continue
+        declared = _declared_name(node)
+        if declared is not None and declared not in module_names:
+            module_names.add(declared)
+            extras.append(_node_text(lines, node))
+    for node in piece_contract.body if piece_contract is not None else []:
+        declared = _declared_name(node)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and declared not in method_names:
+            method_names.add(declared)
+            methods.append(textwrap.indent(_node_text(lines, node), "    "))
+    return module, extras, methods
+
+
+def _skeleton(context_code: str) -> tuple[ast.Module, ast.ClassDef, set[str], set[str]]:
+    skeleton = _parse(context_code, CONTEXT)
+    contract = contract_class(skeleton)
+    if contract is None:
+        raise AssemblyError("translation of the context declares no contract class")
+    module_names = {_declared_name(node) for node in skeleton.body} - {None}
+    method_names = {_declared_name(node) for node in contract.body} - {None}
+    return skeleton, contract, module_names, method_names
+
+
+def function_snippet(context_code: str, piece_code: str, piece: str = "function") -> str:
+    """What a function piece adds to the context: its imports, new declarations and methods.
+
+    The result is a module of its own whose contract class holds only the new
+    methods, so it can be stored and later passed back to :func:`assemble`.
+    """
+    _, _, module_names, method_names = _skeleton(context_code)
+    module, extras, methods = _new_declarations(module_names, method_names, piece_code, piece)
+    if not methods:
+        raise AssemblyError(f"translation of {piece} adds no method to the contract")
+    sections = ["\n".join(_merge_imports([module])), *extras,
+                "class Snippet(ARC4Contract):\n" + "\n\n".join(methods)]
+    return "\n\n\n".join(section for section in sections if section) + "\n"
+
+
+def _method(module: ast.Module, name: str) -> ast.FunctionDef | ast.AsyncFunctionDef | None:
+    contract = contract_class(module)
+    return next((node for node in contract.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                 and node.name == name), None) if contract is not None else None
+
+
+def replace_method(snippet: str, code: str, name: str) -> str | None:
+    """``snippet`` with its method ``name`` taken from the contract in ``code``; None when it has no such method.
+
+    ``snippet`` is a piece's translation as :func:`function_snippet` returns it
+    (or the context's). The imports of ``code`` are merged in, so a method
+    rewritten in the assembled contract, by a repair, keeps what it needs.
+    """
+    piece = _parse(snippet, name)
+    old = _method(piece, name)
+    if old is None:
+        return None
+    source = _parse(code, name)
+    new = _method(source, name)
+    if new is None:
+        raise AssemblyError(f"the contract has no method {name} to take")
+    lines = snippet.splitlines()
+    start, end = _node_lines(old)
+    lines[start - 1 : end] = textwrap.indent(_node_text(code.splitlines(), new), " " * old.col_offset).splitlines()
+    # imports come before the contract class, so their lines did not move
+    imports = {n for node in piece.body if isinstance(node, (ast.Import, ast.ImportFrom))
+               for n in range(_node_lines(node)[0], _node_lines(node)[1] + 1)}
+    rest = "\n".join(line for number, line in enumerate(lines, 1) if number not in imports).strip("\n")
+    return "\n".join(_merge_imports([piece, source])) + "\n\n\n" + rest + "\n"
+
+
+def assemble(context_code: str, function_codes: dict[str, str]) -> str:
+    """Merge translated pieces into one module around the context's contract class."""
+    skeleton, contract, module_names, method_names = _skeleton(context_code)
+    modules = []
+    module_extras: list[str] = []
+    methods: list[str] = []
+    for name, code in function_codes.items():
+        module, extras, new_methods = _new_declarations(module_names, method_names, code, name)
+        modules.append(module)
+        module_extras.extend(extras)
+        methods.extend(new_methods)
+
+    lines = context_code.splitlines()
+    class_start, class_end = _node_lines(contract)
+    imports = [node for node in skeleton.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    import_lines = {n for node in imports for n in range(_node_lines(node)[0], _node_lines(node)[1] + 1)}
+    before = [line for number, line in enumerate(lines[: class_start - 1], 1) if number not in import_lines]
+    contract_text = "\n\n".join(["\n".join(lines[class_start - 1 : class_end]), *methods])
+    if methods and len(contract.body) == 1 and isinstance(contract.body[0], ast.Pass):
+        # an empty context class holds only a placeholder the methods replace
+        header = "\n".join(lines[class_start - 1 : contract.body[0].lineno - 1])
+        contract_text = "\n".join([header, "\n\n".join(methods)])
+    sections = [
+        "\n".join(_merge_imports([skeleton, *modules])),
+        "\n".join(before).strip("\n"),
+        *module_extras,
+        contract_text,
+        "\n".join(lines[class_end:]).strip("\n"),
+    ]
+    return "\n\n\n".join(section for section in sections if section) + "\n"
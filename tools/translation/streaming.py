@@ -0,0 +1,222 @@
+"""Early abort of streamed completions whose code block cannot be used.
+
+Chain-of-thought prompts (``COT1prompt.txt``, ``COT2prompt.txt``,
+``cotfew.text``) produce long answers, and a broken code block used to be found
+only once the whole answer had arrived. With ``runner --stream`` completions
+are streamed, and :class:`CodeStreamMonitor` follows the text line by line:
+
+* prose and non-Python fences are skipped; a Python block is watched once it
+  looks like the contract (it imports ``algopy`` or declares a ``Contract`` /
+  ``ARC4Contract`` class), so scratch snippets in the reasoning never abort;
+* an import of anything but ``algopy``, ``typing`` or ``__future__`` aborts;
+* every complete line, the block so far is compiled: errors that more text can
+  still fix (an open bracket or string, a block header waiting for its body, a
+  problem on the last line) are ignored, any other syntax error aborts;
+* when the block closes it must compile as a whole, so a class left without a
+  body or a bracket never closed aborts before the prose after it is generated.
+
+An aborted stream closes the connection, so the model stops generating, and
+its slot goes to a retry; the last attempt is streamed without the monitor so a
+cell still gets an answer for ``--repair`` to work on. The run reports how many
+streams were cut, and the tokens and seconds saved, estimated from the mean
+length of the streams that finished.
+
+``python -m tools.translation.streaming`` replays saved raw completions
+(``.md`` files) through the monitor and prints where each would have been cut::
+
+    python -m tools.translation.runner --model gpt-4o --prompts 'COT*' --stream
+    python -m tools.translation.streaming translations/gpt-4o/COT1prompt
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tools.translation.backend import Completion, StreamAborted
+
+#: Top-level modules a translation may import
+ALLOWED_IMPORTS = frozenset({"algopy", "typing", "__future__"})
+
+_FENCE_RE = re.compile(r"^\s*```\s*([\w+-]*)\s*$")
+_IMPORT_RE = re.compile(r"^\s*(?:from\s+([.\w]+)\s+import\b|import\s+([\w.][\w., ]*))")
+_CONTRACT_CLASS_RE = re.compile(r"^class\s+\w+\s*\([^)]*\b(?:ARC4Contract|Contract)\b")
+_PYTHON_FENCES = frozenset({"", "python", "py", "python3"})
+
+#: SyntaxError messages of code that is only cut short
+_INCOMPLETE = ("was never closed", "unterminated triple-quoted", "unexpected EOF")
+
+
+def _imported_roots(line: str) -> list[str]:
+    match = _IMPORT_RE.match(line)
+    if match is None:
+        return []
+    module = match.group(1)
+    if module is not None:
+        return ["."] if module.startswith(".") else [module.split(".")[0]]
+    return [name.split()[0].split(".")[0] for name in match.group(2).split(",") if name.strip()]
+
+
+def _syntax_error(code: str) -> SyntaxError | None:
+    try:
+        compile(code, "<stream>", "exec", dont_inherit=True)
+    except SyntaxError as exc:
+        return exc
+    except ValueError:
+        return None
+    return None
+
+
+class CodeStreamMonitor:
+    """Stream check for :meth:`OpenAICompatibleBackend.complete_streaming`.
+
+    Call it with each delta; it returns why the answer is unusable, or None.
+    """
+
+    def __init__(self, allowed_imports: frozenset[str] = ALLOWED_IMPORTS) -> None:
+        self.allowed_imports = allowed_imports
+        self.lines = 0
+        self.reason: str | None = None
+        self._partial = ""
+        #: Fence language of the open block, None outside fences
+        self._fence: str | None = None
+        self._block: list[str] = []
+        self._contract = False
+
+    def __call__(self, delta: str) -> str | None:
+        self._partial += delta
+        *lines, self._partial = self._partial.split("\n")
+        for line in lines:
+            self.lines += 1
+            if (reason := self._line(line)) is not None:
+                self.reason = reason
+                return reason
+        return None
+
+    def _line(self, line: str) -> str | None:
+        fence = _FENCE_RE.match(line)
+        if self._fence is None:
+            if fence is not None:
+                self._fence = fence.group(1).lower()
+                self._block = []
+                self._contract = False
+            return None
+        if fence is not None and not fence.group(1):
+            return self._close()
+        if self._fence not in _PYTHON_FENCES:
+            return None
+        self._block.append(line)
+        if not self._contract:
+            self._contract = "algopy" in _imported_roots(line) or _CONTRACT_CLASS_RE.match(line) is not None
+            if not self._contract:
+                return None
+            # earlier lines of the block were not checked yet
+            for earlier in self._block[:-1]:
+                if (reason := self._import(earlier)) is not None:
+                    return reason
+        return self._import(line) or self._prefix()
+
+    def _import(self, line: str) -> str | None:
+        for root in _imported_roots(line):
+            if root not in self.allowed_imports:
+                return f"imports {root} outside algopy"
+        return None
+
+    def _prefix(self) -> str | None:
+        error = _syntax_error("\n".join(self._block) + "\n")
+        if error is None or any(text in (error.msg or "") for text in _INCOMPLETE):
+            return None
+        if error.lineno is None or error.lineno >= len(self._block):
+            return None
+        return f"{error.msg} (line {error.lineno} of the code block)"
+
+    def _close(self) -> str | None:
+        checked = self._fence in _PYTHON_FENCES and self._contract
+        self._fence = None
+        if not checked:
+            return None
+        error = _syntax_error("\n".join(self._block) + "\n")
+        if error is not None:
+            return f"code block ends with {error.msg} (line {error.lineno})"
+        return None
+
+
+@dataclass
+class StreamStats:
+    """Streams of a run: finished ones and the ones cut short."""
+
+    finished: int = 0
+    finished_tokens: int = 0
+    finished_seconds: float = 0.0
+    aborted: int = 0
+    #: Tokens and seconds the aborted streams ran before they were cut
+    aborted_tokens: int = 0
+    aborted_seconds: float = 0.0
+    reasons: Counter = field(default_factory=Counter)
+
+    def record(self, completion: Completion) -> None:
+        self.finished += 1
+        self.finished_tokens += completion.completion_tokens
+        self.finished_seconds += completion.latency_s
+
+    def record_abort(self, exc: StreamAborted) -> None:
+        self.aborted += 1
+        self.aborted_tokens += exc.partial.completion_tokens
+        self.aborted_seconds += exc.partial.latency_s
+        # the line number makes every reason unique; group by its kind
+        self.reasons[re.sub(r" (?:on line \d+|\(line \d+[^)]*\))", "", exc.reason)] += 1
+
+    @property
+    def saved_tokens(self) -> float:
+        """Completion tokens the aborted streams would have cost had they run to the mean length."""
+        if not self.finished:
+            return 0.0
+        return max(0.0, self.aborted * self.finished_tokens / self.finished - self.aborted_tokens)
+
+    @property
+    def saved_seconds(self) -> float:
+        if not self.finished:
+            return 0.0
+        return max(0.0, self.aborted * self.finished_seconds / self.finished - self.aborted_seconds)
+
+
+def format_stats(stats: StreamStats) -> str:
+    streams = stats.finished + stats.aborted
+    reasons = ", ".join(f"{count} {reason}" for reason, count in stats.reasons.most_common())
+    return (f"{stats.aborted}/{streams} streams aborted early{f' ({reasons})' if reasons else ''}; "
+            f"~{stats.saved_tokens:.0f} completion tokens and ~{stats.saved_seconds:.1f}s of generation saved")
+
+
+def replay(text: str) -> CodeStreamMonitor:
+    """Run a saved completion through a monitor, line by line."""
+    monitor = CodeStreamMonitor()
+    for line in text.splitlines(keepends=True):
+        if monitor(line) is not None:
+            break
+    return monitor
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", type=Path, help="raw completions (.md) or directories of them")
+    args = parser.parse_args(argv)
+
+    files = [file for path in args.paths for file in (sorted(path.rglob("*.md")) if path.is_dir() else [path])]
+    cut = 0
+    for file in files:
+        text = file.read_text(encoding="utf-8")
+        monitor = replay(text)
+        if monitor.reason is not None:
+            cut += 1
+            total = text.count("\n") + 1
+            print(f"{file}: cut at line {monitor.lines} of {total}: {monitor.reason}")
+    print(f"{cut}/{len(files)} completions would have been aborted")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
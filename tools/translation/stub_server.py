@@ -0,0 +1,212 @@
+"""Local stand-in for an OpenAI-compatible ``/chat/completions`` endpoint.
+
+The stub answers every prompt with a small Algorand Python contract named after
+the last ``contract`` declared in the prompt, with a stub method per function
+(a prompt that ends with Python code, such as a repair request, gets that code
+back), after an optional delay (fixed, plus per answer token), and can be told
+to fail a fraction of requests with 429/503 to exercise retries. Requests with
+``"stream": true`` are answered with server-sent events, a few tokens per event;
+``tokens_sent`` counts what was generated before clients hung up. Use it in
+process::
+
+    async with StubServer(latency=0.05) as server:
+        backend = OpenAICompatibleBackend(server.url)
+
+or standalone with ``python -m tools.translation.stub_server --port 8000``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections.abc import Callable
+
+Responder = Callable[[dict], str]
+
+_CONTRACT_RE = re.compile(r"\bcontract\s+(\w+)")
+_FUNCTION_RE = re.compile(r"\bfunction\s+(\w+)")
+_PYTHON_BLOCK_RE = re.compile(r"```python\n(.*?)```", re.S)
+
+#: Characters per streamed event, about four tokens
+STREAM_CHUNK = 16
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def echo_contract(payload: dict) -> str:
+    """Default responder: an ARC4 contract named after the prompt's target, one stub
+    method per function the target declares (just ``__init__`` if it declares none)."""
+    prompt = payload["messages"][-1]["content"]
+    contracts = list(_CONTRACT_RE.finditer(prompt))
+    blocks = list(_PYTHON_BLOCK_RE.finditer(prompt))
+    if blocks and (not contracts or blocks[-1].start() > contracts[-1].end()):
+        return f"```python\n{blocks[-1].group(1)}```\n"
+    name = contracts[-1].group(1) if contracts else "Translated"
+    target = prompt[contracts[-1].end() :] if contracts else ""
+    methods = dict.fromkeys(_snake_case(f) for f in _FUNCTION_RE.findall(target) if f != name) or {"__init__": None}
+    body = "".join(
+        ("" if method == "__init__" else "\n    @arc4.abimethod")
+        + f"\n    def {method}(self) -> None:\n        pass\n"
+        for method in methods
+    )
+    return (
+        "Here is the translation.\n\n```python\n"
+        "from algopy import ARC4Contract, arc4\n\n\n"
+        f"class {name}(ARC4Contract):{body}"
+        "```\n"
+    )
+
+
+class StubServer:
+    """Asyncio HTTP server answering chat completion requests with ``responder``."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        failure_rate: float = 0.0,
+        responder: Responder = echo_contract,
+        seed: int | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.token_latency = token_latency
+        self.failure_rate = failure_rate
+        self.responder = responder
+        self.requests = 0
+        self.tokens_sent = 0
+        self._rng = random.Random(seed)
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> StubServer:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            self.requests += 1
+            parts = request_line.decode().split()
+            if len(parts) < 2 or parts[0] != "POST" or not parts[1].endswith("/chat/completions"):
+                await self._send(writer, 404, {"error": {"message": "not found"}})
+                return
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                status = self._rng.choice((429, 503))
+                await self._send(writer, status, {"error": {"message": "stub failure"}})
+                return
+            await self.respond(writer, json.loads(body))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, payload: dict) -> None:
+        text = self.responder(payload)
+        prompt = payload["messages"][-1]["content"]
+        if payload.get("stream"):
+            await self._stream(writer, payload, text)
+            return
+        self.tokens_sent += len(text) // 4
+        if self.token_latency:
+            # generation time grows with the length of the answer
+            await asyncio.sleep(len(text) // 4 * self.token_latency)
+        await self._send(writer, 200, {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4},
+        })
+
+    async def _stream(self, writer: asyncio.StreamWriter, payload: dict, text: str) -> None:
+        """Send ``text`` as chat completion chunks, ``STREAM_CHUNK`` characters at a time."""
+        writer.write(b"HTTP/1.1 200 STUB\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        model = payload.get("model", "stub")
+
+        async def event(body: dict | str) -> None:
+            data = body if isinstance(body, str) else json.dumps(body)
+            writer.write(f"data: {data}\n\n".encode())
+            await writer.drain()
+
+        for start in range(0, len(text), STREAM_CHUNK):
+            if writer.is_closing():
+                return
+            if self.token_latency:
+                await asyncio.sleep(STREAM_CHUNK // 4 * self.token_latency)
+            self.tokens_sent += STREAM_CHUNK // 4
+            await event({"id": f"stub-{self.requests}", "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": text[start : start + STREAM_CHUNK]}}]})
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            prompt = payload["messages"][-1]["content"]
+            await event({"id": f"stub-{self.requests}", "object": "chat.completion.chunk", "model": model,
+                         "choices": [],
+                         "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}})
+        await event("[DONE]")
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {status} STUB\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = StubServer(args.host, args.port, latency=args.latency, token_latency=args.token_latency,
+                        failure_rate=args.failure_rate)
+    await server.start()
+    print(f"stub completions at {server.url}")
+    await asyncio.Event().wait()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each answer")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="extra seconds per answer token")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction answered 429/503")
+    try:
+        asyncio.run(_serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
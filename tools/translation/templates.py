@@ -0,0 +1,171 @@
+"""Prompt styles compiled into templates with named slots.
+
+Every file in ``Prompts/`` is a complete prompt written around one example
+target, the ``Auction`` contract. :func:`compile_template` parses such a file
+once into literal text and named slots:
+
+``instructions``  text before the few-shot examples (or before the target)
+``examples``      the few-shot block, from ``Example 1`` up to the closing task
+``task``          the instructions between the examples and the target
+``target``        the Solidity source to translate
+``answer``        text after the target, e.g. an answer header
+
+Each slot defaults to the text found in the file, so ``template.render()``
+reproduces the file byte for byte and ``template.render(target=source)`` is
+what the runner sends. Rendering is a single ``str.join``. Because the response
+cache is keyed by the rendered prompt, editing one prompt file only changes the
+keys of that style's cells; ``template.digest`` identifies the template version.
+
+Usage::
+
+    python -m tools.translation.templates    # check every style round-trips, time renders
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tools.dataset import prompt_files
+
+SLOTS = ("instructions", "examples", "task", "target", "answer")
+
+#: Every prompt embeds this example contract as its translation target
+_TARGET_START = "// SPDX-License-Identifier: MIT\npragma solidity ^0.8.0;\n\ncontract Auction"
+
+_EXAMPLES_START = re.compile(r"^[#* ]*Example 1\b", re.MULTILINE | re.IGNORECASE)
+_EXAMPLE_HEADER = re.compile(r"^[#* ]*Example \d+\b.*\n(?:#+ *Solidity Contract:.*\n)?",
+                             re.MULTILINE | re.IGNORECASE)
+_EXAMPLES_END = re.compile(r"^Now\b", re.MULTILINE | re.IGNORECASE)
+_ANSWER_MARKER = "Equivalent algorand python"
+
+
+@dataclass(frozen=True)
+class FewShotExample:
+    solidity: str
+    algorand: str
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    digest: str
+    defaults: dict[str, str] = field(hash=False)
+
+    def render(self, **slots: str) -> str:
+        """Fill the slots, keeping the file's text for any slot not given."""
+        unknown = slots.keys() - self.defaults.keys()
+        if unknown:
+            raise KeyError(f"unknown prompt slots: {', '.join(sorted(unknown))}")
+        if "target" in slots:
+            slots["target"] = slots["target"].strip()
+        return "".join([slots.get(name, self.defaults[name]) for name in SLOTS])
+
+    @property
+    def has_examples(self) -> bool:
+        return bool(self.defaults["examples"])
+
+    def examples(self) -> list[FewShotExample]:
+        """The few-shot pairs shipped in the file."""
+        return parse_examples(self.defaults["examples"])
+
+
+def _target_span(text: str) -> tuple[int, int]:
+    """Start and end offsets of the embedded target contract in a prompt."""
+    start = text.rfind(_TARGET_START)
+    if start < 0:
+        raise ValueError("prompt has no embedded target contract")
+    depth = 0
+    for index in range(text.index("{", start), len(text)):
+        if text[index] == "{":
+            depth += 1
+        elif text[index] == "}":
+            depth -= 1
+            if depth == 0:
+                return start, index + 1
+    raise ValueError("unbalanced braces in embedded target contract")
+
+
+def compile_template(text: str, name: str = "<prompt>") -> PromptTemplate:
+    """Split a prompt into its slots; raises ValueError if it has no target contract."""
+    target_start, target_end = _target_span(text)
+    head = text[:target_start]
+    examples_start = _EXAMPLES_START.search(head)
+    examples_end = _EXAMPLES_END.search(head, examples_start.end()) if examples_start else None
+    if examples_start and examples_end:
+        instructions = head[: examples_start.start()]
+        examples = head[examples_start.start() : examples_end.start()]
+        task = head[examples_end.start() :]
+    else:
+        instructions, examples, task = head, "", ""
+    defaults = {
+        "instructions": instructions,
+        "examples": examples,
+        "task": task,
+        "target": text[target_start:target_end],
+        "answer": text[target_end:],
+    }
+    return PromptTemplate(name, hashlib.sha256(text.encode()).hexdigest()[:16], defaults)
+
+
+def parse_examples(block: str) -> list[FewShotExample]:
+    """Split a few-shot block into Solidity/Algorand Python pairs."""
+    headers = list(_EXAMPLE_HEADER.finditer(block))
+    pairs = []
+    for header, following in zip(headers, headers[1:] + [None]):
+        body = block[header.end() : following.start() if following else len(block)]
+        solidity, marker, algorand = body.partition(_ANSWER_MARKER)
+        if marker:
+            pairs.append(FewShotExample(solidity.strip(), algorand.strip()))
+    return pairs
+
+
+def format_examples(examples: list[FewShotExample]) -> str:
+    """Lay out few-shot pairs the way the ``Fewshot`` prompt lays out its first example."""
+    return "".join(
+        f"### **Example {number}: Solidity to Algorand Python Translation**\n"
+        f"#### Solidity Contract:\n{example.solidity}\n\n"
+        f"{_ANSWER_MARKER}\n\n\n{example.algorand}\n\n\n"
+        for number, example in enumerate(examples, 1)
+    )
+
+
+_loaded: dict[Path, tuple[int, PromptTemplate]] = {}
+
+
+def load_template(path: Path) -> PromptTemplate:
+    """Compile a prompt file, reusing the compiled template until the file changes."""
+    mtime = path.stat().st_mtime_ns
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = mtime, compile_template(path.read_text(encoding="utf-8"), path.stem)
+        _loaded[path] = cached
+    return cached[1]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=10_000, help="renders timed per style")
+    args = parser.parse_args(argv)
+    failed = False
+    for path in prompt_files():
+        text = path.read_text(encoding="utf-8")
+        template = load_template(path)
+        exact = template.render() == text
+        failed |= not exact
+        started = time.perf_counter()
+        for _ in range(args.renders):
+            template.render(target=text)
+        per_render = (time.perf_counter() - started) / args.renders
+        print(f"{path.name:<22} {template.digest}  examples={len(template.examples())}  "
+              f"round-trip={'ok' if exact else 'MISMATCH'}  {per_render * 1e6:.2f} us/render")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
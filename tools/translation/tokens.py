@@ -0,0 +1,64 @@
+"""Pluggable token counters for prompt accounting.
+
+``approx`` (about four characters per token) needs nothing and is what the
+budgets elsewhere use; ``words`` counts identifiers, numbers and punctuation
+separately, which tracks BPE tokenizers more closely on code; ``tiktoken:<encoding>``
+uses OpenAI's tokenizer when the ``tiktoken`` package is installed.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Protocol
+
+_WORD_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count, about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+class ApproxTokenizer:
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return approx_tokens(text)
+
+
+class WordTokenizer:
+    name = "words"
+
+    def count(self, text: str) -> int:
+        return len(_WORD_RE.findall(text))
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding: str = "o200k_base") -> None:
+        try:
+            import tiktoken
+        except ImportError as exc:
+            raise RuntimeError("tiktoken is not installed; pip install tiktoken") from exc
+        self.name = f"tiktoken:{encoding}"
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def get_tokenizer(spec: str = "approx") -> Tokenizer:
+    """``approx``, ``words`` or ``tiktoken[:<encoding>]``."""
+    name, _, argument = spec.partition(":")
+    if name == "approx":
+        return ApproxTokenizer()
+    if name == "words":
+        return WordTokenizer()
+    if name == "tiktoken":
+        return TiktokenTokenizer(argument or "o200k_base")
+    raise ValueError(f"unknown tokenizer {spec!r}; expected approx, words or tiktoken[:<encoding>]")